@@ -46,12 +46,14 @@ from ColorReliefEditor.color_page import ColorPage
 from ColorReliefEditor.elevation_page import ElevationPage
 from ColorReliefEditor.hillshade_page import HillshadePage
 from ColorReliefEditor.contour_page import ContourPage
-from ColorReliefEditor.make_process import MakeProcess
+from ColorReliefEditor.make_process import MakeProcess, MAX_BUILDS, MAX_JOBS
 from ColorReliefEditor.misc_page import MiscPage
-from ColorReliefEditor.project_config import ProjectConfig, app_files_path, \
+from ColorReliefEditor.project_config import ProjectConfig, ProjectSettings, app_files_path, \
     create_file_from_resource
 from ColorReliefEditor.project_page import ProjectPage
 from ColorReliefEditor.relief_page import ReliefPage
+from ColorReliefEditor.render_worker import RenderClient
+from ColorReliefEditor.stale_monitor import StaleMonitor
 from ColorReliefEditor.settings_page import AppSettingsPage
 
 
@@ -95,13 +97,22 @@ class ColorReliefEdit(QMainWindow):
         self.setup_style(app)
 
         # Manage Makefile operations to build images
-        self.make_process = MakeProcess(self.verbose, is_dark_mode())
+        self.make_process = MakeProcess(
+            self.verbose, is_dark_mode(), int(self.app_config.get("MAKE_JOBS") or MAX_JOBS),
+            int(self.app_config.get("BUILD_JOBS") or MAX_BUILDS)
+        )
 
         # Manage opening projects and  paths to key project files
         self.project: ProjectConfig = ProjectConfig(self, verbose=self.verbose)
 
         # Manage project settings (Project tab will do the load)
-        self.proj_config: YamlConfig = YamlConfig(verbose=self.verbose)
+        self.proj_config: YamlConfig = ProjectSettings(verbose=self.verbose)
+
+        # Persistent worker process for preview rendering (started when a project is loaded)
+        self.render_client = RenderClient(verbose=self.verbose)
+
+        # Tracks which images are out of date as project files change (set when a project loads)
+        self.stale_monitor = StaleMonitor()
 
         # The tabs to launch for basic mode and expert mode
         if self.app_config["MODE"] == "basic":
@@ -258,6 +269,8 @@ class ColorReliefEdit(QMainWindow):
         """
         # Call on_tab_exit for the currently active tab
         self.tabs.widget(self.current_tab).on_tab_exit()
+        self.render_client.close()
+        self.stale_monitor.stop()
         super().closeEvent(event)
 
     def load_app_config(self, name):
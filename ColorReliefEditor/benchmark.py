@@ -0,0 +1,360 @@
+#  Copyright (c) 2024.
+#   Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the “Software”), to deal in the
+#   Software without restriction,
+#   including without limitation the rights to use, copy, modify, merge, publish, distribute,
+#   sublicense, and/or sell copies
+#   of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+#   the following conditions:
+#  #
+#   The above copyright notice and this permission notice shall be included in all copies or
+#   substantial portions of the Software.
+#  #
+#   THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+#   BUT NOT LIMITED TO THE
+#   WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO
+#   EVENT SHALL THE AUTHORS OR
+#   COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+#   CONTRACT, TORT OR
+#   OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#   DEALINGS IN THE SOFTWARE.
+#  #
+#   This uses QT for some components which has the primary open-source license is the GNU Lesser
+#   General Public License v. 3 (“LGPL”).
+#   With the LGPL license option, you can use the essential libraries and some add-on libraries
+#   of Qt.
+#   See https://www.qt.io/licensing/open-source-lgpl-obligations for QT details.
+"""
+Benchmark the relief pipeline on synthetic DEMs.
+
+For each DEM size and data type, relief_benchmark generates a fractal terrain DEM with nodata
+oceans (see synthetic_dem), creates a project for it from the default resources, and runs every
+color_relief.sh stage in build order, timing each one.  The preview path (preview DEM, color,
+hillshade, and merge) is then timed end to end with make.  The build cache is off so every stage
+runs.  Only the GDAL command line tools and color_relief.sh are needed, with no network access.
+
+Results are written as JSON:
+
+    {"version": 1, "machine": {...}, "gdal": "GDAL 3.9.2",
+     "results": [{"case": "1k-int16", "size": 1000, "type": "int16", "engine": "gdal",
+                  "pipeline": "standard", "stage": "hillshade", "seconds": 0.41,
+                  "exit_code": 0}, ...]}
+
+With --baseline, each stage is compared with the same case and stage in an earlier results file.
+A stage more than --threshold times slower (and at least --min-delta seconds slower) is reported
+as a regression and relief_benchmark exits with 1.
+
+Command line usage:
+    relief_benchmark run [--sizes 1k,10k] [--types int16,float32] [--engine gdal|numpy]
+                         [--pipeline standard|fused] [--repeat N] [--workdir DIR]
+                         [--output FILE] [--baseline FILE] [--threshold X] [--min-delta S]
+    relief_benchmark generate [--type int16|float32] [--seed N] [--ocean F] SIZE TARGET
+    relief_benchmark compare [--threshold X] [--min-delta S] BASELINE RESULTS
+"""
+import argparse
+import importlib.resources as pkg_resources
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from ColorReliefEditor import resources
+from ColorReliefEditor.build_graph import BuildGraph
+from ColorReliefEditor.synthetic_dem import DEM_TYPES, parse_size, write_dem
+
+RESULTS_VERSION = 1
+
+REGION = "BENCH"
+LAYER = "Base"
+DEM_NAME = "synthetic.tif"
+
+DEFAULT_SIZES = "1k,10k"
+DEFAULT_THRESHOLD = 1.25
+DEFAULT_MIN_DELTA = 0.5
+
+# Project settings that differ from default_relief.cfg.  The cache would skip stages
+SETTINGS = {
+    "FILES": {"A": DEM_NAME}, "BUILD_CACHE": "off", "TELEMETRY": "off", "TIMING": "false",
+    "QUIET": "-q",
+}
+
+
+def machine_info():
+    """
+    Return a description of this computer for the results.
+    """
+    return {
+        "platform": platform.platform(), "processor": platform.processor(),
+        "cpus": os.cpu_count(), "python": platform.python_version(),
+    }
+
+
+def gdal_version():
+    try:
+        result = subprocess.run(["gdalinfo", "--version"], capture_output=True, text=True)
+        return result.stdout.strip()
+    except OSError:
+        return ""
+
+
+def create_project(folder, size):
+    """
+    Create a project from the default resources for a DEM in folder/elevation.
+
+    Args:
+        folder (str): Project folder.  The region is BENCH.
+        size (int): DEM size.  The preview size is a quarter of it (at most 1000).
+
+    Returns:
+        str: Path of the project config file.
+    """
+    os.makedirs(os.path.join(folder, "elevation"), exist_ok=True)
+    for resource, name in (("Makefile", "Makefile"),
+                           ("default_color_ramp.txt", f"{REGION}_color_ramp.txt")):
+        with open(os.path.join(folder, name), "w") as file:
+            file.write(pkg_resources.files(resources).joinpath(resource).read_text())
+
+    settings = dict(SETTINGS, PREVIEW=str(min(1000, size // 4)))
+    lines = []
+    skip = False
+    for line in pkg_resources.files(resources).joinpath("default_relief.cfg").read_text(
+    ).splitlines():
+        key = line.split(":")[0]
+        if skip and line.startswith(" "):
+            continue
+        skip = False
+        if not line.startswith(" ") and key in settings:
+            value = settings.pop(key)
+            if isinstance(value, dict):
+                lines.append(f"{key}:")
+                lines += [f"  {name}: {item}" for name, item in value.items()]
+                skip = True
+            else:
+                lines.append(f"{key}: '{value}'")
+        else:
+            lines.append(line)
+    lines += [f"{key}: '{value}'" for key, value in settings.items()]
+
+    config_path = os.path.join(folder, f"{REGION}_relief.cfg")
+    with open(config_path, "w") as file:
+        file.write("\n".join(lines) + "\n")
+    return config_path
+
+
+def run_command(command, folder, env):
+    """
+    Run a command and return its exit code and time in seconds.
+    """
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=folder, env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True)
+    seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        print(result.stderr.strip()[-2000:], file=sys.stderr)
+    return result.returncode, seconds
+
+
+def benchmark_case(folder, size, dem_type, engine="gdal", pipeline="standard", repeat=1,
+                   log=print):
+    """
+    Generate a DEM, build every stage, and time each stage and the preview path.
+
+    Args:
+        folder (str): Empty folder for the project.
+        size (int): DEM size in pixels.
+        dem_type (str): "int16" or "float32".
+        engine (str): "gdal" or "numpy" (ENGINE).
+        pipeline (str): "standard" or "fused" (PIPELINE).
+        repeat (int): Runs of each stage.  The fastest is kept.
+        log (callable): Called with progress messages.
+
+    Returns:
+        list of dict: A result for each stage (see module notes).
+    """
+    case = f"{size // 1000}k-{dem_type}" if size % 1000 == 0 else f"{size}-{dem_type}"
+    create_project(folder, size)
+    env = dict(os.environ, ENGINE=engine)
+
+    def result(stage, exit_code, seconds):
+        log(f"{case} {stage}: {seconds:.2f}s" + ("" if exit_code == 0 else f" (exit {exit_code})"))
+        return {"case": case, "size": size, "type": dem_type, "engine": engine,
+                "pipeline": pipeline, "stage": stage, "seconds": round(seconds, 3),
+                "exit_code": exit_code}
+
+    start = time.perf_counter()
+    write_dem(os.path.join(folder, "elevation", DEM_NAME), size, dem_type)
+    results = [result("generate", 0, time.perf_counter() - start)]
+
+    graph = BuildGraph(folder, REGION, LAYER, pipeline, [os.path.join("elevation", DEM_NAME)])
+    preview_target = graph.final.replace(".tif", "_prv.tif")
+    contour = graph.final.replace("_relief.tif", "_contour.shp")
+    for target in (graph.final, contour, preview_target):
+        for stale in graph.stale(target):
+            if stale.target not in graph.commands:
+                continue
+            best = None
+            for _ in range(repeat):
+                exit_code, seconds = run_command(graph.command(stale.target), folder, env)
+                if exit_code != 0:
+                    results.append(result(stale.stage, exit_code, seconds))
+                    return results
+                best = seconds if best is None else min(best, seconds)
+            if "trigger" not in stale.stage:
+                results.append(result(stale.stage, 0, best))
+
+    # The preview path end to end, as the Preview button runs it
+    make = "gmake" if platform.system() == "Darwin" else "make"
+    best = None
+    for _ in range(repeat):
+        for name in os.listdir(folder):
+            if name.endswith("_prv.tif"):
+                os.remove(os.path.join(folder, name))
+        exit_code, seconds = run_command(
+            [make, f"REGION={REGION}", f"LAYER={LAYER}", f"PIPELINE={pipeline}",
+             f"DEM_FILES=elevation/{DEM_NAME}", "-f", "Makefile", preview_target], folder, env
+        )
+        if exit_code != 0:
+            results.append(result("preview path", exit_code, seconds))
+            return results
+        best = seconds if best is None else min(best, seconds)
+    results.append(result("preview path", 0, best))
+    return results
+
+
+def compare(baseline, results, threshold=DEFAULT_THRESHOLD, min_delta=DEFAULT_MIN_DELTA):
+    """
+    Compare results with a baseline.
+
+    Args:
+        baseline (dict): Earlier results.
+        results (dict): New results.
+        threshold (float): A stage this many times slower is a regression.
+        min_delta (float): Ignore stages slower by less than this many seconds.
+
+    Returns:
+        list of (dict, float): Each regressed result and its baseline seconds.
+    """
+    def key(item):
+        return item["case"], item.get("engine"), item.get("pipeline"), item["stage"]
+
+    earlier = {key(item): item["seconds"] for item in baseline.get("results", []) if
+               item.get("exit_code") == 0}
+    regressed = []
+    for item in results.get("results", []):
+        before = earlier.get(key(item))
+        if before is None or item.get("exit_code") != 0:
+            continue
+        if item["seconds"] > threshold * before and item["seconds"] - before >= min_delta:
+            regressed.append((item, before))
+    return regressed
+
+
+def print_regressions(regressed, threshold):
+    if not regressed:
+        print("No regressions")
+    for item, before in regressed:
+        print(f"REGRESSION {item['case']} {item['stage']}: {item['seconds']:.2f}s vs "
+              f"{before:.2f}s baseline (over {threshold}x)")
+
+
+def load_results(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def main(argv=None):
+    """
+    Command line entry point for relief_benchmark.
+
+    Args:
+        argv (list of str, optional): Arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: 0 on success, 1 if a stage failed or regressed, 2 on an error.
+    """
+    parser = argparse.ArgumentParser(prog="relief_benchmark", description="Relief benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Benchmark the pipeline")
+    run.add_argument("--sizes", default=DEFAULT_SIZES, help="DEM sizes such as 1k,10k,40k")
+    run.add_argument("--types", default="int16,float32")
+    run.add_argument("--engine", choices=["gdal", "numpy"], default="gdal")
+    run.add_argument("--pipeline", choices=["standard", "fused"], default="standard")
+    run.add_argument("--repeat", type=int, default=1)
+    run.add_argument("--workdir", help="Folder for the projects.  Default is a temp folder")
+    run.add_argument("--output", help="Results file.  Default is standard output")
+    run.add_argument("--baseline", help="Results file to compare with")
+
+    generate = commands.add_parser("generate", help="Write a synthetic DEM")
+    generate.add_argument("--type", choices=sorted(DEM_TYPES), default="int16")
+    generate.add_argument("--seed", type=int, default=0)
+    generate.add_argument("--ocean", type=float, default=0.45)
+    generate.add_argument("size")
+    generate.add_argument("target")
+
+    check = commands.add_parser("compare", help="Compare results with a baseline")
+    check.add_argument("baseline")
+    check.add_argument("results")
+    for command in (run, check):
+        command.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+        command.add_argument("--min-delta", type=float, default=DEFAULT_MIN_DELTA)
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "generate":
+            write_dem(args.target, parse_size(args.size), args.type, args.seed, args.ocean)
+            return 0
+        if args.command == "compare":
+            regressed = compare(load_results(args.baseline), load_results(args.results),
+                                args.threshold, args.min_delta)
+            print_regressions(regressed, args.threshold)
+            return 1 if regressed else 0
+
+        sizes = [parse_size(size) for size in args.sizes.split(",") if size.strip()]
+        types = [dem_type.strip() for dem_type in args.types.split(",") if dem_type.strip()]
+        for dem_type in types:
+            if dem_type not in DEM_TYPES:
+                raise ValueError(f"Unknown DEM type: {dem_type}")
+        baseline = load_results(args.baseline) if args.baseline else None
+
+        workdir = args.workdir or tempfile.mkdtemp(prefix="relief_benchmark_")
+        results = {"version": RESULTS_VERSION, "machine": machine_info(),
+                   "gdal": gdal_version(), "results": []}
+        try:
+            for size in sizes:
+                for dem_type in types:
+                    folder = os.path.join(workdir, f"{size}_{dem_type}", REGION)
+                    shutil.rmtree(folder, ignore_errors=True)
+                    os.makedirs(folder)
+                    results["results"] += benchmark_case(
+                        folder, size, dem_type, args.engine, args.pipeline, max(1, args.repeat),
+                        log=lambda message: print(message, file=sys.stderr)
+                    )
+        finally:
+            if not args.workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        text = json.dumps(results, indent=2)
+        if args.output:
+            with open(args.output, "w") as file:
+                file.write(text + "\n")
+        else:
+            print(text)
+
+        failed = any(item["exit_code"] != 0 for item in results["results"])
+        regressed = []
+        if baseline:
+            regressed = compare(baseline, results, args.threshold, args.min_delta)
+            print_regressions(regressed, args.threshold)
+        return 1 if failed or regressed else 0
+    except (OSError, ValueError) as e:
+        print(f"relief_benchmark: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,463 @@
+#  Copyright (c) 2024.
+#   Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the “Software”), to deal in the
+#   Software without restriction,
+#   including without limitation the rights to use, copy, modify, merge, publish, distribute,
+#   sublicense, and/or sell copies
+#   of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+#   the following conditions:
+#  #
+#   The above copyright notice and this permission notice shall be included in all copies or
+#   substantial portions of the Software.
+#  #
+#   THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+#   BUT NOT LIMITED TO THE
+#   WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO
+#   EVENT SHALL THE AUTHORS OR
+#   COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+#   CONTRACT, TORT OR
+#   OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#   DEALINGS IN THE SOFTWARE.
+#  #
+#   This uses QT for some components which has the primary open-source license is the GNU Lesser
+#   General Public License v. 3 (“LGPL”).
+#   With the LGPL license option, you can use the essential libraries and some add-on libraries
+#   of Qt.
+#   See https://www.qt.io/licensing/open-source-lgpl-obligations for QT details.
+"""
+Content-addressed build cache for color_relief.sh.
+
+Make decides what to rebuild from file modification times, so saving the config, touching a
+trigger file, or reverting a setting reruns stages whose output we already built.  Before
+running a stage, color_relief.sh asks the cache for an output built from identical inputs.  On a
+hit the output is restored with a hardlink (a copy if the cache is on another file system) in
+milliseconds.  Make still schedules the build; the cache only makes a stale target cheap.
+
+Each stage key is a hash of everything that determines the stage output:
+    - dem:        DEM file names, sizes and mtimes for the layer, VRT and WARP1-4
+    - dem (prv):  the dem key, PREVIEW, X_SHIFT and Y_SHIFT
+    - color:      the dem key, the color ramp contents, COLOR1-2, OUTPUT_TYPE, COMPRESS
+    - hillshade:  the dem key, OUTPUT_TYPE, EDGE, HILLSHADE1-4, COMPRESS
+    - merge:      the color and hillshade keys, MERGE1-4, MERGE_CALC, BRIGHTNESS, HILLSHADE_GAMMA,
+                  COMPRESS
+    - relief:     as merge, for the fused pipeline
+EDGE is not part of the color key since -compute_edges has no effect on a color relief.
+The raster engine (ENGINE config setting or environment variable) is part of every key except dem.
+COG and COG_RESAMPLING are part of the color, hillshade, merge, and relief keys since the cached
+output is the Cloud-Optimized GeoTIFF.
+
+The cache is in <project>/.relief_cache unless CACHE_DIR or the RELIEF_CACHE_DIR environment
+variable name a shared folder.  Entries are evicted least recently used first when the cache
+exceeds CACHE_LIMIT megabytes.  BUILD_CACHE: off disables the cache.  color_relief.sh doesn't
+cache previews, which rebuild faster than a cache check, except for the preview DEM (--preview).
+
+Command line usage:
+    relief_cache restore [--preview] CONFIG STAGE TARGET   Exit 0 if TARGET was restored
+    relief_cache store [--preview] CONFIG STAGE TARGET     Add a newly built TARGET
+    relief_cache key [--preview] CONFIG STAGE              Print the stage key
+    relief_cache stats CONFIG                              Print cache statistics
+    relief_cache clear CONFIG                              Remove all cache entries
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shlex
+import shutil
+import sys
+
+from ColorReliefEditor import config_env
+
+# Increment when stage outputs change for identical inputs so old entries are not reused
+CACHE_VERSION = 1
+
+# Default cache size limit in megabytes (CACHE_LIMIT)
+DEFAULT_LIMIT_MB = 2048
+
+STATS_FILE = "stats.json"
+
+# Config settings that determine the output of each stage
+STAGE_KEYS = {
+    "dem": ["VRT", "WARP1", "WARP2", "WARP3", "WARP4"],
+    "preview": ["PREVIEW", "X_SHIFT", "Y_SHIFT"],
+    "color": ["COLOR1", "COLOR2", "OUTPUT_TYPE", "COMPRESS", "COG", "COG_RESAMPLING"],
+    "hillshade": ["OUTPUT_TYPE", "EDGE", "HILLSHADE1", "HILLSHADE2", "HILLSHADE3", "HILLSHADE4",
+                  "COMPRESS", "COG", "COG_RESAMPLING"],
+    "merge": ["MERGE1", "MERGE2", "MERGE3", "MERGE4", "MERGE_CALC", "BRIGHTNESS",
+              "HILLSHADE_GAMMA", "COMPRESS", "COG", "COG_RESAMPLING"],
+}
+STAGE_KEYS["relief"] = STAGE_KEYS["merge"]
+
+STAGES = ["dem", "color", "hillshade", "merge", "relief"]
+
+
+def _digest(*parts):
+    """
+    Return the SHA-256 hex digest of JSON serializable parts.
+    """
+    text = json.dumps([CACHE_VERSION, *parts], separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def region_paths(config_path):
+    """
+    Return the project folder and region for a config file.
+
+    Args:
+        config_path (str): Path to <region>_relief.cfg.
+
+    Returns:
+        tuple: (project folder, region)
+    """
+    config_path = os.path.abspath(config_path)
+    name = os.path.basename(config_path)
+    region = name[:-len("_relief.cfg")] if name.endswith("_relief.cfg") else name
+    return os.path.dirname(config_path), region
+
+
+def dem_fingerprint(values, project_dir):
+    """
+    List the name, size and mtime of each elevation file for the layer.  Patterns in
+    FILES.<LAYER> are expanded in DEM_FOLDER as color_relief.sh does.  The LAYER_ID environment
+    variable overrides the active LAYER.
+
+    Args:
+        values (dict): Config values from config_env.load_values.
+        project_dir (str): Project folder.
+
+    Returns:
+        list: [name, size, mtime_ns] for each file.  Missing files have size and mtime None.
+    """
+    folder = os.path.join(project_dir, values.get("DEM_FOLDER", ""))
+    layer_id = os.environ.get("LAYER_ID") or values.get("LAYER", "")
+    files = []
+    for pattern in shlex.split(values.get(f"FILES.{layer_id}", "")):
+        matches = sorted(glob.glob(os.path.join(folder, pattern))) or [os.path.join(folder, pattern)]
+        for path in matches:
+            try:
+                info = os.stat(path)
+                files.append([os.path.basename(path), info.st_size, info.st_mtime_ns])
+            except OSError:
+                files.append([os.path.basename(path), None, None])
+    return files
+
+
+def file_digest(path):
+    """
+    Return the SHA-256 hex digest of a file's contents, or None if it doesn't exist.
+    """
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def stage_key(config_path, stage, preview=False, values=None):
+    """
+    Return the cache key for a stage output.  Keys are chained, so a new DEM changes the key of
+    every later stage.
+
+    Args:
+        config_path (str): Path to <region>_relief.cfg.
+        stage (str): One of STAGES.
+        preview (bool): Key for the preview output.
+        values (dict, optional): Config values. Loaded from config_path if None.
+
+    Returns:
+        str: Hex digest.
+
+    Raises:
+        ValueError: If the stage is unknown or the config is invalid.
+        OSError: If the config cannot be read.
+    """
+    if stage not in STAGES:
+        raise ValueError(f"Unknown stage '{stage}'. Use one of {', '.join(STAGES)}")
+    if values is None:
+        values = config_env.load_values(config_path)
+    project_dir, region = region_paths(config_path)
+
+    def settings(name):
+        return [values.get(key, "") for key in STAGE_KEYS[name]]
+
+    key = _digest("dem", dem_fingerprint(values, project_dir), settings("dem"))
+    if preview:
+        key = _digest("preview", key, settings("preview"))
+    if stage == "dem":
+        return key
+
+    engine = os.environ.get("ENGINE") or values.get("ENGINE") or "gdal"
+    ramp = file_digest(os.path.join(project_dir, f"{region}_color_ramp.txt"))
+    color = _digest("color", key, engine, ramp, settings("color"))
+    hillshade = _digest("hillshade", key, engine, settings("hillshade"))
+    if stage == "color":
+        return color
+    if stage == "hillshade":
+        return hillshade
+    return _digest(stage, color, hillshade, engine, settings(stage))
+
+
+class BuildCache:
+    """
+    A folder of stage outputs named by their key.  Entry modification times record when each
+    entry was last stored or restored and are used for least recently used eviction.
+
+    **Methods**:
+        - restore(key, target): Restore target from the cache.
+        - store(key, target): Add target to the cache and evict old entries.
+        - evict(): Remove least recently used entries until the cache is within its limit.
+        - stats(): Return cache statistics.
+        - clear(): Remove all entries.
+
+    Attributes:
+        folder (str): Cache folder.
+        limit (int): Size limit in bytes.
+    """
+
+    def __init__(self, folder, limit_mb=DEFAULT_LIMIT_MB):
+        self.folder = folder
+        self.limit = int(limit_mb * 1024 * 1024)
+
+    def path(self, key, target):
+        """
+        Return the cache entry path for a key.  The target's extension is kept.
+        """
+        _, ending = os.path.splitext(target)
+        return os.path.join(self.folder, f"{key}{ending}")
+
+    def entries(self):
+        """
+        Return (path, size, mtime) for each cache entry.
+        """
+        entries = []
+        try:
+            names = os.listdir(self.folder)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if name == STATS_FILE or name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.folder, name)
+            try:
+                info = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, info.st_size, info.st_mtime))
+        return entries
+
+    def restore(self, key, target):
+        """
+        Restore target from the cache.  The target's modification time is set to now so make
+        treats it as up to date.
+
+        Args:
+            key (str): Stage key.
+            target (str): Output path.
+
+        Returns:
+            bool: True if the target was restored, False on a cache miss.
+        """
+        entry = self.path(key, target)
+        if not os.path.isfile(entry):
+            self._count("misses")
+            return False
+        _link(entry, target)
+        os.utime(target)
+        if not os.path.samefile(entry, target):
+            os.utime(entry)
+        self._count("hits")
+        return True
+
+    def store(self, key, target):
+        """
+        Add a newly built target to the cache, then evict old entries.
+
+        Args:
+            key (str): Stage key.
+            target (str): Output path.
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        _link(target, self.path(key, target))
+        self._count("stores")
+        self.evict()
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache is within its size limit.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= self.limit:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        if removed:
+            self._count("evictions", removed)
+        return removed
+
+    def stats(self):
+        """
+        Return cache statistics.
+
+        Returns:
+            dict: folder, entries, size and limit in bytes, and the hits, misses, stores, and
+            evictions counts.
+        """
+        entries = self.entries()
+        stats = {"folder": self.folder, "entries": len(entries),
+                 "size": sum(size for _, size, _ in entries), "limit": self.limit}
+        stats.update(self._load_counts())
+        return stats
+
+    def clear(self):
+        """
+        Remove all cache entries and reset the statistics.
+        """
+        for path, _, _ in self.entries():
+            os.remove(path)
+        try:
+            os.remove(os.path.join(self.folder, STATS_FILE))
+        except FileNotFoundError:
+            pass
+
+    def _load_counts(self):
+        counts = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        try:
+            with open(os.path.join(self.folder, STATS_FILE), "r") as f:
+                counts.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        return counts
+
+    def _count(self, name, amount=1):
+        # Parallel make jobs can race here.  A lost count is acceptable for statistics.
+        counts = self._load_counts()
+        counts[name] += amount
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, STATS_FILE)
+        temp = f"{path}.{os.getpid()}.tmp"
+        with open(temp, "w") as f:
+            json.dump(counts, f)
+        os.replace(temp, path)
+
+
+def _link(source, target):
+    """
+    Replace target with a hardlink to source, or a copy if a hardlink is not possible.  The
+    link is created under a temporary name and renamed so target is never partially written.
+    """
+    temp = f"{target}.{os.getpid()}.tmp"
+    try:
+        os.link(source, temp)
+    except OSError:
+        shutil.copy2(source, temp)
+    os.replace(temp, target)
+
+
+def cache_folder(project_dir, values):
+    """
+    Return the cache folder for a project: RELIEF_CACHE_DIR, CACHE_DIR, or .relief_cache in the
+    project folder.
+    """
+    folder = os.environ.get("RELIEF_CACHE_DIR") or values.get("CACHE_DIR") or ".relief_cache"
+    return os.path.join(project_dir, os.path.expanduser(folder))
+
+
+def open_cache(config_path, values=None):
+    """
+    Return the BuildCache for a project, or None if BUILD_CACHE is off.
+
+    Args:
+        config_path (str): Path to <region>_relief.cfg.
+        values (dict, optional): Config values. Loaded from config_path if None.
+
+    Returns:
+        BuildCache or None
+
+    Raises:
+        ValueError: If CACHE_LIMIT is invalid.
+    """
+    if values is None:
+        values = config_env.load_values(config_path)
+    if values.get("BUILD_CACHE", "").strip().lower() == "off":
+        return None
+    project_dir, _ = region_paths(config_path)
+    folder = cache_folder(project_dir, values)
+    limit = values.get("CACHE_LIMIT", "").strip()
+    try:
+        limit_mb = float(limit) if limit else DEFAULT_LIMIT_MB
+    except ValueError:
+        raise ValueError(f"Invalid CACHE_LIMIT: '{limit}'. Use a size in megabytes")
+    return BuildCache(folder, limit_mb)
+
+
+def main(argv=None):
+    """
+    Command line entry point for relief_cache.
+
+    Args:
+        argv (list of str, optional): Arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: Exit code. 0 on success (or a cache hit for restore), 1 on a cache miss or error.
+    """
+    parser = argparse.ArgumentParser(prog="relief_cache", description="Relief build cache")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("restore", "store", "key"):
+        command = commands.add_parser(name)
+        command.add_argument("--preview", action="store_true")
+        command.add_argument("config")
+        command.add_argument("stage", choices=STAGES)
+        if name != "key":
+            command.add_argument("target")
+    for name in ("stats", "clear"):
+        commands.add_parser(name).add_argument("config")
+    args = parser.parse_args(argv)
+
+    try:
+        values = config_env.load_values(args.config)
+        if args.command == "key":
+            print(stage_key(args.config, args.stage, args.preview, values))
+            return 0
+        cache = open_cache(args.config, values)
+        if cache is None:
+            if args.command in ("stats", "clear"):
+                print("Build cache is off (BUILD_CACHE)")
+            return 1 if args.command == "restore" else 0
+
+        if args.command == "restore":
+            key = stage_key(args.config, args.stage, args.preview, values)
+            if not cache.restore(key, args.target):
+                return 1
+            print(f"Restored {args.target} from build cache", file=sys.stderr)
+        elif args.command == "store":
+            cache.store(stage_key(args.config, args.stage, args.preview, values), args.target)
+        elif args.command == "stats":
+            stats = cache.stats()
+            lookups = stats["hits"] + stats["misses"]
+            rate = f"{100 * stats['hits'] / lookups:.0f}%" if lookups else "-"
+            print(f"Folder:    {stats['folder']}")
+            print(f"Entries:   {stats['entries']}")
+            print(f"Size:      {stats['size'] / 1048576:.1f} MB of {stats['limit'] / 1048576:.0f} MB")
+            print(f"Hits:      {stats['hits']}  Misses: {stats['misses']}  Hit rate: {rate}")
+            print(f"Stores:    {stats['stores']}  Evictions: {stats['evictions']}")
+        else:
+            cache.clear()
+    except (OSError, ValueError) as e:
+        print(f"relief_cache: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+#  Copyright (c) 2024.
+#   Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the “Software”), to deal in the
+#   Software without restriction,
+#   including without limitation the rights to use, copy, modify, merge, publish, distribute,
+#   sublicense, and/or sell copies
+#   of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+#   the following conditions:
+#  #
+#   The above copyright notice and this permission notice shall be included in all copies or
+#   substantial portions of the Software.
+#  #
+#   THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+#   BUT NOT LIMITED TO THE
+#   WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO
+#   EVENT SHALL THE AUTHORS OR
+#   COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+#   CONTRACT, TORT OR
+#   OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#   DEALINGS IN THE SOFTWARE.
+#  #
+#   This uses QT for some components which has the primary open-source license is the GNU Lesser
+#   General Public License v. 3 (“LGPL”).
+#   With the LGPL license option, you can use the essential libraries and some add-on libraries
+#   of Qt.
+#   See https://www.qt.io/licensing/open-source-lgpl-obligations for QT details.
+"""
+In-process model of the Makefile dependency graph.
+
+Checking whether an image is up to date with `make -n` starts a make process and blocks the GUI
+until it finishes.  BuildGraph applies the Makefile rules to file modification times directly,
+which takes a few stat calls, and reports each stage that make would rebuild and why.
+
+The rules mirror resources/Makefile and must be kept in sync with it.
+
+Command line usage:
+    relief_status [--pipeline standard|fused] [--dir PROJECT] REGION LAYER [TARGET]
+        Lists the stages that are out of date.  TARGET defaults to the relief image.  The
+        elevation files and pipeline are read from the project config if it exists.
+        Exits 0 if TARGET is up to date, 1 if it needs to be built.
+"""
+import argparse
+import glob
+import os
+import sys
+from collections import namedtuple
+
+from ColorReliefEditor import config_env
+
+# A stage that make would rebuild.  stage is a short name such as "color (preview)"
+Stale = namedtuple("Stale", ["stage", "target", "reason"])
+
+# Graph node for the elevation files a DEM is built from
+ELEVATION_FILES = "DEM_FILES"
+
+
+class BuildGraph:
+    """
+    The Makefile targets for one region and layer, with the files each is built from.
+    Staleness follows make: a target is rebuilt if it is missing, if a prerequisite is newer,
+    or if a prerequisite will be rebuilt.
+
+    **Methods**:
+        - stale(target): Return the stages that must be rebuilt to make target, in build order.
+        - up_to_date(target): Return True if target doesn't need to be rebuilt.
+        - command(target): Return the Makefile recipe for target.
+        - elevation_paths(): Return the elevation files the DEM is built from.
+
+    Attributes:
+        project_dir (str): Project folder containing the Makefile targets.
+        layer (str): Layer name.
+        rules (dict): Maps each target to its prerequisites.
+        commands (dict): Maps each target to its color_relief.sh arguments.
+        stages (dict): Maps each target to its stage name.
+        final (str): The relief image target.
+        dem_files (list of str): Elevation file patterns the DEM is built from (DEM_FILES).
+    """
+
+    def __init__(self, project_dir, region, layer, pipeline="standard", dem_files=None):
+        """
+        Args:
+            project_dir (str): Project folder.
+            region (str): Region name (REGION).
+            layer (str): Layer name (LAYER).
+            pipeline (str): "standard" or "fused" (PIPELINE).
+            dem_files (list of str, optional): Elevation file patterns relative to the project
+                folder (see dem_patterns).  Like the Makefile wildcard, patterns that match no
+                files are ignored.
+        """
+        self.project_dir = project_dir
+        self.layer = layer
+        self.dem_files = dem_files or []
+        prefix = f"{region}_{layer}"
+        config = f"{region}_relief.cfg"
+        ramp = f"{region}_color_ramp.txt"
+        dem_trigger = f"{prefix}_DEM_trigger.cfg"
+        hillshade_trigger = f"{region}_hillshade_trigger.cfg"
+
+        self.stages = {config: "config", ramp: "color ramp", dem_trigger: "DEM trigger",
+                       hillshade_trigger: "hillshade trigger", ELEVATION_FILES: "elevation file"}
+        self.rules = {dem_trigger: [], hillshade_trigger: []}
+        self.commands = {
+            dem_trigger: ["--create_trigger", region, layer, dem_trigger],
+            hillshade_trigger: ["--create_trigger", region, layer, hillshade_trigger],
+        }
+
+        # Full size targets, then preview targets
+        for suffix, label in (("", ""), ("_prv", " (preview)")):
+            dem, color, hillshade, relief = (f"{prefix}_{base}{suffix}.tif" for base in
+                                             ("DEM", "color", "hillshade", "relief"))
+            preview = ["preview"] if suffix else []
+            if suffix:
+                self.rules[dem] = [f"{prefix}_DEM.tif", dem_trigger]
+                self.commands[dem] = ["--preview_dem", region, layer]
+            else:
+                self.rules[dem] = [dem_trigger, ELEVATION_FILES]
+                self.commands[dem] = ["--init_dem", region, layer]
+            self.rules[color] = [dem, ramp]
+            self.commands[color] = ["--create_color_relief", region, layer] + preview
+            self.rules[hillshade] = [dem, hillshade_trigger]
+            self.commands[hillshade] = ["--create_hillshade", region, layer] + preview
+            if pipeline == "fused":
+                self.rules[relief] = [dem, ramp, hillshade_trigger, config, dem_trigger]
+                self.commands[relief] = ["--create_relief", region, layer] + preview
+            else:
+                self.rules[relief] = [color, hillshade, config, dem_trigger]
+                self.commands[relief] = ["--merge_hillshade", region, layer] + preview
+            for target, name in ((dem, "DEM"), (color, "color"), (hillshade, "hillshade"),
+                                 (relief, "relief")):
+                self.stages[target] = name + label
+
+        contour = f"{prefix}_contour.shp"
+        self.rules[contour] = [f"{prefix}_DEM.tif", config]
+        self.commands[contour] = ["--create_contour", region, layer]
+        self.stages[contour] = "contour"
+        self.final = f"{prefix}_relief.tif"
+
+    def stale(self, target=None):
+        """
+        Return the stages that must be rebuilt to make target.
+
+        Args:
+            target (str, optional): Target file name. Defaults to the relief image.
+
+        Returns:
+            list of Stale: Stages to rebuild in build order.  Empty if target is up to date.
+            Missing files that have no rule (config, color ramp) are included with the reason
+            "not found" since the build would fail.
+
+        Raises:
+            ValueError: If target is not a Makefile target.
+        """
+        target = target or self.final
+        if target not in self.rules:
+            raise ValueError(f"Unknown target: {target}")
+        stale = []
+        self._check(target, {}, {}, stale)
+        return stale
+
+    def up_to_date(self, target=None):
+        """
+        Return True if target doesn't need to be rebuilt.
+        """
+        return not self.stale(target)
+
+    def command(self, target):
+        """
+        Return the command line the Makefile runs to build target.
+
+        Args:
+            target (str): Target file name.
+
+        Returns:
+            list of str: color_relief.sh and its arguments.
+        """
+        return ["color_relief.sh"] + self.commands[target]
+
+    def elevation_paths(self):
+        """
+        Return the paths of the elevation files that match dem_files.
+        """
+        paths = []
+        for pattern in self.dem_files:
+            paths.extend(glob.glob(os.path.join(self.project_dir, pattern)))
+        return paths
+
+    def _mtime(self, name, mtimes):
+        if name not in mtimes and name == ELEVATION_FILES:
+            # The elevation files are one source with the newest file's time
+            newest = 0
+            for path in self.elevation_paths():
+                try:
+                    newest = max(newest, os.stat(path).st_mtime_ns)
+                except OSError:
+                    pass
+            mtimes[name] = newest
+        elif name not in mtimes:
+            try:
+                mtimes[name] = os.stat(os.path.join(self.project_dir, name)).st_mtime_ns
+            except OSError:
+                mtimes[name] = None
+        return mtimes[name]
+
+    def _check(self, target, rebuilt, mtimes, stale):
+        """
+        Return True if make would rebuild target, appending it and its stale prerequisites
+        to stale.
+        """
+        if target in rebuilt:
+            return rebuilt[target]
+
+        mtime = self._mtime(target, mtimes)
+        if target not in self.rules:
+            rebuilt[target] = mtime is None
+            if mtime is None:
+                stale.append(Stale(self.stage(target), target, "not found"))
+            return rebuilt[target]
+
+        reasons = []
+        for source in self.rules[target]:
+            if self._check(source, rebuilt, mtimes, stale):
+                reasons.append(f"{self.stage(source)} will be rebuilt")
+            elif mtime is not None and self._mtime(source, mtimes) > mtime:
+                reasons.append(f"{self.stage(source)} is newer")
+        if mtime is None:
+            reasons.insert(0, "missing")
+
+        rebuilt[target] = bool(reasons)
+        if reasons:
+            stale.append(Stale(self.stage(target), target, ", ".join(reasons)))
+        return rebuilt[target]
+
+    def stage(self, target):
+        """
+        Return the stage name for a file.
+        """
+        return self.stages.get(target, target)
+
+
+def dem_patterns(values, layer_id=None):
+    """
+    Return the elevation file patterns for a layer as paths relative to the project folder.
+
+    Args:
+        values (dict): Config values from config_env.load_values.
+        layer_id (str, optional): Layer id (A-I). Defaults to the active LAYER.
+
+    Returns:
+        list of str: FILES.<layer_id> patterns in DEM_FOLDER.
+    """
+    layer_id = layer_id or values.get("LAYER", "")
+    folder = values.get("DEM_FOLDER", "")
+    return [os.path.join(folder, pattern) for pattern in values.get(f"FILES.{layer_id}", "").split()]
+
+
+def layer_names(values):
+    """
+    Return the layer names from the config mapped to their layer ids.
+
+    Args:
+        values (dict): Config values from config_env.load_values.
+
+    Returns:
+        dict: Maps each layer name (NAMES.<id>) to its id.
+    """
+    return {name: key.split(".", 1)[1] for key, name in values.items()
+            if key.startswith("NAMES.") and name}
+
+
+def layer_graphs(config_path, values=None):
+    """
+    Return a BuildGraph for each layer in a project config.
+
+    Args:
+        config_path (str): Path to <region>_relief.cfg.
+        values (dict, optional): Config values. Loaded from config_path if None.
+
+    Returns:
+        dict: Maps each layer name to its BuildGraph.
+
+    Raises:
+        OSError: If the config cannot be read.
+        ValueError: If the config is invalid.
+    """
+    if values is None:
+        values = config_env.load_values(config_path)
+    project_dir = os.path.dirname(os.path.abspath(config_path))
+    region = os.path.basename(config_path)[:-len("_relief.cfg")]
+    pipeline = "fused" if values.get("PIPELINE") == "fused" else "standard"
+    return {
+        name: BuildGraph(project_dir, region, name, pipeline, dem_patterns(values, layer_id))
+        for name, layer_id in layer_names(values).items()
+    }
+
+
+def main(argv=None):
+    """
+    Command line entry point for relief_status.
+
+    Args:
+        argv (list of str, optional): Arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: Exit code. 0 if up to date, 1 if a build is required, 2 for usage errors.
+    """
+    parser = argparse.ArgumentParser(
+        prog="relief_status", description="List the stages that make would rebuild"
+    )
+    parser.add_argument("--pipeline", choices=["standard", "fused"])
+    parser.add_argument("--dir", default=".", help="Project folder")
+    parser.add_argument("region")
+    parser.add_argument("layer")
+    parser.add_argument("target", nargs="?")
+    args = parser.parse_args(argv)
+
+    # Get the pipeline and elevation files for the layer from the config
+    values = {}
+    config_path = os.path.join(args.dir, f"{args.region}_relief.cfg")
+    if os.path.isfile(config_path):
+        try:
+            values = config_env.load_values(config_path)
+        except (OSError, ValueError) as e:
+            print(f"relief_status: {e}", file=sys.stderr)
+    pipeline = args.pipeline or ("fused" if values.get("PIPELINE") == "fused" else "standard")
+    layer_id = layer_names(values).get(args.layer)
+    dem_files = dem_patterns(values, layer_id) if layer_id else None
+
+    graph = BuildGraph(args.dir, args.region, args.layer, pipeline, dem_files)
+    try:
+        stale = graph.stale(args.target)
+    except ValueError as e:
+        print(f"relief_status: {e}", file=sys.stderr)
+        return 2
+
+    target = args.target or graph.final
+    if not stale:
+        print(f"{target} is up to date")
+        return 0
+    print(f"{target} is out of date:")
+    for item in stale:
+        print(f"  {item.stage}: {item.target} - {item.reason}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,369 @@
+#  Copyright (c) 2024.
+#   Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the “Software”), to deal in the
+#   Software without restriction,
+#   including without limitation the rights to use, copy, modify, merge, publish, distribute,
+#   sublicense, and/or sell copies
+#   of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+#   the following conditions:
+#  #
+#   The above copyright notice and this permission notice shall be included in all copies or
+#   substantial portions of the Software.
+#  #
+#   THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+#   BUT NOT LIMITED TO THE
+#   WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO
+#   EVENT SHALL THE AUTHORS OR
+#   COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+#   CONTRACT, TORT OR
+#   OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#   DEALINGS IN THE SOFTWARE.
+#  #
+#   This uses QT for some components which has the primary open-source license is the GNU Lesser
+#   General Public License v. 3 (“LGPL”).
+#   With the LGPL license option, you can use the essential libraries and some add-on libraries
+#   of Qt.
+#   See https://www.qt.io/licensing/open-source-lgpl-obligations for QT details.
+"""
+Structured progress and time estimates for color_relief.sh stages.
+
+GDAL tools and relief_engine report progress as "0...10...20...30" on stdout, which is hidden
+with QUIET: -q and is hard to follow when it isn't.  When the editor runs a build it sets
+RELIEF_PROGRESS, and color_relief.sh runs each long stage through relief_progress.  That
+removes the quiet switch so the tool reports progress, converts the ticks into one line per
+step:
+
+    @progress {"stage": "hillshade", "layer": "A", "percent": 40.0, "bytes": 4000000,
+               "total": 10000000, "elapsed": 12.5, "eta": 18.7}
+
+and (with --quiet) hides the tool's other output.  MakeProcess and BuildScheduler pick these
+lines out of the output and drive the progress bar in PreviewWidget.
+
+The time estimate uses the throughput (input bytes per second) of earlier runs of the same stage
+for rasters of a similar size, blended with the rate measured so far as the stage proceeds.
+Throughput is kept in progress_history.json in the app config folder, or in the file named by
+RELIEF_PROGRESS_HISTORY.
+
+Command line usage:
+    relief_progress [--quiet] --stage STAGE --layer LAYER --input FILE -- COMMAND...
+"""
+import argparse
+import json
+import math
+import os
+import re
+import subprocess
+import sys
+import time
+
+PROGRESS_PREFIX = "@progress "
+HISTORY_FILE = "progress_history.json"
+
+# Weight of the newest run in the throughput average
+HISTORY_WEIGHT = 0.3
+
+# Percent complete before the measured rate alone is trusted for an estimate
+MIN_MEASURED_PERCENT = 5.0
+
+QUIET_SWITCHES = ("-q", "--quiet")
+VRT_SOURCE = re.compile(r'<SourceFilename([^>]*)>([^<]+)</SourceFilename>')
+
+
+def format_event(event):
+    """
+    Return the output line for a progress event (a dict).
+    """
+    return PROGRESS_PREFIX + json.dumps(event)
+
+
+def parse_event(line):
+    """
+    Return the progress event in an output line, or None if the line isn't a progress event.
+    """
+    if not line.startswith(PROGRESS_PREFIX):
+        return None
+    try:
+        event = json.loads(line[len(PROGRESS_PREFIX):])
+    except ValueError:
+        return None
+    return event if isinstance(event, dict) else None
+
+
+def format_eta(seconds):
+    """
+    Format a time estimate as "h:mm:ss" or "m:ss".  Returns "" if the estimate is unknown.
+    """
+    if seconds is None:
+        return ""
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def input_size(path):
+    """
+    Return the size in bytes of a raster.  For a VRT, this is the size of its source files.
+    """
+    try:
+        if not path.lower().endswith(".vrt"):
+            return os.path.getsize(path)
+        with open(path) as file:
+            text = file.read()
+    except OSError:
+        return 0
+    folder = os.path.dirname(path)
+    total = 0
+    for attributes, name in VRT_SOURCE.findall(text):
+        if 'relativeToVRT="1"' in attributes:
+            name = os.path.join(folder, name)
+        try:
+            total += os.path.getsize(name)
+        except OSError:
+            pass
+    return total
+
+
+class TickParser:
+    """
+    Converts gdal style progress output ("0...10...20...") into percent complete.  Each dot is
+    2.5% and each number is its value.  Other text is returned unchanged.
+    """
+
+    def __init__(self):
+        self.percent = None
+        self._digits = ""
+
+    def feed(self, text):
+        """
+        Parse a chunk of output.
+
+        Args:
+            text (str): Output from the tool.
+
+        Returns:
+            (str, bool): Text that isn't progress, and True if the percent changed.
+        """
+        other = []
+        changed = False
+        for char in text:
+            if char.isdigit():
+                self._digits += char
+                continue
+            if self._digits:
+                changed |= self._number(other)
+            if char == ".":
+                if self.percent is None or self.percent >= 100:
+                    other.append(char)
+                else:
+                    self.percent = min(100.0, self.percent + 2.5)
+                    changed = True
+            else:
+                other.append(char)
+        return "".join(other), changed
+
+    def _number(self, other):
+        value = int(self._digits)
+        expected = 0 if self.percent is None else math.floor(self.percent / 10 + 0.5) * 10
+        digits, self._digits = self._digits, ""
+        if value % 10 == 0 and value <= 100 and (self.percent is not None or value == 0) and \
+                abs(value - expected) <= 10:
+            self.percent = float(value)
+            return True
+        other.append(digits)
+        return False
+
+    def close(self):
+        """
+        Return any digits held back at the end of the output.
+        """
+        digits, self._digits = self._digits, ""
+        if digits:
+            other = []
+            return "".join(other) if self._number(other) else digits
+        return ""
+
+
+class ThroughputHistory:
+    """
+    Throughput of earlier stage runs, by stage and raster size.  Sizes are grouped by powers of
+    two, so a 300 MB hillshade is estimated from runs on 256 - 512 MB rasters.
+
+    **Methods**:
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path) as file:
+                self.rates = json.load(file)
+        except (OSError, ValueError):
+            self.rates = {}
+
+    @staticmethod
+    def key(stage, size):
+        return f"{stage}:{max(0, int(math.log2(max(size, 1))))}"
+
+    def rate(self, stage, size):
+        """
+        Return the bytes per second for the stage and size, or None if it hasn't run.  If no run
+        had a similar size, the nearest size for the stage is used.
+        """
+        rate = self.rates.get(self.key(stage, size))
+        if rate is not None:
+            return rate
+        bucket = int(self.key(stage, size).split(":")[1])
+        nearest = [(abs(int(key.split(":")[1]) - bucket), value) for key, value in
+                   self.rates.items() if key.split(":")[0] == stage]
+        return min(nearest)[1] if nearest else None
+
+    def estimate(self, stage, size, percent, elapsed):
+        """
+        Return the estimated seconds remaining for a stage, or None if unknown.
+
+        Args:
+            stage (str): Stage name.
+            size (int): Input size in bytes.
+            percent (float): Percent complete.
+            elapsed (float): Seconds since the stage started.
+        """
+        rate = self.rate(stage, size) if size else None
+        expected = size / rate if rate else None
+        if percent <= 0:
+            return expected
+        measured = elapsed * 100.0 / percent
+        if expected is None:
+            return measured - elapsed if percent >= MIN_MEASURED_PERCENT else None
+
+        # Trust the measured rate more as the stage proceeds
+        weight = percent / 100.0
+        return max(0.0, (1 - weight) * expected + weight * measured - elapsed)
+
+    def record(self, stage, size, seconds):
+        """
+        Add a completed run to the history and save it.
+        """
+        if size <= 0 or seconds <= 0:
+            return
+        key = self.key(stage, size)
+        rate = size / seconds
+        previous = self.rates.get(key)
+        self.rates[key] = rate if previous is None else (
+                HISTORY_WEIGHT * rate + (1 - HISTORY_WEIGHT) * previous)
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            temp = f"{self.path}.{os.getpid()}"
+            with open(temp, "w") as file:
+                json.dump(self.rates, file)
+            os.replace(temp, self.path)
+        except OSError:
+            pass
+
+
+def history_path():
+    """
+    Return the path of the throughput history file.
+    """
+    path = os.environ.get("RELIEF_PROGRESS_HISTORY")
+    if path:
+        return path
+    from appdirs import user_config_dir
+    return os.path.join(user_config_dir("ColorReliefEditor"), HISTORY_FILE)
+
+
+def run(command, stage, layer, size, history, quiet=False, out=sys.stdout):
+    """
+    Run a command and write progress events for its gdal style progress output.
+
+    Args:
+        command (list of str): The command.  Quiet switches are removed.
+        stage (str): Stage name for the events.
+        layer (str): Layer name for the events.
+        size (int): Input size in bytes.
+        history (ThroughputHistory): Throughput of earlier runs.
+        quiet (bool): Hide the command's other output.
+        out (file): Where to write events and output.
+
+    Returns:
+        int: The command's exit code.
+    """
+    command = [arg for arg in command if arg not in QUIET_SWITCHES]
+    parser = TickParser()
+    start = time.monotonic()
+
+    # True when output has been written without a newline.  Events must start a line
+    open_line = False
+
+    def emit(percent):
+        nonlocal open_line
+        elapsed = time.monotonic() - start
+        eta = history.estimate(stage, size, percent, elapsed)
+        event = {
+            "stage": stage, "layer": layer, "percent": percent,
+            "bytes": int(size * percent / 100), "total": size, "elapsed": round(elapsed, 1),
+            "eta": None if eta is None else round(eta, 1)
+        }
+        out.write(("\n" if open_line else "") + format_event(event) + "\n")
+        out.flush()
+        open_line = False
+
+    def write(text):
+        nonlocal open_line
+        if text and not quiet:
+            out.write(text)
+            out.flush()
+            open_line = not text.endswith("\n")
+
+    emit(0.0)
+    process = subprocess.Popen(command, stdout=subprocess.PIPE)
+    while True:
+        chunk = os.read(process.stdout.fileno(), 4096)
+        if not chunk:
+            break
+        text, changed = parser.feed(chunk.decode("utf-8", errors="replace"))
+        write(text)
+        if changed:
+            emit(parser.percent)
+    write(parser.close())
+    exit_code = process.wait()
+    if exit_code == 0:
+        if parser.percent != 100.0:
+            emit(100.0)
+        history.record(stage, size, time.monotonic() - start)
+    return exit_code
+
+
+def main(argv=None):
+    """
+    Command line entry point for relief_progress.
+
+    Args:
+        argv (list of str, optional): Arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: The exit code of the command.
+    """
+    parser = argparse.ArgumentParser(
+        prog="relief_progress", description="Report stage progress for color_relief.sh"
+    )
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only output progress")
+    parser.add_argument("--stage", required=True)
+    parser.add_argument("--layer", default="")
+    parser.add_argument("--input", default="", help="Input raster, used to estimate time")
+    parser.add_argument("command", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    if not command:
+        parser.error("no command")
+
+    try:
+        return run(
+            command, args.stage, args.layer, input_size(args.input) if args.input else 0,
+            ThroughputHistory(history_path()), args.quiet
+        )
+    except OSError as e:
+        print(f"relief_progress: {e}", file=sys.stderr)
+        return 127
+
+
+if __name__ == "__main__":
+    sys.exit(main())
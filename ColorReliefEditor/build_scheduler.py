@@ -0,0 +1,320 @@
+#  Copyright (c) 2024.
+#   Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the “Software”), to deal in the
+#   Software without restriction,
+#   including without limitation the rights to use, copy, modify, merge, publish, distribute,
+#   sublicense, and/or sell copies
+#   of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+#   the following conditions:
+#  #
+#   The above copyright notice and this permission notice shall be included in all copies or
+#   substantial portions of the Software.
+#  #
+#   THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+#   BUT NOT LIMITED TO THE
+#   WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO
+#   EVENT SHALL THE AUTHORS OR
+#   COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+#   CONTRACT, TORT OR
+#   OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#   DEALINGS IN THE SOFTWARE.
+#  #
+#   This uses QT for some components which has the primary open-source license is the GNU Lesser
+#   General Public License v. 3 (“LGPL”).
+#   With the LGPL license option, you can use the essential libraries and some add-on libraries
+#   of Qt.
+#   See https://www.qt.io/licensing/open-source-lgpl-obligations for QT details.
+"""
+Builds every layer of a project at the same time.
+
+make builds one layer per run.  plan_build combines the out of date stages of every layer into a
+single graph of jobs, and BuildScheduler runs jobs whose prerequisites are done concurrently.
+The scheduler shares a global budget of worker cores and memory: each job is given a share of
+the free cores (passed to relief_engine as WORKERS) and an estimated memory use, and a job only
+starts when both fit.  A job that is larger than the whole budget runs by itself.
+
+Jobs run the same color_relief.sh commands as the Makefile (see BuildGraph.command).
+"""
+import os
+
+# Handle imports for PyQt6 versus PySide depending on which has been installed
+try:
+    from PySide6.QtCore import QObject, QProcess, QProcessEnvironment, Signal
+except ImportError:
+    from PyQt6.QtCore import QObject, QProcess, QProcessEnvironment, pyqtSignal as Signal
+
+from ColorReliefEditor.build_progress import parse_event
+
+# Estimated memory use of a stage as a multiple of the DEM file size
+MEMORY_FACTOR = {"DEM": 2.0, "color": 3.0, "hillshade": 2.0, "relief": 4.0, "contour": 1.0}
+
+# Memory estimate for preview stages and triggers, in bytes
+SMALL_JOB = 64 * 1024 * 1024
+
+
+def memory_budget(value):
+    """
+    Parse the BUILD_MEMORY setting.
+
+    Args:
+        value (str): Memory budget in megabytes.  Blank uses half of the physical memory.
+
+    Returns:
+        int: Budget in bytes.  0 is unlimited (physical memory unknown).
+
+    Raises:
+        ValueError: If the value is not a number.
+    """
+    text = str(value if value is not None else "").strip()
+    if text:
+        try:
+            return int(float(text) * 1024 * 1024)
+        except ValueError:
+            raise ValueError(f"Invalid BUILD_MEMORY: '{value}'. Use a size in megabytes")
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // 2
+    except (AttributeError, ValueError, OSError):
+        return 0
+
+
+class BuildJob:
+    """
+    One stage of one layer.
+
+    Attributes:
+        target (str): File the job creates.
+        layer (str): Layer name.
+        layer_id (str): Layer id (A-I), passed to color_relief.sh as LAYER_ID.
+        stage (str): Stage name, e.g. "color".
+        command (list of str): Command line.
+        deps (set of str): Targets that must be built first.
+        memory (int): Estimated memory use in bytes.
+    """
+
+    def __init__(self, target, layer, layer_id, stage, command, deps, memory):
+        self.target = target
+        self.layer = layer
+        self.layer_id = layer_id
+        self.stage = stage
+        self.command = command
+        self.deps = deps
+        self.memory = memory
+
+    def __repr__(self):
+        return f"BuildJob({self.target})"
+
+
+def estimate_memory(graph, target):
+    """
+    Estimate the memory a stage uses from the size of its DEM (or the elevation files if the DEM
+    doesn't exist yet).
+
+    Args:
+        graph (BuildGraph): Graph for the layer.
+        target (str): Target file name.
+
+    Returns:
+        int: Estimated bytes.
+    """
+    stage = graph.stage(target)
+    if stage not in MEMORY_FACTOR:
+        return SMALL_JOB
+    dem = os.path.join(graph.project_dir, graph.final.replace("_relief.tif", "_DEM.tif"))
+    try:
+        size = os.stat(dem).st_size
+    except OSError:
+        size = 0
+        for path in graph.elevation_paths():
+            try:
+                size += os.stat(path).st_size
+            except OSError:
+                pass
+    return int(size * MEMORY_FACTOR[stage])
+
+
+def plan_build(graphs, layer_ids=None, target_base="relief"):
+    """
+    Combine the out of date stages of several layers into one list of jobs.  Files shared by
+    layers (the hillshade trigger) are built once.
+
+    Args:
+        graphs (dict): Maps each layer name to its BuildGraph.
+        layer_ids (dict, optional): Maps each layer name to its id.
+        target_base (str): Image to build for each layer, e.g. "relief".
+
+    Returns:
+        list of BuildJob: Jobs in an order where each job follows its prerequisites.
+
+    Raises:
+        ValueError: If a source file such as the config or color ramp is missing.
+    """
+    layer_ids = layer_ids or {}
+    jobs = {}
+    for layer, graph in graphs.items():
+        target = graph.final.replace("_relief.tif", f"_{target_base}.tif")
+        for item in graph.stale(target):
+            if item.target not in graph.rules:
+                raise ValueError(f"{item.target} not found")
+            if item.target in jobs:
+                continue
+            deps = {dep for dep in graph.rules[item.target] if dep in jobs}
+            jobs[item.target] = BuildJob(
+                item.target, layer, layer_ids.get(layer, ""), item.stage,
+                graph.command(item.target), deps, estimate_memory(graph, item.target)
+            )
+    return list(jobs.values())
+
+
+def next_jobs(pending, running, done, workers, memory):
+    """
+    Select the pending jobs to start now.
+
+    Args:
+        pending (list of BuildJob): Jobs not started, in plan order.
+        running (dict): Maps each running job to its (workers, memory) allocation.
+        done (set of str): Targets that were built.
+        workers (int): Worker budget.
+        memory (int): Memory budget in bytes. 0 is unlimited.
+
+    Returns:
+        list of (BuildJob, int): Jobs to start with the workers given to each.
+    """
+    free_workers = workers - sum(cores for cores, _ in running.values())
+    free_memory = memory - sum(size for _, size in running.values())
+    ready = [job for job in pending if job.deps <= done]
+
+    selected = []
+    for job in ready:
+        if len(selected) >= free_workers:
+            break
+        fits = not memory or job.memory <= free_memory
+        if fits or (not running and not selected):
+            selected.append(job)
+            free_memory -= job.memory
+
+    # Share the free cores between the jobs that start now
+    share = max(1, free_workers // len(selected)) if selected else 1
+    return [(job, share) for job in selected]
+
+
+class BuildScheduler(QObject):
+    """
+    Runs a build plan with a process for each job, starting jobs as their prerequisites finish
+    and budget is available.  If a job fails, jobs that depend on it are skipped, but other
+    layers continue.
+
+    **Methods**:
+        - start(): Start the build.
+        - cancel(): Stop all running jobs.
+
+    Attributes:
+        output (Signal): Emitted with the layer name and a line of output.
+        progress (Signal): Emitted with the layer name, jobs finished, and job count for the layer.
+        stage_progress (Signal): Emitted with the layer name and a progress event for a running
+            stage (see build_progress).
+        finished (Signal): Emitted with 0 when all jobs succeeded, otherwise the first failing
+            exit code.
+    """
+    output = Signal(str, str)
+    progress = Signal(str, int, int)
+    stage_progress = Signal(str, object)
+    finished = Signal(int)
+
+    def __init__(self, project_dir, jobs, workers, memory=0):
+        """
+        Args:
+            project_dir (str): Folder to run the jobs in.
+            jobs (list of BuildJob): Plan from plan_build.
+            workers (int): Worker budget.
+            memory (int): Memory budget in bytes. 0 is unlimited.
+        """
+        super().__init__()
+        self.project_dir = project_dir
+        self.workers = max(1, workers)
+        self.memory = memory
+        self.pending = list(jobs)
+        self.running = {}
+        self.done = set()
+        self.exit_code = 0
+        self._processes = {}
+        self._totals = {}
+        self._finished = {}
+        for job in jobs:
+            self._totals[job.layer] = self._totals.get(job.layer, 0) + 1
+            self._finished[job.layer] = 0
+
+    def start(self):
+        """
+        Start the build.  finished is emitted when all jobs have run.
+        """
+        for layer, total in self._totals.items():
+            self.progress.emit(layer, 0, total)
+        self._start_ready()
+
+    def cancel(self):
+        """
+        Stop all running jobs and skip the jobs that haven't started.
+        """
+        self.pending = []
+        self.exit_code = self.exit_code or 2
+        for process in list(self._processes.values()):
+            process.kill()
+
+    def _start_ready(self):
+        for job, workers in next_jobs(
+                self.pending, self.running, self.done, self.workers, self.memory):
+            self.pending.remove(job)
+            self.running[job] = (workers, job.memory)
+            self._run(job, workers)
+
+        if not self.running:
+            # Anything still pending depends on a failed job
+            for job in self.pending:
+                self.output.emit(job.layer, f"Skipped {job.stage}")
+            self.pending = []
+            self.finished.emit(self.exit_code)
+
+    def _run(self, job, workers):
+        process = QProcess(self)
+        environment = QProcessEnvironment.systemEnvironment()
+        environment.insert("WORKERS", str(workers))
+        environment.insert("RELIEF_PROGRESS", "1")
+        if job.layer_id:
+            environment.insert("LAYER_ID", job.layer_id)
+        process.setProcessEnvironment(environment)
+        process.setWorkingDirectory(self.project_dir)
+        process.setProcessChannelMode(QProcess.ProcessChannelMode.MergedChannels)
+        process.readyReadStandardOutput.connect(lambda: self._on_output(job, process))
+        process.finished.connect(lambda code, _status: self._on_finished(job, code))
+        process.errorOccurred.connect(lambda error: self._on_error(job, error))
+        self._processes[job] = process
+        self.output.emit(job.layer, " ".join(job.command))
+        process.start(job.command[0], job.command[1:])
+
+    def _on_output(self, job, process):
+        text = bytes(process.readAllStandardOutput()).decode("utf-8", errors="replace")
+        for line in text.splitlines():
+            event = parse_event(line)
+            if event is not None:
+                self.stage_progress.emit(job.layer, event)
+            elif line.strip():
+                self.output.emit(job.layer, line)
+
+    def _on_error(self, job, error):
+        if error == QProcess.ProcessError.FailedToStart:
+            self.output.emit(job.layer, f"ERROR: Unable to run {job.command[0]}")
+            self._on_finished(job, 102)
+
+    def _on_finished(self, job, exit_code):
+        if job not in self.running:
+            return
+        del self.running[job]
+        self._processes.pop(job).deleteLater()
+        if exit_code == 0:
+            self.done.add(job.target)
+            self._finished[job.layer] += 1
+            self.progress.emit(job.layer, self._finished[job.layer], self._totals[job.layer])
+        else:
+            self.output.emit(job.layer, f"{job.stage} failed ({exit_code}) ❌")
+            self.exit_code = self.exit_code or exit_code
+        self._start_ready()
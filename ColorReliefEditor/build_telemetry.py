@@ -0,0 +1,422 @@
+#  Copyright (c) 2024.
+#   Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the “Software”), to deal in the
+#   Software without restriction,
+#   including without limitation the rights to use, copy, modify, merge, publish, distribute,
+#   sublicense, and/or sell copies
+#   of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+#   the following conditions:
+#  #
+#   The above copyright notice and this permission notice shall be included in all copies or
+#   substantial portions of the Software.
+#  #
+#   THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+#   BUT NOT LIMITED TO THE
+#   WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO
+#   EVENT SHALL THE AUTHORS OR
+#   COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+#   CONTRACT, TORT OR
+#   OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#   DEALINGS IN THE SOFTWARE.
+#  #
+#   This uses QT for some components which has the primary open-source license is the GNU Lesser
+#   General Public License v. 3 (“LGPL”).
+#   With the LGPL license option, you can use the essential libraries and some add-on libraries
+#   of Qt.
+#   See https://www.qt.io/licensing/open-source-lgpl-obligations for QT details.
+"""
+Per-stage performance telemetry for color_relief.sh.
+
+color_relief.sh runs each stage through relief_telemetry (see run_stage), which appends a JSON
+record for the run to <region>_telemetry.jsonl in the project folder:
+
+    {"time": "2024-11-02T10:15:04", "region": "ICELAND", "layer": "A", "stage": "hillshade",
+     "preview": false, "exit_code": 0, "wall": 84.2, "user": 80.1, "sys": 2.3,
+     "max_rss": 812000000, "read_bytes": 0, "write_bytes": 190000000,
+     "input_bytes": 460000000, "output_bytes": 190000000, "width": 12000, "height": 9000,
+     "config": {"HILLSHADE1": "-igor", ...}}
+
+CPU time, peak memory (max_rss, the largest process), and read_bytes/write_bytes come from the
+resource usage of the stage process and its children.  read_bytes and write_bytes only count I/O
+that reached the disk, so reads served from the file cache are not included.  input_bytes is the
+size of the input file (the source files for a VRT).  width and height are the raster size of
+the output (or input) GeoTIFF or VRT.  config holds the settings that determine the stage output.
+Where os.wait4 isn't available (Windows), only the wall time is measured and the resource usage
+fields are null.  The log keeps the last MAX_RECORDS runs.
+
+Telemetry is off unless TELEMETRY is on, since it runs each stage through another process.
+
+relief_telemetry report summarizes the log: time, CPU, memory, and throughput for each stage,
+the cost of each combination of settings, and runs much slower than earlier runs of the same
+stage and size (possible regressions).
+
+Command line usage:
+    relief_telemetry record [--preview] --stage STAGE [--layer LAYER] [--input FILE]
+                            [--output FILE] CONFIG -- COMMAND...
+    relief_telemetry report [--stage STAGE] CONFIG
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import struct
+import subprocess
+import sys
+import time
+
+from ColorReliefEditor import config_env
+from ColorReliefEditor.build_cache import STAGE_KEYS, region_paths
+from ColorReliefEditor.build_progress import input_size
+from ColorReliefEditor.geotiff import read_directories
+
+TELEMETRY_FILE = "{region}_telemetry.jsonl"
+
+# Runs kept in the telemetry log.  Older runs are removed.
+MAX_RECORDS = 2000
+
+# Config settings recorded for each stage
+STAGE_SETTINGS = {
+    "init_dem": ["VRT"],
+    "set_crs": ["WARP1", "WARP2", "WARP3", "WARP4"],
+    "preview_dem": ["PREVIEW", "X_SHIFT", "Y_SHIFT"],
+    "color": STAGE_KEYS["color"] + ["ENGINE", "WORKERS"],
+    "hillshade": STAGE_KEYS["hillshade"] + ["ENGINE", "WORKERS"],
+    "merge": STAGE_KEYS["merge"] + ["ENGINE", "WORKERS"],
+    "relief": STAGE_KEYS["relief"] + STAGE_KEYS["hillshade"] + ["COLOR1", "COLOR2", "WORKERS"],
+    "contour": ["INTERVAL"],
+    "cog": ["COG", "COG_RESAMPLING", "COMPRESS", "WORKERS"],
+}
+
+# A run this many times slower than the median of earlier runs is reported as a regression
+REGRESSION_FACTOR = 1.5
+
+VRT_SIZE = re.compile(r'<VRTDataset[^>]*rasterXSize="(\d+)"[^>]*rasterYSize="(\d+)"')
+
+
+def telemetry_path(config_path):
+    """
+    Return the telemetry log for a project config file.
+    """
+    project_dir, region = region_paths(config_path)
+    return os.path.join(project_dir, TELEMETRY_FILE.format(region=region))
+
+
+def raster_size(path):
+    """
+    Return the (width, height) of a GeoTIFF or VRT, or (None, None) if it can't be read.
+    """
+    try:
+        with open(path, "rb") as file:
+            header = file.read(16)
+            if header.startswith(b"<VRTDataset"):
+                match = VRT_SIZE.search((header + file.read(4096)).decode("utf-8", "replace"))
+                return (int(match.group(1)), int(match.group(2))) if match else (None, None)
+            return _tiff_size(file, header)
+    except (OSError, struct.error, ValueError):
+        return None, None
+
+
+def _tiff_size(file, header):
+    """
+    Read ImageWidth and ImageLength from the first directory of a TIFF or BigTIFF.
+    """
+    directories = read_directories(file, header, limit=1)
+    return (directories[0].width, directories[0].height) if directories else (None, None)
+
+
+def file_size(path):
+    try:
+        return os.path.getsize(path) if path else 0
+    except OSError:
+        return 0
+
+
+def measure(command):
+    """
+    Run a command and measure its resource usage, including its child processes.
+
+    Args:
+        command (list of str): The command.
+
+    Returns:
+        (int, dict): The exit code, and wall, user, sys (seconds), max_rss, read_bytes, and
+            write_bytes.  Without os.wait4 only wall is measured and the others are None.
+    """
+    start = time.monotonic()
+    process = subprocess.Popen(command)
+    if not hasattr(os, "wait4"):
+        exit_code = process.wait()
+        return exit_code, {
+            "wall": round(time.monotonic() - start, 3), "user": None, "sys": None,
+            "max_rss": None, "read_bytes": None, "write_bytes": None,
+        }
+    _, status, usage = os.wait4(process.pid, 0)
+    wall = time.monotonic() - start
+    exit_code = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+    process.returncode = exit_code
+
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    rss_scale = 1 if sys.platform == "darwin" else 1024
+    return exit_code, {
+        "wall": round(wall, 3), "user": round(usage.ru_utime, 3), "sys": round(usage.ru_stime, 3),
+        "max_rss": usage.ru_maxrss * rss_scale, "read_bytes": usage.ru_inblock * 512,
+        "write_bytes": usage.ru_oublock * 512,
+    }
+
+
+def record_stage(config_path, stage, layer, preview, command, input_path="", output_path=""):
+    """
+    Run a stage command and append its telemetry record to the project log.
+
+    Args:
+        config_path (str): Path to <region>_relief.cfg.
+        stage (str): Stage name (see STAGE_SETTINGS).
+        layer (str): Layer name.
+        preview (bool): True for a preview build.
+        command (list of str): The stage command.
+        input_path (str): Stage input file.
+        output_path (str): Stage output file.
+
+    Returns:
+        int: The exit code of the command.
+    """
+    exit_code, usage = measure(command)
+    try:
+        values = config_env.load_values(config_path)
+    except (OSError, ValueError):
+        values = {}
+    width, height = raster_size(output_path) if exit_code == 0 else (None, None)
+    if width is None and input_path:
+        width, height = raster_size(input_path)
+
+    record = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "region": region_paths(config_path)[1],
+        "layer": layer, "stage": stage, "preview": preview, "exit_code": exit_code, **usage,
+        "input_bytes": input_size(input_path) if input_path else 0,
+        "output_bytes": file_size(output_path),
+        "width": width, "height": height,
+        "config": {key: values.get(key) for key in STAGE_SETTINGS.get(stage, [])},
+    }
+    try:
+        append_record(telemetry_path(config_path), record)
+    except OSError as e:
+        print(f"relief_telemetry: {e}", file=sys.stderr)
+    return exit_code
+
+
+def append_record(path, record, max_records=MAX_RECORDS):
+    """
+    Append a record to a telemetry log, keeping only the last max_records records.
+
+    Raises:
+        OSError: If the log can't be written.
+    """
+    with open(path, "a+") as file:
+        file.write(json.dumps(record) + "\n")
+        file.seek(0)
+        lines = file.readlines()
+    if len(lines) > max_records:
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as file:
+            file.writelines(lines[-max_records:])
+        os.replace(temp_path, path)
+
+
+def load_records(path):
+    """
+    Return the records in a telemetry log.  Lines that can't be parsed are skipped.
+    """
+    records = []
+    try:
+        with open(path) as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and "stage" in record:
+                    records.append(record)
+    except OSError:
+        pass
+    return records
+
+
+def size_class(record):
+    """
+    Return a label for the raster size of a run, so runs on similar rasters are compared.
+    """
+    if record.get("width") and record.get("height"):
+        megapixels = record["width"] * record["height"] / 1e6
+        return f"{megapixels:.0f} MP" if megapixels >= 1 else f"{megapixels:.1f} MP"
+    return "preview" if record.get("preview") else "full"
+
+
+def summarize(records):
+    """
+    Summarize successful runs by stage and raster size.
+
+    Returns:
+        list of dict: stage, size, runs, wall, cpu (median seconds, or None), max_rss
+            (largest), and rate (median input megabytes per second, or None).
+    """
+    groups = {}
+    for record in records:
+        if record.get("exit_code") == 0:
+            groups.setdefault((record["stage"], size_class(record)), []).append(record)
+
+    summary = []
+    for (stage, size), runs in groups.items():
+        rates = [run["input_bytes"] / 1e6 / run["wall"] for run in runs if
+                 run.get("input_bytes") and run.get("wall")]
+        # CPU time is missing for runs measured without os.wait4
+        cpu = [run["user"] + run["sys"] for run in runs if
+               run.get("user") is not None and run.get("sys") is not None]
+        summary.append({
+            "stage": stage, "size": size, "runs": len(runs),
+            "wall": statistics.median(run["wall"] for run in runs),
+            "cpu": statistics.median(cpu) if cpu else None,
+            "max_rss": max(run.get("max_rss") or 0 for run in runs),
+            "rate": statistics.median(rates) if rates else None,
+        })
+    return summary
+
+
+def settings_cost(records):
+    """
+    Return the median time of each combination of settings used for a stage and raster size,
+    slowest first, for stages run with more than one combination.
+
+    Returns:
+        list of dict: stage, size, config, runs, wall.
+    """
+    groups = {}
+    for record in records:
+        if record.get("exit_code") == 0:
+            key = (record["stage"], size_class(record))
+            config = json.dumps(record.get("config", {}), sort_keys=True)
+            groups.setdefault(key, {}).setdefault(config, []).append(record["wall"])
+
+    costs = []
+    for (stage, size), configs in groups.items():
+        if len(configs) < 2:
+            continue
+        for config, walls in configs.items():
+            costs.append({
+                "stage": stage, "size": size, "config": json.loads(config), "runs": len(walls),
+                "wall": statistics.median(walls)
+            })
+    return sorted(costs, key=lambda cost: (cost["stage"], cost["size"], -cost["wall"]))
+
+
+def regressions(records, factor=REGRESSION_FACTOR):
+    """
+    Return the runs that took more than factor times the median of earlier runs of the same
+    stage, raster size, and settings.
+
+    Returns:
+        list of (dict, float): The record and the median time of the earlier runs.
+    """
+    history = {}
+    slow = []
+    for record in records:
+        if record.get("exit_code") != 0:
+            continue
+        key = (record["stage"], size_class(record),
+               json.dumps(record.get("config", {}), sort_keys=True))
+        earlier = history.setdefault(key, [])
+        if len(earlier) >= 2:
+            median = statistics.median(earlier)
+            if record["wall"] > factor * median:
+                slow.append((record, median))
+        earlier.append(record["wall"])
+    return slow
+
+
+def report(records):
+    """
+    Return a text report for telemetry records.
+    """
+    if not records:
+        return "No telemetry records"
+    lines = [f"{'Stage':<12}{'Size':>10}{'Runs':>6}{'Wall s':>10}{'CPU s':>10}{'Peak MB':>10}"
+             f"{'MB/s':>9}"]
+    for item in sorted(summarize(records), key=lambda item: (item["stage"], item["size"])):
+        rate = f"{item['rate']:.1f}" if item["rate"] is not None else "-"
+        cpu = f"{item['cpu']:.1f}" if item["cpu"] is not None else "-"
+        lines.append(
+            f"{item['stage']:<12}{item['size']:>10}{item['runs']:>6}{item['wall']:>10.1f}"
+            f"{cpu:>10}{item['max_rss'] / 1048576:>10.0f}{rate:>9}"
+        )
+
+    failed = sum(1 for record in records if record.get("exit_code") != 0)
+    if failed:
+        lines.append(f"Failed runs: {failed}")
+
+    costs = settings_cost(records)
+    if costs:
+        lines += ["", "Settings by cost (median wall seconds):"]
+        for cost in costs:
+            settings = " ".join(f"{key}={value}" for key, value in cost["config"].items() if value)
+            lines.append(f"  {cost['stage']:<12}{cost['size']:>10}{cost['wall']:>10.1f}  "
+                         f"{settings or '(defaults)'}")
+
+    slow = regressions(records)
+    if slow:
+        lines += ["", f"Possible regressions (over {REGRESSION_FACTOR}x earlier runs):"]
+        for record, median in slow:
+            lines.append(
+                f"  {record['time']}  {record['stage']} {record.get('layer', '')} "
+                f"{record['wall']:.1f}s vs {median:.1f}s"
+            )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """
+    Command line entry point for relief_telemetry.
+
+    Args:
+        argv (list of str, optional): Arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: For record, the exit code of the command.  Otherwise 0 on success.
+    """
+    parser = argparse.ArgumentParser(prog="relief_telemetry", description="Stage telemetry")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record")
+    record.add_argument("--preview", action="store_true")
+    record.add_argument("--stage", required=True)
+    record.add_argument("--layer", default="")
+    record.add_argument("--input", default="")
+    record.add_argument("--output", default="")
+    record.add_argument("config")
+    record.add_argument("stage_command", nargs=argparse.REMAINDER)
+    summary = commands.add_parser("report")
+    summary.add_argument("--stage")
+    summary.add_argument("config")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        command = args.stage_command
+        command = command[1:] if command[:1] == ["--"] else command
+        if not command:
+            parser.error("no command")
+        try:
+            return record_stage(
+                args.config, args.stage, args.layer, args.preview, command, args.input,
+                args.output
+            )
+        except OSError as e:
+            print(f"relief_telemetry: {e}", file=sys.stderr)
+            return 127
+
+    records = load_records(telemetry_path(args.config))
+    if args.stage:
+        records = [record for record in records if record["stage"] == args.stage]
+    print(report(records))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -109,7 +109,7 @@ class ColorPage(TabPage):
         color_settings_pane = create_vbox_layout(widgets, 0, 0, 0, 0, 5)
 
         # Create a preview widget to run gdaldem color-relief and display result
-        button_flags = ["preview"]
+        button_flags = ["preview", "export"]
         self.preview = PreviewWidget(
             main, self.tab_name, self.color_settings_widget, True, self.data_mgr.save,
             button_flags, )
@@ -135,6 +135,9 @@ class ColorPage(TabPage):
             self.color_settings_widget.color_sample.update
         )
 
+        # When color is updated, re-render the preview in the background
+        self.color_settings_widget.colors_updated.connect(self.preview.schedule_preview)
+
     def display(self):
         self.color_settings_widget.display()
         if self.preview:
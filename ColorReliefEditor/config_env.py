@@ -0,0 +1,222 @@
+#  Copyright (c) 2024.
+#   Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the “Software”), to deal in the
+#   Software without restriction,
+#   including without limitation the rights to use, copy, modify, merge, publish, distribute,
+#   sublicense, and/or sell copies
+#   of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+#   the following conditions:
+#  #
+#   The above copyright notice and this permission notice shall be included in all copies or
+#   substantial portions of the Software.
+#  #
+#   THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+#   BUT NOT LIMITED TO THE
+#   WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO
+#   EVENT SHALL THE AUTHORS OR
+#   COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+#   CONTRACT, TORT OR
+#   OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#   DEALINGS IN THE SOFTWARE.
+#  #
+#   This uses QT for some components which has the primary open-source license is the GNU Lesser
+#   General Public License v. 3 (“LGPL”).
+#   With the LGPL license option, you can use the essential libraries and some add-on libraries
+#   of Qt.
+#   See https://www.qt.io/licensing/open-source-lgpl-obligations for QT details.
+"""
+Single-parse config loader for color_relief.sh.
+
+color_relief.sh previously ran `yq` (plus `sed`) once per config key, which forks dozens of
+processes for every build step.  This parses `<region>_relief.cfg` once and writes every key as
+a shell variable assignment to an env file that color_relief.sh sources.  The env file is
+regenerated when the config is newer than it, and is deleted when the project config is saved.
+
+Values are formatted the way `yq ".KEY"` prints them after color_relief.sh strips enclosing
+quotes: scalars are output exactly as written, null and missing keys are blank, and nested keys
+such as FILES.A are available as CFG_FILES__A.
+
+Command line usage:
+    relief_config CONFIG [ENV_FILE]    Write ENV_FILE (default: CONFIG_env.sh)
+    relief_config --get CONFIG KEY     Print a single value
+"""
+import os
+import re
+import sys
+
+import yaml
+
+# Prefix for the shell variable of each config key
+PREFIX = "CFG_"
+
+_KEY_PATTERN = re.compile(r"^[A-Za-z0-9_]+$")
+
+
+def env_path(config_path):
+    """
+    Return the path of the cached env file for a config file.
+
+    Args:
+        config_path (str): Path to <region>_relief.cfg.
+
+    Returns:
+        str: Path to <region>_relief_env.sh.
+    """
+    base, _ = os.path.splitext(config_path)
+    return f"{base}_env.sh"
+
+
+def invalidate(config_path):
+    """
+    Delete the cached env file for a config file so color_relief.sh rebuilds it.
+
+    Args:
+        config_path (str): Path to <region>_relief.cfg.
+    """
+    try:
+        os.remove(env_path(config_path))
+    except FileNotFoundError:
+        pass
+
+
+def variable_name(key):
+    """
+    Return the shell variable name for a config key. Dots in nested keys become "__".
+
+    Args:
+        key (str): Config key such as "WARP1" or "FILES.A".
+
+    Returns:
+        str or None: Variable name, or None if the key can't be a shell variable.
+    """
+    parts = key.split(".")
+    if not all(_KEY_PATTERN.match(part) for part in parts):
+        return None
+    return PREFIX + "__".join(parts)
+
+
+def format_value(value):
+    """
+    Format a value as `yq` prints it, with enclosing quote characters removed as in
+    color_relief.sh optional_flag.
+
+    Args:
+        value: Value loaded with yaml.BaseLoader (strings or lists).
+
+    Returns:
+        str: The formatted value. null is blank.
+    """
+    if isinstance(value, list):
+        text = yaml.safe_dump(value, default_flow_style=False, sort_keys=False).rstrip("\n")
+    else:
+        text = "" if value is None else str(value)
+    if text in ("null", "~"):
+        return ""
+    return text.strip("\"'")
+
+
+def load_values(config_path):
+    """
+    Parse a config file once and return every key with its formatted value.
+
+    Args:
+        config_path (str): Path to <region>_relief.cfg.
+
+    Returns:
+        dict: Maps keys (nested keys joined with ".") to formatted string values.  Mappings
+        such as FILES are only available through their nested keys.
+
+    Raises:
+        OSError: If the file cannot be read.
+        ValueError: If the file is not a YAML mapping.
+    """
+    with open(config_path, "r") as f:
+        try:
+            # BaseLoader keeps scalars as written (e.g. '0.50' and 'true'), as yq prints them
+            data = yaml.load(f, Loader=yaml.BaseLoader)
+        except yaml.YAMLError as e:
+            raise ValueError(f"Invalid YAML in {config_path}: {e}")
+    if data is None:
+        return {}
+    if not isinstance(data, dict):
+        raise ValueError(f"Invalid config {config_path}: not a mapping")
+
+    values = {}
+
+    def add(prefix, item):
+        if isinstance(item, dict):
+            for key, value in item.items():
+                add(f"{prefix}.{key}", value)
+        else:
+            values[prefix] = format_value(item)
+
+    for key, value in data.items():
+        add(str(key), value)
+    return values
+
+
+def shell_quote(text):
+    """
+    Quote text as a single-quoted POSIX shell word.
+    """
+    return "'" + text.replace("'", "'\\''") + "'"
+
+
+def write_env(config_path, target=None):
+    """
+    Write the env file for a config file.  The file is written to a temporary name and renamed
+    so that parallel make jobs never source a partial file.
+
+    Args:
+        config_path (str): Path to <region>_relief.cfg.
+        target (str, optional): Env file path. Defaults to env_path(config_path).
+
+    Returns:
+        str: Path of the env file.
+
+    Raises:
+        OSError: If the file cannot be read or written.
+        ValueError: If the config is invalid.
+    """
+    target = target or env_path(config_path)
+    lines = [f"# Generated from {os.path.basename(config_path)} by relief_config. Do not edit."]
+    for key, value in load_values(config_path).items():
+        name = variable_name(key)
+        if name:
+            lines.append(f"{name}={shell_quote(value)}")
+
+    temp = f"{target}.{os.getpid()}.tmp"
+    with open(temp, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(temp, target)
+    return target
+
+
+def main(argv=None):
+    """
+    Command line entry point for relief_config.
+
+    Args:
+        argv (list of str, optional): Arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: Exit code. 0 on success, 1 on error, 100 for usage.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    try:
+        if len(argv) == 3 and argv[0] == "--get":
+            print(load_values(argv[1]).get(argv[2], ""))
+        elif len(argv) in (1, 2) and not argv[0].startswith("-"):
+            write_env(argv[0], argv[1] if len(argv) == 2 else None)
+        else:
+            print("Usage: relief_config CONFIG [ENV_FILE] | relief_config --get CONFIG KEY",
+                  file=sys.stderr)
+            return 100
+    except (OSError, ValueError) as e:
+        print(f"relief_config: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
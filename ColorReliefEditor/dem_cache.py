@@ -0,0 +1,262 @@
+#  Copyright (c) 2024.
+#   Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the “Software”), to deal in the
+#   Software without restriction,
+#   including without limitation the rights to use, copy, modify, merge, publish, distribute,
+#   sublicense, and/or sell copies
+#   of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+#   the following conditions:
+#  #
+#   The above copyright notice and this permission notice shall be included in all copies or
+#   substantial portions of the Software.
+#  #
+#   THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+#   BUT NOT LIMITED TO THE
+#   WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO
+#   EVENT SHALL THE AUTHORS OR
+#   COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+#   CONTRACT, TORT OR
+#   OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#   DEALINGS IN THE SOFTWARE.
+#  #
+#   This uses QT for some components which has the primary open-source license is the GNU Lesser
+#   General Public License v. 3 (“LGPL”).
+#   With the LGPL license option, you can use the essential libraries and some add-on libraries
+#   of Qt.
+#   See https://www.qt.io/licensing/open-source-lgpl-obligations for QT details.
+"""
+Memory-mapped cache of the preview section of a DEM.
+
+Each preview renderer used to read the preview section (PREVIEW, X_SHIFT, Y_SHIFT) of the DEM
+separately.  The cache writes the section once as a raw little-endian array with a JSON sidecar
+holding the dtype, shape, geotransform, and nodata value.  Readers open the array with
+numpy.memmap, so the GUI, the render worker, and any other process reading the same section share
+its pages through the operating system page cache instead of each holding a decoded copy.
+
+Entries are named by a hash of the DEM path, size and mtime, the mtime of the DEM trigger file,
+and the PREVIEW, X_SHIFT, Y_SHIFT, and MONTAGE settings, so rebuilding the DEM, touching its trigger, or
+moving the preview section selects a new entry.  The sidecar is written last and marks the entry
+complete.  Older entries for the same DEM are removed when a new one is written and at most
+MAX_ENTRIES are kept.
+
+The cache is in the preview_dem folder of the build cache folder (see build_cache.cache_folder).
+"""
+from collections import namedtuple
+import glob
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from ColorReliefEditor import build_cache, relief_engine
+
+# Increment when the entry format changes so old entries are not reused
+CACHE_VERSION = 1
+
+# Maximum number of preview sections kept in the cache
+MAX_ENTRIES = 4
+
+FOLDER = "preview_dem"
+
+# Preview section of a DEM.  values is a read-only numpy.memmap when the section is cached.
+# window is (x_offset, y_offset, width, height), or a tuple of windows for a montage.
+PreviewDEM = namedtuple("PreviewDEM", ["key", "values", "geotransform", "nodata", "window"])
+
+
+def trigger_path(dem_path):
+    """
+    Return the trigger file for a DEM (<prefix>_DEM_trigger.cfg for <prefix>_DEM.tif).
+    """
+    root, _ = os.path.splitext(dem_path)
+    return f"{root}_trigger.cfg"
+
+
+def section(settings):
+    """
+    Return the PREVIEW, X_SHIFT, Y_SHIFT, and MONTAGE settings as a tuple.
+    """
+    keys = ("PREVIEW", "X_SHIFT", "Y_SHIFT", "MONTAGE")
+    return tuple(str(settings.get(k) or "").strip() for k in keys)
+
+
+def cache_key(dem_path, settings):
+    """
+    Return the cache key for the preview section of a DEM.
+
+    Args:
+        dem_path (str): Path to the full DEM.
+        settings (dict): Config values with the PREVIEW, X_SHIFT, Y_SHIFT, and MONTAGE settings.
+
+    Returns:
+        str: Hex digest that changes when the DEM, its trigger, or the preview section changes.
+
+    Raises:
+        OSError: If the DEM does not exist.
+    """
+    dem_path = os.path.abspath(dem_path)
+    stat = os.stat(dem_path)
+    try:
+        trigger = os.stat(trigger_path(dem_path)).st_mtime_ns
+    except OSError:
+        trigger = 0
+    parts = [CACHE_VERSION, dem_path, stat.st_size, stat.st_mtime_ns, trigger, *section(settings)]
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()[:32]
+
+
+def cache_dir(dem_path, settings):
+    """
+    Return the preview DEM cache folder for the project containing a DEM, or None if BUILD_CACHE
+    is off.
+    """
+    if str(settings.get("BUILD_CACHE", "")).strip().lower() == "off":
+        return None
+    project_dir = os.path.dirname(os.path.abspath(dem_path))
+    return os.path.join(build_cache.cache_folder(project_dir, settings), FOLDER)
+
+
+def preview_dem(dem_path, settings, reader=None, folder=None):
+    """
+    Return the preview section of a DEM, memory mapped from the cache when possible.
+
+    Args:
+        dem_path (str): Path to the full DEM.
+        settings (dict): Config values with the PREVIEW, X_SHIFT, Y_SHIFT, and MONTAGE settings
+            and the build cache settings.
+        reader (callable, optional): reader(dem_path, size, x_shift, y_shift, montage)
+            returning (values, geotransform, nodata, window).  Defaults to
+            relief_engine.read_preview.
+        folder (str, optional): Cache folder.  Defaults to cache_dir(dem_path, settings).
+
+    Returns:
+        PreviewDEM: The section.  values is an in-memory array if the cache is disabled or cannot
+        be written.
+
+    Raises:
+        RuntimeError: If GDAL is unavailable or the DEM cannot be read.
+        ValueError: If the preview settings are invalid.
+    """
+    key = cache_key(dem_path, settings)
+    folder = folder or cache_dir(dem_path, settings)
+    if folder:
+        cached = load(folder, key)
+        if cached is not None:
+            return cached
+    values, geotransform, nodata, window = (reader or relief_engine.read_preview)(
+        dem_path, *section(settings))
+    result = PreviewDEM(key, values, geotransform, nodata, _window(window))
+    if folder:
+        try:
+            store(folder, result, dem_path)
+            return load(folder, key) or result
+        except OSError:
+            pass
+    return result
+
+
+def load(folder, key):
+    """
+    Open a cache entry.
+
+    Returns:
+        PreviewDEM: The entry with values memory mapped read-only, or None if it is missing or
+        incomplete.
+    """
+    base = os.path.join(folder, key)
+    try:
+        with open(f"{base}.json") as file:
+            meta = json.load(file)
+        dtype = np.dtype(meta["dtype"])
+        shape = tuple(meta["shape"])
+        if meta.get("version") != CACHE_VERSION:
+            return None
+        if os.path.getsize(f"{base}.raw") != dtype.itemsize * int(np.prod(shape)):
+            return None
+        values = np.memmap(f"{base}.raw", dtype=dtype, mode="r", shape=shape)
+        # Mark the entry recently used
+        os.utime(f"{base}.json")
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    geotransform = tuple(meta["geotransform"]) if meta["geotransform"] else None
+    return PreviewDEM(key, values, geotransform, meta["nodata"], _window(meta["window"]))
+
+
+def store(folder, preview, dem_path):
+    """
+    Write a cache entry, remove older entries for the same DEM, and evict the least recently used
+    entries beyond MAX_ENTRIES.
+
+    Raises:
+        OSError: If the entry cannot be written.
+    """
+    os.makedirs(folder, exist_ok=True)
+    base = os.path.join(folder, preview.key)
+    values = np.asarray(preview.values)
+    values = values.astype(values.dtype.newbyteorder("<"), copy=False)
+    temp = f"{base}.raw.{os.getpid()}"
+    values.tofile(temp)
+    os.replace(temp, f"{base}.raw")
+    nodata = preview.nodata
+    meta = {
+        "version": CACHE_VERSION, "dtype": values.dtype.str, "shape": list(values.shape),
+        "geotransform": list(preview.geotransform) if preview.geotransform else None,
+        "nodata": None if nodata is None else float(nodata),
+        "window": preview.window, "dem": os.path.abspath(dem_path),
+    }
+    temp = f"{base}.json.{os.getpid()}"
+    with open(temp, "w") as file:
+        json.dump(meta, file)
+    os.replace(temp, f"{base}.json")
+    prune(folder, keep=preview.key, dem_path=dem_path)
+
+
+def _window(window):
+    """
+    Return a window (x_offset, y_offset, width, height) or a list of montage windows as tuples.
+    """
+    return tuple(_window(w) if isinstance(w, (list, tuple)) else int(w) for w in window)
+
+
+def entries(folder):
+    """
+    Return the cache entries in a folder, most recently used first.
+
+    Returns:
+        list: (key, dem path) tuples.
+    """
+    found = []
+    for path in glob.glob(os.path.join(folder, "*.json")):
+        try:
+            with open(path) as file:
+                dem = json.load(file).get("dem")
+            found.append((os.path.getmtime(path), os.path.basename(path)[:-5], dem))
+        except (OSError, ValueError, AttributeError):
+            continue
+    found.sort(reverse=True)
+    return [(key, dem) for _, key, dem in found]
+
+
+def prune(folder, keep=None, dem_path=None):
+    """
+    Remove entries for older versions of dem_path and entries beyond MAX_ENTRIES.
+
+    A process that has an entry mapped keeps its pages; removing the files only unlinks them.
+    """
+    dem_path = os.path.abspath(dem_path) if dem_path else None
+    kept = 0
+    for key, dem in entries(folder):
+        if key == keep or (dem != dem_path and kept < MAX_ENTRIES - 1):
+            kept += key != keep
+            continue
+        remove(folder, key)
+
+
+def remove(folder, key):
+    """
+    Remove a cache entry.  The sidecar is removed first so readers never see a partial entry.
+    """
+    for suffix in (".json", ".raw"):
+        try:
+            os.remove(os.path.join(folder, key + suffix))
+        except OSError:
+            pass
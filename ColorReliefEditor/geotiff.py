@@ -0,0 +1,193 @@
+#  Copyright (c) 2024.
+#   Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the “Software”), to deal in the
+#   Software without restriction,
+#   including without limitation the rights to use, copy, modify, merge, publish, distribute,
+#   sublicense, and/or sell copies
+#   of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+#   the following conditions:
+#  #
+#   The above copyright notice and this permission notice shall be included in all copies or
+#   substantial portions of the Software.
+#  #
+#   THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+#   BUT NOT LIMITED TO THE
+#   WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO
+#   EVENT SHALL THE AUTHORS OR
+#   COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+#   CONTRACT, TORT OR
+#   OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#   DEALINGS IN THE SOFTWARE.
+#  #
+#   This uses QT for some components which has the primary open-source license is the GNU Lesser
+#   General Public License v. 3 (“LGPL”).
+#   With the LGPL license option, you can use the essential libraries and some add-on libraries
+#   of Qt.
+#   See https://www.qt.io/licensing/open-source-lgpl-obligations for QT details.
+"""
+Read GeoTIFF file structure without GDAL.
+
+The editor runs without the GDAL Python bindings, so the little it needs to know about an image
+file (its size, overview levels, and whether it is a Cloud-Optimized GeoTIFF) is read from the
+TIFF header and image directories directly.
+"""
+import struct
+from collections import namedtuple
+
+# GDAL writes this block after the TIFF header of a Cloud-Optimized GeoTIFF
+COG_LAYOUT = b"LAYOUT=IFDS_BEFORE_DATA"
+
+# Bytes to read for the header and GDAL structural metadata
+HEADER_BYTES = 512
+
+# Most image directories read from a file.  Guards against directory loops in damaged files
+MAX_DIRECTORIES = 64
+
+# TIFF tags
+NEW_SUBFILE_TYPE = 254
+IMAGE_WIDTH = 256
+IMAGE_LENGTH = 257
+
+# NewSubfileType flags
+REDUCED_RESOLUTION = 1
+TRANSPARENCY_MASK = 4
+
+# An image directory.  index is its position in the file, as used by QImageReader.jumpToImage
+Directory = namedtuple("Directory", ["index", "width", "height", "subfile_type"])
+
+
+def cog_images(values):
+    """
+    Return the image names the COG setting applies to.
+
+    Args:
+        values (dict): Project config values (COG), or the project config.
+
+    Returns:
+        set of str: Image bases (relief, color, hillshade) written as Cloud-Optimized GeoTIFFs.
+    """
+    setting = (values.get("COG") or "off").strip()
+    if setting == "all":
+        return {"relief", "color", "hillshade"}
+    if setting == "relief":
+        return {"relief"}
+    return set()
+
+
+def is_cog(path):
+    """
+    Return True if path is a Cloud-Optimized GeoTIFF written by GDAL.
+
+    Args:
+        path (str): Image file.
+
+    Returns:
+        bool: False if the file is not a COG or can't be read.
+    """
+    try:
+        with open(path, "rb") as file:
+            header = file.read(HEADER_BYTES)
+    except OSError:
+        return False
+    return header[:2] in (b"II", b"MM") and COG_LAYOUT in header
+
+
+def read_directories(file, header, limit=MAX_DIRECTORIES):
+    """
+    Read the image directories of a TIFF or BigTIFF.
+
+    Args:
+        file (file): The TIFF opened in binary mode.
+        header (bytes): The first 16 bytes of the file.
+        limit (int): Most directories to read.
+
+    Returns:
+        list of Directory: The directories in file order.  Empty if the file isn't a TIFF.
+
+    Raises:
+        struct.error: If the file is truncated.
+    """
+    order = {b"II": "<", b"MM": ">"}.get(header[:2])
+    if order is None:
+        return []
+    version = struct.unpack(order + "H", header[2:4])[0]
+    if version == 42:
+        offset = struct.unpack(order + "I", header[4:8])[0]
+        count_format, entry_format, entry_size, next_format = "H", "HHI4s", 12, "I"
+    elif version == 43:
+        offset = struct.unpack(order + "Q", header[8:16])[0]
+        count_format, entry_format, entry_size, next_format = "Q", "HHQ8s", 20, "Q"
+    else:
+        return []
+
+    directories = []
+    seen = set()
+    count_size = struct.calcsize(count_format)
+    while offset and offset not in seen and len(directories) < limit:
+        seen.add(offset)
+        file.seek(offset)
+        count = struct.unpack(order + count_format, file.read(count_size))[0]
+        entries = file.read(count * entry_size)
+        tags = {}
+        for index in range(count):
+            tag, field_type, _, value = struct.unpack(
+                order + entry_format, entries[index * entry_size:(index + 1) * entry_size]
+            )
+            if tag in (NEW_SUBFILE_TYPE, IMAGE_WIDTH, IMAGE_LENGTH):
+                # SHORT (3) or LONG (4) values are stored in the entry
+                value_format = "H" if field_type == 3 else "I"
+                value = value[:struct.calcsize(value_format)]
+                tags[tag] = struct.unpack(order + value_format, value)[0]
+        directories.append(Directory(len(directories), tags.get(IMAGE_WIDTH),
+                                     tags.get(IMAGE_LENGTH), tags.get(NEW_SUBFILE_TYPE, 0)))
+        next_size = struct.calcsize(next_format)
+        offset = struct.unpack(order + next_format, file.read(next_size))[0]
+    return directories
+
+
+def image_levels(path):
+    """
+    Return the full resolution image and overviews of a TIFF, largest first.
+
+    Overviews are the reduced resolution images GDAL stores in the file (COG, or gdaladdo
+    without -ro).  Transparency masks are left out.
+
+    Args:
+        path (str): Image file.
+
+    Returns:
+        list of Directory: Empty if the file isn't a TIFF or can't be read.
+    """
+    try:
+        with open(path, "rb") as file:
+            directories = read_directories(file, file.read(16))
+    except (OSError, struct.error):
+        return []
+    levels = [item for item in directories if item.width and item.height and
+              not item.subfile_type & TRANSPARENCY_MASK]
+    return sorted(levels, key=lambda item: -item.width)
+
+
+def choose_level(levels, width, height):
+    """
+    Return the smallest level that still covers width x height, so it can be shown without
+    enlarging.  The largest level if none are big enough.
+
+    Args:
+        levels (list of Directory): Levels from image_levels.
+        width (int): Width to display.
+        height (int): Height to display.
+
+    Returns:
+        Directory: The level to read, or None if levels is empty.
+    """
+    if not levels:
+        return None
+    # Fit the full image into width x height, then find the level for that scale
+    full = levels[0]
+    scale = min(width / full.width, height / full.height, 1.0)
+    chosen = full
+    for level in levels:
+        if level.width >= full.width * scale and level.height >= full.height * scale:
+            chosen = level
+    return chosen
@@ -41,6 +41,9 @@ from ColorReliefEditor.instructions import get_instructions
 from ColorReliefEditor.preview_widget import PreviewWidget
 from ColorReliefEditor.tab_page import TabPage, expanding_vertical_spacer
 
+# Settings that update the live preview when edited
+LIVE_PREVIEW_KEYS = ["HILLSHADE1", "HILLSHADE2", "HILLSHADE3"]
+
 
 class HillshadePage(TabPage):
     """
@@ -64,14 +67,12 @@ class HillshadePage(TabPage):
                                                     '-combined', '-multidirectional', " "], 180),
                 "HILLSHADE2": ("Strength", "combo", ['-z 1','-z 2','-z 3','-z 4','-z 5','-z 6',], 180),
                 "HILLSHADE3": ("Other", "line_edit", None, 180),
-                "BRIGHTNESS": ("Brightness", "spinbox", [.3, 1.8, .1, 1], 200),
 
             }, "basic": {
                 "HILLSHADE1": ("Shading", "combo", ["-igor", '-alg Horn', '-alg '
                                                                           'ZevenbergenThorne',
                                                     '-combined', '-multidirectional', " "], 180),
                 "HILLSHADE2": ("Strength", "combo", ['-z 1','-z 2','-z 3','-z 4','-z 5','-z 6',], 180),
-                "BRIGHTNESS": ("Brightness", "spinbox", [.3, 1.8, .1, 1], 200),
             }
         }
 
@@ -83,7 +84,11 @@ class HillshadePage(TabPage):
         # Set margins (left, top, right, bottom) to 0 and spacing between widgets to 5
         settings_layout.setContentsMargins(0, 0, 0, 0)  # No external margins
         settings_layout.setSpacing(5)  # Internal padding between widgets
-        self.settings_widget = SettingsWidget(main.proj_config, formats, mode, verbose=main.verbose)
+        # Re-render the preview in the background when a hillshade setting changes
+        self.settings_widget = SettingsWidget(
+            main.proj_config, formats, mode, LIVE_PREVIEW_KEYS, self.on_setting_changed,
+            verbose=main.verbose
+        )
 
         settings_layout.addWidget(self.settings_widget)
         settings_layout.addItem(expanding_vertical_spacer(1))
@@ -93,7 +98,7 @@ class HillshadePage(TabPage):
         )
 
         # Widget for building and displaying a preview
-        button_flags = ["preview"]
+        button_flags = ["preview", "export"]
         self.preview = PreviewWidget(
             main, self.tab_name, self.settings_widget, True, main.proj_config.save, button_flags, )
 
@@ -111,6 +116,12 @@ class HillshadePage(TabPage):
             widgets, None, instructions, self.tab_name, vertical=False, stretch=stretch
         )
 
+    def on_setting_changed(self, key, value):
+        """
+        Called by the settings widget when a setting in LIVE_PREVIEW_KEYS is edited.
+        """
+        self.preview.schedule_preview()
+
     def display(self):
         self.settings_widget.display()
         if self.preview:
@@ -129,11 +140,10 @@ class HillshadePage(TabPage):
         project_dir = Path(self.main.project.project_directory)
         self.preview.image_file = str(project_dir / self.preview.target)
 
-        # Update Hillshade proxy file if HILLSHADE or BRIGHTNESS fields change.
-        # This forces Hillshade rebuild
+        # Update Hillshade proxy file if HILLSHADE fields change.  This forces Hillshade rebuild.
         self.main.proj_config.register_proxy_file(
             self.main.project.get_proxy_path("hillshade"),
-            ["HILLSHADE1", "HILLSHADE2", "HILLSHADE3", "HILLSHADE4", "BRIGHTNESS"]
+            ["HILLSHADE1", "HILLSHADE2", "HILLSHADE3", "HILLSHADE4"]
         )
 
         return True
@@ -0,0 +1,289 @@
+#  Copyright (c) 2024.
+#   Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the “Software”), to deal in the
+#   Software without restriction,
+#   including without limitation the rights to use, copy, modify, merge, publish, distribute,
+#   sublicense, and/or sell copies
+#   of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+#   the following conditions:
+#  #
+#   The above copyright notice and this permission notice shall be included in all copies or
+#   substantial portions of the Software.
+#  #
+#   THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+#   BUT NOT LIMITED TO THE
+#   WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO
+#   EVENT SHALL THE AUTHORS OR
+#   COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+#   CONTRACT, TORT OR
+#   OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#   DEALINGS IN THE SOFTWARE.
+#  #
+#   This uses QT for some components which has the primary open-source license is the GNU Lesser
+#   General Public License v. 3 (“LGPL”).
+#   With the LGPL license option, you can use the essential libraries and some add-on libraries
+#   of Qt.
+#   See https://www.qt.io/licensing/open-source-lgpl-obligations for QT details.
+"""
+Load images for display at the size they are shown.
+
+Decoding a full size relief to show it in a label takes gigabytes of memory and can take minutes.
+read_image only decodes what the display needs:
+
+    - With the GDAL Python bindings, the image is read directly at the display size.  GDAL reads
+      the overview nearest that size if the file has overviews (see COG), otherwise it reads
+      every n-th pixel.
+    - Without them, the overview nearest the display size is found from the TIFF directories
+      (see geotiff) and decoded by Qt.  Files without overviews are decoded by Qt and scaled.
+
+ImageLoader runs read_image on a thread pool thread so the GUI doesn't freeze, and only delivers
+the newest load.
+"""
+from contextlib import contextmanager
+import os
+import re
+import sys
+import tempfile
+import threading
+
+# Handle imports for PyQt6 versus PySide depending on which has been installed
+try:
+    from PySide6.QtCore import QObject, QRunnable, QSize, QThreadPool, Signal
+    from PySide6.QtGui import QImage, QImageReader
+except ImportError:
+    from PyQt6.QtCore import QObject, QRunnable, QSize, QThreadPool, pyqtSignal as Signal
+    from PyQt6.QtGui import QImage, QImageReader
+
+# GDAL Python bindings are optional.  Qt decodes the image without them
+try:
+    from osgeo import gdal
+except ImportError:
+    gdal = None
+
+from ColorReliefEditor.geotiff import choose_level, image_levels
+
+# Spurious libtiff warnings for GeoTIFF tags
+GEOTIFF_WARNING = r'Unknown field with tag \d+'
+
+# stderr is redirected for the whole process, so only one thread may filter it at a time
+_stderr_lock = threading.Lock()
+
+
+def fit_size(width, height, max_width, max_height):
+    """
+    Return the size of a width x height image scaled to fit max_width x max_height.  Images are
+    not enlarged.
+
+    Returns:
+        tuple: (width, height), each at least 1.
+    """
+    scale = min(max_width / width, max_height / height, 1.0)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def read_image(path, width, height):
+    """
+    Decode an image at the size it will be displayed.
+
+    Args:
+        path (str): Image file.
+        width (int): Display width in pixels.
+        height (int): Display height in pixels.
+
+    Returns:
+        tuple: (QImage, (source width, source height)).  The QImage is null if the file can't be
+        read.  It is at most width x height unless the file had to be decoded by Qt at a larger
+        overview level.
+    """
+    if gdal is not None:
+        result = _read_gdal(path, width, height)
+        if result is not None:
+            return result
+    return _read_qt(path, width, height)
+
+
+def _read_gdal(path, width, height):
+    """
+    Read the image with GDAL at the display size, or return None if GDAL can't open it.
+    """
+    dataset = gdal.Open(path)
+    if dataset is None:
+        return None
+    source = (dataset.RasterXSize, dataset.RasterYSize)
+    image = gdal_image(dataset, (0, 0, *source), fit_size(*source, width, height))
+    return (image, source) if image is not None else None
+
+
+def gdal_image(dataset, window, out_size):
+    """
+    Read a window of a GDAL dataset into a QImage.  GDAL reads the overview for the output size,
+    or every n-th pixel if there isn't one.
+
+    Args:
+        dataset (gdal.Dataset): Image with 1 (gray), 3 (RGB), or 4 (RGBA) Byte bands.
+        window (tuple): (x_offset, y_offset, width, height) in full size pixels.
+        out_size (tuple): (width, height) of the QImage.
+
+    Returns:
+        QImage: The pixels, or None if the read failed.
+    """
+    band_count = 4 if dataset.RasterCount >= 4 else 3 if dataset.RasterCount == 3 else 1
+    image_format = {1: QImage.Format.Format_Grayscale8, 3: QImage.Format.Format_RGB888,
+                    4: QImage.Format.Format_RGBA8888}[band_count]
+    out_width, out_height = out_size
+
+    # Pixel interleaved bytes
+    pixels = dataset.ReadRaster(
+        *window, buf_xsize=out_width, buf_ysize=out_height, buf_type=gdal.GDT_Byte,
+        band_list=list(range(1, band_count + 1)), buf_pixel_space=band_count,
+        buf_line_space=band_count * out_width, buf_band_space=1
+    )
+    if pixels is None:
+        return None
+    return QImage(pixels, out_width, out_height, band_count * out_width, image_format).copy()
+
+
+def _read_qt(path, width, height):
+    """
+    Decode the overview nearest the display size with Qt.
+    """
+    levels = image_levels(path)
+    reader = QImageReader(path)
+    if levels:
+        source = (levels[0].width, levels[0].height)
+        level = choose_level(levels, width, height)
+        if level.index > 0:
+            reader.jumpToImage(level.index)
+        size = (level.width, level.height)
+    else:
+        size = (reader.size().width(), reader.size().height())
+        source = size
+
+    # Without an overview this small, Qt decodes the image and scales it
+    if size[0] > 0 and size[1] > 0 and (size[0] > width or size[1] > height):
+        reader.setScaledSize(QSize(*fit_size(*size, width, height)))
+    with filter_stderr(GEOTIFF_WARNING):
+        image = reader.read()
+    return image, source
+
+
+@contextmanager
+def filter_stderr(pattern):
+    """
+    Context manager to suppress specific warnings in stderr.
+
+    Args:
+        pattern (str): Suppress messages containing this regular expression.
+    """
+    with _stderr_lock:
+        # Save the original stderr file descriptor
+        original_stderr_fd = os.dup(sys.stderr.fileno())
+
+        # Create a temporary file to capture stderr
+        with tempfile.TemporaryFile(mode='w+') as temp_stderr:
+            # Redirect stderr to the temporary file
+            os.dup2(temp_stderr.fileno(), sys.stderr.fileno())
+            try:
+                yield
+            finally:
+                # Flush and restore stderr
+                os.dup2(original_stderr_fd, sys.stderr.fileno())
+                os.close(original_stderr_fd)
+                # Process the temporary file for filtering
+                temp_stderr.seek(0)
+                for line in temp_stderr:
+                    if not re.search(pattern, line):
+                        sys.stderr.write(line)
+
+
+class LoadSignals(QObject):
+    """
+    Signals for LoadTask. QRunnable can't emit signals itself.
+
+    Attributes:
+        finished (Signal): Emitted with the generation, path, QImage, and source size.
+    """
+    finished = Signal(int, str, object, object)
+
+
+class LoadTask(QRunnable):
+    """
+    Decodes one image on a thread pool thread.
+    """
+
+    def __init__(self, loader, generation, path, width, height):
+        super().__init__()
+        self.loader = loader
+        self.generation = generation
+        self.path = path
+        self.width = width
+        self.height = height
+        self.signals = loader.signals
+
+    def run(self):
+        # Skip loads that were superseded while waiting in the queue
+        if self.generation != self.loader.generation:
+            return
+        try:
+            image, source = read_image(self.path, self.width, self.height)
+        except Exception:
+            # Report any failure as an image that can't be loaded rather than ending the thread
+            image, source = QImage(), None
+        self.signals.finished.emit(self.generation, self.path, image, source)
+
+
+class ImageLoader(QObject):
+    """
+    Loads images on a thread pool thread.  A newer load supersedes older ones, and only the
+    newest is delivered.
+
+    Attributes:
+        generation (int): Incremented for each load.
+        loading (bool): True while the newest load hasn't been delivered.
+
+    **Methods**:
+        - load(path, width, height): Start loading an image at a display size.
+        - cancel(): Don't deliver loads in progress.
+    """
+
+    def __init__(self, on_loaded, pool=None):
+        """
+        Initialize
+
+        Args:
+            on_loaded (callable): Called with the path, QImage (null on error), and source
+                (width, height) of each delivered load.
+            pool (QThreadPool, optional): Pool to decode on.  Defaults to the global pool.
+        """
+        super().__init__()
+        self.on_loaded = on_loaded
+        self.pool = pool or QThreadPool.globalInstance()
+        self.generation = 0
+        self.loading = False
+        self.signals = LoadSignals()
+        self.signals.finished.connect(self._on_finished)
+
+    def load(self, path, width, height):
+        """
+        Start loading an image.
+
+        Args:
+            path (str): Image file.
+            width (int): Display width in pixels.
+            height (int): Display height in pixels.
+        """
+        self.generation += 1
+        self.loading = True
+        self.pool.start(LoadTask(self, self.generation, path, max(1, width), max(1, height)))
+
+    def cancel(self):
+        """
+        Don't deliver loads in progress.
+        """
+        self.generation += 1
+        self.loading = False
+
+    def _on_finished(self, generation, path, image, source):
+        if generation == self.generation:
+            self.loading = False
+            self.on_loaded(path, image, source)
@@ -0,0 +1,236 @@
+#  Copyright (c) 2024.
+#   Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the “Software”), to deal in the
+#   Software without restriction,
+#   including without limitation the rights to use, copy, modify, merge, publish, distribute,
+#   sublicense, and/or sell copies
+#   of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+#   the following conditions:
+#  #
+#   The above copyright notice and this permission notice shall be included in all copies or
+#   substantial portions of the Software.
+#  #
+#   THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+#   BUT NOT LIMITED TO THE
+#   WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO
+#   EVENT SHALL THE AUTHORS OR
+#   COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+#   CONTRACT, TORT OR
+#   OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#   DEALINGS IN THE SOFTWARE.
+#  #
+#   This uses QT for some components which has the primary open-source license is the GNU Lesser
+#   General Public License v. 3 (“LGPL”).
+#   With the LGPL license option, you can use the essential libraries and some add-on libraries
+#   of Qt.
+#   See https://www.qt.io/licensing/open-source-lgpl-obligations for QT details.
+"""
+Scale images to a label off the GUI thread.
+
+Smooth scaling a 3000 pixel preview for every resize event makes dragging a splitter stutter.
+ImageScaler keeps a mip chain of the image, each level half the size of the one before, built on
+a thread pool thread.  While the label is being resized, a draft is scaled with nearest neighbour
+from the smallest level that covers the label, which is fast since that level is at most twice
+the label size.  When resizing stops, the smooth image is scaled from the same level on a thread
+pool thread and replaces the draft.
+"""
+# Handle imports for PyQt6 versus PySide depending on which has been installed
+try:
+    from PySide6.QtCore import QObject, QRunnable, Qt, QThreadPool, QTimer, Signal
+    from PySide6.QtGui import QPixmap
+except ImportError:
+    from PyQt6.QtCore import QObject, QRunnable, Qt, QThreadPool, QTimer, pyqtSignal as Signal
+    from PyQt6.QtGui import QPixmap
+
+# Milliseconds without a resize before the smooth image is scaled
+SETTLE_MS = 150
+
+# Mip levels stop at this size (pixels on the longer side)
+MIP_MIN_SIZE = 256
+
+
+def build_mips(image, min_size=MIP_MIN_SIZE):
+    """
+    Return the image and smooth scaled copies, each half the size of the one before.
+
+    Args:
+        image (QImage): Full size image.
+        min_size (int): Stop when the longer side is at most this size.
+
+    Returns:
+        list of QImage: Largest first.
+    """
+    mips = [image]
+    while max(mips[-1].width(), mips[-1].height()) // 2 >= min_size:
+        previous = mips[-1]
+        mips.append(previous.scaled(
+            max(1, previous.width() // 2), max(1, previous.height() // 2),
+            Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.SmoothTransformation
+        ))
+    return mips
+
+
+def choose_mip(mips, width, height):
+    """
+    Return the index of the smallest level at least width x height, or 0 if none are.
+    """
+    index = 0
+    for level, mip in enumerate(mips):
+        if mip.width() >= width and mip.height() >= height:
+            index = level
+    return index
+
+
+class ScaleSignals(QObject):
+    """
+    Signals for the scaler tasks. QRunnable can't emit signals itself.
+
+    Attributes:
+        mips (Signal): Emitted with the generation and list of QImage levels.
+        scaled (Signal): Emitted with the generation and smooth scaled QImage.
+    """
+    mips = Signal(int, object)
+    scaled = Signal(int, object)
+
+
+class MipTask(QRunnable):
+    """
+    Builds the mip chain of an image on a thread pool thread.
+    """
+
+    def __init__(self, scaler, generation, image):
+        super().__init__()
+        self.scaler = scaler
+        self.generation = generation
+        self.image = image
+        self.signals = scaler.signals
+
+    def run(self):
+        if self.generation == self.scaler.generation:
+            self.signals.mips.emit(self.generation, build_mips(self.image))
+
+
+class ScaleTask(QRunnable):
+    """
+    Smooth scales an image on a thread pool thread.
+    """
+
+    def __init__(self, scaler, generation, image, width, height):
+        super().__init__()
+        self.scaler = scaler
+        self.generation = generation
+        self.image = image
+        self.width = width
+        self.height = height
+        self.signals = scaler.signals
+
+    def run(self):
+        # Skip sizes that were superseded while waiting in the queue
+        if self.generation != self.scaler.scale_generation:
+            return
+        self.signals.scaled.emit(self.generation, self.image.scaled(
+            self.width, self.height, Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation
+        ))
+
+
+class ImageScaler(QObject):
+    """
+    Scales an image to a display size with a fast draft and a smooth image off the GUI thread.
+
+    Attributes:
+        mips (list of QImage): The image and its reduced levels, largest first.
+        generation (int): Incremented for each image.
+        scale_generation (int): Incremented for each requested size.
+
+    **Methods**:
+        - set_image(image): Scale a new image.
+        - draft(width, height): Return a fast nearest neighbour pixmap.
+        - request(width, height): Scale a smooth image when resizing stops.
+        - clear(): Drop the image.
+    """
+
+    def __init__(self, on_scaled, pool=None, delay=SETTLE_MS):
+        """
+        Initialize
+
+        Args:
+            on_scaled (callable): Called with the QPixmap of each smooth image.
+            pool (QThreadPool, optional): Pool to scale on.  Defaults to the global pool.
+            delay (int): Milliseconds without a request before the smooth image is scaled.
+        """
+        super().__init__()
+        self.on_scaled = on_scaled
+        self.pool = pool or QThreadPool.globalInstance()
+        self.mips = []
+        self._drafts = []
+        self.generation = 0
+        self.scale_generation = 0
+        self.size = None
+
+        self.signals = ScaleSignals()
+        self.signals.mips.connect(self._on_mips)
+        self.signals.scaled.connect(self._on_scaled)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self._start_scale)
+
+    def set_image(self, image):
+        """
+        Use a new image.  Its reduced levels are built on a thread pool thread.
+
+        Args:
+            image (QImage): Full size image.
+        """
+        self.generation += 1
+        self.scale_generation += 1
+        self.mips = [image]
+        self._drafts = [None]
+        self.pool.start(MipTask(self, self.generation, image))
+
+    def clear(self):
+        self.generation += 1
+        self.scale_generation += 1
+        self.timer.stop()
+        self.mips = []
+        self._drafts = []
+
+    def draft(self, width, height):
+        """
+        Return a pixmap of about width x height scaled with nearest neighbour from the nearest
+        level, or None if there is no image.
+        """
+        if not self.mips:
+            return None
+        index = choose_mip(self.mips, width, height)
+        if self._drafts[index] is None:
+            self._drafts[index] = QPixmap.fromImage(self.mips[index])
+        return self._drafts[index].scaled(
+            width, height, Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.FastTransformation
+        )
+
+    def request(self, width, height):
+        """
+        Scale a smooth image of width x height once requests stop for the settle delay.
+        """
+        self.size = (width, height)
+        self.scale_generation += 1
+        self.timer.start()
+
+    def _start_scale(self):
+        if not self.mips or not self.size:
+            return
+        image = self.mips[choose_mip(self.mips, *self.size)]
+        self.pool.start(ScaleTask(self, self.scale_generation, image, *self.size))
+
+    def _on_mips(self, generation, mips):
+        if generation == self.generation:
+            self.mips = mips
+            self._drafts = [None] * len(mips)
+
+    def _on_scaled(self, generation, image):
+        if generation == self.scale_generation:
+            self.on_scaled(QPixmap.fromImage(image))
@@ -0,0 +1,300 @@
+#  Copyright (c) 2024.
+#   Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the “Software”), to deal in the
+#   Software without restriction,
+#   including without limitation the rights to use, copy, modify, merge, publish, distribute,
+#   sublicense, and/or sell copies
+#   of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+#   the following conditions:
+#  #
+#   The above copyright notice and this permission notice shall be included in all copies or
+#   substantial portions of the Software.
+#  #
+#   THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+#   BUT NOT LIMITED TO THE
+#   WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO
+#   EVENT SHALL THE AUTHORS OR
+#   COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+#   CONTRACT, TORT OR
+#   OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#   DEALINGS IN THE SOFTWARE.
+#  #
+#   This uses QT for some components which has the primary open-source license is the GNU Lesser
+#   General Public License v. 3 (“LGPL”).
+#   With the LGPL license option, you can use the essential libraries and some add-on libraries
+#   of Qt.
+#   See https://www.qt.io/licensing/open-source-lgpl-obligations for QT details.
+"""
+Live previews that are re-rendered in the background while settings are edited.
+
+Edits restart a short timer so a burst of edits produces one render. Renders run on a worker
+thread with the render worker, a newer render cancels the one in progress, and only a frame
+newer than the one displayed is shown.
+
+A render can be progressive: a coarse frame from every 8th DEM row and column is shown within
+milliseconds, then refined to full resolution.  Refinement stops when a newer edit arrives.
+Live previews need the render worker (ENGINE numpy and the GDAL Python bindings).  If get_request
+can't provide a request, on_unavailable is called so the page can say why.
+"""
+# Handle imports for PyQt6 versus PySide depending on which has been installed
+try:
+    from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
+    from PySide6.QtGui import QImage
+except ImportError:
+    from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal as Signal
+    from PyQt6.QtGui import QImage
+
+# Milliseconds to wait after the last edit before rendering
+DEBOUNCE_MS = 200
+
+# Decimation factors of the frames of a progressive render, coarsest first
+PROGRESSIVE_SCALES = (8, 2, 1)
+
+
+class RenderSignals(QObject):
+    """
+    Signals for RenderTask. QRunnable can't emit signals itself.
+
+    Attributes:
+        finished (Signal): Emitted with the generation, scale, status, and QImage or error
+            message.
+        exported (Signal): Emitted with the status and target path or error message.
+    """
+    finished = Signal(int, int, str, object)
+    exported = Signal(str, object)
+
+
+class RenderTask(QRunnable):
+    """
+    Renders the frames of one preview, coarsest first, on a thread pool thread.
+    """
+
+    def __init__(self, live_preview, generation, request):
+        """
+        Initialize
+
+        Args:
+            live_preview (LivePreview): The scheduler that created this task.
+            generation (int): Generation of the edit that requested this frame.
+            request (dict): RenderClient.render() keyword arguments other than channel.
+        """
+        super().__init__()
+        self.live_preview = live_preview
+        self.generation = generation
+        self.request = request
+        self.signals = live_preview.signals
+
+    def run(self):
+        for scale in self.live_preview.scales:
+            # Skip frames that were superseded while waiting in the queue or refining
+            if self.generation != self.live_preview.generation:
+                self.signals.finished.emit(self.generation, scale, "cancelled", None)
+                return
+            status, result = self.live_preview.client.render(
+                self.live_preview.channel, scale=scale, **self.request
+            )
+            if status == "ok" and result is None:
+                # The full frame is a fast patch, so the coarse frame isn't needed
+                continue
+            if status == "ok":
+                result = rgba_to_qimage(result)
+            self.signals.finished.emit(self.generation, scale, status, result)
+            if status != "ok":
+                return
+
+
+class ExportTask(QRunnable):
+    """
+    Renders a preview and writes it to a file on a thread pool thread.
+    """
+
+    def __init__(self, live_preview, target, request):
+        """
+        Initialize
+
+        Args:
+            live_preview (LivePreview): The scheduler that created this task.
+            target (str): Path of the GeoTIFF to write.
+            request (dict): RenderClient.render() keyword arguments other than channel.
+        """
+        super().__init__()
+        self.live_preview = live_preview
+        self.target = target
+        self.request = request
+        self.signals = live_preview.signals
+
+    def run(self):
+        status, result = self.live_preview.client.export(
+            self.live_preview.channel, target=self.target, **self.request
+        )
+        self.signals.exported.emit(status, result)
+
+
+class LivePreview(QObject):
+    """
+    Debounces edits and renders previews in the background with the render worker.
+
+    Attributes:
+        generation (int): Incremented for each scheduled render.
+        shown (tuple): (generation, scale) of the frame on display.
+
+    **Methods**:
+    """
+
+    def __init__(self, client, channel, get_request, on_frame, on_error=None,
+                 delay=DEBOUNCE_MS, scales=(1,), on_unavailable=None):
+        """
+        Initialize
+
+        Args:
+            client (RenderClient): The render worker client.
+            channel (str): Render channel.  A newer render on the channel cancels older ones.
+            get_request (callable): Returns RenderClient.render() keyword arguments other than
+                channel, or None if a live preview isn't available.
+            on_frame (callable): Called with the QImage of each new frame.
+            on_error (callable, optional): Called with an error message.
+            delay (int): Milliseconds to wait after the last edit before rendering.
+            scales (tuple): Decimation factor of each frame of a render, coarsest first, e.g.
+                PROGRESSIVE_SCALES.  The default renders one full resolution frame.
+            on_unavailable (callable, optional): Called when an edit can't be rendered because
+                get_request returned None.
+        """
+        super().__init__()
+        self.client = client
+        self.channel = channel
+        self.get_request = get_request
+        self.on_frame = on_frame
+        self.on_error = on_error
+        self.on_unavailable = on_unavailable
+        # (generation, callback) for render(), and the callback for export()
+        self._on_done = (0, None)
+        self._on_exported = None
+        self.scales = scales
+        self.generation = 0
+        self.shown = (0, 1)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self._on_timer)
+
+        # One thread: the render worker handles one request at a time
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+        self.signals = RenderSignals()
+        self.signals.finished.connect(self._on_finished)
+        self.signals.exported.connect(self._exported)
+
+    def schedule(self):
+        """
+        Schedule a render.  Restarts the timer so rapid edits are coalesced.
+        """
+        self.timer.start()
+
+    def stop(self):
+        """
+        Stop pending and running renders.  Frames from them are not shown.
+        """
+        self.timer.stop()
+        self.generation += 1
+        self.shown = (self.generation, 1)
+        self.client.cancel_channel(self.channel)
+        self._cancel_done()
+
+    def render(self, on_done):
+        """
+        Render now without waiting for the debounce delay, e.g. for a Preview button.  Frames
+        are shown as for an edit.
+
+        Args:
+            on_done (callable): Called with (status, result) when the render ends.  status is
+                "ok" with the final QImage, "cancelled" if another render() or stop()
+                superseded it, "error" with a message, or "unavailable" if the worker can't be
+                used.  If an edit supersedes the render, on_done is called when the edit's
+                render ends.
+
+        Returns:
+            bool: False if the preview can't be rendered by the render worker.
+        """
+        self.timer.stop()
+        return self._start(on_done)
+
+    def export(self, target, on_done):
+        """
+        Render the preview and write it to target as a GeoTIFF in the background.
+
+        Args:
+            target (str): Path of the GeoTIFF to write.
+            on_done (callable): Called with (status, result).  result is the target path if
+                status is "ok", otherwise an error message.
+
+        Returns:
+            bool: False if the preview can't be rendered by the render worker.
+        """
+        request = self.get_request()
+        if request is None:
+            return False
+        self._on_exported = on_done
+        self.pool.start(ExportTask(self, target, request))
+        return True
+
+    def _on_timer(self):
+        if not self._start() and self.on_unavailable:
+            self.on_unavailable()
+
+    def _start(self, on_done=None):
+        request = self.get_request()
+        if request is None:
+            return False
+        self.generation += 1
+        self.client.cancel_channel(self.channel)
+        if on_done is None:
+            # An edit renders the newer settings for a pending render() rather than dropping it
+            on_done = self._on_done[1]
+        else:
+            self._cancel_done()
+        self._on_done = (self.generation, on_done)
+        self.pool.start(RenderTask(self, self.generation, request))
+        return True
+
+    def _on_finished(self, generation, scale, status, result):
+        if status == "ok":
+            # Show newer frames and finer frames of the frame on display
+            if (generation, -scale) > (self.shown[0], -self.shown[1]):
+                self.shown = (generation, scale)
+                self.on_frame(result)
+        elif status == "error" and generation == self.generation and self.on_error:
+            self.on_error(result)
+
+        done_generation, on_done = self._on_done
+        if on_done and generation == done_generation and (
+                status != "ok" or scale == self.scales[-1]):
+            self._on_done = (0, None)
+            on_done(status, result)
+
+    def _cancel_done(self):
+        on_done = self._on_done[1]
+        self._on_done = (0, None)
+        if on_done:
+            on_done("cancelled", None)
+
+    def _exported(self, status, result):
+        on_done, self._on_exported = self._on_exported, None
+        if on_done:
+            on_done(status, result)
+
+
+def rgba_to_qimage(rgba):
+    """
+    Convert an RGBA array to a QImage.
+
+    Args:
+        rgba (numpy.ndarray): uint8 array of shape (rows, cols, 4).
+
+    Returns:
+        QImage: A copy of the pixels that does not reference the array.
+    """
+    height, width = rgba.shape[:2]
+    pixels = rgba.tobytes()
+    return QImage(pixels, width, height, 4 * width, QImage.Format.Format_RGBA8888).copy()
@@ -1,3 +1,9 @@
+import os
+
+from ColorReliefEditor.build_graph import BuildGraph
+from ColorReliefEditor.make_process import BUILD_PRIORITY, PREVIEW_PRIORITY
+
+
 class MakeHandler:
     """
     Handles make process for generating, viewing, and publishing images.
@@ -11,6 +17,7 @@ class MakeHandler:
         self.dry_run = False
         self.make_process = main.make_process
         self.make = self.main.make_process.make
+        self.job_id = None
 
     def output(self, message):
         self.output_window.appendPlainText(message)
@@ -25,15 +32,35 @@ class MakeHandler:
         dry_run = " -n" if dry_run_flag else ""
         self.dry_run = dry_run_flag
 
+        dem_files = " ".join(self.get_dem_files())
         return (f"{self.make} {self.multiprocess_flag if not dry_run_flag else ''} REGION={region} "
-                f"LAYER={layer} -f Makefile {base} {dry_run}")
+                f"LAYER={layer} PIPELINE={self.get_pipeline()} DEM_FILES=\"{dem_files}\" "
+                f"-f Makefile {base} {dry_run}")
+
+    def get_dem_files(self):
+        """
+        Return the elevation file patterns for the active layer, relative to the project folder.
+        """
+        if not self.main.proj_config:
+            return []
+        folder = self.main.proj_config.get("DEM_FOLDER") or ""
+        files = self.main.proj_config.get("FILES.@LAYER") or ""
+        return [os.path.join(folder, pattern) for pattern in files.split()]
+
+    def get_pipeline(self):
+        """
+        Return the relief pipeline from the project config: "standard" or "fused".
+        """
+        pipeline = self.main.proj_config.get("PIPELINE") if self.main.proj_config else None
+        return "fused" if pipeline == "fused" else "standard"
 
     def make_image(self, base, preview_mode, layers):
         self.output_window.clear()
         for layer in layers:
             target = self.main.project.get_target_image_name(base, preview_mode, layer)
             command = self.get_make_command(target)
-            self.run_make(command)
+            priority = PREVIEW_PRIORITY if preview_mode else BUILD_PRIORITY
+            self.run_make(command, priority, self.get_targets(target))
             return target
 
     def make_clean(self, layers):
@@ -46,17 +73,80 @@ class MakeHandler:
             else:
                 self.output("Error: layer name is empty.")
 
-    def run_make(self, command):
+    def run_make(self, command, priority=BUILD_PRIORITY, targets=None):
+        """
+        Queue a make command.  Jobs with targets=None (e.g. clean) run alone.
+        """
         project_directory = self.main.project.project_directory
         makefile_path = self.main.project.makefile_path
-        self.make_process.run_make(
-            makefile_path, project_directory, command, self.tab_name, self.output_window
+        self.job_id = self.make_process.run_make(
+            makefile_path, project_directory, command, self.tab_name, self.output_window,
+            priority, targets
         )
 
+    def get_targets(self, target):
+        """
+        Return the files that building target may write, or None if they aren't known.
+        """
+        try:
+            return {target} | {item.target for item in self.stale(target)}
+        except ValueError:
+            return None
+
     def up_to_date(self, target):
         """
-        Check if the project is up to date by running a dry-run of the make process.
-        Returns True if the project is up to date, False otherwise.
+        Check if the target is up to date using the state kept by the stale monitor (see
+        StaleMonitor and BuildGraph).  This doesn't block the GUI like a make dry-run.
+        Returns True if the target is up to date, False otherwise.
+        """
+        layer = self.main.project.get_layer()
+        try:
+            stale = self.stale(target) if layer else None
+        except ValueError:
+            # Not a target in the graph. Ask make instead
+            return self._make_up_to_date(target)
+
+        self.output_window.clear()
+        if stale is None:
+            self.output("Error: layer name is empty.")
+            return False
+        if stale:
+            self.output("The image is out of date.  Click Create to build the image.")
+            for item in stale:
+                self.output(f"   {item.stage}: {item.reason}")
+            return False
+        self.output("Image is up to date. ✅")
+        return True
+
+    def stale(self, target=None):
+        """
+        Return the stages that must be rebuilt to make target for the active layer.
+
+        Args:
+            target (str, optional): Target file name. Defaults to the relief image.
+
+        Returns:
+            list of Stale: Stages to rebuild in build order.
+
+        Raises:
+            ValueError: If the target is not in the Makefile graph.
+        """
+        project = self.main.project
+        layer = project.get_layer()
+        try:
+            return self.main.stale_monitor.stale(layer, target)
+        except ValueError:
+            # The monitor hasn't seen this layer yet (e.g. the config isn't saved)
+            graph = BuildGraph(
+                project.project_directory, project.region, layer, self.get_pipeline(),
+                self.get_dem_files()
+            )
+            return graph.stale(target)
+
+    def _make_up_to_date(self, target):
+        """
+        Check if the target is up to date by running a dry-run of the make process.
+        Returns True if the target is up to date, False otherwise.
         """
         # Get the make command with the dry-run option
         command = self.get_make_command(dry_run_flag=True, base=target)
@@ -65,7 +155,6 @@ class MakeHandler:
         makefile_path = self.main.project.makefile_path
 
         # Run the make process with dry-run to check if anything would be built
-
         self.make_process.run_make(
             makefile_path, project_directory, command, self.tab_name, self.output_window
         )
@@ -27,19 +27,23 @@
 
 #
 #
+import codecs
 import os
 import platform
 import re
 import shutil
+from collections import deque
 
 # Handle imports for PyQt6 versus PySide depending on which has been installed
 try:
-    from PySide6.QtCore import QObject,  Signal, QProcess
+    from PySide6.QtCore import QObject, Signal, QProcess, QProcessEnvironment, QTimer
     from PySide6.QtGui import QTextCursor, QTextCharFormat, QColor
 except ImportError:
-    from PyQt6.QtCore import QObject, pyqtSignal as Signal, QProcess
+    from PyQt6.QtCore import (QObject, pyqtSignal as Signal, QProcess, QProcessEnvironment,
+                              QTimer)
     from PyQt6.QtGui import QTextCursor, QTextCharFormat, QColor
 
+from ColorReliefEditor.build_progress import PROGRESS_PREFIX, parse_event
 
 # ANSI color mapping
 ANSI_COLOR_MAP = {
@@ -47,21 +51,86 @@ ANSI_COLOR_MAP = {
     '36': 'cyan', '37': 'white',
 }
 ANSI_ESCAPE = re.compile(r'\x1b\[([0-9;]*)m')
+ANSI_PARTIAL = re.compile(r'\x1b(\[[0-9;]*)?$')
+DEFAULT_COLOR = "default"
+
+# Milliseconds between writes of buffered output to the output windows
+FLUSH_MS = 100
+
+# Reads of output kept for each job
+MAX_JOB_OUTPUT = 1000
+
+
+# Job priorities.  Lower runs first
+PREVIEW_PRIORITY = 0
+BUILD_PRIORITY = 1
+
+# Default limits on make processes running at once: all jobs, and full builds
+MAX_JOBS = 2
+MAX_BUILDS = 1
+
+
+class MakeJob:
+    """
+    One make command in the MakeProcess queue.
+
+    Attributes:
+        job_id (int): Unique id, passed to the make_finished signal.
+        job_name (str): Name of the tab that started the job.
+        command (str): The make command.
+        project_directory (str): Folder to run the command in.
+        output_window (QPlainTextEdit): Window for the job output, or None.
+        priority (int): PREVIEW_PRIORITY or BUILD_PRIORITY.
+        targets (set of str): Files the job may write, or None if unknown.  Jobs with
+            overlapping (or unknown) targets don't run at the same time.
+        output (deque of str): The most recent output from the job.
+        process (QProcess): The running process, or None while queued.
+        cancelled (bool): True if the job was cancelled.
+        partial_line (str): Start of an output line that may be a progress event.
+    """
+
+    def __init__(self, job_id, job_name, command, project_directory, output_window, priority,
+                 targets):
+        self.job_id = job_id
+        self.job_name = job_name
+        self.command = command
+        self.project_directory = project_directory
+        self.output_window = output_window
+        self.priority = priority
+        self.targets = set(targets) if targets is not None else None
+        self.output = deque(maxlen=MAX_JOB_OUTPUT)
+        self.stdout_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.stderr_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.process = None
+        self.cancelled = False
+        self.partial_line = ""
+
+    def conflicts(self, other):
+        """
+        Return True if this job and other may write the same files.
+        """
+        if self.job_name == other.job_name or self.targets is None or other.targets is None:
+            return True
+        return bool(self.targets & other.targets)
 
 
 class MakeProcess(QObject):
     """
-    Executes Makefile commands, streaming real-time output to an optional output window and
-    emitting a `make_finished` signal upon completion. Supports dry-run mode to preview actions
-    without execution and provides `build_required` to indicate if the dry-run determined that a
-    build
-    is required.
+    Runs Makefile commands from a job queue, streaming real-time output to each job's output
+    window and emitting a `make_finished` signal as each job completes.  Several jobs can run at
+    once: preview jobs are started before full builds, and a full build can continue while
+    previews are built.  Jobs that may write the same files wait for each other.  Supports
+    dry-run mode to preview actions without execution and provides `build_required` to
+    indicate if the dry-run determined that a build is required.
 
     Attributes:
-        make_finished (Signal): Signal emitted when the make process finishes, with
-            the job name and exit code.
-        job_name (str): Name of the current job being processed.
-        dry_run (bool): Specifies if the current process is a dry-run. Set to True if the
+        make_finished (Signal): Signal emitted when a make job finishes, with
+            the job name, exit code, and job id.
+        progress (Signal): Signal emitted with the job name and a progress event (a dict with
+            stage, layer, percent, bytes, total, elapsed, and eta - see build_progress).
+        max_jobs (int): Maximum number of jobs running at once.
+        max_builds (int): Maximum number of full builds (BUILD_PRIORITY) running at once.
+        dry_run (bool): Specifies if the last command was a dry-run. Set to True if the
             make command ends with '-n'. Runs the process synchronously for analysis
             without actual execution.
         build_required (bool): Indicates whether a build is required based on the output
@@ -71,9 +140,10 @@ class MakeProcess(QObject):
     **Methods**:
     """
 
-    make_finished = Signal(str, int)
+    make_finished = Signal(str, int, int)
+    progress = Signal(str, object)
 
-    def __init__(self, verbose=0, dark_mode=True ):
+    def __init__(self, verbose=0, dark_mode=True, max_jobs=MAX_JOBS, max_builds=MAX_BUILDS):
         """
         Initialize the MakeProcess object.
         """
@@ -82,12 +152,21 @@ class MakeProcess(QObject):
         self.verbose = verbose
         self.dry_run = False
         self.build_required = False
-        self.process = QProcess()
-        self.job_name = ""
+        self.max_jobs = max(1, max_jobs)
+        self.max_builds = max(1, max_builds)
+        self.queue = []
+        self.running = []
+        self._next_id = 1
         self._output_window = None
-        self.process.readyReadStandardOutput.connect(self._on_standard_output)
-        self.process.readyReadStandardError.connect(self._on_standard_error)
-        self.process.finished.connect(self._on_process_finished)
+
+        # Output waiting to be written, by window, with the ANSI color in effect for each window
+        self._pending = {}
+        self._ansi_color = {}
+        self._formats = {}
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(FLUSH_MS)
+        self._flush_timer.timeout.connect(self.flush)
 
         system = platform.system()
         if system == "Darwin":
@@ -95,11 +174,12 @@ class MakeProcess(QObject):
         else:
             self.make = "make"
 
-    def run_make(self, makefile_path, project_directory, command, job_name, output_window=None):
+    def run_make(self, makefile_path, project_directory, command, job_name, output_window=None,
+                 priority=BUILD_PRIORITY, targets=None):
         """
-        Execute the given command.
+        Queue the given command.
         Runs synchronously if '-n' is in the command (fast dry-run),
-        otherwise runs the process asynchronously and emits the `make_finished` signal
+        otherwise the job runs when a slot is free and emits the `make_finished` signal
 
         Args:
             makefile_path (str): The path to the Makefile file.
@@ -107,65 +187,126 @@ class MakeProcess(QObject):
             job_name (str): The name of the job for tracking purposes.
             output_window (QPlainTextEdit, optional): The window to display process output.
             project_directory (str): The path to the project directory.
+            priority (int): PREVIEW_PRIORITY or BUILD_PRIORITY.
+            targets (iterable of str, optional): Files the job may write.  None if unknown,
+                in which case the job runs alone.
 
         Returns:
-            int: Exit code if running synchronously, 0 if running asynchronously.
+            int: Exit code if running synchronously, otherwise the job id.
         """
+        job = MakeJob(
+            self._next_id, job_name, command, project_directory, output_window, priority, targets
+        )
+        self._next_id += 1
         self._output_window = output_window
         self.clear_output()
-        self.job_name = job_name
         self.output(f"{command}\n")
 
         # Validate command
         if shutil.which(command.split()[0]) is None:
-            return self.return_error(102, f"ERROR: Command not found: {command.split()[0]}")
+            return self.return_error(102, f"ERROR: Command not found: {command.split()[0]}", job)
 
         if not makefile_path or not os.path.isfile(makefile_path):
-            self.return_error(103, f"ERROR: Makefile not found at: {makefile_path} ")
+            self.return_error(103, f"ERROR: Makefile not found at: {makefile_path} ", job)
 
         # chdir to the project directory
         try:
             os.chdir(project_directory)
         except OSError as e:
             self.return_error(
-                104, f"ERROR: Unable to change directory to: {project_directory} {e} "
+                104, f"ERROR: Unable to change directory to: {project_directory} {e} ", job
             )
 
-        # Start the make process
-        self.build_required = False
-
-        try:
-            self.process.startCommand(command)
-        except Exception as e:
-            self.warn(f"\nERROR: Unable to run Makefile command.\n{e}")
-            return self.return_error(105, f"ERROR: Unable to start process. {e}")
-
         # Check if this is a dry-run command
         if command.strip().endswith("-n"):
             # Run dry-run synchronously and scan output for ".sh" to determine if
             # build is required
             self.dry_run = True
-            self.process.waitForFinished()
-        else:
-            # Run asynchronously and handle with signal
-            # Monitor if the process fails to start
-            self.process.waitForStarted()
-            if self.process.state() != QProcess.ProcessState.Running:
-                self.return_error(105, f"\nERROR: Unable to run {command}")
-            self.dry_run = False
+            self.build_required = False
+            process = self._create_process(job)
+            process.startCommand(command)
+            process.waitForFinished()
+            process.deleteLater()
+            self.flush()
+            return process.exitCode()
+
+        self.dry_run = False
+        self.queue.append(job)
+        self._start_jobs()
+        return job.job_id
 
-    def _on_process_finished(self, exit_code):
+    def _start_jobs(self):
+        """
+        Start queued jobs in priority order while there are free slots.
+        """
+        for job in sorted(self.queue, key=lambda item: (item.priority, item.job_id)):
+            if len(self.running) >= self.max_jobs:
+                break
+            builds = sum(1 for item in self.running if item.priority == BUILD_PRIORITY)
+            if job.priority == BUILD_PRIORITY and builds >= self.max_builds:
+                continue
+            if any(job.conflicts(item) for item in self.running):
+                continue
+            self.queue.remove(job)
+            self._start(job)
+
+    def _start(self, job):
+        """
+        Start the process for a job.
+        """
+        self.running.append(job)
+        process = self._create_process(job)
+        process.finished.connect(
+            lambda exit_code, _status: self._on_process_finished(job, exit_code)
+        )
+        try:
+            process.startCommand(job.command)
+        except Exception as e:
+            self._append(job, f"\n\033[33mERROR: Unable to run Makefile command.\n{e}\x1b[0m")
+            self._on_process_finished(job, 105)
+            return
+
+        # Monitor if the process fails to start
+        process.waitForStarted()
+        if process.state() != QProcess.ProcessState.Running:
+            self._append(job, f"\n\033[33mERROR: Unable to run {job.command}\x1b[0m")
+            self._on_process_finished(job, 105)
+
+    def _create_process(self, job):
+        process = QProcess(self)
+        process.setWorkingDirectory(job.project_directory)
+
+        # color_relief.sh reports stage progress as events (see build_progress)
+        environment = QProcessEnvironment.systemEnvironment()
+        environment.insert("RELIEF_PROGRESS", "1")
+        process.setProcessEnvironment(environment)
+        process.readyReadStandardOutput.connect(lambda: self._on_standard_output(job))
+        process.readyReadStandardError.connect(lambda: self._on_standard_error(job))
+        job.process = process
+        return process
+
+    def _on_process_finished(self, job, exit_code):
         """
         Handle the process finished event.
 
         Args:
+            job (MakeJob): The job that completed.
             exit_code (int): The exit code of the completed process.
         """
-        self.make_finished.emit(self.job_name, exit_code)
-
-    def return_error(self, error, message):
+        if job not in self.running:
+            return
+        self.running.remove(job)
+        job.process.deleteLater()
+        self.flush()
+        if job.cancelled:
+            exit_code = 2
+        self.make_finished.emit(job.job_name, exit_code, job.job_id)
+        self._start_jobs()
+
+    def return_error(self, error, message, job=None):
         self.output(f"\033[33m{message}\x1b[0m")
-        self.make_finished.emit(self.job_name, error)
+        self.flush()
+        self.make_finished.emit(job.job_name if job else "", error, job.job_id if job else 0)
         return error
 
     def clear_output(self):
@@ -173,98 +314,185 @@ class MakeProcess(QObject):
         Clear output window
         """
         if self._output_window:
+            self._pending.pop(self._output_window, None)
+            self._ansi_color.pop(self._output_window, None)
             self._output_window.clear()
 
     def output(self, text):
         """
-        Output the given text to the output window
+        Queue the given text for the output window.  It is written on the next flush.
 
         Args:
             text (str): The text to display in the output window.
         """
         if self._output_window:
-            self._output_window.moveCursor(QTextCursor.MoveOperation.End)
-            self._append_ansi_text(text)
-            self._output_window.moveCursor(QTextCursor.MoveOperation.End)
+            self._pending.setdefault(self._output_window, []).append(text)
+            if not self._flush_timer.isActive():
+                self._flush_timer.start()
+
+    def job_output(self, job_id):
+        """
+        Return the recent output of a running or queued job.
+
+        Args:
+            job_id (int): Job id from run_make.
 
-    def cancel(self):
+        Returns:
+            str: The output so far, or None if the job is not running or queued.
         """
-        Cancel the currently running make process.
+        for job in self.running + self.queue:
+            if job.job_id == job_id:
+                return "".join(job.output)
+        return None
+
+    def cancel(self, job_id=None, job_name=None):
         """
-        self.process.kill()
-        self.make_finished.emit(self.job_name, 2)
+        Cancel a queued or running job.  With no arguments, cancel every job.
 
-    def _on_standard_output(self):
+        Args:
+            job_id (int, optional): Cancel the job with this id.
+            job_name (str, optional): Cancel the jobs with this name.
+        """
+        def selected(job):
+            return ((job_id is None and job_name is None) or job.job_id == job_id or
+                    job.job_name == job_name)
+
+        for job in [job for job in self.queue if selected(job)]:
+            self.queue.remove(job)
+            self.make_finished.emit(job.job_name, 2, job.job_id)
+        for job in [job for job in self.running if selected(job)]:
+            job.cancelled = True
+            job.process.kill()
+
+    def _append(self, job, text):
         """
-        Handle and display standard output from the make process.
+        Add text to a job's output buffer and output window.
         """
-        output = self.process.readAllStandardOutput().data().decode()
+        job.output.append(text)
+        self._output_window = job.output_window
+        self.output(text)
 
-        if self._output_window:
-            self._output_window.moveCursor(QTextCursor.MoveOperation.End)
-            self._append_ansi_text(output)
-            self._output_window.moveCursor(QTextCursor.MoveOperation.End)
+    def _on_standard_output(self, job):
+        """
+        Handle and display standard output from a make process.
+        """
+        output = job.stdout_decoder.decode(job.process.readAllStandardOutput().data())
+        self._append(job, self._take_progress(job, output))
 
-        # During dry run check if output contains ".sh" (indicating work to be done)
-        if self.dry_run and ".sh " in output:
+        # During a dry run (never queued) check if output contains ".sh" (work to be done)
+        if job not in self.running and ".sh " in output:
             # If there are script names in the dry run output, a build is required
             self.build_required = True
 
-    def _on_standard_error(self):
+    def _take_progress(self, job, output):
         """
-        Handle and display standard error output from the make process.
+        Emit the progress events in the output and return the rest of the output.
         """
-        self.build_required = True
-        output = self.process.readAllStandardError().data().decode()
+        if not job.partial_line and "@" not in output:
+            return output
+        lines = (job.partial_line + output).split("\n")
+
+        # Hold back the last line until it is complete if it may be an event
+        job.partial_line = lines.pop()
+        newline = "\n"
+        if not PROGRESS_PREFIX.startswith(job.partial_line[:len(PROGRESS_PREFIX)]):
+            lines.append(job.partial_line)
+            job.partial_line = ""
+            newline = ""
+
+        text = []
+        for line in lines:
+            event = parse_event(line)
+            if event is None:
+                text.append(line)
+            else:
+                self.progress.emit(job.job_name, event)
+        return "\n".join(text) + newline if text else ""
 
-        A=7
-        B=9
-        aa = print(   (A < 4) | ((A > 90) & (A < 150))  | (A > 250) , B, (A / 255.) * B)
+    def _on_standard_error(self, job):
+        """
+        Handle and display standard error output from a make process.
+        """
+        if job not in self.running:
+            self.build_required = True
+        output = job.stderr_decoder.decode(job.process.readAllStandardError().data())
 
-        if self._output_window:
-            self._output_window.moveCursor(QTextCursor.MoveOperation.End)
-            if "ERR" in output or "err" in output or "Err" in output or "failed" in output:
-                self._append_ansi_text(f"\033[33m{output}\x1b[0m")
-            else:
-                self._append_ansi_text(output)
-            self._output_window.moveCursor(QTextCursor.MoveOperation.End)
+        if "ERR" in output or "err" in output or "Err" in output or "failed" in output:
+            self._append(job, f"\033[33m{output}\x1b[0m")
+        else:
+            self._append(job, output)
 
-    def _append_ansi_text(self, text):
+    def flush(self):
         """
-        Parse ANSI escape sequences and append styled text to the output window.
+        Write the buffered output to the output windows.  Output is buffered as it arrives and
+        written in one batch per window when the flush timer fires, so heavy output doesn't
+        redraw the window for every read.
+        """
+        self._flush_timer.stop()
+        pending, self._pending = self._pending, {}
+        for window, chunks in pending.items():
+            text = "".join(chunks)
+
+            # Hold back an escape sequence split across reads
+            partial = ANSI_PARTIAL.search(text)
+            if partial:
+                self._pending[window] = [partial.group(0)]
+                text = text[:partial.start()]
+
+            cursor = window.textCursor()
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            cursor.beginEditBlock()
+            self._append_ansi_text(window, cursor, text)
+            cursor.endEditBlock()
+            window.moveCursor(QTextCursor.MoveOperation.End)
+
+    def _append_ansi_text(self, window, cursor, text):
+        """
+        Parse ANSI escape sequences and append styled text at the cursor.  The color in effect
+        at the end of the text carries over to the next output for the window.
 
         Args:
+            window (QPlainTextEdit): The output window.
+            cursor (QTextCursor): Cursor at the end of the window.
             text (str): The text containing ANSI escape sequences.
         """
-        cursor = self._output_window.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-
-        default_format = QTextCharFormat()
-        current_format = QTextCharFormat()
-        if self.dark_mode:
-            current_format.setForeground(QColor('white'))  # Default color
-        else:
-            current_format.setForeground(QColor('black'))  # Default color
+        color = self._ansi_color.get(window, DEFAULT_COLOR)
 
         pos = 0
         for match in ANSI_ESCAPE.finditer(text):
             start, end = match.span()
 
             # Insert the text up to the ANSI escape sequence
-            cursor.insertText(text[pos:start], current_format)
+            if start > pos:
+                cursor.insertText(text[pos:start], self._format(color))
             pos = end
 
-            # Update the current format based on ANSI codes
+            # Update the current color based on ANSI codes
             codes = match.group(1).split(';')
-            if '0' in codes:  # Reset to default
-                current_format = QTextCharFormat(default_format)
+            if '0' in codes:  # Reset
+                color = None
             for code in codes:
                 if code in ANSI_COLOR_MAP:
                     color = ANSI_COLOR_MAP[code]
-                    current_format.setForeground(QColor(color))
 
         # Insert the remaining text
-        cursor.insertText(text[pos:], current_format)
+        if pos < len(text):
+            cursor.insertText(text[pos:], self._format(color))
+        self._ansi_color[window] = color
+
+    def _format(self, color):
+        """
+        Return the cached character format for an ANSI color (None for the reset format).
+        """
+        text_format = self._formats.get(color)
+        if text_format is None:
+            text_format = QTextCharFormat()
+            if color == DEFAULT_COLOR:
+                text_format.setForeground(QColor('white' if self.dark_mode else 'black'))
+            elif color:
+                text_format.setForeground(QColor(color))
+            self._formats[color] = text_format
+        return text_format
 
     def warn(self, message):
         if self.verbose > 0:
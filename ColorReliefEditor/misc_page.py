@@ -56,6 +56,8 @@ class MiscPage(TabPage):
                 "WARP1": ("CRS", "line_edit", r'^\s*-t_srs\s+\S+$', 200),
                 "WARP2": ("gdalwarp", "line_edit", r"(?:-(?:\w+(?:\s+\w+=[\w/]+)?)\s*)+", 500),
                 "WARP4": ("Performance", "line_edit", None, 500),
+                "WORKERS": ("Workers", "line_edit", r"^\s*(\d+|ALL_CPUS)?\s*$", 120),
+                "BUILD_MEMORY": ("Build Memory MB", "line_edit", r"^\s*\d*\s*$", 120),
                 "WARP3": ("Resampling", "combo",
                                                                             ["-r bilinear",
                                                                              '-r cubic',
@@ -67,6 +69,9 @@ class MiscPage(TabPage):
                 "EDGE": ("Edges", "combo", ["-compute_edges", " "], 180),
                 "OUTPUT_TYPE": ("Output Type", "line_edit", r'^\s*-of\s+\S+$', 200),
                 "COLOR1": ("Nearest Color", "line_edit", None, 200),
+                "ENGINE": ("Engine", "combo", ["gdal", "numpy"], 180),
+                "MONTAGE": ("Preview Montage", "line_edit",
+                            r"^\s*(off|\d+|(\d*\.?\d+,\d*\.?\d+\s*)+)?\s*$", 300),
                 "LABEL6": ("", "label", None, 400),
                 "LABEL1": ("GDAL CALC", "label", None, 400),
                 "MERGE1": ("gdal_calc", "line_edit", r"^(--[a-zA-Z0-9]+(=["
@@ -74,6 +79,17 @@ class MiscPage(TabPage):
                                                      r"a-zA-Z0-9]+(=["
                                                      r"a-zA-Z0-9]+)?)*$", 500),
                 "COMPRESS": ("Compress", "line_edit", r'^-co COMPRESS=.*', 500),
+                "COG": ("Cloud Optimized", "combo", ["off", "relief", "all"], 180),
+                "COG_RESAMPLING": ("Overview Resampling", "combo",
+                                   ["average", "bilinear", "cubic", "lanczos", "nearest"], 180),
+                "LABEL7": ("", "label", None, 400),
+                "LABEL8": ("BUILD CACHE", "label", None, 400),
+                "BUILD_CACHE": ("Build Cache", "combo", ["on", "off"], 180),
+                "CACHE_LIMIT": ("Cache MB", "line_edit", r"^\s*\d*\s*$", 120),
+                "CACHE_DIR": ("Cache Folder", "line_edit", None, 500),
+                "LABEL9": ("", "label", None, 400),
+                "LABEL10": ("PERFORMANCE", "label", None, 400),
+                "TELEMETRY": ("Telemetry", "combo", ["off", "on"], 180),
             }, "basic": {
             }
         }
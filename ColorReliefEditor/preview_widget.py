@@ -26,30 +26,40 @@
 #   See https://www.qt.io/licensing/open-source-lgpl-obligations for QT details.
 #
 #
-from contextlib import contextmanager
 import os
 from pathlib import Path
 import platform
-import re
 import shutil
 import subprocess
-import sys
-import tempfile
 
 # Handle imports for PyQt6 versus PySide depending on which has been installed
 try:
     from PySide6.QtCore import Qt, QTimer
     from PySide6.QtGui import QPixmap
-    from PySide6.QtWidgets import QLabel, QSizePolicy, QMessageBox
+    from PySide6.QtWidgets import QLabel, QProgressBar, QSizePolicy, QMessageBox
 except ImportError:
     from PyQt6.QtCore import Qt, QTimer
     from PyQt6.QtGui import QPixmap
-    from PyQt6.QtWidgets import QLabel, QSizePolicy, QMessageBox
-
+    from PyQt6.QtWidgets import QLabel, QProgressBar, QSizePolicy, QMessageBox
+
+from ColorReliefEditor import config_env, relief_engine, render_worker
+from ColorReliefEditor.build_graph import layer_graphs, layer_names
+from ColorReliefEditor.build_progress import format_eta
+from ColorReliefEditor.build_scheduler import BuildScheduler, memory_budget, plan_build
+from ColorReliefEditor.color_config import ColorConfig
+from ColorReliefEditor.geotiff import cog_images, is_cog
+from ColorReliefEditor.image_loader import ImageLoader
+from ColorReliefEditor.image_scaler import ImageScaler
+from ColorReliefEditor.live_preview import LivePreview, PROGRESSIVE_SCALES
 from ColorReliefEditor.make_handler import MakeHandler
+from ColorReliefEditor.tile_scheduler import resolve_workers
+from ColorReliefEditor.tile_viewer import TileViewer
 from ColorReliefEditor.tab_page import TabPage, create_hbox_layout, create_button, \
     create_readonly_window
 
+# Decode the image file again when the decoded image is enlarged more than this
+RELOAD_ZOOM = 1.25
+
 
 class PreviewWidget(TabPage):
     """
@@ -58,11 +68,13 @@ class PreviewWidget(TabPage):
     This widget has two modes:
     - **Preview Mode**: Generates small images for quick viewing.
     - **Full Build Mode**: Produces full-sized images with features for publishing, cleaning
-    temporary files, and launching an external viewer.
+    temporary files, and launching an external viewer.  Images are shown in a zoom and pan
+    viewer (see TileViewer).
 
     Attributes:
         preview_mode (bool): Determines the operational mode (Preview or Full Build).
         image_label (QLabel): Displays the generated image in preview mode.
+        tile_viewer (TileViewer): Displays the full size image in full build mode.
         zoom_factor (float): The current zoom level for the image display.
         make_handler (MakeHandler): Manages the `make` process for image generation and maintenance.
         full_output_height (int): Height of make output for full build. Default = 400
@@ -79,7 +91,8 @@ class PreviewWidget(TabPage):
             settings (object):  Configuration settings object for this widget.
             preview_mode (bool): Whether the widget is in preview mode.
             on_save (callable): Callback function executed upon saving.
-            button_ids (list): List of button ids to display in full mode (make,view,publish,clean,cancel)
+            button_ids (list): List of button ids to display (preview,export,make,view,publish,clean,
+                cancel)
         """
         self.image_file = None
         self.image = None
@@ -90,7 +103,10 @@ class PreviewWidget(TabPage):
         # Button definitions
         self.button_definitions = [
             {"id": "preview", "label": "Preview", "callback": self.make_image, "focus": True},
+            {"id": "export", "label": "Export", "callback": self.export_preview, "focus": False},
             {"id": "make", "label": "Create", "callback": self.make_image, "focus": True},
+            {"id": "make_all", "label": "Create All", "callback": self.make_all_layers,
+             "focus": False},
             {"id": "view", "label": "View...", "callback": self.launch_viewer, "focus": False},
             {"id": "publish", "label": "Publish", "callback": self.publish, "focus": False}, {
                 "id": "clean", "label": "Cleanup files", "callback": self.make_clean,
@@ -108,6 +124,11 @@ class PreviewWidget(TabPage):
         self._pixmap = None
 
         self.image_label = None
+        self.tile_viewer = None
+        self.status_label = None
+        self.progress_bar = None
+        self.scheduler = None
+        self.layer_progress = {}
         self.zoom_factor = 1.0
 
         # General Buttons
@@ -126,6 +147,17 @@ class PreviewWidget(TabPage):
 
         self.init_ui()
 
+        # Previews re-rendered in the background while settings are edited
+        self.live_preview = None
+        self.render_unavailable = None
+        self.unavailable_shown = None
+        if self.preview_mode:
+            self.live_preview = LivePreview(
+                main.render_client, self.tab_name, self.live_request, self.image.set_image,
+                self.output, scales=PROGRESSIVE_SCALES,
+                on_unavailable=self.on_live_unavailable
+            )
+
         # Run Make in multiprocessor mode?
         if self.main.app_config["MULTI"] == 'multi':
             multi = ' -j '
@@ -137,8 +169,13 @@ class PreviewWidget(TabPage):
 
         if not self.connected_to_make:
             self.make_handler.make_process.make_finished.connect(self.on_make_done)
+            self.make_handler.make_process.progress.connect(self.on_progress)
             self.connected_to_make = True
 
+        # Full builds show whether the image is up to date as files change
+        if self.status_label:
+            main.stale_monitor.status_changed.connect(self.show_status)
+
     def init_ui(self):
         """
         Initialize UI components for the display
@@ -155,6 +192,13 @@ class PreviewWidget(TabPage):
             if defn["id"] in self.button_ids:
                 button = create_button(defn["label"], defn["callback"], defn["focus"], self)
                 buttons.append(button)
+        if not self.preview_mode:
+            # Stage progress and time remaining while an image is built
+            self.progress_bar = QProgressBar(self)
+            self.progress_bar.setVisible(False)
+            buttons.append(self.progress_bar)
+            self.status_label = QLabel(self)
+            buttons.append(self.status_label)
         button_layout = create_hbox_layout(buttons)
 
         if self.preview_mode:
@@ -170,6 +214,14 @@ class PreviewWidget(TabPage):
 
             # Vertical size ratios of widgets:  buttons, output_window, image
             stretch = [1, 3, 15]
+        elif self.tab_name.lower() != "contour":
+            # Full Build Mode - an output window and a zoom and pan viewer for the image
+            self.tile_viewer = TileViewer(self)
+            self.tile_viewer.setMinimumSize(400, 300)
+            self.output_window.setMinimumSize(70, self.preview_output_height)
+
+            # Vertical size ratios of widgets:  buttons, output_window, image
+            stretch = [1, 5, 15]
         else:
             # Full Build Mode - just an output window, no image preview
             self.output_window.setMinimumSize(70, self.full_output_height)
@@ -179,14 +231,15 @@ class PreviewWidget(TabPage):
 
         self.image = Image(
             self.main, tab_name=self.tab_name, image_label=self.image_label,
-            preview_mode=self.preview_mode
+            preview_mode=self.preview_mode, on_error=self.output
         )
 
-        widgets = [button_layout, self.output_window, self.image_label]
+        widgets = [button_layout, self.output_window, self.image_label or self.tile_viewer]
         self.create_page(widgets, None, None, None, vertical=True, stretch=stretch)
 
     def redisplay(self):
         self.settings.display()
+        self.show_status()
 
         # If layer was changed, reload image for new layer
         if self.image_layer != self.main.project.get_layer() and self.image:
@@ -194,6 +247,40 @@ class PreviewWidget(TabPage):
             self.output_window.clear()
             self.image.load_image(zoom=False)
             self.image.zoom_image()
+        self.show_full_image()
+
+    def show_full_image(self):
+        """
+        Show the full size image in the viewer.  It is only reopened if the file has changed.
+        """
+        if not self.tile_viewer or not self.image:
+            return
+        image_path = self.image.construct_image_path()
+        if not os.path.exists(image_path):
+            self.tile_viewer.close()
+            return
+        error = self.tile_viewer.open(image_path, os.path.getmtime(image_path))
+        if error:
+            self.output(f"Error: cannot view {image_path}: {error} ❌")
+
+    def show_status(self):
+        """
+        Show whether the full size image is up to date (see StaleMonitor).
+        """
+        if (not self.status_label or not self.image or self.scheduler or
+                not self.main.project.project_directory):
+            return
+        layer = self.main.project.get_layer()
+        target = self.main.project.get_target_image_name(self.image.get_image_base(), False, layer)
+        try:
+            stale = self.make_handler.stale(target)
+        except ValueError:
+            self.status_label.setText("")
+            return
+        if stale:
+            self.status_label.setText(f"Out of date: {', '.join(item.stage for item in stale)}")
+        else:
+            self.status_label.setText("Up to date ✅")
 
     def make_image(self):
         self.set_buttons_ready(False)
@@ -201,17 +288,232 @@ class PreviewWidget(TabPage):
 
         self.image_layer = self.main.project.get_layer()
 
+        # Previews are rendered in the background by the render worker instead of make if
+        # possible
+        if self.live_preview:
+            self.output_window.clear()
+            if self.live_preview.render(self.on_render_done):
+                return
+
         self.image_file = self.make_handler.make_image(
             self.image.get_image_base(), self.preview_mode, [self.image_layer]
         )
 
+    def make_all_layers(self):
+        """
+        Build the image for every layer at the same time (see BuildScheduler).  Stages from all
+        layers share the WORKERS and BUILD_MEMORY budget.
+        """
+        self.set_buttons_ready(False)
+        self.on_save()
+        self.output_window.clear()
+
+        config_path = self.main.proj_config.file_path
+        try:
+            values = config_env.load_values(config_path)
+            jobs = plan_build(
+                layer_graphs(config_path, values), layer_names(values),
+                self.image.get_image_base()
+            )
+            workers = resolve_workers(values.get("WORKERS"))
+            memory = memory_budget(values.get("BUILD_MEMORY"))
+        except (OSError, ValueError) as e:
+            self.output(f"Error: {e} ❌")
+            self.set_buttons_ready(True)
+            return
+
+        if not jobs:
+            self.output("All layers are up to date. ✅")
+            self.set_buttons_ready(True)
+            return
+
+        self.layer_progress = {}
+        self.scheduler = BuildScheduler(
+            self.main.project.project_directory, jobs, workers, memory
+        )
+        self.scheduler.output.connect(lambda layer, line: self.output(f"{layer}: {line}"))
+        self.scheduler.progress.connect(self.on_layer_progress)
+        self.scheduler.stage_progress.connect(self.on_stage_progress)
+        self.scheduler.finished.connect(self.on_all_layers_done)
+        self.scheduler.start()
+
+    def on_layer_progress(self, layer, done, total):
+        """
+        Show the stages finished for each layer while all layers are built.
+        """
+        self.layer_progress[layer] = f"{layer} {done}/{total}"
+        if self.status_label:
+            self.status_label.setText("  ".join(self.layer_progress.values()))
+
+    def on_stage_progress(self, layer, event):
+        """
+        Show the progress of a running stage while all layers are built.
+        """
+        eta = format_eta(event.get("eta"))
+        self.layer_progress[layer] = (f"{layer} {event.get('stage')} "
+                                      f"{event.get('percent', 0):.0f}% {eta}").rstrip()
+        if self.status_label:
+            self.status_label.setText("  ".join(self.layer_progress.values()))
+
+    def on_progress(self, name, event):
+        """
+        Show the progress of the running stage and the estimated time remaining.
+
+        Args:
+            name (str): Job name (tab name).
+            event (dict): Progress event (see build_progress).
+        """
+        if name != self.tab_name or not self.progress_bar:
+            return
+        eta = format_eta(event.get("eta"))
+        self.progress_bar.setFormat(
+            f"{event.get('stage')} %p%" + (f"  {eta} left" if eta else "")
+        )
+        self.progress_bar.setValue(int(event.get("percent", 0)))
+        self.progress_bar.setVisible(True)
+
+    def on_all_layers_done(self, exit_code):
+        self.scheduler = None
+        self.set_buttons_ready(True)
+        self.output("Done ✅" if exit_code == 0 else f"Build failed ({exit_code}) ❌")
+        self.show_status()
+
+    def on_render_done(self, status, result):
+        """
+        Called when a preview rendered by the render worker (relief_engine) ends.  The preview
+        section is read directly from the DEM, so no _prv files are created.  The render worker
+        is only used when ENGINE is numpy, GDAL Python bindings are installed, and the DEM is
+        current.  If the worker fails or is unavailable, the preview is built with make.
+
+        Args:
+            status (str): Render status (see LivePreview.render).
+            result: The final QImage or an error message.
+        """
+        if status in ("ok", "cancelled"):
+            if status == "ok":
+                self.output("Done ✅")
+            self.set_buttons_ready(True)
+            return
+        self.image_file = self.make_handler.make_image(
+            self.image.get_image_base(), self.preview_mode, [self.image_layer]
+        )
+
+    def schedule_preview(self):
+        """
+        Schedule a background preview render after a settings edit.  Rapid edits are
+        coalesced.  Only available when the preview can be rendered by the render worker.
+        """
+        if self.live_preview:
+            self.live_preview.schedule()
+
+    def live_request(self):
+        """
+        Return the render request for a live preview (see render_request), saving edits first.
+        """
+        self.image_layer = self.main.project.get_layer()
+        request = self.render_request()
+        if request is not None:
+            self.on_save()
+        return request
+
+    def on_live_unavailable(self):
+        """
+        Explain why an edit didn't update the preview.  Each reason is shown once in a row.
+        """
+        if self.render_unavailable and self.render_unavailable != self.unavailable_shown:
+            self.output(self.render_unavailable)
+        self.unavailable_shown = self.render_unavailable
+
+    def export_preview(self):
+        """
+        Write the preview image to its _prv file, e.g. to open it in another application.
+        The preview is rendered by the render worker if possible, otherwise built with make.
+        """
+        self.set_buttons_ready(False)
+        self.on_save()
+        self.image_layer = self.main.project.get_layer()
+
+        if self.live_preview:
+            self.output_window.clear()
+            if self.live_preview.export(self.image.construct_image_path(), self.on_export_done):
+                return
+
+        self.image_file = self.make_handler.make_image(
+            self.image.get_image_base(), self.preview_mode, [self.image_layer]
+        )
+
+    def on_export_done(self, status, result):
+        """
+        Called when a preview export by the render worker ends.  If the worker is unavailable,
+        the preview is built with make.
+        """
+        if status == "unavailable":
+            self.image_file = self.make_handler.make_image(
+                self.image.get_image_base(), self.preview_mode, [self.image_layer]
+            )
+            return
+        target = self.image.construct_image_path()
+        self.output(f"Exported {target} ✅" if status == "ok" else f"Export: {result}")
+        self.set_buttons_ready(True)
+
+    def render_request(self):
+        """
+        Return the arguments for a render worker request for this preview, or None if the
+        preview can't be rendered by the worker.
+
+        Sets render_unavailable to the reason if the worker can't be used.
+
+        Returns:
+            dict: RenderClient.render() keyword arguments other than channel, or None.
+        """
+        self.render_unavailable = None
+        base = self.image.get_image_base()
+        if not self.preview_mode or base not in render_worker.RENDER_BASES:
+            return None
+        if self.main.proj_config.get("ENGINE") != "numpy":
+            self.render_unavailable = (
+                "Live preview needs Engine: numpy (Misc tab). Press Preview to update."
+            )
+            return None
+        if relief_engine.gdal is None:
+            self.render_unavailable = (
+                "Live preview needs the GDAL Python bindings. Press Preview to update."
+            )
+            return None
+
+        # The DEM must be up to date with the DEM trigger
+        project = self.main.project
+        layer = self.image_layer
+        dem_path = Path(project.project_directory) / project.get_target_image_name(
+            "DEM", False, layer
+        )
+        if not is_newer(dem_path, [Path(project.get_proxy_layer_path("dem", layer))]):
+            self.render_unavailable = "The DEM is out of date. Press Preview to update."
+            return None
+
+        # Send the color table being edited directly, so the ramp file doesn't need to be saved
+        rows, nv = None, None
+        color_config = getattr(self.settings, "data_mgr", None)
+        if isinstance(color_config, ColorConfig):
+            rows, nv = color_config._data, relief_engine.parse_nv_line(color_config.misc_lines)
+
+        return {
+            "base": base, "config_path": self.main.proj_config.file_path,
+            "dem_path": str(dem_path), "ramp_path": project.color_file_path, "rows": rows,
+            "nv": nv
+        }
+
     def make_clean(self):
         self.set_buttons_ready(False)
         self.make_handler.make_clean([self.main.project.get_layer()])
 
-    def on_make_done(self, name, exit_code):
+    def on_make_done(self, name, exit_code, job_id=0):
+        # Jobs are named by tab, and a tab runs one job at a time
         if name == self.tab_name:
             self.set_buttons_ready(True)
+            self.show_status()
+            if self.progress_bar:
+                self.progress_bar.setVisible(False)
 
             if exit_code == 0:
                 # Only display "Done" if this wasn't a dry run
@@ -220,6 +522,7 @@ class PreviewWidget(TabPage):
                     self.output(msg)
 
                 # Display image
+                self.show_full_image()
                 if self.image_label:
                     # Load the image into the label
                     image_loaded = self.image.load_image()
@@ -259,6 +562,8 @@ class PreviewWidget(TabPage):
         )
         if self.cancel_for_out_of_date("Publish", target):
             return
+        if self.cancel_for_not_cog(image_path):
+            return
 
         target_path = destination_folder / Path(image_path).name
         try:
@@ -270,9 +575,12 @@ class PreviewWidget(TabPage):
 
     def on_cancel_button(self):
         """
-        Cancel the make process.
+        Cancel the make process or the build of all layers.
         """
-        self.make_handler.make_process.cancel()
+        if self.scheduler:
+            self.scheduler.cancel()
+        else:
+            self.make_handler.make_process.cancel(job_name=self.tab_name)
 
     def set_buttons_ready(self, ready):
         """
@@ -319,6 +627,28 @@ class PreviewWidget(TabPage):
                 return True
         return False
 
+    def cancel_for_not_cog(self, image_path):
+        """
+        Displays a confirmation dialog if the COG setting covers the image but it isn't a
+        Cloud-Optimized GeoTIFF, e.g. it was built before the setting was changed.
+
+        Args:
+            image_path (str): The image to publish.
+        Returns:
+            bool: True if they cancel, False to proceed.
+        """
+        if (self.preview_mode or self.image.get_image_base() not in cog_images(
+                self.main.proj_config) or is_cog(image_path)):
+            return False
+        msg_box = QMessageBox(self)
+        msg_box.setWindowTitle("Not Cloud Optimized")
+        msg_box.setText("Image is not a Cloud-Optimized GeoTIFF.  Clean and Create the image to "
+                        "convert it.  Publish anyway?")
+        msg_box.addButton("Publish", QMessageBox.ButtonRole.AcceptRole)
+        cancel_button = msg_box.addButton("Cancel", QMessageBox.ButtonRole.RejectRole)
+        msg_box.exec()
+        return msg_box.clickedButton() == cancel_button
+
     def resizeEvent(self, event):
         """
         Resize the image when the window is resized
@@ -426,14 +756,32 @@ class PreviewWidget(TabPage):
 
 
 class Image:
-    def __init__(self, main, tab_name, image_label, preview_mode):
-        self._pixmap = None
+    """
+    The image shown in a preview tab.  Images are decoded on a thread pool thread at the size of
+    the label (see ImageLoader), and decoded again with more detail if the label grows.  Resizes
+    show a fast draft and the smooth image is scaled off the GUI thread (see ImageScaler).
+
+    **Methods**:
+        - load_image(zoom): Start loading the target image.
+        - set_image(image): Display an in-memory image.
+        - zoom_image(): Scale the image to the label.
+    """
+
+    def __init__(self, main, tab_name, image_label, preview_mode, on_error=None):
+        self._image = None
         self.zoom_factor = None
         self.main = main
         self.tab_name = tab_name
         self.image_label = image_label
         self.preview_mode = preview_mode
+        self.on_error = on_error
         self._image_file = None
+        self._zoom_after_load = True
+
+        # Size of the image file the pixmap was decoded from. None for in-memory images
+        self.source_size = None
+        self.loader = ImageLoader(self._on_loaded)
+        self.scaler = ImageScaler(self._on_scaled)
 
     @property
     def image_file(self):
@@ -467,56 +815,99 @@ class Image:
 
     def load_image(self, zoom=True):
         """
-        Load and display an image from the given file path.
+        Start loading the target image.  It is decoded on a thread pool thread at the size of the
+        label and displayed when it is ready.
 
         Args:
             zoom (bool): Whether the image should be zoomed.
         Returns:
-            True if image loaded
+            True if the image is being loaded, False if there is no image file
         """
         if not self.image_label:
             return
 
-        # self.image_layer = self.main.project.get_layer()
         file_path = self.construct_image_path()
-        if not file_path:
+        if not file_path or not os.path.exists(file_path):
+            self.loader.cancel()
             self.image_label.clear()  # Clear the image label
             self.image_label.update()  # Update the label to reflect the clear state
+            self._image = None
+            self.scaler.clear()
+            self.zoom_factor = 1
             return False
 
-        # Load the image.  Filter stderr during load for spurious warnings on GeoTiff tags
-        with filter_stderr(r'Unknown field with tag \d+'):
-            self._pixmap = QPixmap(file_path)
+        self.image_file = file_path
+        self._zoom_after_load = zoom
+        self.loader.load(file_path, *self.display_size())
+        return True
 
-        if self._pixmap.width() == 0:
+    def display_size(self):
+        """
+        Return the label size in device pixels, at least the label minimum size.
+        """
+        ratio = self.image_label.devicePixelRatioF()
+        minimum = self.image_label.minimumSize()
+        width = max(self.image_label.width(), minimum.width())
+        height = max(self.image_label.height(), minimum.height())
+        return int(width * ratio), int(height * ratio)
+
+    def _on_loaded(self, path, image, source_size):
+        if not self.image_label:
+            return
+        if image is None or image.isNull():
             # Can't load image
             self.image_label.clear()  # Clear the image label
             self.image_label.update()  # Update the display
+            self._image = None
+            self.scaler.clear()
             self.zoom_factor = 1
-            return False
-        if zoom:
+            if self.on_error:
+                self.on_error(f"Error: cannot load {path} ❌")
+            return
+
+        self._image = image
+        self.scaler.set_image(image)
+        self.source_size = source_size
+        if self._zoom_after_load:
             # Use a single-shot timer to defer zoom until geometry is set
             QTimer.singleShot(0, self.zoom_image)
         else:
             # todo self.use_error_layout(False)
-            self.image_label.setPixmap(self._pixmap)
+            self.image_label.setPixmap(QPixmap.fromImage(image))
             self.image_label.update()
 
-        return True
+    def set_image(self, image):
+        """
+        Display an in-memory image instead of loading the target file.
+
+        Args:
+            image (QImage): The image to display.
+        """
+        if not self.image_label:
+            return
+        # A file load in progress would replace this image
+        self.loader.cancel()
+        self.source_size = None
+        self._image = image
+        self.scaler.set_image(image)
+
+        # Use a single-shot timer to defer zoom until geometry is set
+        QTimer.singleShot(0, self.zoom_image)
 
     def zoom_image(self):
         """
-        Update the displayed image according to the current zoom factor.
+        Update the displayed image according to the current zoom factor.  A fast draft is shown
+        at once and replaced by a smooth image when resizing stops.
         """
-        if not self._pixmap:
+        if not self._image:
             return
 
         label_width = self.image_label.width()
         label_height = self.image_label.height()
 
-        # Get dimensions of the pixmap and the image label
-        image_width = self._pixmap.width()
-        image_height = self._pixmap.height()
+        # Get dimensions of the image and the image label
+        image_width = self._image.width()
+        image_height = self._image.height()
         if image_width == 0:
             return
 
@@ -526,36 +917,34 @@ class Image:
 
         # Use the smaller of the two scaling factors to fit the image
         self.zoom_factor = min(width_factor, height_factor)
-        scaled_pixmap = self._pixmap.scaled(
-            int(self._pixmap.width() * self.zoom_factor),
-            int(self._pixmap.height() * self.zoom_factor), Qt.AspectRatioMode.KeepAspectRatio
-        )
-        self.image_label.setPixmap(scaled_pixmap)
+        width = max(1, int(image_width * self.zoom_factor))
+        height = max(1, int(image_height * self.zoom_factor))
+        self.image_label.setPixmap(self.scaler.draft(width, height))
+        self.scaler.request(width, height)
+
+        # Decode the file again with more detail if the label has grown past the decoded image
+        enlarged = self.zoom_factor * self.image_label.devicePixelRatioF() > RELOAD_ZOOM
+        if (enlarged and self.source_size and image_width < self.source_size[0] and
+                not self.loader.loading):
+            self.load_image(zoom=True)
+
+    def _on_scaled(self, pixmap):
+        if self.image_label and self._image:
+            self.image_label.setPixmap(pixmap)
 
 
-@contextmanager
-def filter_stderr(pattern):
+def is_newer(target, sources):
     """
-    Context manager to suppress specific warnings in stderr.
+    Check that target exists and is at least as new as each existing source file.
 
     Args:
-        pattern (str): Suppress messages containing this regular expression.
-    """
-    # Save the original stderr file descriptor
-    original_stderr_fd = os.dup(sys.stderr.fileno())
+        target (Path): The target file.
+        sources (list of Path): The files the target is built from.
 
-    # Create a temporary file to capture stderr
-    with tempfile.TemporaryFile(mode='w+') as temp_stderr:
-        # Redirect stderr to the temporary file
-        os.dup2(temp_stderr.fileno(), sys.stderr.fileno())
-        try:
-            yield
-        finally:
-            # Flush and restore stderr
-            os.dup2(original_stderr_fd, sys.stderr.fileno())
-            os.close(original_stderr_fd)
-            # Process the temporary file for filtering
-            temp_stderr.seek(0)
-            for line in temp_stderr:
-                if not re.search(pattern, line):
-                    sys.stderr.write(line)
+    Returns:
+        bool: True if the target is current.
+    """
+    if not target.exists():
+        return False
+    target_time = target.stat().st_mtime
+    return all(target_time >= source.stat().st_mtime for source in sources if source.exists())
@@ -30,8 +30,9 @@ from pathlib import Path
 
 from appdirs import user_config_dir
 from YMLEditor.data_manager import DataManager
+from YMLEditor.yaml_config import YamlConfig
 
-from ColorReliefEditor import resources
+from ColorReliefEditor import config_env, relief_engine, resources
 from ColorReliefEditor.recent_files import RecentFiles
 
 
@@ -128,8 +129,25 @@ class ProjectConfig(DataManager):
             if not os.path.exists(rel_path):
                 os.mkdir(rel_path)
             self.dem_directory = os.path.join(os.path.dirname(config_path), dem_folder)
+            if upgrade_hillshade_tone(self.main.proj_config, self.get_proxy_path("hillshade")):
+                self.main.warn("Hillshades will be rebuilt: brightness is now applied when the "
+                               "hillshade is merged")
+            self.main.stale_monitor.set_project(config_path)
+            self.warmup_render_worker()
             return True
 
+    def warmup_render_worker(self):
+        """
+        Start the preview render worker and preload this project (only when ENGINE is numpy).
+        """
+        if self.main.proj_config.get("ENGINE") != "numpy" or relief_engine.gdal is None:
+            return
+        layer = self.get_layer()
+        dem_path = os.path.join(
+            self.project_directory, self.get_target_image_name("DEM", False, layer)
+        )
+        self.main.render_client.warmup(self.main.proj_config.file_path, dem_path)
+
     def print_project_files(self, config_path):
         """
         Print project file paths.
@@ -275,6 +293,49 @@ class ProjectConfig(DataManager):
         return True, None
 
 
+class ProjectSettings(YamlConfig):
+    """
+    Project settings (<region>_relief.cfg).  Extends YamlConfig to delete the color_relief.sh
+    config cache (see config_env) whenever the settings are saved.
+
+    **Methods**:
+    """
+
+    def save(self):
+        """
+        Save the settings if modified and invalidate the color_relief.sh config cache.
+
+        Returns:
+            bool: True if the file was saved.
+        """
+        saved = super().save()
+        if saved:
+            config_env.invalidate(self.file_path)
+        return saved
+
+
+def upgrade_hillshade_tone(settings, hillshade_trigger):
+    """
+    Upgrade a project created before BRIGHTNESS moved from the hillshade to the merge.  Its
+    hillshades have the brightness built in, so the merge would apply it again.  Touch the
+    hillshade trigger so they are rebuilt, and add HILLSHADE_GAMMA so this only happens once.
+    A legacy GAMMA setting was never used and is left alone.
+
+    Args:
+        settings (ProjectSettings): Loaded project settings.
+        hillshade_trigger (str): Path to the hillshade trigger file.
+
+    Returns:
+        bool: True if the project was upgraded.
+    """
+    if settings.get("HILLSHADE_GAMMA") is not None:
+        return False
+    settings.set("HILLSHADE_GAMMA", "1.0")
+    settings.save()
+    touch_file(hillshade_trigger)
+    return True
+
+
 def app_files_path(filename):
     """
     Determine the platform-appropriate path for app files.
@@ -0,0 +1,1687 @@
+#  Copyright (c) 2024.
+#   Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the “Software”), to deal in the
+#   Software without restriction,
+#   including without limitation the rights to use, copy, modify, merge, publish, distribute,
+#   sublicense, and/or sell copies
+#   of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+#   the following conditions:
+#  #
+#   The above copyright notice and this permission notice shall be included in all copies or
+#   substantial portions of the Software.
+#  #
+#   THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+#   BUT NOT LIMITED TO THE
+#   WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO
+#   EVENT SHALL THE AUTHORS OR
+#   COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+#   CONTRACT, TORT OR
+#   OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#   DEALINGS IN THE SOFTWARE.
+#  #
+#   This uses QT for some components which has the primary open-source license is the GNU Lesser
+#   General Public License v. 3 (“LGPL”).
+#   With the LGPL license option, you can use the essential libraries and some add-on libraries
+#   of Qt.
+#   See https://www.qt.io/licensing/open-source-lgpl-obligations for QT details.
+
+#
+#
+"""
+In-process raster engine for color relief images.
+
+This is a NumPy replacement for `gdaldem color-relief`, `gdaldem hillshade` and the
+`gdal_calc.py` merge.  The color ramp is interpolated with vectorized `searchsorted` lookups
+and the DEM is processed in blocks, so the full DEM never needs to fit in memory.  Results
+match gdaldem for the same ramp, including the `-exact_color_entry` and `-nearest_color_entry`
+modes, `nv` (no data) entries, and alpha.
+
+The fused relief pipeline streams DEM blocks (with a 1 pixel halo for the hillshade) through
+color mapping, hillshade, brightness and the MERGE_CALC expression in memory and only writes
+the final relief. The color and hillshade images are only written if requested.
+
+GDAL Python bindings (osgeo.gdal) are needed to read and write GeoTIFF files. The array
+functions work without them.
+
+Full-resolution images can be rendered on multiple cores with --workers (see tile_scheduler).
+
+Command line usage:
+    relief_engine color-relief [--flags=FLAGS] DEM RAMP TARGET
+    relief_engine hillshade [--flags=FLAGS] [--brightness=VAL] DEM TARGET
+    relief_engine merge [--calc=EXPR] COLOR HILLSHADE TARGET
+    relief_engine relief [--color_flags=FLAGS] [--hillshade_flags=FLAGS]
+                  [--brightness=VAL] [--calc=EXPR] [--color=FILE] [--hillshade=FILE]
+                  DEM RAMP TARGET
+    Common options: [-q] [--compress=FLAGS] [--block_size=N] [--workers=N]
+"""
+import argparse
+import ast
+import math
+import re
+import sys
+
+import numpy as np
+
+# GDAL Python bindings are optional.  Without them, only the array functions are available
+try:
+    from osgeo import gdal
+except ImportError:
+    gdal = None
+
+from ColorReliefEditor import tile_scheduler
+from ColorReliefEditor.color_config import ColorConfig
+
+# Color selection modes for gdaldem color-relief
+INTERPOLATE = "interpolate"
+EXACT = "exact"
+NEAREST = "nearest"
+
+# Default block size (pixels) for reading the DEM and for output tiles
+BLOCK_SIZE = 512
+
+# Integer DEMs with a value range smaller than this use a precomputed lookup table
+MAX_LUT_SIZE = 1 << 17
+
+# Gradient algorithms for gdaldem hillshade
+HORN = "Horn"
+ZEVENBERGEN_THORNE = "ZevenbergenThorne"
+
+# Default MERGE_CALC expression
+DEFAULT_MERGE_CALC = "numpy.where( (A < 2)  | (A > 254), B, (A / 255.) * B)"
+
+# gdal_calc.py writes this no data value for Byte output
+CALC_NODATA = 255
+
+# Montage previews: most windows, no data pixels between windows, sample pixels per candidate
+# window side, and most candidate windows per DEM side when windows are chosen automatically
+MAX_MONTAGE = 16
+MONTAGE_GUTTER = 4
+MONTAGE_SAMPLE = 8
+MONTAGE_CELLS = 64
+
+
+class ColorRamp:
+    """
+    A GDALDEM color ramp prepared for vectorized lookups.
+
+    The ramp entries are sorted by ascending elevation. If the DEM has a no data value, an entry
+    for it is added with the `nv` color, or transparent black if there is no `nv` line. This
+    mirrors gdaldem, so values between the no data value and the nearest ramp entry are
+    interpolated the same way gdaldem does it.
+
+    Attributes:
+        elevations (numpy.ndarray): float64 ramp elevations, ascending.
+        colors (numpy.ndarray): uint8 array of shape (n, 4) with RGBA for each elevation.
+        mode (str): INTERPOLATE, EXACT, or NEAREST.
+        nan_color (tuple or None): RGBA for NaN values when the no data value is NaN.
+
+    **Methods**:
+    """
+
+    def __init__(self, rows, nodata=None, nv_color=None, mode=INTERPOLATE):
+        """
+        Initialize
+
+        Args:
+            rows (list): Ramp rows of (elevation, r, g, b[, a]). Alpha may be None.
+            nodata (float, optional): The DEM no data value.
+            nv_color (tuple, optional): RGBA from the `nv` line of the color file.
+            mode (str): INTERPOLATE, EXACT, or NEAREST.
+
+        Raises:
+            ValueError: If the ramp is empty or the mode is unknown.
+        """
+        if mode not in (INTERPOLATE, EXACT, NEAREST):
+            raise ValueError(f"Unknown color selection mode: {mode}")
+
+        entries = [(float(row[0]), _rgba(row[1:])) for row in rows]
+        if not entries:
+            raise ValueError("Color ramp is empty")
+
+        self.mode = mode
+        self.nan_color = None
+
+        if nodata is not None:
+            if np.isnan(nodata):
+                self.nan_color = nv_color or (0, 0, 0, 0)
+            else:
+                # gdaldem places the nv entry ahead of the file entries and adds a
+                # transparent entry for the no data value if none was given
+                if nv_color:
+                    entries.insert(0, (float(nodata), nv_color))
+                if not any(elevation == nodata for elevation, _ in entries):
+                    entries.append((float(nodata), (0, 0, 0, 0)))
+
+        # Stable sort keeps the file order for duplicate elevations (as gdaldem does)
+        entries.sort(key=lambda entry: entry[0])
+        self.elevations = np.array([elevation for elevation, _ in entries], dtype=np.float64)
+        self.colors = np.array([color for _, color in entries], dtype=np.uint8)
+
+    @classmethod
+    def from_config(cls, color_config, nodata=None, mode=INTERPOLATE):
+        """
+        Create a ColorRamp directly from a loaded ColorConfig.
+
+        Args:
+            color_config (ColorConfig): The color ramp data manager.
+            nodata (float, optional): The DEM no data value.
+            mode (str): INTERPOLATE, EXACT, or NEAREST.
+
+        Returns:
+            ColorRamp: The prepared ramp.
+        """
+        nv_color = parse_nv_line(color_config.misc_lines)
+        return cls(color_config._data, nodata, nv_color, mode)
+
+    @classmethod
+    def from_file(cls, path, nodata=None, mode=INTERPOLATE):
+        """
+        Load a GDALDEM color text file and create a ColorRamp.
+
+        Args:
+            path (str): Path to the color ramp file.
+            nodata (float, optional): The DEM no data value.
+            mode (str): INTERPOLATE, EXACT, or NEAREST.
+
+        Returns:
+            ColorRamp: The prepared ramp.
+
+        Raises:
+            ValueError: If the color file cannot be loaded.
+        """
+        color_config = ColorConfig()
+        if not color_config.load(path):
+            raise ValueError(color_config.error)
+        return cls.from_config(color_config, nodata, mode)
+
+    def apply(self, values):
+        """
+        Map elevation values to colors.
+
+        Integer DEMs with a small value range are mapped with a lookup table built from
+        the ramp, the same optimization gdaldem uses for Byte and Int16 files.
+
+        Args:
+            values (numpy.ndarray): Elevation values.
+
+        Returns:
+            numpy.ndarray: uint8 array with shape values.shape + (4,) holding RGBA.
+        """
+        values = np.asarray(values)
+        if values.dtype.kind in "iu" and values.size > MAX_LUT_SIZE:
+            low, high = int(values.min()), int(values.max())
+            if high - low < MAX_LUT_SIZE:
+                lut = self._lookup(np.arange(low, high + 1, dtype=np.float64))
+                return lut[values.astype(np.int64) - low]
+        return self._lookup(values.astype(np.float64))
+
+    def changed_range(self, other):
+        """
+        Return the elevation range where this ramp can color pixels differently than another
+        ramp, e.g. after one row of the color table was edited.  Pixels outside the range get
+        the same color from both ramps.
+
+        Args:
+            other (ColorRamp): The ramp to compare with.
+
+        Returns:
+            tuple: (low, high) closed elevation range, unbounded sides are -inf or inf, or None
+            if the ramps are identical.
+        """
+        if (self.mode != other.mode or self.nan_color != other.nan_color or
+                len(self.elevations) != len(other.elevations)):
+            return -np.inf, np.inf
+        changed = np.flatnonzero(
+            (self.elevations != other.elevations) | np.any(self.colors != other.colors, axis=1)
+        )
+        if changed.size == 0:
+            return None
+
+        # A pixel's color only depends on the ramp entries on either side of it
+        first, last = changed[0], changed[-1]
+        low = self.elevations[first - 1] if first > 0 else -np.inf
+        high = self.elevations[last + 1] if last + 1 < len(self.elevations) else np.inf
+        return low, high
+
+    def _lookup(self, values):
+        """
+        Vectorized equivalent of GDALColorReliefGetRGBA.
+
+        Args:
+            values (numpy.ndarray): float64 elevation values.
+
+        Returns:
+            numpy.ndarray: uint8 RGBA array.
+        """
+        elevations, colors = self.elevations, self.colors
+        last = len(elevations) - 1
+
+        # Index of the first ramp entry >= value.  Values outside the ramp use the end entries
+        idx = np.searchsorted(elevations, values, side="left")
+        lower = np.clip(idx - 1, 0, last)
+        upper = np.minimum(idx, last)
+        low_elev = elevations[lower]
+        high_elev = elevations[upper]
+
+        if self.mode == EXACT:
+            # Only exact matches get a color, everything else is transparent black
+            rgba = colors[np.where(high_elev == values, upper, lower)]
+            rgba[(low_elev != values) & (high_elev != values)] = 0
+        elif self.mode == NEAREST:
+            rgba = colors[np.where(values - low_elev < high_elev - values, lower, upper)]
+        else:
+            span = high_elev - low_elev
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = np.where(span > 0, (values - low_elev) / span, 0.0)
+
+            # gdaldem rounds with a 0.45 offset and truncates:
+            #   trunc(0.45 + low_color + ratio * (high_color - low_color))
+            # The color terms are looked up per ramp interval and combined in place
+            intervals = np.arange(last + 2)
+            low_color = colors[np.clip(intervals - 1, 0, last)].astype(np.float64)
+            high_color = colors[np.minimum(intervals, last)].astype(np.float64)
+            rgba = (high_color - low_color)[idx]
+            rgba *= ratio[..., np.newaxis]
+            rgba += (0.45 + low_color)[idx]
+            np.trunc(rgba, out=rgba)
+            rgba = np.clip(rgba, 0, 255, out=rgba).astype(np.uint8)
+
+        if self.nan_color is not None:
+            rgba[np.isnan(values)] = self.nan_color
+        return rgba
+
+
+def _rgba(color):
+    """
+    Return an RGBA tuple for ramp colors. Missing alpha is opaque.
+    """
+    r, g, b = color[0:3]
+    a = color[3] if len(color) > 3 and color[3] is not None else 255
+    return int(r), int(g), int(b), int(a)
+
+
+def parse_nv_line(misc_lines):
+    """
+    Find the `nv` (no data) color in the metadata lines of a color file.
+
+    Args:
+        misc_lines (list of str): Comment and nv lines from ColorConfig.
+
+    Returns:
+        tuple or None: RGBA for no data, or None if there is no valid nv line.
+    """
+    for line in misc_lines:
+        parts = re.split(r'[,\t\s]+', line.strip())
+        if parts[0] == "nv" and len(parts) in (4, 5):
+            try:
+                return _rgba([int(value) for value in parts[1:]])
+            except ValueError:
+                return None
+    return None
+
+
+def parse_color_flags(flags):
+    """
+    Parse gdaldem color-relief switches (COLOR1, COLOR2 config settings).
+
+    Args:
+        flags (str): Switches such as "-alpha -nearest_color_entry".
+
+    Returns:
+        tuple: (mode, alpha) where mode is INTERPOLATE, EXACT, or NEAREST and alpha is True
+        if an alpha band should be written.
+    """
+    tokens = (flags or "").split()
+    mode = INTERPOLATE
+    if "-exact_color_entry" in tokens:
+        mode = EXACT
+    elif "-nearest_color_entry" in tokens:
+        mode = NEAREST
+    return mode, "-alpha" in tokens
+
+
+def check_output_type(flags):
+    """
+    Check the -of switch in gdaldem switches (OUTPUT_TYPE).  relief_engine only writes GeoTIFF.
+
+    Args:
+        flags (str): gdaldem switches such as "-of GTiff -compute_edges".
+
+    Raises:
+        ValueError: If an output format other than GTiff is requested.
+    """
+    tokens = (flags or "").split()
+    for idx, token in enumerate(tokens[:-1]):
+        if token == "-of" and tokens[idx + 1].lower() != "gtiff":
+            raise ValueError(
+                f"ENGINE numpy only writes GeoTIFF. Set OUTPUT_TYPE to blank or -of GTiff "
+                f"instead of -of {tokens[idx + 1]}."
+            )
+
+
+def creation_options(compress="", block_size=BLOCK_SIZE):
+    """
+    Build GeoTIFF creation options for tiled output.
+
+    Args:
+        compress (str): Compression switches, e.g. "-co COMPRESS=JPEG" or "--co=COMPRESS=JPEG".
+        block_size (int): Tile size in pixels.
+
+    Returns:
+        list of str: GDAL creation options.
+    """
+    options = ["TILED=YES", f"BLOCKXSIZE={block_size}", f"BLOCKYSIZE={block_size}",
+               "BIGTIFF=IF_SAFER"]
+    tokens = (compress or "").split()
+    for idx, token in enumerate(tokens):
+        if token in ("-co", "--co") and idx + 1 < len(tokens):
+            options.append(tokens[idx + 1])
+        elif token.startswith("--co="):
+            options.append(token[len("--co="):])
+    return options
+
+
+def iter_windows(x_size, y_size, block_size=BLOCK_SIZE):
+    """
+    Yield block windows covering a raster, in row-major order.
+
+    Args:
+        x_size (int): Raster width.
+        y_size (int): Raster height.
+        block_size (int): Block size in pixels.
+
+    Yields:
+        tuple: (x_offset, y_offset, width, height)
+    """
+    for y_off in range(0, y_size, block_size):
+        for x_off in range(0, x_size, block_size):
+            yield x_off, y_off, min(block_size, x_size - x_off), min(block_size, y_size - y_off)
+
+
+def window_geotransform(geotransform, x_off, y_off):
+    """
+    Return the geotransform of a window that starts at pixel (x_off, y_off).
+    """
+    gt = geotransform
+    return (gt[0] + x_off * gt[1] + y_off * gt[2], gt[1], gt[2],
+            gt[3] + x_off * gt[4] + y_off * gt[5], gt[4], gt[5])
+
+
+def preview_window(x_size, y_size, size=None, x_shift=None, y_shift=None):
+    """
+    Return the preview section of a DEM.  Matches create_preview_dem in color_relief.sh.
+
+    Args:
+        x_size (int): DEM width.
+        y_size (int): DEM height.
+        size (str or int, optional): PREVIEW setting, the preview size in pixels. Blank or 0
+            is 1000.
+        x_shift (str or float, optional): X_SHIFT setting. 0 is left, 0.5 is middle, 1 is right.
+        y_shift (str or float, optional): Y_SHIFT setting. 0 is top, 0.5 is middle, 1 is bottom.
+
+    Returns:
+        tuple: (x_offset, y_offset, width, height)
+
+    Raises:
+        ValueError: If a setting is invalid or the preview is larger than the DEM.
+    """
+    try:
+        size = int(str(size).strip() or 0) if size is not None else 0
+        x_shift = float(str(x_shift).strip() or 0) if x_shift is not None else 0.0
+        y_shift = float(str(y_shift).strip() or 0) if y_shift is not None else 0.0
+    except ValueError:
+        raise ValueError("PREVIEW, X_SHIFT and Y_SHIFT must be numbers.")
+    if not (0 <= x_shift <= 1 and 0 <= y_shift <= 1):
+        raise ValueError("x_shift and y_shift must be >=0  and <= 1.")
+    size = size or 1000
+    if x_size <= size or y_size <= size:
+        raise ValueError("Preview size exceeds image dimensions.")
+    return round((x_size - size) * x_shift), round((y_size - size) * y_shift), size, size
+
+
+def read_preview(dem_path, size=None, x_shift=None, y_shift=None, montage=None):
+    """
+    Read the preview section of a DEM into memory instead of writing a preview DEM file.
+
+    Args:
+        dem_path (str): Path to the full DEM.
+        size, x_shift, y_shift: PREVIEW, X_SHIFT, and Y_SHIFT settings (see preview_window).
+        montage (str, optional): MONTAGE setting (see parse_montage).  If set, X_SHIFT and
+            Y_SHIFT are ignored and the result is from read_montage.
+
+    Returns:
+        tuple: (values, geotransform, nodata, window).  geotransform is for the window.
+
+    Raises:
+        RuntimeError: If GDAL is unavailable or the DEM cannot be read.
+        ValueError: If the preview settings are invalid.
+    """
+    windows = parse_montage(montage)
+    if windows is not None:
+        return read_montage(dem_path, size, windows)
+    dataset, band, nodata = open_dem(dem_path)
+    window = preview_window(dataset.RasterXSize, dataset.RasterYSize, size, x_shift, y_shift)
+    values = band.ReadAsArray(*window)
+    geotransform = window_geotransform(dataset.GetGeoTransform(), window[0], window[1])
+    return values, geotransform, nodata, window
+
+
+def parse_montage(value):
+    """
+    Parse the MONTAGE setting.
+
+    Args:
+        value (str): Blank or off for a single preview section.  A number of windows to choose
+            from elevation quantiles, or X_SHIFT,Y_SHIFT pairs separated by spaces, e.g.
+            "0.1,0.9 0.5,0.5 0.8,0.2".
+
+    Returns:
+        int, list, or None: Number of windows, list of (x_shift, y_shift), or None for off.
+
+    Raises:
+        ValueError: If the setting is invalid.
+    """
+    text = str(value if value is not None else "").strip()
+    if text.lower() in ("", "off"):
+        return None
+    if isinstance(value, (int, list)):
+        windows = value
+    elif text.isdigit():
+        windows = int(text)
+    else:
+        try:
+            windows = [tuple(float(v) for v in pair.split(",")) for pair in text.split()]
+        except ValueError:
+            windows = []
+        if not all(len(pair) == 2 and 0 <= min(pair) and max(pair) <= 1 for pair in windows):
+            raise ValueError(
+                "MONTAGE must be off, a number of windows, or X_SHIFT,Y_SHIFT pairs from 0 to 1."
+            )
+    count = windows if isinstance(windows, int) else len(windows)
+    if not 1 <= count <= MAX_MONTAGE:
+        raise ValueError(f"MONTAGE must have 1 to {MAX_MONTAGE} windows.")
+    return windows
+
+
+def montage_shape(count, tile):
+    """
+    Return the layout of a montage of count square windows with tile pixel sides.
+
+    Returns:
+        tuple: ((height, width), offsets).  offsets is a list of (y, x) for each window in
+        reading order.  Windows are separated by MONTAGE_GUTTER pixels.
+    """
+    cols = math.ceil(math.sqrt(count))
+    rows = math.ceil(count / cols)
+    step = tile + MONTAGE_GUTTER
+    offsets = [(i // cols * step, i % cols * step) for i in range(count)]
+    return (rows * step - MONTAGE_GUTTER, cols * step - MONTAGE_GUTTER), offsets
+
+
+def montage_windows(x_size, y_size, size, windows, read_sample=None, nodata=None):
+    """
+    Return the DEM windows for a montage.  The windows share the PREVIEW size, so a montage
+    renders about as many pixels as a single preview section.
+
+    Args:
+        x_size (int): DEM width.
+        y_size (int): DEM height.
+        size (str or int): PREVIEW setting.  Blank or 0 is 1000.
+        windows (int or list): Result of parse_montage.
+        read_sample (callable, optional): read_sample(window, width, height) returns the DEM
+            window (x_offset, y_offset, width, height) resampled to width x height.  Required
+            when windows is a number.
+        nodata (float, optional): DEM no data value.
+
+    Returns:
+        list: (x_offset, y_offset, width, height) for each window.  Windows chosen from
+        elevation quantiles are ordered from lowest to highest.
+
+    Raises:
+        ValueError: If the DEM is too small or has too little data for the montage.
+    """
+    try:
+        size = int(str(size).strip() or 0) if size is not None else 0
+    except ValueError:
+        raise ValueError("PREVIEW must be a number.")
+    count = windows if isinstance(windows, int) else len(windows)
+    cols = math.ceil(math.sqrt(count))
+    tile = ((size or 1000) - (cols - 1) * MONTAGE_GUTTER) // cols
+    if not isinstance(windows, int):
+        return [preview_window(x_size, y_size, tile, x, y) for x, y in windows]
+
+    # Rank candidate windows on a grid by their mean elevation in a decimated sample and pick
+    # the windows at evenly spaced quantiles
+    stride = max(tile, -(-max(x_size, y_size) // MONTAGE_CELLS))
+    cells_x, cells_y = x_size // stride, y_size // stride
+    if cells_x * cells_y < count:
+        raise ValueError(f"The DEM is too small for a montage of {count} windows.")
+    sample = np.array(read_sample(
+        (0, 0, cells_x * stride, cells_y * stride), cells_x * MONTAGE_SAMPLE,
+        cells_y * MONTAGE_SAMPLE
+    ), dtype=np.float64)
+    if nodata is not None:
+        sample[sample == nodata] = np.nan
+    cells = sample.reshape(cells_y, MONTAGE_SAMPLE, cells_x, MONTAGE_SAMPLE).swapaxes(1, 2)
+    cells = cells.reshape(cells_y * cells_x, MONTAGE_SAMPLE * MONTAGE_SAMPLE)
+    valid = np.isfinite(cells)
+    candidates = np.flatnonzero(valid.mean(axis=1) >= 0.5)
+    if candidates.size < count:
+        raise ValueError(f"The DEM has too little elevation data for a montage of {count} "
+                         f"windows.")
+    means = np.where(valid, cells, 0).sum(axis=1)[candidates] / valid.sum(axis=1)[candidates]
+    ranked = candidates[np.argsort(means, kind="stable")]
+    picks = ranked[((np.arange(count) + 0.5) * ranked.size / count).astype(int)]
+    margin = (stride - tile) // 2
+    return [(int(cell % cells_x) * stride + margin, int(cell // cells_x) * stride + margin,
+             tile, tile) for cell in picks]
+
+
+def tile_montage(blocks, nodata=None):
+    """
+    Tile equal size square DEM windows into one array separated by no data pixels.
+
+    Args:
+        blocks (list): 2D arrays for the windows.
+        nodata (float, optional): DEM no data value.  If None, the lowest value of the DEM
+            type is used.
+
+    Returns:
+        tuple: (values, nodata)
+    """
+    tile = blocks[0].shape[0]
+    shape, offsets = montage_shape(len(blocks), tile)
+    dtype = blocks[0].dtype
+    if nodata is None:
+        nodata = np.iinfo(dtype).min if dtype.kind in "iu" else float(np.finfo(dtype).min)
+    values = np.full(shape, nodata, dtype=dtype)
+    for block, (y, x) in zip(blocks, offsets):
+        values[y:y + tile, x:x + tile] = block
+    return values, nodata
+
+
+def read_montage(dem_path, size=None, windows=None):
+    """
+    Read the montage windows of a DEM with one open and tile them into one array.
+
+    Args:
+        dem_path (str): Path to the full DEM.
+        size (str or int, optional): PREVIEW setting, the montage size in pixels.
+        windows (int or list): Result of parse_montage.
+
+    Returns:
+        tuple: (values, geotransform, nodata, windows).  geotransform is for the first window
+        and gives the pixel size.  windows is a list of DEM windows in montage order.
+
+    Raises:
+        RuntimeError: If GDAL is unavailable or the DEM cannot be read.
+        ValueError: If the montage settings are invalid.
+    """
+    dataset, band, nodata = open_dem(dem_path)
+    windows = montage_windows(
+        dataset.RasterXSize, dataset.RasterYSize, size, windows,
+        lambda window, width, height: band.ReadAsArray(
+            *window, buf_xsize=width, buf_ysize=height
+        ), nodata
+    )
+    values, nodata = tile_montage([band.ReadAsArray(*window) for window in windows], nodata)
+    geotransform = window_geotransform(dataset.GetGeoTransform(), *windows[0][:2])
+    return values, geotransform, nodata, windows
+
+
+def require_gdal():
+    """
+    Raise RuntimeError if the GDAL Python bindings are not installed.
+    """
+    if gdal is None:
+        raise RuntimeError("GDAL Python bindings (osgeo.gdal) are not installed")
+
+
+def open_dem(dem_path):
+    """
+    Open a DEM file for reading.
+
+    Args:
+        dem_path (str): Path to the DEM.
+
+    Returns:
+        tuple: (dataset, band, nodata)
+
+    Raises:
+        RuntimeError: If GDAL is unavailable or the file cannot be opened.
+    """
+    require_gdal()
+    dataset = gdal.Open(dem_path)
+    if dataset is None:
+        raise RuntimeError(f"Unable to open DEM: {dem_path}")
+    band = dataset.GetRasterBand(1)
+    return dataset, band, band.GetNoDataValue()
+
+
+def create_output(target, source, band_count, options, window=None):
+    """
+    Create a Byte GeoTIFF with the size and georeferencing of the source.
+
+    Args:
+        target (str): Output file path.
+        source (gdal.Dataset): Dataset to copy size and georeferencing from.
+        band_count (int): 1 for grayscale, 3 for RGB, 4 for RGBA.
+        options (list of str): GDAL creation options.
+        window (tuple, optional): (x_offset, y_offset, width, height) of the source to cover.
+            Defaults to the whole source.
+
+    Returns:
+        gdal.Dataset: The new dataset.
+    """
+    if window is None:
+        window = (0, 0, source.RasterXSize, source.RasterYSize)
+    x_off, y_off, width, height = window
+    driver = gdal.GetDriverByName("GTiff")
+    output = driver.Create(target, width, height, band_count, gdal.GDT_Byte, options)
+    if output is None:
+        raise RuntimeError(f"Unable to create {target}")
+    output.SetGeoTransform(window_geotransform(source.GetGeoTransform(), x_off, y_off))
+    output.SetProjection(source.GetProjection())
+    if band_count >= 3:
+        interpretations = [gdal.GCI_RedBand, gdal.GCI_GreenBand, gdal.GCI_BlueBand,
+                           gdal.GCI_AlphaBand]
+        for idx in range(band_count):
+            output.GetRasterBand(idx + 1).SetColorInterpretation(interpretations[idx])
+    return output
+
+
+def write_bands(output, pixels, x_off, y_off):
+    """
+    Write a block of pixels to every band of the output.
+
+    Args:
+        output (gdal.Dataset): Output dataset.
+        pixels (numpy.ndarray): Array of shape (rows, cols) or (rows, cols, bands).
+        x_off (int): Column offset of the block.
+        y_off (int): Row offset of the block.
+    """
+    if pixels.ndim == 2:
+        output.GetRasterBand(1).WriteArray(pixels, x_off, y_off)
+        return
+    for idx in range(output.RasterCount):
+        output.GetRasterBand(idx + 1).WriteArray(pixels[..., idx], x_off, y_off)
+
+
+class BlockJob:
+    """
+    Base class for work done on one block of a raster by tile_scheduler.run_blocks.
+    Input files are opened lazily so that jobs can be sent to worker processes.
+
+    Attributes:
+        halo (int): Pixels of neighboring data read around each block.
+
+    **Methods**:
+    """
+    halo = 0
+
+    def __init__(self, dem_path):
+        self.dem_path = dem_path
+        self._dataset = None
+        self._band = None
+
+    def __getstate__(self):
+        # GDAL datasets can't be pickled. Each worker process opens its own
+        state = dict(self.__dict__)
+        state["_dataset"] = state["_band"] = None
+        return state
+
+    def read(self, window):
+        """
+        Read a DEM block and its halo.
+
+        Returns:
+            tuple: (values, edges) as returned by read_block.
+        """
+        if self._band is None:
+            self._dataset, self._band, _ = open_dem(self.dem_path)
+        return read_block(
+            self._band, window, self._dataset.RasterXSize, self._dataset.RasterYSize, self.halo
+        )
+
+    def process(self, window):
+        """
+        Process one block.
+
+        Args:
+            window (tuple): (x_offset, y_offset, width, height).
+
+        Returns:
+            tuple: One array for each output.
+        """
+        raise NotImplementedError
+
+
+class ColorReliefJob(BlockJob):
+    """
+    Color relief for a block.  Output: (color,).
+    """
+
+    def __init__(self, dem_path, ramp, band_count):
+        super().__init__(dem_path)
+        self.ramp = ramp
+        self.band_count = band_count
+
+    def process(self, window):
+        values, _ = self.read(window)
+        return (self.ramp.apply(values)[..., :self.band_count],)
+
+
+def render_blocks(job, source, outputs, block_size=BLOCK_SIZE, workers=1, progress=None):
+    """
+    Run a block job over a raster and write each result to its output.
+
+    Args:
+        job (BlockJob): The job. process() returns one array per output.
+        source (gdal.Dataset): Dataset that defines the raster size.
+        outputs (list): Output dataset for each job result, or None to discard that result.
+        block_size (int): Block size in pixels.
+        workers (int): Number of worker processes.
+        progress (callable, optional): Called with the completed fraction (0.0 - 1.0).
+    """
+    windows = list(iter_windows(source.RasterXSize, source.RasterYSize, block_size))
+    completed = 0
+
+    def on_result(window, results):
+        nonlocal completed
+        for output, pixels in zip(outputs, results):
+            if output is not None:
+                write_bands(output, pixels, window[0], window[1])
+        completed += 1
+        if progress:
+            progress(completed / len(windows))
+
+    tile_scheduler.run_blocks(job, windows, workers, on_result)
+    for output in outputs:
+        if output is not None:
+            output.FlushCache()
+
+
+def create_color_relief(
+        dem_path, ramp_path, target, color_flags="", compress="", block_size=BLOCK_SIZE,
+        progress=None, workers=1
+):
+    """
+    Create a tiled color relief GeoTIFF from a DEM. Equivalent to gdaldem color-relief.
+
+    Args:
+        dem_path (str): Path to the DEM.
+        ramp_path (str): Path to the GDALDEM color ramp file.
+        target (str): Output file path.
+        color_flags (str): gdaldem switches (OUTPUT_TYPE, EDGE, COLOR1, COLOR2).  EDGE has no
+            effect on a color relief, as with gdaldem.
+        compress (str): Compression switches (COMPRESS).
+        block_size (int): Block size in pixels for reading and for output tiles.
+        progress (callable, optional): Called with the completed fraction (0.0 - 1.0).
+        workers (int): Number of worker processes (WORKERS).
+
+    Raises:
+        RuntimeError: If GDAL is unavailable or a file cannot be opened or created.
+        ValueError: If the color ramp is invalid or OUTPUT_TYPE isn't GTiff.
+    """
+    check_output_type(color_flags)
+    source, _, nodata = open_dem(dem_path)
+    mode, alpha = parse_color_flags(color_flags)
+    ramp = ColorRamp.from_file(ramp_path, nodata, mode)
+
+    band_count = 4 if alpha else 3
+    output = create_output(target, source, band_count, creation_options(compress, block_size))
+    render_blocks(
+        ColorReliefJob(dem_path, ramp, band_count), source, [output], block_size, workers,
+        progress
+    )
+
+
+class HillshadeOptions:
+    """
+    gdaldem hillshade settings parsed from the HILLSHADE1-4 and EDGE switches.
+
+    Attributes:
+        alg (str): HORN or ZEVENBERGEN_THORNE.
+        shading (str): "standard", "combined", "multidirectional" or "igor".
+        z (float): Vertical exaggeration (-z).
+        scale (float): Ratio of vertical units to horizontal units (-s).
+        azimuth (float): Azimuth of the light in degrees (-az).
+        altitude (float): Altitude of the light in degrees (-alt).
+        compute_edges (bool): Compute values at raster edges and next to no data (-compute_edges).
+    """
+
+    def __init__(self):
+        self.alg = HORN
+        self.shading = "standard"
+        self.z = 1.0
+        self.scale = 1.0
+        self.azimuth = 315.0
+        self.altitude = 45.0
+        self.compute_edges = False
+
+    @classmethod
+    def from_flags(cls, flags):
+        """
+        Parse gdaldem hillshade switches. Unrecognized switches are ignored.
+
+        Args:
+            flags (str): Switches such as "-igor -z 3 -compute_edges".
+
+        Returns:
+            HillshadeOptions: The parsed options.
+
+        Raises:
+            ValueError: If a numeric switch has an invalid value.
+        """
+        options = cls()
+        tokens = (flags or "").split()
+        numeric = {"-z": "z", "-s": "scale", "-scale": "scale", "-az": "azimuth",
+                   "-alt": "altitude"}
+        idx = 0
+        while idx < len(tokens):
+            token = tokens[idx]
+            if token in numeric and idx + 1 < len(tokens):
+                try:
+                    setattr(options, numeric[token], float(tokens[idx + 1]))
+                except ValueError:
+                    raise ValueError(f"Invalid value for {token}: {tokens[idx + 1]}")
+                idx += 1
+            elif token == "-alg" and idx + 1 < len(tokens):
+                options.alg = ZEVENBERGEN_THORNE if tokens[idx + 1] == ZEVENBERGEN_THORNE else HORN
+                idx += 1
+            elif token in ("-combined", "-multidirectional", "-igor"):
+                options.shading = token[1:]
+            elif token == "-compute_edges":
+                options.compute_edges = True
+            idx += 1
+        return options
+
+
+def _interpol(a, b):
+    """
+    Extrapolate a value past the raster edge as gdaldem does: 2a - b.  NaN (no data) propagates.
+    """
+    return 2 * a - b
+
+
+def _pad_edges(values, edges, compute_edges):
+    """
+    Add a one pixel border on the sides of a block that are raster edges.
+
+    Args:
+        values (numpy.ndarray): float64 block with a halo on the sides that are not raster edges.
+        edges (tuple): (top, bottom, left, right) True where that side is a raster edge.
+        compute_edges (bool): Extrapolate the border, otherwise fill it with NaN (no data).
+
+    Returns:
+        numpy.ndarray: The block with a one pixel border on every side.
+    """
+    top, bottom, left, right = edges
+    if left:
+        col = _interpol(values[:, 0], values[:, 1]) if compute_edges and values.shape[1] > 1 \
+            else np.full(values.shape[0], np.nan)
+        values = np.column_stack([col, values])
+    if right:
+        col = _interpol(values[:, -1], values[:, -2]) if compute_edges and values.shape[1] > 1 \
+            else np.full(values.shape[0], np.nan)
+        values = np.column_stack([values, col])
+    if top:
+        row = _interpol(values[0], values[1]) if compute_edges and values.shape[0] > 1 \
+            else np.full(values.shape[1], np.nan)
+        values = np.vstack([row, values])
+    if bottom:
+        row = _interpol(values[-1], values[-2]) if compute_edges and values.shape[0] > 1 \
+            else np.full(values.shape[1], np.nan)
+        values = np.vstack([values, row])
+    return values
+
+
+def _shade(padded, options, geotransform):
+    """
+    Compute hillshade values (1.0 - 255.0) for the interior of a padded block.
+
+    Args:
+        padded (numpy.ndarray): float64 block with a one pixel border. NaN is no data.
+        options (HillshadeOptions): Hillshade settings.
+        geotransform (tuple): GDAL geotransform of the DEM.
+
+    Returns:
+        tuple: (shade, invalid) float64 shade values and a mask of no data output pixels.
+    """
+    rows, cols = padded.shape[0] - 2, padded.shape[1] - 2
+    win = [padded[r:r + rows, c:c + cols] for r in range(3) for c in range(3)]
+    center = win[4]
+
+    # No data in the center gives no data.  No data neighbors are replaced by the center
+    # with -compute_edges, otherwise they give no data
+    invalid = np.isnan(center)
+    for k in (0, 1, 2, 3, 5, 6, 7, 8):
+        missing = np.isnan(win[k])
+        if missing.any():
+            if options.compute_edges:
+                win[k] = np.where(missing, center, win[k])
+            else:
+                invalid |= missing
+
+    a, b, c, d, e, f, g, h, i = win
+    inv_ewres = 1.0 / (geotransform[1] * options.scale)
+    inv_nsres = 1.0 / (geotransform[5] * options.scale)
+    if options.alg == ZEVENBERGEN_THORNE:
+        x = (d - f) * inv_ewres
+        y = (h - b) * inv_nsres
+        z_scaled = options.z / 2
+    else:
+        x = ((a + d + d + g) - (c + f + f + i)) * inv_ewres
+        y = ((g + h + h + i) - (a + b + b + c)) * inv_nsres
+        z_scaled = options.z / 8
+
+    alt = math.radians(options.altitude)
+    az = math.radians(options.azimuth)
+    sin_alt = math.sin(alt)
+    cos_alt_z = math.cos(alt) * z_scaled
+    xx_plus_yy = x * x + y * y
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if options.shading == "igor":
+            slope = np.degrees(np.arctan(np.sqrt(xx_plus_yy) * z_scaled))
+            if options.alg == ZEVENBERGEN_THORNE:
+                aspect = np.arctan2(h - b, -(f - d))
+            else:
+                aspect = np.arctan2((g + h + h + i) - (a + b + b + c),
+                                    -((c + f + f + i) - (a + d + d + g)))
+            diff = np.fmod(np.abs(aspect - (math.pi * 3 / 2 - az)), 2 * math.pi)
+            diff = np.where(diff > math.pi, 2 * math.pi - diff, diff)
+            shade = 255.0 * (1.0 - (slope / 90) * (1 - diff / math.pi))
+        elif options.shading == "multidirectional":
+            sin_alt_127 = 127.0 * sin_alt
+            cos_alt_z_127 = 127.0 * cos_alt_z
+            diag = cos_alt_z_127 / math.sqrt(2)
+            val225 = np.maximum(sin_alt_127 + (x - y) * diag, 0.0)
+            val270 = np.maximum(sin_alt_127 - x * cos_alt_z_127, 0.0)
+            val315 = np.maximum(sin_alt_127 + (x + y) * diag, 0.0)
+            val360 = np.maximum(sin_alt_127 - y * cos_alt_z_127, 0.0)
+            weight225 = 0.5 * xx_plus_yy - x * y
+            weight315 = xx_plus_yy - weight225
+            weighted = (weight225 * val225 + x * x * val270 + weight315 * val315 +
+                        y * y * val360) / xx_plus_yy
+            shade = 1.0 + weighted / np.sqrt(1 + z_scaled * z_scaled * xx_plus_yy)
+            shade = np.where(xx_plus_yy == 0.0, 1.0 + 254.0 * sin_alt, shade)
+        else:
+            slope = z_scaled * z_scaled * xx_plus_yy
+            cang = (sin_alt - (y * math.cos(az) * cos_alt_z - x * math.sin(az) * cos_alt_z)) \
+                / np.sqrt(1 + slope)
+            if options.shading == "combined":
+                cang = np.arccos(np.clip(cang, -1.0, 1.0))
+                cang = 1 - cang * np.arctan(np.sqrt(slope)) / (math.pi / 2) ** 2
+            shade = np.where(cang <= 0.0, 1.0, 1.0 + 254.0 * cang)
+
+    return shade, invalid
+
+
+def hillshade(values, geotransform, options, nodata=None, edges=(True, True, True, True)):
+    """
+    Create a hillshade for a block of a DEM. Equivalent to gdaldem hillshade.
+
+    Args:
+        values (numpy.ndarray): DEM block. Sides that are not raster edges must include a one
+            pixel halo of neighboring DEM values.
+        geotransform (tuple): GDAL geotransform of the DEM.
+        options (HillshadeOptions): Hillshade settings.
+        nodata (float, optional): DEM no data value.
+        edges (tuple): (top, bottom, left, right) True where that side is a raster edge. The
+            default is a complete DEM.
+
+    Returns:
+        numpy.ndarray: uint8 hillshade for the block without the halo.  0 is no data.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if nodata is not None and not np.isnan(nodata):
+        values = np.where(values == nodata, np.nan, values)
+
+    padded = _pad_edges(values, edges, options.compute_edges)
+    shade, invalid = _shade(padded, options, geotransform)
+
+    # On the first and last raster lines gdaldem clamps the neighbor columns at the raster edge
+    # instead of extrapolating them
+    if options.compute_edges and (edges[2] or edges[3]):
+        for row, is_edge in ((0, edges[0]), (-1, edges[1])):
+            if is_edge:
+                lines = padded[0:3].copy() if row == 0 else padded[-3:].copy()
+                if edges[2]:
+                    lines[:, 0] = lines[:, 1]
+                if edges[3]:
+                    lines[:, -1] = lines[:, -2]
+                line_shade, line_invalid = _shade(lines, options, geotransform)
+                shade[row], invalid[row] = line_shade[0], line_invalid[0]
+
+    result = to_byte(shade)
+    result[invalid] = 0
+    return result
+
+
+def to_byte(values):
+    """
+    Convert values to uint8 the way GDAL writes floating point data to a Byte band:
+    round half up and clamp to 0-255.
+
+    Args:
+        values (numpy.ndarray): Values to convert.
+
+    Returns:
+        numpy.ndarray: uint8 values.
+    """
+    values = np.nan_to_num(np.asarray(values, dtype=np.float64), nan=0.0)
+    return np.clip(np.floor(values + 0.5), 0, 255).astype(np.uint8)
+
+
+def tone_lut(brightness=1.0, gamma=1.0):
+    """
+    Create the hillshade tone curve for BRIGHTNESS and HILLSHADE_GAMMA as a 256 entry lookup
+    table: uint8(clip((((A / 255.) ** (1 / gamma)) * brightness) * 255, 1, 254)).
+    No data (0) is preserved.
+
+    Args:
+        brightness (float): Brightness factor. 1 is no change.
+        gamma (float): Gamma. 1 is no change, > 1 brightens mid tones.
+
+    Returns:
+        numpy.ndarray: uint8 lookup table, or None if the tone curve is no change.
+    """
+    brightness = 1.0 if brightness is None else brightness
+    gamma = 1.0 if gamma is None else gamma
+    if brightness == 1 and gamma == 1:
+        return None
+    levels = np.arange(256) / 255.
+    if gamma != 1:
+        levels = levels ** (1 / gamma)
+    lut = np.clip((levels * brightness) * 255, 1, 254).astype(np.uint8)
+    lut[0] = 0
+    return lut
+
+
+def adjust_brightness(shade, brightness, gamma=1.0):
+    """
+    Apply the BRIGHTNESS and HILLSHADE_GAMMA tone curve (see tone_lut) to a hillshade.
+    With gamma 1 this is the color_relief.sh adjust_brightness gdal_calc.py step.
+
+    Args:
+        shade (numpy.ndarray): uint8 hillshade.
+        brightness (float): Brightness factor. 1 is no change.
+        gamma (float): Gamma. 1 is no change.
+
+    Returns:
+        numpy.ndarray: uint8 adjusted hillshade.
+    """
+    lut = tone_lut(brightness, gamma)
+    return shade if lut is None else lut[shade]
+
+
+def tone_expression(expression, brightness=1.0, gamma=1.0):
+    """
+    Return a MERGE_CALC expression with the hillshade tone curve applied to A, so
+    gdal_calc.py can merge a hillshade without a separate brightness pass.
+
+    Args:
+        expression (str): MERGE_CALC expression, with or without "--calc=".
+        brightness (float): Brightness factor. 1 is no change.
+        gamma (float): Gamma. 1 is no change.
+
+    Returns:
+        str: The expression.
+
+    Raises:
+        ValueError: If the expression is not valid Python syntax.
+    """
+    expression = MergeCalc(expression).expression
+    if tone_lut(brightness, gamma) is None:
+        return expression
+
+    # Same operations as tone_lut, so the results are identical
+    levels = "(A / 255.)" if gamma == 1 else f"((A / 255.) ** (1 / {float(gamma)!r}))"
+    tone = ast.parse(
+        f"numpy.where(A == 0, A, numpy.uint8(numpy.clip(({levels} * {float(brightness)!r}) * 255,"
+        f" 1, 254)))",
+        mode="eval"
+    ).body
+
+    class ReplaceA(ast.NodeTransformer):
+        def visit_Name(self, node):
+            return tone if node.id == "A" else node
+
+    return ast.unparse(ReplaceA().visit(ast.parse(expression, mode="eval")))
+
+
+def calc_namespace():
+    """
+    Return the namespace gdal_calc.py expressions are evaluated in (numpy functions).
+    """
+    namespace = {name: getattr(np, name) for name in dir(np) if not name.startswith("_")}
+    namespace.update({"numpy": np, "np": np, "__builtins__": {}})
+    return namespace
+
+
+class MergeCalc:
+    """
+    Evaluates a MERGE_CALC expression for each color band, as
+    `gdal_calc.py -A hillshade -B color --allBands=B --type=Byte` does.
+    A is the hillshade and B is a color band.
+
+    **Methods**:
+    """
+
+    def __init__(self, expression=None):
+        """
+        Args:
+            expression (str, optional): The calc expression, with or without "--calc=".
+
+        Raises:
+            ValueError: If the expression is not valid Python syntax.
+        """
+        expression = (expression or DEFAULT_MERGE_CALC).strip()
+        if expression.startswith("--calc="):
+            expression = expression[len("--calc="):]
+        self.expression = expression.strip().strip('"').strip("'")
+        try:
+            self._code = compile(self.expression, "<MERGE_CALC>", "eval")
+        except SyntaxError as e:
+            raise ValueError(f"Invalid MERGE_CALC expression: {e}")
+        self._namespace = calc_namespace()
+
+    def __getstate__(self):
+        # Compiled code can't be pickled. It is recompiled when unpickled
+        return {"expression": self.expression}
+
+    def __setstate__(self, state):
+        self.__init__(state["expression"])
+
+    def apply(self, shade, color, nodata_mask=None):
+        """
+        Merge a hillshade with a color image.
+
+        Args:
+            shade (numpy.ndarray): uint8 hillshade. 0 is no data.
+            color (numpy.ndarray): uint8 color image of shape (rows, cols, bands).
+            nodata_mask (numpy.ndarray, optional): Hillshade no data pixels. Defaults to
+                shade == 0.
+
+        Returns:
+            numpy.ndarray: uint8 relief with the same shape as color.  Pixels where the
+            hillshade is no data are CALC_NODATA, as gdal_calc.py writes them.
+
+        Raises:
+            ValueError: If the expression fails to evaluate.
+        """
+        relief = np.empty(color.shape, dtype=np.uint8)
+        for band in range(color.shape[-1]):
+            namespace = dict(self._namespace, A=shade, B=color[..., band])
+            try:
+                result = eval(self._code, namespace)
+            except Exception as e:
+                raise ValueError(f"MERGE_CALC error: {e}")
+            relief[..., band] = to_byte(np.broadcast_to(result, shade.shape))
+        relief[shade == 0 if nodata_mask is None else nodata_mask] = CALC_NODATA
+        return relief
+
+
+def relief_block(values, geotransform, ramp, options, brightness, merge_calc, band_count,
+                 nodata=None, edges=(True, True, True, True), gamma=1.0):
+    """
+    Run color relief, hillshade, brightness and merge on one DEM block in memory.
+
+    Args:
+        values (numpy.ndarray): DEM block with a one pixel halo on the sides that are not
+            raster edges.
+        geotransform (tuple): GDAL geotransform of the DEM.
+        ramp (ColorRamp): Color ramp.
+        options (HillshadeOptions): Hillshade settings.
+        brightness (float): Hillshade brightness. 1 is no change.
+        merge_calc (MergeCalc): Merge expression.
+        band_count (int): 3 for RGB or 4 for RGBA color and relief.
+        nodata (float, optional): DEM no data value.
+        edges (tuple): (top, bottom, left, right) True where that side is a raster edge.
+        gamma (float): Hillshade gamma. 1 is no change.
+
+    Returns:
+        tuple: (color, shade, relief) uint8 arrays for the block without the halo.  shade is
+        the hillshade before brightness and gamma, as create_hillshade writes it.
+    """
+    top = 0 if edges[0] else 1
+    left = 0 if edges[2] else 1
+    bottom = values.shape[0] if edges[1] else values.shape[0] - 1
+    right = values.shape[1] if edges[3] else values.shape[1] - 1
+
+    color = ramp.apply(values[top:bottom, left:right])[..., :band_count]
+    shade = hillshade(values, geotransform, options, nodata, edges)
+    toned = adjust_brightness(shade, brightness, gamma)
+    return color, shade, merge_calc.apply(toned, color, shade == 0)
+
+
+def read_block(band, window, x_size, y_size, halo=1):
+    """
+    Read a DEM block plus a halo of neighboring pixels, clipped to the raster.
+
+    Args:
+        band (gdal.Band): DEM band.
+        window (tuple): (x_offset, y_offset, width, height) of the block.
+        x_size (int): Raster width.
+        y_size (int): Raster height.
+        halo (int): Halo width in pixels.
+
+    Returns:
+        tuple: (values, edges) where edges is (top, bottom, left, right), True where that
+        side is a raster edge (and has no halo).
+    """
+    x_off, y_off, width, height = window
+    x0, y0 = max(0, x_off - halo), max(0, y_off - halo)
+    x1, y1 = min(x_size, x_off + width + halo), min(y_size, y_off + height + halo)
+    edges = (y_off == 0, y_off + height == y_size, x_off == 0, x_off + width == x_size)
+    return band.ReadAsArray(x0, y0, x1 - x0, y1 - y0), edges
+
+
+class HillshadeJob(BlockJob):
+    """
+    Hillshade with brightness for a block.  Output: (shade,).
+    """
+    halo = 1
+
+    def __init__(self, dem_path, geotransform, options, brightness, nodata):
+        super().__init__(dem_path)
+        self.geotransform = geotransform
+        self.options = options
+        self.brightness = brightness
+        self.nodata = nodata
+
+    def process(self, window):
+        values, edges = self.read(window)
+        shade = hillshade(values, self.geotransform, self.options, self.nodata, edges)
+        return (adjust_brightness(shade, self.brightness),)
+
+
+class ReliefJob(BlockJob):
+    """
+    Fused color relief, hillshade, brightness and merge for a block.
+    Output: (relief, color, shade).
+    """
+    halo = 1
+
+    def __init__(self, dem_path, geotransform, ramp, options, brightness, merge_calc,
+                 band_count, nodata, gamma=1.0):
+        super().__init__(dem_path)
+        self.geotransform = geotransform
+        self.ramp = ramp
+        self.options = options
+        self.brightness = brightness
+        self.gamma = gamma
+        self.merge_calc = merge_calc
+        self.band_count = band_count
+        self.nodata = nodata
+
+    def process(self, window):
+        values, edges = self.read(window)
+        color, shade, relief = relief_block(
+            values, self.geotransform, self.ramp, self.options, self.brightness,
+            self.merge_calc, self.band_count, self.nodata, edges, self.gamma
+        )
+        return relief, color, shade
+
+
+class MergeJob(BlockJob):
+    """
+    Merge a color relief file and a hillshade file for a block, as gdal_calc.py does.
+    The hillshade tone curve (brightness and gamma) is applied with a lookup table.
+    Output: (relief,).
+    """
+
+    def __init__(self, color_path, hillshade_path, merge_calc, tone=None):
+        super().__init__(color_path)
+        self.hillshade_path = hillshade_path
+        self.merge_calc = merge_calc
+        self.tone = tone
+        self._shade_dataset = None
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state["_shade_dataset"] = None
+        return state
+
+    def process(self, window):
+        if self._dataset is None:
+            self._dataset = open_raster(self.dem_path)
+            self._shade_dataset = open_raster(self.hillshade_path)
+        shade_band = self._shade_dataset.GetRasterBand(1)
+        x_off, y_off, width, height = window
+        color = np.dstack([
+            self._dataset.GetRasterBand(idx + 1).ReadAsArray(x_off, y_off, width, height)
+            for idx in range(self._dataset.RasterCount)
+        ])
+        shade = shade_band.ReadAsArray(x_off, y_off, width, height)
+        nodata = shade_band.GetNoDataValue()
+        mask = shade == nodata if nodata is not None else np.zeros(shade.shape, dtype=bool)
+        if self.tone is not None:
+            shade = self.tone[shade]
+        return (self.merge_calc.apply(shade, color, mask),)
+
+
+def open_raster(path):
+    """
+    Open a raster file for reading.
+
+    Raises:
+        RuntimeError: If GDAL is unavailable or the file cannot be opened.
+    """
+    require_gdal()
+    dataset = gdal.Open(path)
+    if dataset is None:
+        raise RuntimeError(f"Unable to open: {path}")
+    return dataset
+
+
+def create_hillshade(
+        dem_path, target, hillshade_flags="", brightness=1.0, compress="",
+        block_size=BLOCK_SIZE, progress=None, workers=1
+):
+    """
+    Create a hillshade GeoTIFF from a DEM.  Equivalent to gdaldem hillshade followed by the
+    color_relief.sh brightness adjustment.
+
+    Args:
+        dem_path (str): Path to the DEM.
+        target (str): Output file path.
+        hillshade_flags (str): gdaldem hillshade switches (OUTPUT_TYPE, EDGE, HILLSHADE1-4).
+        brightness (float): Hillshade brightness (BRIGHTNESS).
+        compress (str): Compression switches (COMPRESS).
+        block_size (int): Block size in pixels for reading and for output tiles.
+        progress (callable, optional): Called with the completed fraction (0.0 - 1.0).
+        workers (int): Number of worker processes (WORKERS).
+
+    Raises:
+        RuntimeError: If GDAL is unavailable or a file cannot be opened or created.
+        ValueError: If a setting is invalid.
+    """
+    check_output_type(hillshade_flags)
+    source, _, nodata = open_dem(dem_path)
+    options = HillshadeOptions.from_flags(hillshade_flags)
+    output = create_output(target, source, 1, creation_options(compress, block_size))
+    output.GetRasterBand(1).SetNoDataValue(0)
+    job = HillshadeJob(dem_path, source.GetGeoTransform(), options, brightness, nodata)
+    render_blocks(job, source, [output], block_size, workers, progress)
+
+
+def merge_relief(
+        color_path, hillshade_path, target, merge_expression=None, compress="",
+        block_size=BLOCK_SIZE, progress=None, workers=1, brightness=1.0, gamma=1.0
+):
+    """
+    Merge a color relief and a hillshade into the final relief.  Equivalent to
+    `gdal_calc.py -B color -A hillshade --allBands=B --type=Byte`, with the hillshade
+    brightness and gamma applied as part of the merge.
+
+    Args:
+        color_path (str): Path to the color relief.
+        hillshade_path (str): Path to the hillshade.
+        target (str): Output file path.
+        merge_expression (str): MERGE_CALC expression.
+        compress (str): Compression switches (COMPRESS).
+        block_size (int): Block size in pixels for reading and for output tiles.
+        progress (callable, optional): Called with the completed fraction (0.0 - 1.0).
+        workers (int): Number of worker processes (WORKERS).
+        brightness (float): Hillshade brightness (BRIGHTNESS).
+        gamma (float): Hillshade gamma (HILLSHADE_GAMMA).
+
+    Raises:
+        RuntimeError: If GDAL is unavailable or a file cannot be opened or created.
+        ValueError: If the expression is invalid or the images differ in size.
+    """
+    source = open_raster(color_path)
+    shade = open_raster(hillshade_path)
+    if (source.RasterXSize, source.RasterYSize) != (shade.RasterXSize, shade.RasterYSize):
+        raise ValueError(f"{color_path} and {hillshade_path} have different sizes")
+    band_count = source.RasterCount
+    output = create_output(target, source, band_count, creation_options(compress, block_size))
+    for idx in range(band_count):
+        output.GetRasterBand(idx + 1).SetNoDataValue(CALC_NODATA)
+    job = MergeJob(
+        color_path, hillshade_path, MergeCalc(merge_expression), tone_lut(brightness, gamma)
+    )
+    render_blocks(job, source, [output], block_size, workers, progress)
+
+
+def create_relief(
+        dem_path, ramp_path, target, color_flags="", hillshade_flags="", brightness=1.0,
+        merge_expression=None, compress="", color_path=None, hillshade_path=None,
+        block_size=BLOCK_SIZE, progress=None, workers=1, gamma=1.0
+):
+    """
+    Fused relief pipeline: create the final relief from the DEM in one pass.
+    Equivalent to gdaldem color-relief, gdaldem hillshade, adjust_brightness and the
+    gdal_calc.py merge, without writing the intermediate files.
+
+    Args:
+        dem_path (str): Path to the DEM.
+        ramp_path (str): Path to the GDALDEM color ramp file.
+        target (str): Output relief file path.
+        color_flags (str): gdaldem color switches (COLOR1, COLOR2).
+        hillshade_flags (str): gdaldem hillshade switches (OUTPUT_TYPE, EDGE, HILLSHADE1-4).
+        brightness (float): Hillshade brightness (BRIGHTNESS).
+        merge_expression (str): MERGE_CALC expression.
+        compress (str): Compression switches (COMPRESS).
+        color_path (str, optional): Also write the color relief to this file.
+        hillshade_path (str, optional): Also write the hillshade (before brightness and gamma)
+            to this file.
+        block_size (int): Block size in pixels for reading and for output tiles.
+        progress (callable, optional): Called with the completed fraction (0.0 - 1.0).
+        workers (int): Number of worker processes (WORKERS).
+        gamma (float): Hillshade gamma (HILLSHADE_GAMMA).
+
+    Raises:
+        RuntimeError: If GDAL is unavailable or a file cannot be opened or created.
+        ValueError: If a setting is invalid.
+    """
+    source, _, nodata = open_dem(dem_path)
+    mode, alpha = parse_color_flags(color_flags)
+    ramp = ColorRamp.from_file(ramp_path, nodata, mode)
+    options = HillshadeOptions.from_flags(hillshade_flags)
+    merge_calc = MergeCalc(merge_expression)
+    band_count = 4 if alpha else 3
+    create_options = creation_options(compress, block_size)
+
+    relief_out = create_output(target, source, band_count, create_options)
+    for idx in range(band_count):
+        relief_out.GetRasterBand(idx + 1).SetNoDataValue(CALC_NODATA)
+    color_out = create_output(color_path, source, band_count, create_options) \
+        if color_path else None
+    shade_out = create_output(hillshade_path, source, 1, create_options) \
+        if hillshade_path else None
+    if shade_out:
+        shade_out.GetRasterBand(1).SetNoDataValue(0)
+
+    job = ReliefJob(
+        dem_path, source.GetGeoTransform(), ramp, options, brightness, merge_calc, band_count,
+        nodata, gamma
+    )
+    render_blocks(job, source, [relief_out, color_out, shade_out], block_size, workers, progress)
+
+
+def parse_brightness(value):
+    """
+    Parse the BRIGHTNESS setting. Blank is 1 (no change).
+
+    Raises:
+        ValueError: If the value is not a number.
+    """
+    if value is None or str(value).strip() == "":
+        return 1.0
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"Invalid BRIGHTNESS: {value}")
+
+
+def parse_gamma(value):
+    """
+    Parse the HILLSHADE_GAMMA setting. Blank is 1 (no change).
+
+    Raises:
+        ValueError: If the value is not a positive number.
+    """
+    if value is None or str(value).strip() == "":
+        return 1.0
+    try:
+        gamma = float(value)
+    except ValueError:
+        gamma = 0
+    if not gamma > 0:
+        raise ValueError(f"Invalid HILLSHADE_GAMMA: {value}")
+    return gamma
+
+
+def render_color_relief(dem_path, color_config, color_flags=""):
+    """
+    Render a color relief of a (small) DEM in memory, e.g. for a preview.
+
+    Args:
+        dem_path (str): Path to the DEM.
+        color_config (ColorConfig): The loaded color ramp.
+        color_flags (str): gdaldem color switches (COLOR1, COLOR2).
+
+    Returns:
+        numpy.ndarray: uint8 RGBA array of shape (rows, cols, 4). Alpha is opaque unless
+        -alpha is in color_flags.
+    """
+    _, band, nodata = open_dem(dem_path)
+    mode, alpha = parse_color_flags(color_flags)
+    rgba = ColorRamp.from_config(color_config, nodata, mode).apply(band.ReadAsArray())
+    if not alpha:
+        rgba[..., 3] = 255
+    return rgba
+
+
+class TerminalProgress:
+    """
+    Prints gdal style progress ("0...10...20...") to stdout.
+    """
+
+    def __init__(self):
+        self.last = -1
+
+    def __call__(self, fraction):
+        """
+        Args:
+            fraction (float): Completed fraction (0.0 - 1.0).
+        """
+        step = int(fraction * 40)
+        for tick in range(self.last + 1, step + 1):
+            if tick % 4 == 0:
+                print(f"{tick // 4 * 10}", end="" if tick < 40 else " - done.\n", flush=True)
+            else:
+                print(".", end="", flush=True)
+        self.last = max(self.last, step)
+
+
+def main(argv=None):
+    """
+    Command line entry point for relief_engine.
+
+    Args:
+        argv (list of str, optional): Arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: Exit code. 0 on success, 1 on error.
+    """
+    parser = argparse.ArgumentParser(
+        prog="relief_engine", description="NumPy raster engine for color relief images"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    color = commands.add_parser("color-relief", help="Create a color relief image (gdaldem "
+                                                     "color-relief)")
+    color.add_argument("dem", help="DEM file")
+    color.add_argument("ramp", help="GDALDEM color ramp file")
+    color.add_argument("target", help="Output GeoTIFF")
+    color.add_argument("--flags", default="", help="gdaldem color-relief switches")
+
+    hill = commands.add_parser("hillshade", help="Create a hillshade image (gdaldem hillshade)")
+    hill.add_argument("dem", help="DEM file")
+    hill.add_argument("target", help="Output GeoTIFF")
+    hill.add_argument("--flags", default="", help="gdaldem hillshade switches")
+    hill.add_argument("--brightness", default="", help="Hillshade brightness. 1 is no change")
+
+    merge = commands.add_parser("merge", help="Merge color relief and hillshade (gdal_calc.py)")
+    merge.add_argument("color", help="Color relief file (B)")
+    merge.add_argument("hillshade", help="Hillshade file (A)")
+    merge.add_argument("target", help="Output GeoTIFF")
+    merge.add_argument("--calc", default=DEFAULT_MERGE_CALC, help="MERGE_CALC expression")
+    merge.add_argument("--brightness", default="", help="Hillshade brightness. 1 is no change")
+    merge.add_argument("--gamma", default="", help="Hillshade gamma. 1 is no change")
+
+    relief = commands.add_parser("relief", help="Create the final relief in one fused pass")
+    relief.add_argument("dem", help="DEM file")
+    relief.add_argument("ramp", help="GDALDEM color ramp file")
+    relief.add_argument("target", help="Output GeoTIFF")
+    relief.add_argument("--color_flags", default="", help="gdaldem color-relief switches")
+    relief.add_argument("--hillshade_flags", default="", help="gdaldem hillshade switches")
+    relief.add_argument("--brightness", default="", help="Hillshade brightness. 1 is no change")
+    relief.add_argument("--gamma", default="", help="Hillshade gamma. 1 is no change")
+    relief.add_argument("--calc", default=DEFAULT_MERGE_CALC, help="MERGE_CALC expression")
+    relief.add_argument("--color", default=None, help="Also write the color relief to this file")
+    relief.add_argument("--hillshade", default=None, help="Also write the hillshade to this file")
+
+    calc = commands.add_parser(
+        "calc", help="Print a MERGE_CALC expression with the hillshade brightness and gamma "
+                     "applied to A, for gdal_calc.py"
+    )
+    calc.add_argument("expression", help="MERGE_CALC expression")
+    calc.add_argument("--brightness", default="", help="Hillshade brightness. 1 is no change")
+    calc.add_argument("--gamma", default="", help="Hillshade gamma. 1 is no change")
+
+    for command in (color, hill, merge, relief):
+        command.add_argument("--compress", default="", help="Compression switches, -co ...")
+        command.add_argument("--block_size", type=int, default=BLOCK_SIZE, help="Block size")
+        command.add_argument("--workers", default="1",
+                             help="Worker processes. Blank, 0 or ALL_CPUS uses all CPUs")
+        command.add_argument("-q", "--quiet", action="store_true", help="No progress output")
+
+    args = parser.parse_args(argv)
+    if args.command == "calc":
+        try:
+            print(tone_expression(
+                args.expression, parse_brightness(args.brightness), parse_gamma(args.gamma)
+            ))
+        except ValueError as e:
+            print(f"relief_engine: {e}", file=sys.stderr)
+            return 1
+        return 0
+    progress = None if args.quiet else TerminalProgress()
+
+    try:
+        workers = tile_scheduler.resolve_workers(args.workers)
+        if args.command == "color-relief":
+            create_color_relief(
+                args.dem, args.ramp, args.target, args.flags, args.compress, args.block_size,
+                progress, workers
+            )
+        elif args.command == "hillshade":
+            create_hillshade(
+                args.dem, args.target, args.flags, parse_brightness(args.brightness),
+                args.compress, args.block_size, progress, workers
+            )
+        elif args.command == "merge":
+            merge_relief(
+                args.color, args.hillshade, args.target, args.calc, args.compress,
+                args.block_size, progress, workers, parse_brightness(args.brightness),
+                parse_gamma(args.gamma)
+            )
+        elif args.command == "relief":
+            create_relief(
+                args.dem, args.ramp, args.target, args.color_flags, args.hillshade_flags,
+                parse_brightness(args.brightness), args.calc, args.compress, args.color,
+                args.hillshade, args.block_size, progress, workers, parse_gamma(args.gamma)
+            )
+    except (RuntimeError, ValueError, OSError) as e:
+        print(f"relief_engine: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
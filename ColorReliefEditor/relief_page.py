@@ -60,10 +60,15 @@ class ReliefPage(TabPage):
         formats = {
             "expert": {
                 "NAMES.@LAYER": ("", "read_only", None, 180, label_style),
+                "BRIGHTNESS": ("Brightness", "spinbox", [.3, 1.8, .1, 1], 200),
+                "HILLSHADE_GAMMA": ("Gamma", "spinbox", [.5, 2.0, .1, 1], 200),
                 "MERGE_CALC": ("Calc ", "text_edit", r"^--calc=.*$", 280),
+                "PIPELINE": ("Pipeline", "combo", ["standard", "fused"], 100),
+                "INTERMEDIATES": ("Keep Files", "combo", ["none", "color", "hillshade", "both"], 100),
                 "PUBLISH": ("Publish To", "text_edit", None, 280),
                 "QUIET": ("Quiet Mode", "combo", ["-q", "-v", "--version"], 100),
             }, "basic": {
+                "BRIGHTNESS": ("Brightness", "spinbox", [.3, 1.8, .1, 1], 200),
             },
         }
 
@@ -88,9 +93,9 @@ class ReliefPage(TabPage):
 
         # Widget for building and managing images
         if mode == "expert":
-            button_flags = ["make", "view", "publish", "cancel", "clean"]
+            button_flags = ["make", "make_all", "view", "publish", "cancel", "clean"]
         else:
-            button_flags = ["make", "view"]
+            button_flags = ["make", "make_all", "view"]
         self.preview = PreviewWidget(
             main, self.tab_name, self.settings_widget, False, main.proj_config.save, button_flags
         )
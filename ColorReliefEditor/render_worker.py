@@ -0,0 +1,968 @@
+#  Copyright (c) 2024.
+#   Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the “Software”), to deal in the
+#   Software without restriction,
+#   including without limitation the rights to use, copy, modify, merge, publish, distribute,
+#   sublicense, and/or sell copies
+#   of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+#   the following conditions:
+#  #
+#   The above copyright notice and this permission notice shall be included in all copies or
+#   substantial portions of the Software.
+#  #
+#   THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+#   BUT NOT LIMITED TO THE
+#   WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO
+#   EVENT SHALL THE AUTHORS OR
+#   COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+#   CONTRACT, TORT OR
+#   OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#   DEALINGS IN THE SOFTWARE.
+#  #
+#   This uses QT for some components which has the primary open-source license is the GNU Lesser
+#   General Public License v. 3 (“LGPL”).
+#   With the LGPL license option, you can use the essential libraries and some add-on libraries
+#   of Qt.
+#   See https://www.qt.io/licensing/open-source-lgpl-obligations for QT details.
+"""
+Persistent render worker for previews.
+
+A preview built with make runs make, color_relief.sh, and several GDAL executables, each of
+which re-opens the DEM.  The render worker is a long-lived local process that keeps the preview
+section of the DEM, derived hillshades, and parsed configs resident and renders color, hillshade,
+and relief previews with relief_engine.  The preview section (PREVIEW, X_SHIFT, Y_SHIFT) is read
+from the full DEM once and memory mapped from the preview DEM cache (see dem_cache), and every
+stage is rendered in memory, so no _prv files are written unless a preview is exported.  If
+MONTAGE is set, the preview section is a montage of several smaller windows of the DEM (see
+relief_engine.read_montage) and each window is shaded as a separate DEM.  Blocks of a preview are
+rendered concurrently on a thread pool.
+
+Protocol:
+    The worker listens on a Unix socket (a named pipe on Windows) using
+    multiprocessing.connection with a per-session authentication key.  Requests and responses
+    are dicts:
+
+    - {"id": int, "op": "ping"}
+    - {"id": int, "op": "warmup", "config": path, "dem": path}
+    - {"id": int, "op": "render", "channel": str, "base": "color" | "hillshade" | "relief",
+      "config": path, "dem": path, "ramp": path, "rows": list (optional), "nv": tuple (optional),
+      "since": id (optional), "scale": int (optional)}
+    - {"id": int, "op": "export", "target": path, ...render fields}
+    - {"id": int, "op": "cancel", "target": id}
+    - {"id": int, "op": "shutdown"}
+
+    Responses are {"id": int, "status": "ok" | "cancelled" | "error", "result": ...,
+    "error": str}.  A render result is a uint8 RGBA array.  An export writes the rendered
+    preview to target as a GeoTIFF and returns the target path.
+
+    If "since" is the id of the client's last render for the channel and only the color ramp
+    changed, the result is a patch {"index": flat pixel indices, "rgba": RGBA for those pixels}
+    covering just the elevations between the ramp entries next to the edit.
+
+    If "scale" is more than 1, the preview is rendered from every scale'th row and column of the
+    preview section, so a coarse preview can be shown while the full preview renders.  The
+    result is None if only the color ramp changed, since the full render is then a fast patch.
+
+    Requests are handled in order. A render request is cancelled if a newer render request for the
+    same channel arrives or a cancel request names it. Running renders check for this between
+    blocks.
+
+Command line usage (started by RenderClient):
+    python -m ColorReliefEditor.render_worker ADDRESS [--warmup CONFIG DEM] [--parent PID]
+"""
+import argparse
+from collections import deque
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from multiprocessing.connection import Client, Listener
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from ColorReliefEditor import config_env, dem_cache, relief_engine
+
+# Environment variable that passes the authentication key to the worker
+AUTHKEY_ENV = "RELIEF_WORKER_KEY"
+
+# Rows per block.  A block that hasn't started is skipped when the render is cancelled.
+STRIP_ROWS = 256
+
+# Seconds between cancellation checks while blocks render
+CANCEL_POLL = 0.02
+
+# Threads rendering blocks of a preview
+RENDER_THREADS = os.cpu_count() or 1
+
+# Preview bases the worker can render
+RENDER_BASES = ("color", "hillshade", "relief")
+
+
+class RenderCancelled(Exception):
+    """
+    Raised when a render request is superseded or cancelled.
+    """
+    pass
+
+
+def connection_family():
+    """
+    Return the multiprocessing.connection family for this platform.
+    """
+    return "AF_PIPE" if platform.system() == "Windows" else "AF_UNIX"
+
+
+def default_address():
+    """
+    Return a worker address unique to this process.
+    """
+    name = f"relief_worker_{os.getpid()}"
+    if connection_family() == "AF_PIPE":
+        return rf"\\.\pipe\{name}"
+    return os.path.join(tempfile.gettempdir(), f"{name}.sock")
+
+
+class PreviewRenderer:
+    """
+    Renders previews with relief_engine and keeps DEMs, hillshades and configs resident.
+    Cached items are reloaded when their file changes.
+
+    **Methods**:
+    """
+
+    def __init__(self):
+        self._configs = {}
+        self._dems = {}
+        # Montage windows in each preview section, by DEM key: list of (rows, columns) slices
+        self._regions = {}
+        self._shades = {}
+        self._renders = {}
+        self._index = None
+        # Last toned hillshade: (key, array)
+        self._toned = None
+        self._pool = None
+
+    def config(self, config_path):
+        """
+        Return the config values for a project (see config_env.load_values).
+
+        Args:
+            config_path (str): Path to <region>_relief.cfg.
+
+        Returns:
+            dict: Config keys to formatted string values.
+        """
+        stamp = os.stat(config_path).st_mtime_ns
+        cached = self._configs.get(config_path)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, config_env.load_values(config_path))
+            self._configs[config_path] = cached
+        return cached[1]
+
+    def dem(self, dem_path, settings):
+        """
+        Return the preview section of a DEM, memory mapped from the preview DEM cache (see
+        dem_cache).
+
+        Args:
+            dem_path (str): Path to the full DEM.
+            settings (dict): Config values with the PREVIEW, X_SHIFT, and Y_SHIFT settings.
+
+        Returns:
+            tuple: (key, values, geotransform, nodata).  key identifies this version of the
+            preview section.
+
+        Raises:
+            RuntimeError: If GDAL is unavailable or the DEM cannot be read.
+            ValueError: If the preview settings are invalid.
+        """
+        key = dem_cache.cache_key(dem_path, settings)
+        cached = self._dems.get(dem_path)
+        if cached is None or cached[0] != key:
+            if cached is not None:
+                # Hillshades for an older version of this DEM are no longer valid
+                self._shades = {k: v for k, v in self._shades.items() if k[0] != cached[0]}
+                self._regions.pop(cached[0], None)
+            preview = dem_cache.preview_dem(dem_path, settings)
+            cached = (preview.key, preview.values, preview.geotransform, preview.nodata)
+            self._dems[dem_path] = cached
+            if isinstance(preview.window[0], tuple):
+                tile = preview.window[0][2]
+                _, offsets = relief_engine.montage_shape(len(preview.window), tile)
+                self._regions[preview.key] = [
+                    (slice(y, y + tile), slice(x, x + tile)) for y, x in offsets
+                ]
+        return cached
+
+    def warmup(self, config_path, dem_path):
+        """
+        Load the config, the DEM, its hillshade, and its elevation index so the first preview
+        and the first color edit are fast.
+        """
+        settings = self.config(config_path)
+        if os.path.exists(dem_path):
+            dem = self.dem(dem_path, settings)
+            self.hillshade(dem, settings, lambda: False)
+            self.sorted_index(dem)
+
+    def hillshade(self, dem, settings, cancelled, scale=1, tone=True):
+        """
+        Return the hillshade with the BRIGHTNESS and HILLSHADE_GAMMA tone curve applied.  The
+        hillshade is cached by DEM and hillshade flags only, so a tone change doesn't recompute
+        it.
+
+        Args:
+            dem (tuple): Result of dem().
+            settings (dict): Config values.
+            cancelled (callable): Returns True if the request should stop.
+            scale (int): Decimation factor.  Every scale'th DEM row and column is shaded.
+            tone (bool): Apply the tone curve.  The tone is applied when the hillshade is
+                merged, so the hillshade preview is shown without it.
+
+        Returns:
+            numpy.ndarray: uint8 hillshade.
+
+        Raises:
+            RenderCancelled: If cancelled.
+        """
+        flags, brightness, gamma = shade_settings(settings)
+        if not tone:
+            brightness, gamma = 1.0, 1.0
+        tone_key = (dem[0], flags, brightness, gamma)
+        if self._toned is None or self._toned[0] != tone_key:
+            if scale > 1:
+                # Decimated hillshades are cheap, so they aren't cached and don't replace the
+                # full hillshade
+                shade = self._shades.get((dem[0], flags))
+                shade = (shade[::scale, ::scale] if shade is not None else
+                         self.shade(dem, flags, cancelled, scale))
+                return relief_engine.adjust_brightness(shade, brightness, gamma)
+            shade = relief_engine.adjust_brightness(
+                self._hillshade(dem, flags, cancelled), brightness, gamma
+            )
+            self._toned = (tone_key, shade)
+        return self._toned[1][::scale, ::scale]
+
+    def _hillshade(self, dem, flags, cancelled):
+        shade_key = (dem[0], flags)
+        if shade_key not in self._shades:
+            self._shades[shade_key] = self.shade(dem, flags, cancelled)
+        return self._shades[shade_key]
+
+    def shade(self, dem, flags, cancelled, scale=1):
+        """
+        Return the hillshade of a DEM without the tone curve.  Blocks are shaded concurrently.
+
+        Args:
+            dem (tuple): Result of dem().
+            flags (str): Hillshade flags.
+            cancelled (callable): Returns True if the request should stop.
+            scale (int): Decimation factor.  Every scale'th DEM row and column is shaded.
+
+        Returns:
+            numpy.ndarray: uint8 hillshade.
+
+        Raises:
+            RenderCancelled: If cancelled.
+        """
+        _, values, geotransform, nodata = dem
+        values = values[::scale, ::scale]
+        if geotransform is not None and scale > 1:
+            geotransform = (geotransform[0], *(v * scale for v in geotransform[1:3]),
+                            geotransform[3], *(v * scale for v in geotransform[4:6]))
+
+        options = relief_engine.HillshadeOptions.from_flags(flags)
+        # Each montage window is shaded separately so its sides are raster edges
+        shade = np.zeros(values.shape, dtype=np.uint8)
+
+        def shade_strip(region, y, y1, rows):
+            block = values[region][max(0, y - 1):min(rows, y1 + 1)]
+            edges = (y == 0, y1 == rows, True, True)
+            shade[region][y:y1] = relief_engine.hillshade(
+                block, geotransform, options, nodata, edges
+            )
+
+        jobs = []
+        for region in self.regions(dem, scale):
+            rows = values[region].shape[0]
+            for y in range(0, rows, STRIP_ROWS):
+                jobs.append((shade_strip, region, y, min(y + STRIP_ROWS, rows), rows))
+        self.run_parallel(jobs, cancelled)
+        return shade
+
+    def render(self, request, cancelled):
+        """
+        Render a preview.
+
+        If the request has "since", the id of the last render for this channel, and only the
+        color ramp changed, just the pixels in the elevation range affected by the change are
+        recomputed and a patch is returned.
+
+        If the request has "scale", every scale'th row and column of the preview section is
+        rendered.  A decimated render doesn't change the last render used for patches, and
+        returns None instead if the full render will be a patch.
+
+        Args:
+            request (dict): Render request (see module docstring).
+            cancelled (callable): Returns True if the request should stop.
+
+        Returns:
+            numpy.ndarray, dict, or None: uint8 RGBA array, or a patch {"index": flat pixel
+            indices, "rgba": uint8 RGBA array for those pixels}.
+
+        Raises:
+            RenderCancelled: If cancelled.
+            RuntimeError: If GDAL is unavailable or a file cannot be read.
+            ValueError: If a setting or the color ramp is invalid.
+        """
+        base = request.get("base")
+        if base not in RENDER_BASES:
+            raise ValueError(f"Unknown preview: {base}")
+
+        scale = max(1, int(request.get("scale") or 1))
+        settings = self.config(request["config"])
+        dem = self.dem(request["dem"], settings)
+        key, values, _, nodata = dem
+        values = values[::scale, ::scale]
+        channel = request.get("channel") if request.get("op") == "render" else None
+        last = self._renders.get(channel) if scale > 1 else self._renders.pop(channel, None)
+
+        if base == "hillshade":
+            shade = self.hillshade(dem, settings, cancelled, scale, tone=False)
+            rgba = np.full(values.shape + (4,), 255, dtype=np.uint8)
+            rgba[..., :3] = shade[..., np.newaxis]
+            return rgba
+
+        mode, alpha = relief_engine.parse_color_flags(
+            " ".join(settings.get(k, "") for k in ("COLOR1", "COLOR2"))
+        )
+        if request.get("rows") is not None:
+            ramp = relief_engine.ColorRamp(request["rows"], nodata, request.get("nv"), mode)
+        else:
+            ramp = relief_engine.ColorRamp.from_file(request["ramp"], nodata, mode)
+
+        shade, merge_calc = None, None
+        if base == "relief":
+            shade = self.hillshade(dem, settings, cancelled, scale)
+            merge_calc = relief_engine.MergeCalc(settings.get("MERGE_CALC"))
+
+        # Everything except the color ramp that the rendered pixels depend on
+        state = (key, base, alpha, shade_settings(settings) if shade is not None else None,
+                 merge_calc and merge_calc.expression)
+        result = None
+        if last is not None and request.get("since") == last[0] and state == last[1]:
+            if scale > 1:
+                return None
+            result = self._patch(last[2], ramp, dem, shade, alpha, merge_calc)
+        if result is None:
+            result = rgba = np.empty(values.shape + (4,), dtype=np.uint8)
+
+            def color_strip(y):
+                rgba[y:y + STRIP_ROWS] = colorize(
+                    values[y:y + STRIP_ROWS], ramp, alpha,
+                    None if shade is None else shade[y:y + STRIP_ROWS], merge_calc
+                )
+
+            self.run_parallel(
+                [(color_strip, y) for y in range(0, values.shape[0], STRIP_ROWS)], cancelled
+            )
+
+        if channel is not None and scale == 1:
+            self._renders[channel] = (request.get("id"), state, ramp)
+        return result
+
+    def regions(self, dem, scale=1):
+        """
+        Return the montage windows of a preview section as (rows, columns) slices of the DEM
+        decimated by scale.  A preview section that isn't a montage is a single window.
+        """
+        regions = self._regions.get(dem[0]) or [(slice(None), slice(None))]
+        return [tuple(slice(-(-part.start // scale), -(-part.stop // scale))
+                      if part.start is not None else part for part in region)
+                for region in regions]
+
+    def run_parallel(self, jobs, cancelled):
+        """
+        Run jobs on the render thread pool and wait for them.  numpy releases the GIL for
+        most array operations, so blocks render concurrently.
+
+        cancelled is only called on this thread, every CANCEL_POLL seconds, since it may read
+        the client connection.  The jobs just test a stop flag before they start.
+
+        Args:
+            jobs (list): (function, *args) tuples.
+            cancelled (callable): Returns True if the request should stop.
+
+        Raises:
+            RenderCancelled: If cancelled.
+            Exception: The first exception raised by a job.  Jobs that have not started are
+            skipped, and running jobs are waited for.
+        """
+        check_cancel(cancelled)
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(RENDER_THREADS, thread_name_prefix="render")
+        stop = threading.Event()
+
+        def run(function, *args):
+            if not stop.is_set():
+                function(*args)
+
+        futures = [self._pool.submit(run, *job) for job in jobs]
+        try:
+            running = futures
+            while running:
+                done, running = wait(running, CANCEL_POLL, FIRST_EXCEPTION)
+                for future in done:
+                    future.result()
+                if running:
+                    check_cancel(cancelled)
+        finally:
+            stop.set()
+            for future in futures:
+                future.cancel()
+            wait(futures)
+
+    def _patch(self, last_ramp, ramp, dem, shade, alpha, merge_calc):
+        """
+        Return a patch from the last render with last_ramp, or None if a full render is
+        needed.
+        """
+        _, values, _, _ = dem
+        changed = ramp.changed_range(last_ramp)
+        if changed is None:
+            index = np.empty(0, dtype=np.intp)
+        else:
+            index = self.pixels_between(dem, *changed)
+            if index.size > values.size // 2:
+                return None
+        pixels = colorize(values.ravel()[index], ramp, alpha,
+                          None if shade is None else shade.ravel()[index], merge_calc)
+        return {"index": index, "rgba": pixels}
+
+    def sorted_index(self, dem):
+        """
+        Return the DEM pixel order by elevation, cached for the current DEM.
+
+        Returns:
+            tuple: (flat pixel indices sorted by elevation, sorted elevations)
+        """
+        key, values, _, _ = dem
+        if self._index is None or self._index[0] != key:
+            order = np.argsort(values, axis=None, kind="stable")
+            self._index = (key, order, values.ravel()[order])
+        return self._index[1:]
+
+    def pixels_between(self, dem, low, high):
+        """
+        Return the flat indices of DEM pixels with elevations in [low, high].  Uses a sorted
+        index of the DEM that is built on first use.
+
+        Args:
+            dem (tuple): Result of dem().
+            low (float): Lowest elevation, may be -inf.
+            high (float): Highest elevation, may be inf. NaN pixels are included if inf.
+
+        Returns:
+            numpy.ndarray: Flat pixel indices.
+        """
+        order, ordered = self.sorted_index(dem)
+        first = np.searchsorted(ordered, low, side="left")
+        last = len(ordered) if high == np.inf else np.searchsorted(ordered, high, side="right")
+        return order[first:last]
+
+    def export(self, request, cancelled):
+        """
+        Render a preview and write it as a GeoTIFF georeferenced to the preview section.
+
+        Args:
+            request (dict): Export request (see module docstring).
+            cancelled (callable): Returns True if the request should stop.
+
+        Returns:
+            str: The target path.
+        """
+        settings = self.config(request["config"])
+        if relief_engine.parse_montage(settings.get("MONTAGE")) is not None:
+            raise ValueError("A montage preview can't be exported. Set MONTAGE to off.")
+        rgba = self.render(request, cancelled)
+        if request["base"] == "hillshade":
+            pixels = rgba[..., 0]
+        else:
+            _, alpha = relief_engine.parse_color_flags(
+                " ".join(settings.get(k, "") for k in ("COLOR1", "COLOR2"))
+            )
+            pixels = rgba if alpha else rgba[..., :3]
+
+        dataset, _, _ = relief_engine.open_dem(request["dem"])
+        window = relief_engine.preview_window(
+            dataset.RasterXSize, dataset.RasterYSize,
+            *(settings.get(k, "") for k in ("PREVIEW", "X_SHIFT", "Y_SHIFT"))
+        )
+        output = relief_engine.create_output(
+            request["target"], dataset, 1 if pixels.ndim == 2 else pixels.shape[2],
+            relief_engine.creation_options(), window
+        )
+        relief_engine.write_bands(output, pixels, 0, 0)
+        output.FlushCache()
+        return request["target"]
+
+
+def shade_settings(settings):
+    """
+    Return the (flags, brightness, gamma) hillshade settings from config values.
+    """
+    flags = " ".join(settings.get(k, "") for k in
+                     ("EDGE", "HILLSHADE1", "HILLSHADE2", "HILLSHADE3", "HILLSHADE4"))
+    return (flags, relief_engine.parse_brightness(settings.get("BRIGHTNESS")),
+            relief_engine.parse_gamma(settings.get("HILLSHADE_GAMMA")))
+
+
+def colorize(values, ramp, alpha, shade=None, merge_calc=None):
+    """
+    Color DEM values and optionally merge them with the hillshade.
+
+    Args:
+        values (numpy.ndarray): Elevations.
+        ramp (relief_engine.ColorRamp): Color ramp.
+        alpha (bool): Keep the ramp alpha. Otherwise pixels are opaque.
+        shade (numpy.ndarray, optional): uint8 hillshade for the same pixels.
+        merge_calc (relief_engine.MergeCalc, optional): Merge for the hillshade.
+
+    Returns:
+        numpy.ndarray: uint8 RGBA array with shape values.shape + (4,).
+    """
+    rgba = ramp.apply(values)
+    if shade is not None:
+        band_count = 4 if alpha else 3
+        rgba[..., :band_count] = merge_calc.apply(shade, rgba[..., :band_count])
+    if not alpha:
+        rgba[..., 3] = 255
+    return rgba
+
+
+def check_cancel(cancelled):
+    """
+    Raise RenderCancelled if cancelled() is True.
+    """
+    if cancelled():
+        raise RenderCancelled()
+
+
+class RenderWorker:
+    """
+    Serves requests from a RenderClient connection.
+
+    **Methods**:
+    """
+
+    def __init__(self, renderer=None):
+        self.renderer = renderer or PreviewRenderer()
+        self.pending = deque()
+        self.cancelled = set()
+        # Held while the renderer is in use, so a startup warmup can run beside serve()
+        self.lock = threading.Lock()
+
+    def start_warmup(self, config_path, dem_path):
+        """
+        Preload a project on a background thread so connections are accepted at once.  A
+        request that arrives during the warmup waits for it and then uses the loaded data.
+        """
+        def warmup():
+            with self.lock:
+                try:
+                    self.renderer.warmup(config_path, dem_path)
+                except (RuntimeError, ValueError, OSError) as e:
+                    print(f"render_worker: warmup failed: {e}", file=sys.stderr)
+
+        threading.Thread(target=warmup, daemon=True).start()
+
+    def serve(self, listener):
+        """
+        Accept client connections until a shutdown request is received.
+        """
+        while True:
+            conn = listener.accept()
+            try:
+                if not self.handle(conn):
+                    return
+            finally:
+                conn.close()
+
+    def handle(self, conn):
+        """
+        Handle requests from one connection.
+
+        Returns:
+            bool: False if a shutdown was requested, True if the client disconnected.
+        """
+        self.pending.clear()
+        self.cancelled.clear()
+        try:
+            while True:
+                if not self.pending:
+                    self._queue(conn.recv())
+                self._drain(conn)
+                request = self.pending.popleft()
+                op = request.get("op")
+
+                if op == "shutdown":
+                    conn.send(response(request, "ok"))
+                    return False
+                if op in ("ping", "cancel"):
+                    conn.send(response(request, "ok"))
+                    continue
+                if self._is_cancelled(request):
+                    conn.send(response(request, "cancelled"))
+                    continue
+
+                try:
+                    result = self.dispatch(request, lambda: self._check(conn, request))
+                    conn.send(response(request, "ok", result))
+                except RenderCancelled:
+                    conn.send(response(request, "cancelled"))
+                except (RuntimeError, ValueError, OSError, KeyError) as e:
+                    conn.send(response(request, "error", error=str(e)))
+        except (EOFError, OSError):
+            return True
+
+    def dispatch(self, request, cancelled):
+        """
+        Run a warmup, render, or export request.
+        """
+        with self.lock:
+            if request.get("op") == "warmup":
+                self.renderer.warmup(request["config"], request["dem"])
+                return None
+            if request.get("op") == "render":
+                return self.renderer.render(request, cancelled)
+            if request.get("op") == "export":
+                return self.renderer.export(request, cancelled)
+        raise ValueError(f"Unknown request: {request.get('op')}")
+
+    def _queue(self, request):
+        if request.get("op") == "cancel":
+            self.cancelled.add(request.get("target"))
+        self.pending.append(request)
+
+    def _drain(self, conn):
+        while conn.poll(0):
+            self._queue(conn.recv())
+
+    def _is_cancelled(self, request):
+        if request.get("id") in self.cancelled:
+            return True
+        if any(item.get("op") == "shutdown" for item in self.pending):
+            return True
+        # A newer render for the same channel supersedes this one
+        return request.get("op") == "render" and any(
+            item.get("op") == "render" and item.get("channel") == request.get("channel")
+            for item in self.pending
+        )
+
+    def _check(self, conn, request):
+        self._drain(conn)
+        return self._is_cancelled(request)
+
+
+def response(request, status, result=None, error=""):
+    """
+    Create a response for a request.
+    """
+    return {"id": request.get("id"), "status": status, "result": result, "error": error}
+
+
+class RenderClient:
+    """
+    Starts and talks to the render worker process.  If the worker can't be started or fails,
+    the client is disabled and callers fall back to building previews with make.
+    Renders can be requested from any thread.  They are sent one at a time, and a render
+    cancels the render in progress for the same channel.
+
+    **Methods**:
+    """
+
+    def __init__(self, address=None, timeout=30.0, verbose=0):
+        """
+        Initialize
+
+        Args:
+            address (str, optional): Worker socket address. Defaults to default_address().
+            timeout (float): Seconds to wait for the worker to start or respond.
+            verbose (int): Print diagnostics if > 0.
+        """
+        self.address = address or default_address()
+        self.timeout = timeout
+        self.verbose = verbose
+        self.authkey = os.urandom(16)
+        self.process = None
+        self.conn = None
+        self.disabled = False
+        self._next_id = 0
+        # Last rendered image for each channel: (request id, RGBA array)
+        self._images = {}
+        # Request id of the render in progress for each channel
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self, warmup=None):
+        """
+        Start the worker process if it is not running.  Does not wait for it.
+
+        Args:
+            warmup (tuple, optional): (config_path, dem_path) to load on startup.
+        """
+        if self.running or self.disabled:
+            return
+        command = [sys.executable, "-m", "ColorReliefEditor.render_worker", self.address,
+                   "--parent", str(os.getpid())]
+        if warmup:
+            command += ["--warmup", *warmup]
+        env = dict(os.environ, **{AUTHKEY_ENV: self.authkey.hex()})
+        try:
+            self.process = subprocess.Popen(command, env=env, stdin=subprocess.DEVNULL)
+        except OSError as e:
+            self._disable(f"Unable to start render worker: {e}")
+        self.conn = None
+
+    def warmup(self, config_path, dem_path):
+        """
+        Start the worker if needed and preload a project.  Does not wait for a response.
+        """
+        if not self.running:
+            self.start((config_path, dem_path))
+        elif self.conn is not None:
+            self._send("warmup", config=config_path, dem=dem_path)
+
+    def render(self, channel, base, config_path, dem_path, ramp_path, rows=None, nv=None,
+               scale=1):
+        """
+        Render a preview.  Cancels any earlier render for the same channel.
+
+        Args:
+            channel (str): Requester name. A newer request on a channel supersedes older ones.
+            base (str): "color", "hillshade", or "relief".
+            config_path (str): Path to <region>_relief.cfg.
+            dem_path (str): Path to the full DEM.  The preview section is read from it.
+            ramp_path (str): Path to the color ramp file.
+            rows (list, optional): In-memory color ramp rows, used instead of ramp_path.
+            nv (tuple, optional): RGBA for the nv line of the in-memory color ramp.
+            scale (int): Decimation factor for a coarse preview (see PreviewRenderer.render).
+
+        Returns:
+            tuple: (status, result).  status is "ok" with an RGBA array, "cancelled", "error"
+            with a message, or "unavailable" if the worker can't be used.  A coarse preview
+            result is None if the full preview will be a fast patch.
+        """
+        self.cancel_channel(channel)
+        with self._lock:
+            if scale > 1:
+                # Coarse previews are never patches and don't replace the last image
+                since = self._images.get(channel, (None, None))[0]
+                _, status, result = self._request(
+                    "render", channel=channel, base=base, config=config_path, dem=dem_path,
+                    ramp=ramp_path, rows=rows, nv=nv, since=since, scale=scale
+                )
+                return status, result
+            since, image = self._images.pop(channel, (None, None))
+            request_id, status, result = self._request(
+                "render", channel=channel, base=base, config=config_path, dem=dem_path,
+                ramp=ramp_path, rows=rows, nv=nv, since=since
+            )
+            if status != "ok":
+                return status, result
+            if isinstance(result, dict):
+                # Patch the last image in place
+                image.reshape(-1, 4)[result["index"]] = result["rgba"]
+                result = image
+            self._images[channel] = (request_id, result)
+            return status, result
+
+    def export(self, channel, base, config_path, dem_path, ramp_path, target, rows=None,
+               nv=None):
+        """
+        Render a preview and write it to target as a GeoTIFF.  Arguments are as for render().
+
+        Returns:
+            tuple: (status, result).  result is the target path if status is "ok".
+        """
+        with self._lock:
+            _, status, result = self._request(
+                "export", channel=channel, base=base, config=config_path, dem=dem_path,
+                ramp=ramp_path, rows=rows, nv=nv, target=target
+            )
+        return status, result
+
+    def _request(self, op, **kwargs):
+        """
+        Send a request and wait for its response.  The caller holds self._lock.
+
+        Returns:
+            tuple: (request id, status, result or error message).
+        """
+        if self.disabled:
+            return None, "unavailable", None
+        if not self.running:
+            self.start()
+        if self._connect() is None:
+            return None, "unavailable", None
+        request_id = self._send(op, **kwargs)
+        if request_id is None:
+            return None, "unavailable", None
+        channel = kwargs.get("channel")
+        self._in_flight[channel] = request_id
+        try:
+            reply = self._receive(request_id)
+        finally:
+            self._in_flight.pop(channel, None)
+        if reply is None:
+            return request_id, "unavailable", None
+        result = reply["result"] if reply["status"] == "ok" else reply["error"]
+        return request_id, reply["status"], result
+
+    def cancel(self, request_id):
+        """
+        Ask the worker to cancel a request.
+        """
+        if self.conn is not None and request_id is not None:
+            self._send("cancel", target=request_id)
+
+    def cancel_channel(self, channel):
+        """
+        Ask the worker to cancel the request in progress for a channel, if any.
+        """
+        self.cancel(self._in_flight.get(channel))
+
+    def close(self):
+        """
+        Shut down the worker.
+        """
+        if self.conn is not None:
+            try:
+                self.conn.send({"id": -1, "op": "shutdown"})
+                self.conn.close()
+            except OSError:
+                pass
+            self.conn = None
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+
+    def _connect(self):
+        if self.conn is not None:
+            return self.conn
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            try:
+                self.conn = Client(self.address, connection_family(), authkey=self.authkey)
+                return self.conn
+            except (OSError, EOFError):
+                if not self.running:
+                    break
+                time.sleep(0.05)
+        self._disable("Render worker is not responding")
+        return None
+
+    def _send(self, op, **kwargs):
+        with self._send_lock:
+            conn = self.conn
+            if conn is None:
+                return None
+            self._next_id += 1
+            request_id = self._next_id
+            try:
+                conn.send(dict(kwargs, id=request_id, op=op))
+            except (OSError, ValueError) as e:
+                self._disable(f"Render worker connection failed: {e}")
+                return None
+        return request_id
+
+    def _receive(self, request_id):
+        """
+        Wait for the response to request_id.  Responses to earlier requests are discarded.
+        """
+        conn = self.conn
+        if conn is None:
+            return None
+        try:
+            while conn.poll(self.timeout):
+                reply = conn.recv()
+                if reply.get("id") == request_id:
+                    return reply
+        except (OSError, EOFError) as e:
+            self._disable(f"Render worker connection failed: {e}")
+            return None
+        self._disable("Render worker timed out")
+        return None
+
+    def _disable(self, message):
+        if self.verbose > 0:
+            print(message)
+        self.disabled = True
+        self._images = {}
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+        self.process = None
+        self.conn = None
+
+
+def watch_parent(parent_pid):
+    """
+    Exit the worker if the parent process exits.
+    """
+    while True:
+        time.sleep(2)
+        if os.getppid() != parent_pid:
+            os._exit(0)
+
+
+def main(argv=None):
+    """
+    Entry point for the worker process.
+
+    Returns:
+        int: Exit code.
+    """
+    parser = argparse.ArgumentParser(description="Preview render worker")
+    parser.add_argument("address", help="Socket address")
+    parser.add_argument("--warmup", nargs=2, metavar=("CONFIG", "DEM"), help="Preload a project")
+    parser.add_argument("--parent", type=int, default=None, help="Exit when this process exits")
+    args = parser.parse_args(argv)
+
+    key = os.environ.get(AUTHKEY_ENV)
+    if not key:
+        print(f"render_worker: {AUTHKEY_ENV} is not set", file=sys.stderr)
+        return 1
+
+    if args.parent:
+        threading.Thread(target=watch_parent, args=(args.parent,), daemon=True).start()
+
+    family = connection_family()
+    if family == "AF_UNIX" and os.path.exists(args.address):
+        os.remove(args.address)
+    listener = Listener(args.address, family, authkey=bytes.fromhex(key))
+
+    worker = RenderWorker()
+    if args.warmup:
+        worker.start_warmup(*args.warmup)
+
+    try:
+        worker.serve(listener)
+    finally:
+        listener.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -63,6 +63,8 @@ class AppSettingsPage(TabPage):
                 "VIEWER": ("Viewer", "combo", ['default', "QGIS", 'GIMP', 'Firefox', ], 180),
                 "LABEL3": ("", "label", None, 400),
                 "MULTI": ("Multiprocessor", "combo", ["multi", 'single'], 180),
+                "MAKE_JOBS": ("Make Jobs", "line_edit", r"^[1-9]$", 90),
+                "BUILD_JOBS": ("Build Jobs", "line_edit", r"^[1-9]$", 90),
                 "VERBOSE": ("Verbose", "combo", ["0", '1', '2'], 180),
                 "FONT_SIZE": ("Font Size", "line_edit", r"^\d{1,2}$", 90),
             }, "basic": {
@@ -0,0 +1,195 @@
+#  Copyright (c) 2024.
+#   Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the “Software”), to deal in the
+#   Software without restriction,
+#   including without limitation the rights to use, copy, modify, merge, publish, distribute,
+#   sublicense, and/or sell copies
+#   of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+#   the following conditions:
+#  #
+#   The above copyright notice and this permission notice shall be included in all copies or
+#   substantial portions of the Software.
+#  #
+#   THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+#   BUT NOT LIMITED TO THE
+#   WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO
+#   EVENT SHALL THE AUTHORS OR
+#   COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+#   CONTRACT, TORT OR
+#   OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#   DEALINGS IN THE SOFTWARE.
+#  #
+#   This uses QT for some components which has the primary open-source license is the GNU Lesser
+#   General Public License v. 3 (“LGPL”).
+#   With the LGPL license option, you can use the essential libraries and some add-on libraries
+#   of Qt.
+#   See https://www.qt.io/licensing/open-source-lgpl-obligations for QT details.
+"""
+Background monitor that keeps the up to date state of every layer's images.
+
+A QFileSystemWatcher watches the project folder, the elevation folder, and the config, color
+ramp, trigger, and image files.  Only folders and a few project files are watched, so elevation
+folders with thousands of tiles use a single watch.  A change restarts a short timer, so a burst
+of writes during a build produces one refresh, and the state is recomputed with BuildGraph.
+"""
+import os
+import time
+
+# Handle imports for PyQt6 versus PySide depending on which has been installed
+try:
+    from PySide6.QtCore import QFileSystemWatcher, QObject, QTimer, Signal
+except ImportError:
+    from PyQt6.QtCore import QFileSystemWatcher, QObject, QTimer, pyqtSignal as Signal
+
+from ColorReliefEditor import config_env
+from ColorReliefEditor.build_graph import layer_graphs
+
+# Milliseconds to wait after the last change before refreshing
+DEBOUNCE_MS = 500
+
+# Seconds of continuous changes (e.g. a long build) after which the state is refreshed anyway
+MAX_WAIT = 5.0
+
+
+class StaleMonitor(QObject):
+    """
+    Keeps the stale stages for each layer's relief image up to date as project files change.
+
+    **Methods**:
+        - set_project(config_path): Watch a project.
+        - stale(layer, target): Return the stale stages for a target.
+        - up_to_date(layer, target): Return True if a target is up to date.
+        - refresh(): Recompute the state now.
+        - stop(): Stop watching.
+
+    Attributes:
+        status_changed (Signal): Emitted when any layer's relief image changes between up to date
+            and out of date.
+        status (dict): Maps each layer name to the stale stages of its relief image.
+    """
+    status_changed = Signal()
+
+    def __init__(self, delay=DEBOUNCE_MS):
+        super().__init__()
+        self.status = {}
+        self.config_path = None
+        self._dem_folder = None
+        self._graphs = {}
+        self._results = {}
+        self._pending_since = None
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_change)
+        self._watcher.fileChanged.connect(self._on_change)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay)
+        self._timer.timeout.connect(self.refresh)
+
+    def set_project(self, config_path):
+        """
+        Watch the project for a config file and compute its state.
+
+        Args:
+            config_path (str): Path to <region>_relief.cfg.
+        """
+        self.stop()
+        self.config_path = config_path
+        self.refresh()
+
+    def stop(self):
+        """
+        Stop watching the current project.
+        """
+        self._timer.stop()
+        self._pending_since = None
+        paths = self._watcher.files() + self._watcher.directories()
+        if paths:
+            self._watcher.removePaths(paths)
+
+    def stale(self, layer, target=None):
+        """
+        Return the stages that must be rebuilt to make target.  Pending changes are applied
+        first, so the result is current.
+
+        Args:
+            layer (str): Layer name.
+            target (str, optional): Target file name. Defaults to the relief image.
+
+        Returns:
+            list of Stale: Stages to rebuild in build order (see BuildGraph.stale).
+
+        Raises:
+            ValueError: If no project is loaded or the layer or target is unknown.
+        """
+        if self._timer.isActive():
+            self.refresh()
+        graph = self._graphs.get(layer)
+        if graph is None:
+            raise ValueError(f"Unknown layer: {layer}")
+        key = (layer, target or graph.final)
+        if key not in self._results:
+            self._results[key] = graph.stale(target)
+        return self._results[key]
+
+    def up_to_date(self, layer, target=None):
+        """
+        Return True if target doesn't need to be rebuilt.
+        """
+        return not self.stale(layer, target)
+
+    def refresh(self):
+        """
+        Rebuild the graph for each layer from the config, recompute the state of each relief
+        image, and update the watched paths.  Emits status_changed if the state changed.
+        """
+        self._timer.stop()
+        self._pending_since = None
+        self._results = {}
+        if not self.config_path:
+            return
+        try:
+            values = config_env.load_values(self.config_path)
+        except (OSError, ValueError):
+            # Keep the previous graphs while the config is being rewritten
+            values = None
+
+        project_dir = os.path.dirname(os.path.abspath(self.config_path))
+        if values is not None:
+            self._dem_folder = os.path.join(project_dir, values.get("DEM_FOLDER", ""))
+            self._graphs = layer_graphs(self.config_path, values)
+
+        status = {layer: self.stale(layer) for layer in self._graphs}
+        self._watch(project_dir)
+        if status != self.status:
+            self.status = status
+            self.status_changed.emit()
+
+    def _watch(self, project_dir):
+        """
+        Watch the project and elevation folders, and the project files that exist.  Files that
+        were replaced are dropped by the watcher, so they are added again here.
+        """
+        paths = {project_dir, self.config_path, self._dem_folder}
+        for graph in self._graphs.values():
+            paths.update(os.path.join(project_dir, name) for name in graph.stages)
+            paths.update(os.path.dirname(os.path.join(project_dir, pattern))
+                         for pattern in graph.dem_files)
+        paths.discard(None)
+        watched = set(self._watcher.files() + self._watcher.directories())
+        new_paths = [path for path in paths if path not in watched and os.path.exists(path)]
+        if new_paths:
+            self._watcher.addPaths(new_paths)
+
+    def _on_change(self, _path):
+        """
+        Restart the refresh timer after a change.  During a long burst of changes the timer
+        is not restarted after MAX_WAIT, so the state still refreshes periodically.
+        """
+        now = time.monotonic()
+        if self._pending_since is None:
+            self._pending_since = now
+        elif now - self._pending_since > MAX_WAIT and self._timer.isActive():
+            return
+        self._timer.start()
@@ -0,0 +1,230 @@
+#  Copyright (c) 2024.
+#   Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the “Software”), to deal in the
+#   Software without restriction,
+#   including without limitation the rights to use, copy, modify, merge, publish, distribute,
+#   sublicense, and/or sell copies
+#   of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+#   the following conditions:
+#  #
+#   The above copyright notice and this permission notice shall be included in all copies or
+#   substantial portions of the Software.
+#  #
+#   THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+#   BUT NOT LIMITED TO THE
+#   WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO
+#   EVENT SHALL THE AUTHORS OR
+#   COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+#   CONTRACT, TORT OR
+#   OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#   DEALINGS IN THE SOFTWARE.
+#  #
+#   This uses QT for some components which has the primary open-source license is the GNU Lesser
+#   General Public License v. 3 (“LGPL”).
+#   With the LGPL license option, you can use the essential libraries and some add-on libraries
+#   of Qt.
+#   See https://www.qt.io/licensing/open-source-lgpl-obligations for QT details.
+"""
+Synthetic fractal terrain DEMs for benchmarks and tests.
+
+Terrain is multi-octave value noise: random heights on a lattice, smoothly interpolated, with
+each octave at half the cell size and a fraction (roughness) of the height of the previous one.
+Lattice heights are a hash of the lattice position and seed, so the terrain is generated in
+blocks of rows, with bounded memory at any size, and the same seed always gives the same DEM.
+Terrain below the sea level fraction is ocean and set to nodata.
+
+The DEM is written as raw pixels and a VRT (VRTRawRasterBand) that gives GDAL the size, data
+type, georeferencing (EPSG:4326, about 30 m pixels), and nodata value.  If the target is a .tif,
+gdal_translate converts it to a tiled GeoTIFF.  Only the GDAL command line tools are needed.
+
+Command line usage:
+    relief_benchmark generate [--type int16|float32] [--seed N] [--ocean F] SIZE TARGET
+"""
+import math
+import os
+import subprocess
+
+import numpy as np
+
+# Data types: numpy type (little endian), GDAL type name, nodata value
+DEM_TYPES = {
+    "int16": ("<i2", "Int16", -32768),
+    "float32": ("<f4", "Float32", -9999.0),
+}
+
+# Height of the highest terrain in meters
+MAX_ELEVATION = 4000.0
+
+# Degrees per pixel (1 arc second, about 30 m) and the northwest corner of the DEM
+PIXEL_SIZE = 1.0 / 3600
+ORIGIN = (-20.0, 60.0)
+
+# Rows generated at a time
+BLOCK_ROWS = 256
+
+VRT_TEMPLATE = """<VRTDataset rasterXSize="{width}" rasterYSize="{height}">
+  <SRS>EPSG:4326</SRS>
+  <GeoTransform>{x0}, {pixel}, 0.0, {y0}, 0.0, -{pixel}</GeoTransform>
+  <VRTRasterBand dataType="{gdal_type}" band="1" subClass="VRTRawRasterBand">
+    <NoDataValue>{nodata}</NoDataValue>
+    <SourceFilename relativeToVRT="1">{raw}</SourceFilename>
+    <ImageOffset>0</ImageOffset>
+    <PixelOffset>{pixel_bytes}</PixelOffset>
+    <LineOffset>{line_bytes}</LineOffset>
+    <ByteOrder>LSB</ByteOrder>
+  </VRTRasterBand>
+</VRTDataset>
+"""
+
+
+def parse_size(text):
+    """
+    Parse a DEM size such as "1000", "1k", or "40k" into pixels.
+    """
+    text = str(text).strip().lower()
+    scale = 1000 if text.endswith("k") else 1
+    try:
+        size = int(float(text.rstrip("k")) * scale)
+    except ValueError:
+        raise ValueError(f"Invalid DEM size: {text}")
+    if size < 16:
+        raise ValueError(f"DEM size must be at least 16: {text}")
+    return size
+
+
+def _hash(ix, iy, seed):
+    """
+    Return a value in [0, 1) for each lattice position.
+    """
+    with np.errstate(over="ignore"):
+        h = (ix.astype(np.uint32) * np.uint32(0x8DA6B343)) ^ (
+                iy.astype(np.uint32) * np.uint32(0xD8163841)) ^ np.uint32(
+            (seed * 0x9E3779B1) & 0xFFFFFFFF)
+        h ^= h >> np.uint32(15)
+        h *= np.uint32(0x2C1B3C6D)
+        h ^= h >> np.uint32(12)
+        h *= np.uint32(0x297A2D39)
+        h ^= h >> np.uint32(15)
+    return h.astype(np.float32) / np.float32(2 ** 32)
+
+
+def _axis(positions, cell):
+    """
+    Return the lattice index and smoothed fraction along one axis.
+    """
+    scaled = positions / cell
+    index = np.floor(scaled)
+    fraction = (scaled - index).astype(np.float32)
+    return index.astype(np.int64), fraction * fraction * (3 - 2 * fraction)
+
+
+def fractal_blocks(width, height, seed=0, roughness=0.5, block_rows=BLOCK_ROWS):
+    """
+    Generate fractal terrain in blocks of rows.
+
+    Args:
+        width (int): Width in pixels.
+        height (int): Height in pixels.
+        seed (int): Random seed.
+        roughness (float): Height of each octave relative to the previous one (0 - 1).
+        block_rows (int): Rows in each block.
+
+    Yields:
+        numpy.ndarray: float32 block of rows with values from 0 to 1.
+    """
+    base_cell = max(width, height) / 3.0
+    octaves = max(1, int(math.log2(base_cell)) - 1)
+    amplitudes = [roughness ** octave for octave in range(octaves)]
+    total = sum(amplitudes)
+    columns = np.arange(width, dtype=np.float64)
+
+    for row in range(0, height, block_rows):
+        rows = np.arange(row, min(row + block_rows, height), dtype=np.float64)
+        block = np.zeros((len(rows), width), dtype=np.float32)
+        for octave, amplitude in enumerate(amplitudes):
+            cell = base_cell / 2 ** octave
+            ix, fx = _axis(columns, cell)
+            iy, fy = _axis(rows, cell)
+            ix, fx, iy, fy = ix[None, :], fx[None, :], iy[:, None], fy[:, None]
+            octave_seed = seed * 31 + octave
+            top = _hash(ix, iy, octave_seed) * (1 - fx) + _hash(ix + 1, iy, octave_seed) * fx
+            bottom = (_hash(ix, iy + 1, octave_seed) * (1 - fx) +
+                      _hash(ix + 1, iy + 1, octave_seed) * fx)
+            block += np.float32(amplitude) * (top * (1 - fy) + bottom * fy)
+        yield block / np.float32(total)
+
+
+def elevation(values, sea_level, dem_type):
+    """
+    Convert fractal values (0 - 1) to elevations with ocean set to nodata.
+
+    Args:
+        values (numpy.ndarray): Fractal values.
+        sea_level (float): Values below this are ocean.
+        dem_type (str): "int16" or "float32".
+
+    Returns:
+        numpy.ndarray: Elevations in meters in the DEM data type.
+    """
+    numpy_type, _, nodata = DEM_TYPES[dem_type]
+    land = (values - sea_level) / max(1e-6, 1 - sea_level) * MAX_ELEVATION
+    land = np.where(values < sea_level, nodata, np.maximum(land, 0))
+    if numpy_type == "<i2":
+        land = np.rint(land)
+    return land.astype(numpy_type)
+
+
+def write_dem(target, size, dem_type="int16", seed=0, ocean=0.45, height=None):
+    """
+    Write a synthetic DEM.
+
+    Args:
+        target (str): Output path.  .vrt writes the raw DEM and VRT, .tif also converts them to a
+            GeoTIFF with gdal_translate.
+        size (int): Width in pixels.
+        dem_type (str): "int16" or "float32".
+        seed (int): Random seed.
+        ocean (float): Sea level as a fraction of the terrain range.  Terrain below is nodata.
+        height (int, optional): Height in pixels.  Defaults to size.
+
+    Returns:
+        str: target
+
+    Raises:
+        ValueError: If dem_type is unknown.
+        OSError: If the files can't be written or gdal_translate fails.
+    """
+    if dem_type not in DEM_TYPES:
+        raise ValueError(f"Unknown DEM type: {dem_type}")
+    numpy_type, gdal_type, nodata = DEM_TYPES[dem_type]
+    height = height or size
+    base, extension = os.path.splitext(target)
+    vrt = target if extension.lower() == ".vrt" else f"{base}_raw.vrt"
+    raw = f"{os.path.splitext(vrt)[0]}.raw"
+
+    with open(raw, "wb") as file:
+        for block in fractal_blocks(size, height, seed):
+            elevation(block, ocean, dem_type).tofile(file)
+
+    pixel_bytes = np.dtype(numpy_type).itemsize
+    with open(vrt, "w") as file:
+        file.write(VRT_TEMPLATE.format(
+            width=size, height=height, x0=ORIGIN[0], y0=ORIGIN[1], pixel=PIXEL_SIZE,
+            gdal_type=gdal_type, nodata=nodata, raw=os.path.basename(raw),
+            pixel_bytes=pixel_bytes, line_bytes=pixel_bytes * size
+        ))
+    if vrt == target:
+        return target
+
+    command = ["gdal_translate", "-q", "-of", "GTiff", "-co", "TILED=YES", "-co",
+               "COMPRESS=DEFLATE", "-co", "BIGTIFF=IF_SAFER", vrt, target]
+    try:
+        result = subprocess.run(command, stderr=subprocess.PIPE, text=True)
+    except FileNotFoundError:
+        raise OSError("gdal_translate not found")
+    finally:
+        for path in (vrt, raw):
+            os.remove(path)
+    if result.returncode != 0:
+        raise OSError(f"gdal_translate failed: {result.stderr.strip()}")
+    return target
@@ -292,6 +292,10 @@ class TabPage(QWidget):
         return None
 
 
+# Lines of history kept in output windows.  Older lines are dropped
+MAX_OUTPUT_LINES = 5000
+
+
 def create_readonly_window():
     """
     Create a read-only text window with a specified height and width, and set the background color.
@@ -306,6 +310,7 @@ def create_readonly_window():
 
     output_window = QPlainTextEdit()
     output_window.setReadOnly(True)
+    output_window.setMaximumBlockCount(MAX_OUTPUT_LINES)
 
     # Set size policy for expansion
     output_window.setSizePolicy(
@@ -0,0 +1,130 @@
+#  Copyright (c) 2024.
+#   Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the “Software”), to deal in the
+#   Software without restriction,
+#   including without limitation the rights to use, copy, modify, merge, publish, distribute,
+#   sublicense, and/or sell copies
+#   of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+#   the following conditions:
+#  #
+#   The above copyright notice and this permission notice shall be included in all copies or
+#   substantial portions of the Software.
+#  #
+#   THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+#   BUT NOT LIMITED TO THE
+#   WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO
+#   EVENT SHALL THE AUTHORS OR
+#   COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+#   CONTRACT, TORT OR
+#   OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#   DEALINGS IN THE SOFTWARE.
+#  #
+#   This uses QT for some components which has the primary open-source license is the GNU Lesser
+#   General Public License v. 3 (“LGPL”).
+#   With the LGPL license option, you can use the essential libraries and some add-on libraries
+#   of Qt.
+#   See https://www.qt.io/licensing/open-source-lgpl-obligations for QT details.
+"""
+Tile scheduler for full-resolution rendering on multiple cores.
+
+gdaldem and gdal_calc.py use a single core.  The scheduler splits a raster into blocks and runs
+a block job on each one, either in-process or on a pool of worker processes.  A job reads its
+own input for each block, including a halo of neighboring pixels for neighborhood operators such
+as hillshade, so every block is computed from exactly the same data as in the serial path and
+results are identical regardless of worker count or completion order.
+
+Jobs are objects with a `process(window)` method that returns a tuple of arrays for the window.
+They are pickled to each worker process once, so they should open their input files lazily.
+"""
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+
+# Blocks queued per worker.  Limits memory used by results waiting to be written
+QUEUE_DEPTH = 2
+
+# The job for this worker process (set by _init_worker)
+_job = None
+
+
+def resolve_workers(value):
+    """
+    Parse the WORKERS setting.
+
+    Args:
+        value (str or int): Number of worker processes.  Blank, 0, or ALL_CPUS uses all CPUs.
+
+    Returns:
+        int: Number of worker processes (at least 1).
+
+    Raises:
+        ValueError: If the value is not a number or ALL_CPUS.
+    """
+    text = str(value if value is not None else "").strip()
+    if text in ("", "0", "ALL_CPUS"):
+        return os.cpu_count() or 1
+    try:
+        workers = int(text)
+    except ValueError:
+        raise ValueError(f"Invalid WORKERS: '{value}'. Use a number or ALL_CPUS")
+    return max(1, workers)
+
+
+def _init_worker(job):
+    global _job
+    _job = job
+
+
+def _process(window):
+    return window, _job.process(window)
+
+
+def run_blocks(job, windows, workers=1, on_result=None):
+    """
+    Run a job on each window.
+
+    Args:
+        job: Object with process(window) returning a tuple of arrays.
+        windows (list): Windows as (x_offset, y_offset, width, height).
+        workers (int): Number of worker processes. 1 runs in this process.
+        on_result (callable, optional): Called as on_result(window, result) in this process
+            as each block finishes.  Blocks may finish in any order.
+
+    Raises:
+        RuntimeError: If a worker process fails.
+        Exceptions raised by job.process are re-raised.
+    """
+    windows = list(windows)
+    on_result = on_result or (lambda window, result: None)
+
+    if workers <= 1 or len(windows) < 2:
+        for window in windows:
+            on_result(window, job.process(window))
+        return
+
+    # Spawned workers don't inherit GDAL state or threads from this process
+    context = multiprocessing.get_context("spawn")
+    workers = min(workers, len(windows))
+    remaining = iter(windows)
+    pending = set()
+    try:
+        with ProcessPoolExecutor(
+                max_workers=workers, mp_context=context, initializer=_init_worker,
+                initargs=(job,)
+        ) as pool:
+            def fill():
+                for window in remaining:
+                    pending.add(pool.submit(_process, window))
+                    if len(pending) >= workers * QUEUE_DEPTH:
+                        return
+
+            fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    on_result(*future.result())
+                fill()
+    except BrokenProcessPool as e:
+        raise RuntimeError(f"Worker process failed: {e}")
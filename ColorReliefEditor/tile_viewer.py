@@ -0,0 +1,473 @@
+#  Copyright (c) 2024.
+#   Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the “Software”), to deal in the
+#   Software without restriction,
+#   including without limitation the rights to use, copy, modify, merge, publish, distribute,
+#   sublicense, and/or sell copies
+#   of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+#   the following conditions:
+#  #
+#   The above copyright notice and this permission notice shall be included in all copies or
+#   substantial portions of the Software.
+#  #
+#   THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+#   BUT NOT LIMITED TO THE
+#   WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO
+#   EVENT SHALL THE AUTHORS OR
+#   COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+#   CONTRACT, TORT OR
+#   OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#   DEALINGS IN THE SOFTWARE.
+#  #
+#   This uses QT for some components which has the primary open-source license is the GNU Lesser
+#   General Public License v. 3 (“LGPL”).
+#   With the LGPL license option, you can use the essential libraries and some add-on libraries
+#   of Qt.
+#   See https://www.qt.io/licensing/open-source-lgpl-obligations for QT details.
+"""
+Zoom and pan viewer for full size reliefs.
+
+A relief can be 40k x 40k pixels, far too large to decode into one image.  TileViewer shows it as
+a pyramid of 512 pixel tiles.  Level 0 is full size and each level above it is half the size of
+the one below.  Only the tiles in view are decoded, at the level that matches the zoom, and
+decoded tiles are kept in an LRU cache with a memory budget.  Tiles next to the view are decoded
+ahead of time on a thread pool so panning shows them without waiting.  The whole image at the
+coarsest level stays behind the tiles so there is always something to see while tiles load.
+
+Tiles are read with the GDAL Python bindings, which use the overviews in the file (see COG).
+Without GDAL, only the overview levels small enough for Qt to decode whole are available.
+"""
+from collections import OrderedDict
+import math
+import threading
+
+# Handle imports for PyQt6 versus PySide depending on which has been installed
+try:
+    from PySide6.QtCore import QObject, QRectF, QRunnable, Qt, QThreadPool, QTimer, Signal
+    from PySide6.QtGui import QImageReader, QPainter, QPixmap
+    from PySide6.QtWidgets import QGraphicsScene, QGraphicsView
+except ImportError:
+    from PyQt6.QtCore import (QObject, QRectF, QRunnable, Qt, QThreadPool, QTimer,
+                              pyqtSignal as Signal)
+    from PyQt6.QtGui import QImageReader, QPainter, QPixmap
+    from PyQt6.QtWidgets import QGraphicsScene, QGraphicsView
+
+from ColorReliefEditor import image_loader
+from ColorReliefEditor.geotiff import Directory, image_levels
+from ColorReliefEditor.image_loader import GEOTIFF_WARNING, filter_stderr, gdal_image
+
+TILE_SIZE = 512
+
+# Memory budget for decoded tiles in megabytes
+TILE_CACHE_MB = 256
+
+# Threads that decode tiles
+TILE_THREADS = 4
+
+# Tiles beyond the edge of the view to decode ahead of time
+PREFETCH_TILES = 1
+
+# Milliseconds to wait after a scroll or zoom before requesting tiles
+UPDATE_MS = 30
+
+# Largest level Qt decodes whole when GDAL isn't available (pixels)
+QT_MAX_PIXELS = 64 * 1024 * 1024
+
+# Zoom for each wheel step, and the most a full size pixel is enlarged
+WHEEL_ZOOM = 1.25
+MAX_ZOOM = 8.0
+
+# Thread pool priorities
+VISIBLE_PRIORITY = 1
+PREFETCH_PRIORITY = 0
+
+
+class GdalTileSource:
+    """
+    Reads tiles with GDAL.  Each thread opens its own dataset since GDAL datasets can't be
+    shared between threads.
+
+    Attributes:
+        width (int): Full size width.
+        height (int): Full size height.
+        levels (list of float): Scale factor of each level.  Level 0 is 1.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        dataset = self.dataset()
+        self.width, self.height = dataset.RasterXSize, dataset.RasterYSize
+        self.levels = [1.0]
+        while max(self.width, self.height) / self.levels[-1] > TILE_SIZE:
+            self.levels.append(self.levels[-1] * 2)
+
+    def dataset(self):
+        dataset = getattr(self._local, "dataset", None)
+        if dataset is None:
+            dataset = image_loader.gdal.Open(self.path)
+            if dataset is None:
+                raise OSError(f"Cannot open {self.path}")
+            self._local.dataset = dataset
+        return dataset
+
+    def read_tile(self, level, tx, ty):
+        """
+        Return a tile as a QImage, or None if it can't be read.
+        """
+        factor = self.levels[level]
+        span = TILE_SIZE * factor
+        x_off, y_off = int(tx * span), int(ty * span)
+        width = min(int(span), self.width - x_off)
+        height = min(int(span), self.height - y_off)
+        if width <= 0 or height <= 0:
+            return None
+        out_size = (max(1, math.ceil(width / factor)), max(1, math.ceil(height / factor)))
+        return gdal_image(self.dataset(), (x_off, y_off, width, height), out_size)
+
+
+class QtTileSource:
+    """
+    Reads tiles from the TIFF overviews Qt can decode whole.  The most recently decoded level
+    is kept to cut tiles from.
+
+    Attributes:
+        width (int): Full size width.
+        height (int): Full size height.
+        levels (list of float): Scale factor of each available level.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        tiff_levels = image_levels(path)
+        if not tiff_levels:
+            reader = QImageReader(path)
+            size = reader.size()
+            if size.width() <= 0:
+                raise OSError(f"Cannot open {path}")
+            tiff_levels = [Directory(0, size.width(), size.height(), 0)]
+        self.width, self.height = tiff_levels[0].width, tiff_levels[0].height
+        self._tiff_levels = [level for level in tiff_levels if
+                             level.width * level.height <= QT_MAX_PIXELS]
+        if not self._tiff_levels:
+            raise OSError("Viewing an image without small overviews needs the GDAL Python "
+                          "bindings")
+        self.levels = [self.width / level.width for level in self._tiff_levels]
+        self._lock = threading.Lock()
+        self._decoded = (None, None)
+
+    def read_tile(self, level, tx, ty):
+        """
+        Return a tile as a QImage, or None if it can't be read.
+        """
+        with self._lock:
+            index, image = self._decoded
+            if index != level:
+                reader = QImageReader(self.path)
+                if self._tiff_levels[level].index > 0:
+                    reader.jumpToImage(self._tiff_levels[level].index)
+                with filter_stderr(GEOTIFF_WARNING):
+                    image = reader.read()
+                self._decoded = (level, image)
+        x_off, y_off = tx * TILE_SIZE, ty * TILE_SIZE
+        width = min(TILE_SIZE, image.width() - x_off)
+        height = min(TILE_SIZE, image.height() - y_off)
+        if image.isNull() or width <= 0 or height <= 0:
+            return None
+        return image.copy(x_off, y_off, width, height)
+
+
+def open_source(path):
+    """
+    Open an image for tiled reading, with GDAL if the bindings are installed.
+
+    Raises:
+        OSError: If the image can't be read.
+    """
+    if image_loader.gdal is not None:
+        try:
+            return GdalTileSource(path)
+        except OSError:
+            pass
+    return QtTileSource(path)
+
+
+class TileCache:
+    """
+    Decoded tiles, least recently used first, within a memory budget.
+
+    **Methods**:
+        - get(key): Return a tile and mark it as used, or None.
+        - put(key, pixmap): Add a tile, evicting the least recently used tiles over the budget.
+        - clear(): Remove all tiles.
+    """
+
+    def __init__(self, budget_mb=TILE_CACHE_MB):
+        self.budget = budget_mb * 1024 * 1024
+        self.size = 0
+        self._tiles = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._tiles
+
+    def __len__(self):
+        return len(self._tiles)
+
+    def get(self, key):
+        pixmap = self._tiles.get(key)
+        if pixmap is not None:
+            self._tiles.move_to_end(key)
+        return pixmap
+
+    def put(self, key, pixmap):
+        if key in self._tiles:
+            self.size -= self._bytes(self._tiles.pop(key))
+        self._tiles[key] = pixmap
+        self.size += self._bytes(pixmap)
+        while self.size > self.budget and len(self._tiles) > 1:
+            _, evicted = self._tiles.popitem(last=False)
+            self.size -= self._bytes(evicted)
+
+    def clear(self):
+        self._tiles.clear()
+        self.size = 0
+
+    @staticmethod
+    def _bytes(pixmap):
+        return pixmap.width() * pixmap.height() * 4
+
+
+class TileSignals(QObject):
+    """
+    Signals for TileTask. QRunnable can't emit signals itself.
+
+    Attributes:
+        loaded (Signal): Emitted with the tile source, key, and QImage (None on error).
+    """
+    loaded = Signal(object, object, object)
+
+
+class TileTask(QRunnable):
+    """
+    Decodes one tile on a thread pool thread.
+    """
+
+    def __init__(self, viewer, source, key):
+        super().__init__()
+        self.viewer = viewer
+        self.source = source
+        self.key = key
+        self.signals = viewer.signals
+
+    def run(self):
+        # Skip tiles that have scrolled out of view while waiting in the queue
+        if self.source is not self.viewer.source or self.key not in self.viewer.wanted:
+            self.signals.loaded.emit(self.source, self.key, None)
+            return
+        try:
+            image = self.source.read_tile(*self.key)
+        except Exception:
+            # Report any failure as a missing tile rather than ending the thread
+            image = None
+        self.signals.loaded.emit(self.source, self.key, image)
+
+
+class TileViewer(QGraphicsView):
+    """
+    Zoom and pan viewer for images of any size.  Scroll or drag to pan, and use the wheel to
+    zoom.
+
+    Attributes:
+        source (GdalTileSource or QtTileSource): The open image, or None.
+        cache (TileCache): Decoded tiles.
+        wanted (set): Keys (level, tx, ty) of the tiles in and next to the view.
+
+    **Methods**:
+        - open(path): Show an image.  Reopens it if the file has changed.
+        - close(): Remove the image.
+        - fit(): Zoom to show the whole image.
+        - level_for_scale(scale): Return the pyramid level for a zoom.
+    """
+
+    def __init__(self, parent=None, budget_mb=TILE_CACHE_MB, threads=TILE_THREADS):
+        super().__init__(parent)
+        self.setScene(QGraphicsScene(self))
+        self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        self.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        self.setBackgroundBrush(Qt.GlobalColor.darkGray)
+
+        self.source = None
+        self.path = None
+        self.modified = None
+        self.cache = TileCache(budget_mb)
+        self.wanted = set()
+        self.pending = set()
+        self.items = {}
+        self.background = None
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(threads)
+        self.signals = TileSignals()
+        self.signals.loaded.connect(self._on_loaded)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(UPDATE_MS)
+        self.timer.timeout.connect(self._update_tiles)
+
+    def open(self, path, modified=None):
+        """
+        Show an image.  Nothing is reloaded if the same file is already shown.
+
+        Args:
+            path (str): Image file.
+            modified (float, optional): File modification time.  A change reopens the file.
+
+        Returns:
+            str: An error message, or None if the image is shown.
+        """
+        if self.source and path == self.path and modified == self.modified:
+            return None
+        self.close()
+        try:
+            self.source = open_source(path)
+        except OSError as e:
+            return str(e)
+        self.path, self.modified = path, modified
+        self.scene().setSceneRect(QRectF(0, 0, self.source.width, self.source.height))
+        self.fit()
+        return None
+
+    def close(self):
+        """
+        Remove the image and drop its tiles.
+        """
+        self.source = None
+        self.path = self.modified = None
+        self.wanted = set()
+        self.pending = set()
+        self.items = {}
+        self.background = None
+        self.cache.clear()
+        self.scene().clear()
+
+    def fit(self):
+        """
+        Zoom to show the whole image.
+        """
+        if self.source:
+            self.fitInView(self.scene().sceneRect(), Qt.AspectRatioMode.KeepAspectRatio)
+            self._schedule()
+
+    def level_for_scale(self, scale):
+        """
+        Return the coarsest level with at least one image pixel for each screen pixel.
+
+        Args:
+            scale (float): Screen pixels per full size pixel.
+        """
+        level = 0
+        for index, factor in enumerate(self.source.levels):
+            if factor * scale <= 1.0:
+                level = index
+        return level
+
+    def wheelEvent(self, event):
+        if not self.source:
+            return
+        steps = event.angleDelta().y() / 120
+        zoom = WHEEL_ZOOM ** steps
+        scale = self.transform().m11() * zoom
+        fit_scale = min(self.viewport().width() / self.source.width,
+                        self.viewport().height() / self.source.height)
+        if scale > MAX_ZOOM or scale < fit_scale / 2:
+            return
+        self.scale(zoom, zoom)
+        self._schedule()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._schedule()
+
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        self._schedule()
+
+    def _schedule(self):
+        if self.source and not self.timer.isActive():
+            self.timer.start()
+
+    def _tiles(self, level, rect, margin=0):
+        """
+        Return the keys of the tiles at level that cover a scene rectangle, plus margin tiles.
+        """
+        span = TILE_SIZE * self.source.levels[level]
+        columns = math.ceil(self.source.width / span)
+        rows = math.ceil(self.source.height / span)
+        first_x = max(0, int(rect.left() // span) - margin)
+        last_x = min(columns - 1, int(rect.right() // span) + margin)
+        first_y = max(0, int(rect.top() // span) - margin)
+        last_y = min(rows - 1, int(rect.bottom() // span) + margin)
+        return [(level, tx, ty) for ty in range(first_y, last_y + 1)
+                for tx in range(first_x, last_x + 1)]
+
+    def _update_tiles(self):
+        if not self.source:
+            return
+        scale = self.transform().m11() * self.devicePixelRatioF()
+        level = self.level_for_scale(scale)
+        coarsest = len(self.source.levels) - 1
+        rect = self.mapToScene(self.viewport().rect()).boundingRect().intersected(
+            self.scene().sceneRect()
+        )
+        background = self._tiles(coarsest, self.scene().sceneRect())
+        visible = self._tiles(level, rect)
+        prefetch = [key for key in self._tiles(level, rect, PREFETCH_TILES) if
+                    key not in visible]
+        self.wanted = set(background) | set(visible) | set(prefetch)
+
+        # Remove tiles that are out of view or at another level
+        for key in list(self.items):
+            if key[0] != coarsest and (key[0] != level or key not in visible):
+                self.scene().removeItem(self.items.pop(key))
+
+        for key in background + visible:
+            pixmap = self.cache.get(key)
+            if pixmap is not None:
+                self._show(key, pixmap)
+            else:
+                self._request(key, VISIBLE_PRIORITY)
+        for key in prefetch:
+            if key not in self.cache:
+                self._request(key, PREFETCH_PRIORITY)
+
+    def _request(self, key, priority):
+        if key not in self.pending:
+            self.pending.add(key)
+            self.pool.start(TileTask(self, self.source, key), priority)
+
+    def _show(self, key, pixmap):
+        if key in self.items:
+            return
+        level, tx, ty = key
+        factor = self.source.levels[level]
+        item = self.scene().addPixmap(pixmap)
+        item.setPos(tx * TILE_SIZE * factor, ty * TILE_SIZE * factor)
+        item.setScale(factor)
+        item.setTransformationMode(Qt.TransformationMode.SmoothTransformation)
+        # Finer levels are drawn over the background
+        item.setZValue(len(self.source.levels) - level)
+        self.items[key] = item
+
+    def _on_loaded(self, source, key, image):
+        if source is not self.source:
+            return
+        self.pending.discard(key)
+        if image is None or image.isNull():
+            return
+        pixmap = QPixmap.fromImage(image)
+        self.cache.put(key, pixmap)
+        if key in self.wanted:
+            # Show it if it is still in view.  Prefetched tiles wait in the cache
+            self._schedule()
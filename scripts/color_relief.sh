@@ -33,6 +33,7 @@ ERROR_GDAL_CALC_FAILED=113
 ERROR_INVALID_PREVIEW_SHIFT=114
 ERROR_GDALBUILDVRT=115
 ERROR_GDAL_CONTOUR_FAILED=116
+ERROR_COG_FAILED=117
 
 # Define color codes
 YELLOW="\033[33m"
@@ -50,6 +51,7 @@ RESET="\033[0m"
 ##   -  --create_color_relief <region>: Generates a color relief image from a DEM file using a specified color ramp.
 ##   -  --create_hillshade <region>: Produces a hillshade image from a DEM file with configurable parameters.
 ##   -  --merge_hillshade <region>: Combines color relief and hillshade images into a single relief image.
+##   -  --create_relief <region>: Creates the final relief from the DEM in one fused pass (PIPELINE: fused).
 ##   -  --preview_dem <region>: Extracts a small section from the merged DEM file for preview generation.
 ##   -  --create_proxy region, layer, name : Creates a proxy file
 ##
@@ -68,9 +70,18 @@ RESET="\033[0m"
 ## - gdalbuildvrt  $vrt_flag "$target" $file_list
 ## - gdalwarp $warp_flags "$input_file" "$target"
 ## - gdaldem color-relief $gdaldem_flags "$dem_file" "${region}_color_ramp.txt" “$target"
+## - relief_engine color-relief --flags="$gdaldem_flags $color_flags" "$dem_file" "${region}_color_ramp.txt" “$target" (ENGINE: numpy)
 ## - gdaldem hillshade $gdaldem_flags $hillshade_flags $quiet "$dem_file" “$target"
 ## - gdal_calc.py -A "$color_file" -B "$hillshade_file" --A_band="$band" —B_band=1 --calc=“$merge_calc" $merge_flags --overwrite —outfile="$target"
 ## - gdal_merge.py $compress -separate -o "$target" $rgb_bands
+## - relief_engine hillshade --flags="$hillshade_flags" --workers="$workers" "$dem_file" “$target" (ENGINE: numpy)
+## - relief_engine merge --calc="$merge_calc" --brightness="$brightness" --gamma="$gamma" --workers="$workers" "$color_file" "$hillshade_file" “$target" (ENGINE: numpy)
+## - relief_engine calc --brightness="$brightness" --gamma="$gamma" "$merge_calc" (applies the hillshade tone in the gdal_calc.py merge)
+## - relief_config "$config" "$env_file"  (parses the config once, see load_config)
+## - relief_cache restore|store "$config" stage "$target" (build cache, see restore_cached)
+## - relief_progress --stage="$stage" --layer="$layer" --input="$input" -- command (progress events when RELIEF_PROGRESS is set, see run_stage)
+## - relief_telemetry record --stage="$stage" --layer="$layer" --input="$input" --output="$target" "$config" -- command (stage telemetry, see run_stage)
+## - relief_engine relief --color_flags="$color_flags" --hillshade_flags="$hillshade_flags" --brightness="$brightness" --gamma="$gamma" --calc="$merge_calc" "$dem_file" "${region}_color_ramp.txt" “$target" (PIPELINE: fused)
 ##
 # UTILITY FUNCTIONS:
 
@@ -84,14 +95,15 @@ display_help() {
   echo "2. --create_color_relief <region>: Creates a color relief image from a DEM file using a specified color ramp."
   echo "3. --create_hillshade <region>: Generates a hillshade image from a DEM file with specified hillshade parameters."
   echo "4. --merge_hillshade <region>: Merges a color relief image and a hillshade image into a single relief image."
-  echo "5. --doc: Generates documentation in docs/source/color_relief.rst"
+  echo "5. --create_relief <region>: Creates the final relief image from the DEM in one pass (color, hillshade, and merge)."
+  echo "6. --doc: Generates documentation in docs/source/color_relief.rst"
   exit $ERROR_HELP
 }
 ##
 ## Function: init():
 ##
 ##    Initializes essential variables for the region and layer.
-##    Verifies the config file exists and key utilities are available (yq, gdal)
+##    Verifies the config file exists and key utilities are available (gdal, relief_config or yq)
 ##    Sets quiet mode, file ending, and dem_file name
 ##      Args:
 ##        $1:
@@ -105,7 +117,6 @@ init() {
   set -e
   # Check that these commands are available
   check_command "gdaldem" $ERROR_MISSING_UTILITY
-  check_command "yq" $ERROR_MISSING_UTILITY
   check_command "bc" $ERROR_MISSING_UTILITY
 
   # Store the  working directory
@@ -122,6 +133,9 @@ init() {
     exit $ERROR_CONFIG_NOT_FOUND
   fi
 
+  # Parse the config once instead of running yq for every key
+  load_config
+
   # Set quiet flag and file suffix based on "preview"
   if [ "$3" = "preview" ]; then
     suffix="_prv"
@@ -225,6 +239,32 @@ format_compression_flag() {
   esac
 }
 
+## Function: load_config
+## Loads all config settings as CFG_<KEY> shell variables (nested keys as CFG_<KEY>__<SUBKEY>).
+## relief_config parses the config once and writes "${region}_relief_env.sh", which is reused
+## until the config is newer.  If relief_config is not available, optional_flag falls back to yq.
+##
+load_config() {
+  config_loaded=""
+  env_file="${config%.cfg}_env.sh"
+
+  if ! command -v relief_config > /dev/null 2>&1; then
+    check_command "yq" $ERROR_MISSING_UTILITY
+    return 0
+  fi
+
+  if [ ! -f "$env_file" ] || [ "$config" -nt "$env_file" ]; then
+    if ! relief_config "$config" "$env_file"; then
+      echo "relief_config failed. Using yq for config settings." >&2
+      check_command "yq" $ERROR_MISSING_UTILITY
+      return 0
+    fi
+  fi
+
+  . "$env_file"
+  config_loaded="yes"
+}
+
 ## Function: optional_flag
 ## Retrieve an optional flag from the YAML configuration file.
 ##  Args:
@@ -242,6 +282,17 @@ optional_flag() {
   key="$1"
   yml_value=""
 
+  # Use the settings loaded by load_config if available.  Nested keys use __ instead of .
+  if [ "$config_loaded" = "yes" ]; then
+    case "$key" in
+      *.*) var_name="CFG_${key%%.*}__${key#*.}" ;;
+      *) var_name="CFG_${key}" ;;
+    esac
+    eval "yml_value=\${${var_name}-}"
+    echo "$yml_value"
+    return 0
+  fi
+
   # Run yq to extract YML key/value from config file
   yml_value=$(eval "yq \".${key}\" \"$config\"")
 
@@ -305,6 +356,125 @@ get_flags() {
 }
 
 
+## Function: get_engine
+## Echos the raster engine to use: "numpy" for relief_engine or "gdal" for gdaldem.
+## The ENGINE environment variable (e.g. make ENGINE=numpy) overrides the ENGINE config setting.
+##
+get_engine() {
+  engine="${ENGINE:-$(optional_flag "ENGINE")}"
+  echo "${engine:-gdal}"
+}
+
+## Function: get_workers
+## Echos the number of relief_engine worker processes from WORKERS (blank or ALL_CPUS is all
+## cores). Previews are small, so they use a single process.  The WORKERS environment variable
+## overrides the config setting (used to share cores when layers are built at the same time).
+##
+get_workers() {
+  if [ "$suffix" = "_prv" ]; then
+    echo "1"
+  else
+    echo "${WORKERS:-$(optional_flag "WORKERS")}"
+  fi
+}
+
+## Function: run_stage
+## Runs a stage command.  When RELIEF_PROGRESS is set (the editor sets it) and relief_progress is
+## installed, relief_progress runs the command and reports its progress as "@progress" lines
+## with an estimated time remaining.  When TELEMETRY is on, relief_telemetry records the
+## time, CPU, memory, and I/O of the stage in ${region}_telemetry.jsonl.
+##  Args:
+##   $1: Stage (init_dem, set_crs, preview_dem, color, hillshade, merge, relief, contour, or cog)
+##   $2: Input file, used to estimate the time remaining
+##   $3: Target file
+##   $4: Command
+##
+run_stage() {
+  stage_cmd="$4"
+  if [ -n "$RELIEF_PROGRESS" ] && command -v relief_progress > /dev/null 2>&1; then
+    progress_quiet=""
+    [ "$quiet" = "-q" ] && progress_quiet="--quiet"
+    stage_cmd="relief_progress $progress_quiet --stage=\"$1\" --layer=\"$layer\" --input=\"$2\" -- $stage_cmd"
+  fi
+  if [ "$(optional_flag "TELEMETRY")" = "on" ] && command -v relief_telemetry > /dev/null 2>&1; then
+    telemetry_preview=""
+    [ "$suffix" = "_prv" ] && telemetry_preview="--preview"
+    stage_cmd="relief_telemetry record $telemetry_preview --stage=\"$1\" --layer=\"$layer\" --input=\"$2\" --output=\"$3\" \"$config\" -- $stage_cmd"
+  fi
+  eval "$stage_cmd"
+}
+
+## Function: write_cog
+## Rewrites a full size image as a Cloud-Optimized GeoTIFF when the COG setting covers it: internal
+## 512 pixel tiles and an overview pyramid, compressed with COMPRESS.  Overviews are built with
+## WORKERS threads and resampled with COG_RESAMPLING.  Preview images are not changed.
+##  Args:
+##   $1: Image (relief, color, or hillshade)
+##   $2: Image file
+##
+## YML Config Settings:
+##   COG - off, relief (the final relief only), or all (relief, color, and hillshade)
+##   COG_RESAMPLING - overview resampling: average, bilinear, cubic, lanczos, or nearest
+##
+write_cog() {
+  [ "$suffix" = "_prv" ] && return 0
+  case "$(optional_flag "COG")" in
+    all) ;;
+    relief) [ "$1" = "relief" ] || return 0 ;;
+    *) return 0 ;;
+  esac
+  check_command "gdal_translate" $ERROR_MISSING_UTILITY
+
+  cog_resampling=$(optional_flag "COG_RESAMPLING")
+  cog_file="${2%.*}_cog.tif"
+  rm -f "$cog_file"
+  cmd="gdal_translate $quiet -of COG -co BLOCKSIZE=512 -co BIGTIFF=IF_SAFER -co NUM_THREADS=$(get_workers) -co RESAMPLING=${cog_resampling:-average} $(get_flags "COMPRESS") \"$2\" \"$cog_file\""
+  echo "$cmd" >&2
+  echo >&2
+  if ! run_stage cog "$2" "$cog_file" "$cmd" || ! mv -f "$cog_file" "$2"; then
+    rm -f "$cog_file" "$2"
+    echo_error "Cloud-Optimized GeoTIFF creation failed. ❌" >&2
+    exit $ERROR_COG_FAILED
+  fi
+}
+
+## Function: restore_cached
+## Restores the target from the build cache if it was already built from identical inputs
+## (see relief_cache).  The cache is skipped if relief_cache is not installed or BUILD_CACHE is off.
+## Previews are small and quick to rebuild, so only the preview DEM is cached.  It is read from the
+## full DEM, and a cache check costs more than building the other preview stages.
+##  Args:
+##   $1: Stage (dem, color, hillshade, merge, or relief)
+##   $2: Target file
+##  Returns 0 if the target was restored
+##
+restore_cached() {
+  if [ "$(optional_flag "BUILD_CACHE")" = "off" ] || ! command -v relief_cache > /dev/null 2>&1; then
+    return 1
+  fi
+  [ "$suffix" = "_prv" ] && [ "$1" != "dem" ] && return 1
+  cache_preview=""
+  [ "$suffix" = "_prv" ] && cache_preview="--preview"
+  relief_cache restore $cache_preview "$config" "$1" "$2"
+}
+
+## Function: store_cached
+## Adds a newly built target to the build cache.  A cache failure does not fail the build.
+## As for restore_cached, the only preview that is cached is the preview DEM.
+##  Args:
+##   $1: Stage (dem, color, hillshade, merge, or relief)
+##   $2: Target file
+##
+store_cached() {
+  if [ "$(optional_flag "BUILD_CACHE")" = "off" ] || ! command -v relief_cache > /dev/null 2>&1; then
+    return 0
+  fi
+  [ "$suffix" = "_prv" ] && [ "$1" != "dem" ] && return 0
+  cache_preview=""
+  [ "$suffix" = "_prv" ] && cache_preview="--preview"
+  relief_cache store $cache_preview "$config" "$1" "$2" || echo "Unable to add $2 to build cache" >&2
+}
+
 ## Function: verify_files
 ## Verifies that each file in parameters exists.
 ## If any file is missing exit with an error.
@@ -350,36 +520,13 @@ set_crs() {
     echo "gdalwarp $warp_flags $quiet  $input_file $targ" >&2
     ls $input_file
     echo >&2
-    if ! gdalwarp $warp_flags $quiet  "$input_file" "$targ"; then
+    if ! run_stage set_crs "$input_file" "$targ" "gdalwarp $warp_flags $quiet \"$input_file\" \"$targ\""; then
       echo_error "gdalwarp failed. ❌" >&2
       exit $ERROR_GDALWARP_FAILED
     fi
   fi
 }
 
-## Function: adjust_brightness
-## Adjusts the brightness of an image
-## Variables:
-##   $brightness: between .7 and 1.5.  Higher is brighter.  1 is no change
-##   $target: image file to adjust
-##
-adjust_brightness() {
-  brightness=$(get_flags  "BRIGHTNESS" )
-  bright_flag="uint8(clip(((A / 255.) * $brightness) * 255, 1, 254))"
-  bright_calc="$bright_flag"  # Assign the final calculation string
-
-  if [ -n "$brightness" ] && [ "$(echo "$brightness != 1" | bc)" -eq 1 ]; then
-    echo "Adjusting brightness to $brightness for $target..." >&2
-
-    brightness_temp="${target%.tif}_brightness.tif"  # Temporary file for brightness adjustment
-    echo gdal_calc.py -A "$target" --outfile="$brightness_temp" $long_quiet --calc="$bright_calc" >&2
-
-    gdal_calc.py -A "$target" --outfile="$brightness_temp" $long_quiet --calc="$bright_calc" --type=Byte --overwrite
-    # Rename brightness-adjusted file back to the target
-    mv "$brightness_temp" "$target"
-  fi
-}
-
 ## Function: create_preview_dem
 ## Extracts a smaller DEM file from input file for preview images. The Preview location
 ## is controlled by x_shift, y_shift
@@ -438,7 +585,8 @@ create_preview_dem() {
 
   # Create the preview using gdal_translate
   echo gdal_translate $quiet -srcwin "$x_offset" "$y_offset" "$preview_size" "$preview_size" "$input_file" "$targ" >&2
-  gdal_translate $quiet -srcwin "$x_offset" "$y_offset" "$preview_size" "$preview_size" "$input_file" "$targ"
+  run_stage preview_dem "$input_file" "$targ" \
+    "gdal_translate $quiet -srcwin $x_offset $y_offset $preview_size $preview_size \"$input_file\" \"$targ\""
 }
 
 
@@ -448,7 +596,7 @@ create_preview_dem() {
 ##              $1 is region name
 ##              $2 is layer name
 ## YML Config Settings:
-##   LAYER - The active layer_id (A-G).  (Different from layer name)
+##   LAYER - The active layer_id (A-G).  (Different from layer name).  LAYER_ID environment overrides
 ##   FILES.layer_id - The file names for the active layer
 ##
 init_dem() {
@@ -458,8 +606,9 @@ init_dem() {
   # Get GDAL switches from YML config
   vrt_flag=$(optional_flag    "VRT")
 
-  # Get file list for DEM files.  layer_id is (A-G) not the layer text name
-  layer_id=$(mandatory_flag  "LAYER")
+  # Get file list for DEM files.  layer_id is (A-G) not the layer text name.  The LAYER_ID
+  # environment variable selects a layer other than the active LAYER (used to build all layers)
+  layer_id="${LAYER_ID:-$(mandatory_flag  "LAYER")}"
   file_list=$(optional_flag   FILES."$layer_id")
 
   # Check if flags are empty and output error message
@@ -472,21 +621,26 @@ init_dem() {
 # Get folder for elevation DEM files
 dem_folder=$(mandatory_flag  "DEM_FOLDER")
 
+if restore_cached dem "$dem_file"; then
+  finished "$dem_file"
+  return 0
+fi
+
 # Change to the dem_folder
 cd "$dem_folder" || {
   echo_error "Unable to change to directory $dem_folder" >&2
   exit 1
 }
 
-# Temp vrt file
-vrt_temp="${region}_tmp1.vrt"
+# Temp vrt file.  Named by layer so layers can be built at the same time
+vrt_temp="${region}_${layer}_tmp1.vrt"
 
 # Remove old temp file
 rm -f "$vrt_temp"
 
 # Create DEM VRT
 echo gdalbuildvrt $quiet $vrt_flag "$vrt_temp" $file_list >&2
-if ! eval gdalbuildvrt $quiet $vrt_flag "$vrt_temp" $file_list; then
+if ! run_stage init_dem "" "$vrt_temp" "gdalbuildvrt $quiet $vrt_flag \"$vrt_temp\" $file_list"; then
   echo_error "gdalbuildvrt failed ❌" >&2
   exit $ERROR_GDALBUILDVRT
 fi
@@ -503,6 +657,7 @@ fi
   exit 1
 }
 
+store_cached dem "$dem_file"
 finished "$dem_file"
 }
 
@@ -515,10 +670,16 @@ preview_dem() {
   verify_files "${dem_file}"
 
   target="${region}_${layer}_DEM_prv.${ending}"
+  suffix="_prv"
+  if restore_cached dem "$target"; then
+    finished "$target"
+    return 0
+  fi
   rm -f "${target}"
 
   create_preview_dem "${dem_file}" "${target}"
-  finished "target"
+  store_cached dem "$target"
+  finished "$target"
 }
 
 ## --hillshade -  gdaldem hillshade
@@ -526,6 +687,9 @@ preview_dem() {
 ## YML Config Settings:
 ##   OUTPUT_TYPE  -of GTiff
 ##   HILLSHADE1-5 gdaldem hillshade hillshade flags
+##   ENGINE - gdal (gdaldem) or numpy (relief_engine, multi-core with WORKERS)
+## BRIGHTNESS and HILLSHADE_GAMMA are not applied here, they are applied when the hillshade is merged.  A
+## brightness change therefore only needs a new merge, not a new hillshade.
 ##
 create_hillshade() {
   init "$@"
@@ -536,25 +700,35 @@ create_hillshade() {
   rm -f "${target}"
 
   verify_files "${dem_file}"
+  if restore_cached hillshade "$target"; then
+    finished "$target"
+    return 0
+  fi
 
   # Format the compression flag for gdaldem
   gdaldem_compress=$(format_compression_flag gdaldem "$compress")
 
-  # Build the gdaldem hillshade command
+  # Build the hillshade command.  ENGINE selects gdaldem or the NumPy relief_engine
   hillshade_flags=$(get_flags "HILLSHADE1" "HILLSHADE2" "HILLSHADE3" "HILLSHADE4" )
-  cmd="gdaldem hillshade $gdaldem_flags $gdaldem_compress $hillshade_flags $quiet \"$dem_file\" \"$target\""
+  engine=$(get_engine)
+  if [ "$engine" = "numpy" ]; then
+    check_command "relief_engine" $ERROR_MISSING_UTILITY
+    workers=$(get_workers)
+    cmd="relief_engine hillshade $quiet --flags=\"$gdaldem_flags $hillshade_flags\" --compress=\"$gdaldem_compress\" --workers=\"$workers\" \"$dem_file\" \"$target\""
+  else
+    cmd="gdaldem hillshade $gdaldem_flags $gdaldem_compress $hillshade_flags $quiet \"$dem_file\" \"$target\""
+  fi
   echo "$cmd" >&2
   echo >&2
 
   # Execute the command
-  if ! eval "$cmd"; then
-      echo_error "gdaldem hillshade failed. ❌" >&2
+  if ! run_stage hillshade "$dem_file" "$target" "$cmd"; then
+      echo_error "hillshade failed. ❌" >&2
       exit $ERROR_GDAL_MERGE_FAILED
   fi
 
-  # If brightness is not 1, then adjust brightness of hillshade
-  adjust_brightness
-
+  write_cog hillshade "$target"
+  store_cached hillshade "$target"
   finished "$target"
 }
 
@@ -579,7 +753,7 @@ create_contour() {
   echo >&2
 
   # Execute the command
-  if ! eval "$cmd"; then
+  if ! run_stage contour "$dem_file" "$target" "$cmd"; then
       echo_error "gdal_contour failed. ❌" >&2
       exit $ERROR_GDAL_CONTOUR_FAILED
   fi
@@ -588,11 +762,12 @@ create_contour() {
 }
 
 
-## --create_color_relief -  gdaldem color-relief
+## --create_color_relief -  gdaldem color-relief or relief_engine color-relief
 ##              $1 is region name $2 is layer name $3 preview flag
 ## YML Config Settings:
 ##   OUTPUT_TYPE  -of GTiff
 ##   EDGE -compute_edges
+##   ENGINE - gdal (gdaldem) or numpy (relief_engine).  The ENGINE environment variable overrides
 ##
 create_color_relief() {
   init "$@"
@@ -604,21 +779,33 @@ create_color_relief() {
   rm -f "${target}"
 
   verify_files "${dem_file}" "${region}_color_ramp.txt"
+  if restore_cached color "$target"; then
+    finished "$target"
+    return 0
+  fi
 
   # Format the compression flag for gdaldem
   gdaldem_compress=$(format_compression_flag gdaldem "$compress")
 
-  # Build the gdaldem color-relief command
-  cmd="gdaldem color-relief $gdaldem_flags $color_flags $quiet $gdaldem_compress \"$dem_file\" \"${region}_color_ramp.txt\" \"$target\""
+  # Build the color-relief command.  ENGINE selects gdaldem or the NumPy relief_engine
+  if [ "$(get_engine)" = "numpy" ]; then
+    check_command "relief_engine" $ERROR_MISSING_UTILITY
+    workers=$(get_workers)
+    cmd="relief_engine color-relief $quiet --flags=\"$gdaldem_flags $color_flags\" --compress=\"$gdaldem_compress\" --workers=\"$workers\" \"$dem_file\" \"${region}_color_ramp.txt\" \"$target\""
+  else
+    cmd="gdaldem color-relief $gdaldem_flags $color_flags $quiet $gdaldem_compress \"$dem_file\" \"${region}_color_ramp.txt\" \"$target\""
+  fi
   echo "$cmd"  >&2
   echo >&2
 
   # Execute the color-relief command
-  if ! eval "$cmd"; then
+  if ! run_stage color "$dem_file" "$target" "$cmd"; then
       echo_error "gdaldem color-relief failed. ❌" >&2
       exit $ERROR_GDAL_COLOR_RELIEF_FAILED
   fi
 
+  write_cog color "$target"
+  store_cached color "$target"
   finished "$target"
 }
 
@@ -629,6 +816,9 @@ create_color_relief() {
 ##   MERGE1-4 - gdal_calc.py flags
 ##   COMPRESS - compression type.  --co=COMPRESS=ZSTD
 ##   MERGE_CALC - calculation to run in gdal_calc.py
+##   BRIGHTNESS - hillshade brightness.  Higher is brighter.  1 is no change
+##   HILLSHADE_GAMMA - hillshade gamma.  Higher brightens mid tones.  1 is no change
+##   ENGINE - gdal (gdal_calc.py) or numpy (relief_engine, multi-core with WORKERS)
 ##
 merge_hillshade() {
   init "$@"
@@ -643,6 +833,10 @@ merge_hillshade() {
   compress=$(get_flags  "COMPRESS")
 
   verify_files "$color_file" "$hillshade_file"
+  if restore_cached merge "$target"; then
+    finished "$target"
+    return 0
+  fi
   rm -f "${target}"
 
   merge_calc=$(mandatory_flag  "MERGE_CALC")
@@ -650,15 +844,37 @@ merge_hillshade() {
   # Remove '--calc=' prefix in $merge_calc so we can quote the expression
   calc_expression="${merge_calc#--calc=}"  # Strip the '--calc=' prefix
 
-  # Format the compression flag for gdal_calc.py
-  gdal_calc_compress=$(format_compression_flag gdal_calc.py "$compress")
-  cmd="gdal_calc.py -B \"$color_file\" -A \"$hillshade_file\" --allBands=B --calc=\"$calc_expression\" $merge_flags $gdal_calc_compress $long_quiet --overwrite --outfile=\"$target\""
+  # The hillshade tone (brightness and gamma) is applied as part of the merge
+  brightness=$(optional_flag "BRIGHTNESS")
+  gamma=$(optional_flag "HILLSHADE_GAMMA")
+
+  # ENGINE selects gdal_calc.py or the NumPy relief_engine
+  if [ "$(get_engine)" = "numpy" ]; then
+    check_command "relief_engine" $ERROR_MISSING_UTILITY
+    gdaldem_compress=$(format_compression_flag gdaldem "$compress")
+    workers=$(get_workers)
+    cmd="relief_engine merge $quiet --calc=\"$calc_expression\" --brightness=\"$brightness\" --gamma=\"$gamma\" --compress=\"$gdaldem_compress\" --workers=\"$workers\" \"$color_file\" \"$hillshade_file\" \"$target\""
+  else
+    # Format the compression flag for gdal_calc.py
+    gdal_calc_compress=$(format_compression_flag gdal_calc.py "$compress")
+
+    # Substitute the toned hillshade for A in the expression, so the merge is a single pass
+    if { [ -n "$brightness" ] && [ "$(echo "$brightness != 1" | bc)" -eq 1 ]; } ||
+       { [ -n "$gamma" ] && [ "$(echo "$gamma != 1" | bc)" -eq 1 ]; }; then
+      check_command "relief_engine" $ERROR_MISSING_UTILITY
+      if ! calc_expression=$(relief_engine calc --brightness="$brightness" --gamma="$gamma" "$calc_expression"); then
+        echo_error "Invalid BRIGHTNESS, HILLSHADE_GAMMA, or MERGE_CALC. ❌" >&2
+        exit $ERROR_GDAL_MERGE_FAILED
+      fi
+    fi
+    cmd="gdal_calc.py -B \"$color_file\" -A \"$hillshade_file\" --allBands=B --calc=\"$calc_expression\" $merge_flags $gdal_calc_compress $long_quiet --overwrite --outfile=\"$target\""
+  fi
 
   echo "$cmd" >&2
   echo >&2
 
   # Execute the command
-  if ! eval "$cmd"; then
+  if ! run_stage merge "$color_file" "$target" "$cmd"; then
     echo_error "gdal_calc.py failed. ❌" >&2
     exit $ERROR_GDAL_MERGE_FAILED
   fi
@@ -668,6 +884,74 @@ merge_hillshade() {
     echo "color_relief.sh $version" >&2
   fi
 
+  write_cog relief "$target"
+  store_cached merge "$target"
+  finished "$target"
+}
+
+
+## --create_relief - fused relief pipeline.  relief_engine creates the final relief directly from
+##              the DEM (color relief, hillshade, brightness, and merge in one pass).
+##              $1 is region name $2 is layer name $3 preview
+## YML Config Settings:
+##   COLOR1-2, EDGE, HILLSHADE1-4, BRIGHTNESS, HILLSHADE_GAMMA, MERGE_CALC, COMPRESS - as for the separate steps
+##   INTERMEDIATES - none, color, hillshade, or both.  Also write these intermediate images
+##
+create_relief() {
+  init "$@"
+  echo "= Create Relief (fused) =" >&2
+  check_command "relief_engine" $ERROR_MISSING_UTILITY
+
+  target="${region}_${layer}_relief${suffix}.${ending}"
+  rm -f "${target}"
+
+  verify_files "${dem_file}" "${region}_color_ramp.txt"
+
+  # Intermediate images are written by the relief_engine run, so only restore without them
+  intermediates_setting=$(optional_flag "INTERMEDIATES")
+  if [ "${intermediates_setting:-none}" = "none" ] && restore_cached relief "$target"; then
+    finished "$target"
+    return 0
+  fi
+
+  # Get switches from YML config
+  color_flags=$(get_flags  "COLOR1" "COLOR2" )
+  hillshade_flags=$(get_flags "EDGE" "HILLSHADE1" "HILLSHADE2" "HILLSHADE3" "HILLSHADE4" )
+  brightness=$(optional_flag  "BRIGHTNESS")
+  gamma=$(optional_flag  "HILLSHADE_GAMMA")
+  merge_calc=$(mandatory_flag  "MERGE_CALC")
+  calc_expression="${merge_calc#--calc=}"
+  compress=$(get_flags  "COMPRESS")
+  gdaldem_compress=$(format_compression_flag gdaldem "$compress")
+
+  # Intermediate images are only written when requested
+  intermediates=""
+  case "$intermediates_setting" in
+    color) intermediates="--color=\"${region}_${layer}_color${suffix}.${ending}\"" ;;
+    hillshade) intermediates="--hillshade=\"${region}_${layer}_hillshade${suffix}.${ending}\"" ;;
+    both) intermediates="--color=\"${region}_${layer}_color${suffix}.${ending}\" --hillshade=\"${region}_${layer}_hillshade${suffix}.${ending}\"" ;;
+  esac
+
+  workers=$(get_workers)
+  cmd="relief_engine relief $quiet --workers=\"$workers\" --color_flags=\"$color_flags\" --hillshade_flags=\"$hillshade_flags\" --brightness=\"$brightness\" --gamma=\"$gamma\" --calc=\"$calc_expression\" --compress=\"$gdaldem_compress\" $intermediates \"$dem_file\" \"${region}_color_ramp.txt\" \"$target\""
+  echo "$cmd" >&2
+  echo >&2
+
+  # Execute the command
+  if ! run_stage relief "$dem_file" "$target" "$cmd"; then
+    echo_error "relief_engine relief failed. ❌" >&2
+    exit $ERROR_GDAL_MERGE_FAILED
+  fi
+
+  # Intermediate images are also converted when COG is all
+  case "$intermediates_setting" in
+    color|both) write_cog color "${region}_${layer}_color${suffix}.${ending}" ;;
+  esac
+  case "$intermediates_setting" in
+    hillshade|both) write_cog hillshade "${region}_${layer}_hillshade${suffix}.${ending}" ;;
+  esac
+  write_cog relief "$target"
+  store_cached relief "$target"
   finished "$target"
 }
 
@@ -719,6 +1003,9 @@ case "$1" in
   --merge_hillshade)
     command="merge_hillshade"
     ;;
+  --create_relief)
+    command="create_relief"
+    ;;
   --init_dem)
     command="init_dem"
     ;;
@@ -753,6 +1040,9 @@ $command "$@"
 ## WARP3: -r bilinear
 ## WARP4: -multi -wo NUM_THREADS=val/ALL_CPUS --config GDAL_CACHEMAX 30%
 ##
+## - $workers= (relief_engine worker processes)
+## WORKERS: ALL_CPUS
+##
 ## - $gdaldem_flags=
 ## OUTPUT_TYPE:
 ## EDGE: -compute_edges
@@ -771,4 +1061,22 @@ $command "$@"
 ##
 ## - $compress=
 ## COMPRESS: -co COMPRESS=JPEG
-##
\ No newline at end of file
+##
+## - Cloud-Optimized GeoTIFF output (write_cog)
+## COG: off (or relief, all)
+## COG_RESAMPLING: average
+##
+## - $engine=
+## ENGINE: gdal
+##
+## - $pipeline= (Makefile)
+## PIPELINE: standard
+##
+## - $intermediates=
+## INTERMEDIATES: none
+####
+## - build cache (relief_cache)
+## BUILD_CACHE: on
+## CACHE_DIR: (blank is .relief_cache in the project folder)
+## CACHE_LIMIT: 2048 (megabytes)
+##
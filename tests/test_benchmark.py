@@ -0,0 +1,93 @@
+#  Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated
+#  documentation files (the “Software”), to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+#  persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+#  Software.
+#
+#  THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+#  WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+#  COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+
+import numpy as np
+import pytest
+
+from ColorReliefEditor.benchmark import compare, create_project, main
+from ColorReliefEditor.config_env import load_values
+from ColorReliefEditor.synthetic_dem import DEM_TYPES, parse_size, write_dem
+
+
+def read_raw(vrt_path, dem_type, size):
+    raw = str(vrt_path).replace(".vrt", ".raw")
+    return np.fromfile(raw, dtype=DEM_TYPES[dem_type][0]).reshape(size, size)
+
+
+def test_parse_size():
+    """Test DEM sizes with k suffixes."""
+    assert parse_size("1k") == 1000
+    assert parse_size("40K") == 40000
+    assert parse_size("512") == 512
+    with pytest.raises(ValueError):
+        parse_size("big")
+
+
+@pytest.mark.parametrize("dem_type", ["int16", "float32"])
+def test_write_dem(tmp_path, dem_type):
+    """Test the DEM is deterministic, has nodata oceans, and the VRT describes the raw file."""
+    write_dem(str(tmp_path / "a.vrt"), 300, dem_type, seed=3)
+    write_dem(str(tmp_path / "b.vrt"), 300, dem_type, seed=3)
+    write_dem(str(tmp_path / "c.vrt"), 300, dem_type, seed=4)
+    a, b, c = (read_raw(tmp_path / f"{name}.vrt", dem_type, 300) for name in "abc")
+    assert np.array_equal(a, b)
+    assert not np.array_equal(a, c)
+
+    nodata = DEM_TYPES[dem_type][2]
+    ocean = np.mean(a == nodata)
+    assert 0.05 < ocean < 0.8
+    land = a[a != nodata]
+    assert land.min() >= 0 and land.max() > 100
+
+    vrt = (tmp_path / "a.vrt").read_text()
+    assert 'rasterXSize="300"' in vrt and DEM_TYPES[dem_type][1] in vrt
+    assert "a.raw" in vrt
+
+
+def test_create_project(tmp_path):
+    """Test the benchmark project uses the synthetic DEM with the cache off."""
+    values = load_values(create_project(str(tmp_path), 4000))
+    assert values["FILES.A"] == "synthetic.tif"
+    assert values["BUILD_CACHE"] == "off"
+    assert values["PREVIEW"] == "1000"
+    assert values["NAMES.A"] == "Base"
+    assert (tmp_path / "Makefile").exists()
+    assert (tmp_path / "BENCH_color_ramp.txt").exists()
+
+
+def result(stage, seconds, case="1k-int16", exit_code=0):
+    return {"case": case, "engine": "gdal", "pipeline": "standard", "stage": stage,
+            "seconds": seconds, "exit_code": exit_code}
+
+
+def test_compare():
+    """Test stages much slower than the baseline are regressions."""
+    baseline = {"results": [result("color", 2.0), result("hillshade", 0.2),
+                            result("merge", 3.0), result("relief", 1.0, exit_code=2)]}
+    results = {"results": [result("color", 4.0), result("hillshade", 0.6),
+                           result("merge", 3.1), result("relief", 9.0),
+                           result("color", 9.0, case="10k-int16")]}
+    regressed = compare(baseline, results, threshold=1.25, min_delta=0.5)
+    assert [(item["stage"], before) for item, before in regressed] == [("color", 2.0)]
+
+
+def test_compare_command(tmp_path, capsys):
+    """Test relief_benchmark compare exits with 1 on a regression."""
+    (tmp_path / "base.json").write_text(json.dumps({"results": [result("color", 2.0)]}))
+    (tmp_path / "same.json").write_text(json.dumps({"results": [result("color", 2.1)]}))
+    (tmp_path / "slow.json").write_text(json.dumps({"results": [result("color", 5.0)]}))
+    assert main(["compare", str(tmp_path / "base.json"), str(tmp_path / "same.json")]) == 0
+    assert main(["compare", str(tmp_path / "base.json"), str(tmp_path / "slow.json")]) == 1
+    assert "REGRESSION 1k-int16 color" in capsys.readouterr().out
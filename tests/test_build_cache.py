@@ -0,0 +1,95 @@
+#  Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated
+#  documentation files (the “Software”), to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+#  persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+#  Software.
+#
+#  THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+#  WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+#  COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+
+import pytest
+
+from ColorReliefEditor import build_cache
+
+CONFIG = """DEM_FOLDER: elevation
+LAYER: A
+FILES:
+  A: n45*.tif
+WARP1: -t_srs epsg:3857
+HILLSHADE1: -igor
+MERGE_CALC: --calc=A*B
+BRIGHTNESS: '1.0'
+CACHE_LIMIT: '1'
+"""
+
+
+@pytest.fixture
+def config(tmp_path):
+    (tmp_path / "elevation").mkdir()
+    (tmp_path / "elevation" / "n45w001.tif").write_bytes(b"dem")
+    (tmp_path / "TEST_color_ramp.txt").write_text("0 0 0 0\n")
+    path = tmp_path / "TEST_relief.cfg"
+    path.write_text(CONFIG)
+    return str(path)
+
+
+def keys(config, preview=False):
+    return {stage: build_cache.stage_key(config, stage, preview) for stage in build_cache.STAGES}
+
+
+def test_stage_keys(config, tmp_path):
+    """Test each input only changes the keys of the stages that depend on it."""
+    before = keys(config)
+    assert len(set(before.values())) == len(before)
+    assert keys(config, True)["dem"] != before["dem"]
+
+    (tmp_path / "TEST_color_ramp.txt").write_text("0 1 1 1\n")
+    after = keys(config)
+    changed = {stage for stage in before if before[stage] != after[stage]}
+    assert changed == {"color", "merge", "relief"}
+
+    # Reverting a change restores the original keys
+    (tmp_path / "TEST_color_ramp.txt").write_text("0 0 0 0\n")
+    assert keys(config) == before
+
+    with open(config, "a") as f:
+        f.write("HILLSHADE2: -z 2\n")
+    after = keys(config)
+    assert {stage for stage in before if before[stage] != after[stage]} == {
+        "hillshade", "merge", "relief"}
+
+    (tmp_path / "elevation" / "n45w002.tif").write_bytes(b"more")
+    assert all(a != b for a, b in zip(after.values(), keys(config).values()))
+
+
+def test_restore_and_evict(config, tmp_path):
+    """Test a stored output is restored by hardlink and the oldest entry is evicted."""
+    cache = build_cache.open_cache(config)
+    target = str(tmp_path / "TEST_A_color.tif")
+    assert not cache.restore("a", target)
+
+    with open(target, "wb") as f:
+        f.write(b"x" * 600000)
+    cache.store("a", target)
+    os.remove(target)
+    assert cache.restore("a", target)
+    assert os.path.samefile(target, cache.path("a", target))
+
+    # The 1 MB limit only holds one entry, so storing "b" evicts "a"
+    os.utime(cache.path("a", target), (1, 1))
+    other = str(tmp_path / "TEST_A_hillshade.tif")
+    with open(other, "wb") as f:
+        f.write(b"y" * 600000)
+    cache.store("b", other)
+    assert not os.path.exists(cache.path("a", target))
+
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["stores"],
+            stats["evictions"]) == (1, 1, 1, 2, 1)
@@ -0,0 +1,55 @@
+#  Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated
+#  documentation files (the “Software”), to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+#  persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+#  Software.
+#
+#  THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+#  WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+#  COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+
+from ColorReliefEditor.build_graph import BuildGraph
+
+FILES = ["T_relief.cfg", "T_color_ramp.txt", "T_A_DEM_trigger.cfg", "T_hillshade_trigger.cfg",
+         "T_A_DEM.tif", "T_A_color.tif", "T_A_hillshade.tif", "T_A_relief.tif"]
+
+
+def create(folder, names):
+    # Create files with increasing mtimes in the order given
+    for i, name in enumerate(names):
+        path = folder / name
+        path.write_bytes(b"")
+        os.utime(path, (1000 + i, 1000 + i))
+
+
+def stages(graph, target=None):
+    return [item.stage for item in graph.stale(target)]
+
+
+def test_up_to_date(tmp_path):
+    create(tmp_path, FILES)
+    graph = BuildGraph(str(tmp_path), "T", "A")
+    assert graph.up_to_date()
+    assert stages(graph, "T_A_relief_prv.tif") == ["DEM (preview)", "color (preview)",
+                                                   "hillshade (preview)", "relief (preview)"]
+
+
+def test_stale_reasons(tmp_path):
+    create(tmp_path, FILES)
+    os.utime(tmp_path / "T_hillshade_trigger.cfg", (2000, 2000))
+    stale = BuildGraph(str(tmp_path), "T", "A").stale()
+    assert [item.stage for item in stale] == ["hillshade", "relief"]
+    assert stale[0].reason == "hillshade trigger is newer"
+    assert stale[1].reason == "hillshade will be rebuilt"
+
+    # The fused pipeline builds the relief directly from the DEM
+    assert stages(BuildGraph(str(tmp_path), "T", "A", "fused")) == ["relief"]
+
+    os.remove(tmp_path / "T_A_DEM.tif")
+    assert stages(BuildGraph(str(tmp_path), "T", "A")) == ["DEM", "color", "hillshade", "relief"]
@@ -0,0 +1,92 @@
+#  Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated
+#  documentation files (the “Software”), to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+#  persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+#  Software.
+#
+#  THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+#  WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+#  COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import io
+import json
+import sys
+
+from ColorReliefEditor.build_progress import (ThroughputHistory, TickParser, format_eta,
+                                              input_size, parse_event, run)
+
+TICKS = "0...10...20...30...40...50...60...70...80...90...100 - done.\n"
+
+FAKE_TOOL = """
+import sys
+print("Input file size is 100, 100")
+if "-q" in sys.argv:
+    sys.exit(3)
+sys.stdout.write(%r)
+""" % TICKS
+
+
+def test_tick_parser():
+    """Test gdal progress ticks split across reads are converted to percent complete."""
+    parser = TickParser()
+    text, changed = parser.feed("Input file size is 100, 100\n0...10...2")
+    assert text == "Input file size is 100, 100\n" and changed
+    assert parser.percent == 17.5
+    text, _ = parser.feed("0...30...40...50...60...70...80...90...100 - done.\n")
+    assert parser.percent == 100.0 and text == " - done.\n"
+
+
+def test_estimate(tmp_path):
+    """Test the estimate uses the throughput of similar runs, then the measured rate."""
+    history = ThroughputHistory(str(tmp_path / "history.json"))
+    assert history.estimate("hillshade", 1000, 0, 0) is None
+    assert history.estimate("hillshade", 1000, 10, 2) == 18
+    history.record("hillshade", 1000, 10)
+    history.record("hillshade", 1000, 20)
+    saved = json.loads((tmp_path / "history.json").read_text())
+    assert saved == {"hillshade:9": 100 * 0.7 + 50 * 0.3}
+
+    history = ThroughputHistory(str(tmp_path / "history.json"))
+    assert round(history.estimate("hillshade", 1000, 0, 0), 1) == 11.8
+    # A larger raster uses the nearest size, and halfway the measured rate counts for half
+    assert round(history.estimate("hillshade", 4000, 0, 0), 1) == 47.1
+    assert round(history.estimate("hillshade", 1000, 50, 10), 1) == round(
+        0.5 * 1000 / 85 + 0.5 * 20 - 10, 1)
+    assert history.estimate("color", 1000, 0, 0) is None
+    assert format_eta(3725.4) == "1:02:05" and format_eta(65) == "1:05" and format_eta(None) == ""
+
+
+def test_run(tmp_path):
+    """Test a tool's progress is reported as events, its quiet switch removed, and output hidden."""
+    tool = tmp_path / "tool.py"
+    tool.write_text(FAKE_TOOL)
+    dem = tmp_path / "dem.tif"
+    dem.write_bytes(b"x" * 2000)
+    history = ThroughputHistory(str(tmp_path / "history.json"))
+    out = io.StringIO()
+    exit_code = run([sys.executable, str(tool), "-q"], "color", "A", input_size(str(dem)), history,
+                    quiet=True, out=out)
+    assert exit_code == 0
+    events = [parse_event(line) for line in out.getvalue().splitlines()]
+    assert None not in events
+    assert events[0]["percent"] == 0 and events[-1]["percent"] == 100
+    assert events[-1]["bytes"] == events[-1]["total"] == 2000
+    assert events[-1]["stage"] == "color" and events[-1]["layer"] == "A"
+    assert history.rate("color", 2000) is not None
+
+
+def test_vrt_size(tmp_path):
+    """Test the size of a VRT is the size of its sources."""
+    (tmp_path / "a.tif").write_bytes(b"x" * 100)
+    (tmp_path / "b.tif").write_bytes(b"x" * 50)
+    vrt = tmp_path / "dem.vrt"
+    vrt.write_text(
+        '<VRTDataset><SourceFilename relativeToVRT="1">a.tif</SourceFilename>'
+        f'<SourceFilename relativeToVRT="0">{tmp_path / "b.tif"}</SourceFilename></VRTDataset>'
+    )
+    assert input_size(str(vrt)) == 150
+    assert parse_event("0...10") is None
@@ -0,0 +1,94 @@
+#  Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated
+#  documentation files (the “Software”), to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+#  persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+#  Software.
+#
+#  THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+#  WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+#  COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import time
+
+# Handle imports for PyQt6 versus PySide depending on which has been installed
+try:
+    from PySide6.QtCore import QCoreApplication
+except ImportError:
+    from PyQt6.QtCore import QCoreApplication
+
+from ColorReliefEditor.build_graph import BuildGraph
+from ColorReliefEditor.build_scheduler import BuildScheduler, next_jobs, plan_build
+
+FAKE_SCRIPT = """#!/bin/sh
+echo "$1 $3 $WORKERS $LAYER_ID" >> build.log
+"""
+
+
+def project(tmp_path):
+    for name in ("T_relief.cfg", "T_color_ramp.txt"):
+        (tmp_path / name).write_text("")
+    return {layer: BuildGraph(str(tmp_path), "T", layer) for layer in ("a", "b")}
+
+
+def test_plan(tmp_path):
+    """Test all stages of both layers are planned and the shared trigger is built once."""
+    jobs = plan_build(project(tmp_path), {"a": "A", "b": "B"})
+    targets = [job.target for job in jobs]
+    assert len(targets) == 11 and targets.count("T_hillshade_trigger.cfg") == 1
+    relief = jobs[targets.index("T_b_relief.tif")]
+    assert relief.deps == {"T_b_color.tif", "T_b_hillshade.tif", "T_b_DEM_trigger.cfg"}
+    assert relief.layer_id == "B"
+    assert relief.command == ["color_relief.sh", "--merge_hillshade", "T", "b"]
+
+
+def test_next_jobs(tmp_path):
+    """Test jobs start when their prerequisites are done and share the budget."""
+    jobs = plan_build(project(tmp_path))
+    ready = next_jobs(jobs, {}, set(), 8, 0)
+    assert [job.target for job, _ in ready] == ["T_a_DEM_trigger.cfg", "T_hillshade_trigger.cfg",
+                                               "T_b_DEM_trigger.cfg"]
+    assert all(workers == 2 for _, workers in ready)
+
+    # A job larger than the memory budget only starts when nothing else is running
+    done = {job.target for job in jobs if "trigger" in job.target}
+    pending = [job for job in jobs if job.target not in done]
+    dems = [job for job in jobs if job.stage == "DEM"]
+    for job in dems:
+        job.memory = 100
+    assert [job for job, _ in next_jobs(pending, {}, done, 8, 150)] == dems[:1]
+    assert next_jobs(dems[1:], {dems[0]: (1, 100)}, done, 8, 150) == []
+    assert [job for job, _ in next_jobs(dems[1:], {}, done, 8, 50)] == dems[1:]
+
+
+def test_scheduler(tmp_path, monkeypatch):
+    """Test the scheduler runs every job with the layer id and reports progress."""
+    app = QCoreApplication.instance() or QCoreApplication([])
+    script = tmp_path / "bin" / "color_relief.sh"
+    script.parent.mkdir()
+    script.write_text(FAKE_SCRIPT)
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{script.parent}{os.pathsep}{os.environ['PATH']}")
+
+    scheduler = BuildScheduler(str(tmp_path), plan_build(project(tmp_path), {"a": "A", "b": "B"}), 4)
+    progress, results = {}, []
+    scheduler.progress.connect(lambda layer, done, total: progress.update({layer: (done, total)}))
+    scheduler.finished.connect(results.append)
+    scheduler.start()
+    deadline = time.monotonic() + 20
+    while not results and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+
+    assert results == [0]
+    assert progress == {"a": (6, 6), "b": (5, 5)}
+    # Each line is the command, layer, workers, and layer id
+    lines = [line.split() for line in (tmp_path / "build.log").read_text().splitlines()]
+    assert len(lines) == 11
+    assert all(layer.upper() == layer_id for _, layer, _, layer_id in lines)
+    commands = [(command, layer) for command, layer, _, _ in lines]
+    assert commands.index(("--init_dem", "a")) < commands.index(("--merge_hillshade", "a"))
@@ -0,0 +1,112 @@
+#  Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated
+#  documentation files (the “Software”), to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+#  persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+#  Software.
+#
+#  THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+#  WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+#  COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+import os
+import struct
+import sys
+
+from ColorReliefEditor.build_telemetry import (append_record, load_records, raster_size,
+                                               record_stage, regressions, report, settings_cost,
+                                               summarize, telemetry_path)
+
+
+def write_tiff(path, width, height, order="<"):
+    """Write the header and first directory of a TIFF with ImageWidth (LONG) and ImageLength
+    (SHORT)."""
+    mark = b"II" if order == "<" else b"MM"
+    entries = struct.pack(order + "HHII", 256, 4, 1, width)
+    entries += struct.pack(order + "HHIHH", 257, 3, 1, height, 0)
+    path.write_bytes(mark + struct.pack(order + "HI", 42, 8) + struct.pack(order + "H", 2) +
+                     entries + struct.pack(order + "I", 0))
+
+
+def test_raster_size(tmp_path):
+    """Test the raster size is read from TIFF and VRT headers."""
+    write_tiff(tmp_path / "a.tif", 12000, 9000)
+    write_tiff(tmp_path / "b.tif", 300, 200, ">")
+    (tmp_path / "c.vrt").write_text('<VRTDataset rasterXSize="640" rasterYSize="480">\n')
+    (tmp_path / "d.tif").write_text("not a tiff")
+    assert raster_size(str(tmp_path / "a.tif")) == (12000, 9000)
+    assert raster_size(str(tmp_path / "b.tif")) == (300, 200)
+    assert raster_size(str(tmp_path / "c.vrt")) == (640, 480)
+    assert raster_size(str(tmp_path / "d.tif")) == (None, None)
+    assert raster_size(str(tmp_path / "missing.tif")) == (None, None)
+
+
+def test_record_stage(tmp_path):
+    """Test a stage run appends a record with its usage, size, and settings."""
+    config = tmp_path / "T_relief.cfg"
+    config.write_text("HILLSHADE1: -igor\nCOMPRESS: -co COMPRESS=ZSTD\nENGINE: gdal\n")
+    write_tiff(tmp_path / "dem.tif", 400, 300)
+    out = tmp_path / "out.tif"
+    command = [sys.executable, "-c",
+               f"import shutil, sys; shutil.copy({str(tmp_path / 'dem.tif')!r}, {str(out)!r}); "
+               "sys.exit(sum(range(200000)) * 0)"]
+    assert record_stage(str(config), "hillshade", "A", False, command, str(tmp_path / "dem.tif"),
+                        str(out)) == 0
+    assert record_stage(str(config), "color", "A", True, [sys.executable, "-c", "exit(4)"]) == 4
+
+    first, second = load_records(telemetry_path(str(config)))
+    assert telemetry_path(str(config)) == str(tmp_path / "T_telemetry.jsonl")
+    assert first["region"] == "T" and first["stage"] == "hillshade" and not first["preview"]
+    assert (first["width"], first["height"]) == (400, 300)
+    assert first["input_bytes"] == first["output_bytes"] > 0
+    assert first["wall"] > 0 and first["user"] + first["sys"] > 0 and first["max_rss"] > 1e6
+    assert first["config"]["HILLSHADE1"] == "-igor" and first["config"]["ENGINE"] == "gdal"
+    assert second["exit_code"] == 4 and second["preview"]
+
+
+def test_report(tmp_path):
+    """Test the report groups runs by stage and size and finds slow settings and regressions."""
+    def run(wall, z="-z 2", stage="hillshade"):
+        return {"time": "t", "stage": stage, "layer": "A", "exit_code": 0, "wall": wall,
+                "user": wall, "sys": 0, "max_rss": 1048576 * 100, "input_bytes": 10e6,
+                "width": 4000, "height": 3000, "config": {"HILLSHADE2": z}}
+
+    records = [run(10), run(11), run(12), run(30, "-z 4"), run(25), run(5, stage="color")]
+    summary = {item["stage"]: item for item in summarize(records)}
+    assert summary["hillshade"]["runs"] == 5 and summary["hillshade"]["size"] == "12 MP"
+    assert summary["hillshade"]["wall"] == 12 and summary["color"]["rate"] == 2
+
+    costs = settings_cost(records)
+    assert [(cost["config"]["HILLSHADE2"], cost["wall"]) for cost in costs] == [
+        ("-z 4", 30), ("-z 2", 11.5)]
+    assert [(record["wall"], median) for record, median in regressions(records)] == [(25, 11)]
+
+    text = report(records + [dict(run(1), exit_code=1)])
+    assert "Failed runs: 1" in text and "HILLSHADE2=-z 4" in text and "25.0s vs 11.0s" in text
+    (tmp_path / "T_telemetry.jsonl").write_text(
+        "\n".join(json.dumps(record) for record in records) + "\nnot json\n"
+    )
+    assert len(load_records(str(tmp_path / "T_telemetry.jsonl"))) == 6
+
+
+def test_record_without_wait4(tmp_path, monkeypatch):
+    """Test only the wall time is recorded where os.wait4 isn't available."""
+    monkeypatch.delattr(os, "wait4", raising=False)
+    config = tmp_path / "T_relief.cfg"
+    config.write_text("ENGINE: gdal\n")
+    assert record_stage(str(config), "color", "A", False, [sys.executable, "-c", "exit(3)"]) == 3
+    record, = load_records(telemetry_path(str(config)))
+    assert record["exit_code"] == 3 and record["wall"] > 0 and record["user"] is None
+    assert "-" in report([dict(record, exit_code=0)])
+
+
+def test_log_is_capped(tmp_path):
+    """Test the log keeps only the last max_records records."""
+    path = str(tmp_path / "T_telemetry.jsonl")
+    for index in range(7):
+        append_record(path, {"stage": "color", "index": index}, max_records=5)
+    assert [record["index"] for record in load_records(path)] == [2, 3, 4, 5, 6]
@@ -0,0 +1,65 @@
+#  Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated
+#  documentation files (the “Software”), to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+#  persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+#  Software.
+#
+#  THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+#  WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+#  COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import subprocess
+
+import pytest
+
+from ColorReliefEditor import config_env
+
+CONFIG = """COLOR1: ''
+EDGE: -compute_edges
+GAMMA: '1.20'
+FILES:
+  A: n45*.tif  n46*.tif
+MERGE_CALC: --calc="numpy.where( (A < 2), B, (A / 255.) * B)"
+OUTPUT_TYPE: null
+PUBLISH:
+TIMING: true
+NAME: it's
+"""
+
+
+@pytest.fixture
+def config(tmp_path):
+    path = tmp_path / "TEST_relief.cfg"
+    path.write_text(CONFIG)
+    return str(path)
+
+
+def test_load_values(config):
+    """Test values match what color_relief.sh got from yq with quotes stripped."""
+    values = config_env.load_values(config)
+    assert values["GAMMA"] == "1.20"
+    assert values["FILES.A"] == "n45*.tif  n46*.tif"
+    assert values["MERGE_CALC"] == '--calc="numpy.where( (A < 2), B, (A / 255.) * B)'
+    assert values["OUTPUT_TYPE"] == values["PUBLISH"] == values["COLOR1"] == ""
+    assert values["TIMING"] == "true"
+    assert "FILES" not in values
+
+
+def test_env_file(config):
+    """Test the env file can be sourced by sh and is removed by invalidate."""
+    env_file = config_env.write_env(config)
+    assert env_file.endswith("TEST_relief_env.sh")
+    output = subprocess.run(
+        ["sh", "-c", f'. "{env_file}"; printf "%s|%s|%s" "$CFG_FILES__A" "$CFG_NAME" "$CFG_EDGE"'],
+        capture_output=True, text=True, check=True
+    ).stdout
+    assert output == "n45*.tif  n46*.tif|it's|-compute_edges"
+
+    config_env.invalidate(config)
+    assert not os.path.exists(env_file)
+    config_env.invalidate(config)
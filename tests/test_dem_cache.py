@@ -0,0 +1,97 @@
+#  Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated
+#  documentation files (the “Software”), to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+#  persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+#  Software.
+#
+#  THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+#  WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+#  COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+
+import numpy as np
+
+from ColorReliefEditor import dem_cache
+
+
+def make_dem(tmp_path):
+    dem_path = tmp_path / "region_A_DEM.tif"
+    dem_path.write_bytes(b"dem")
+    return str(dem_path)
+
+
+def make_reader(calls):
+    def reader(dem_path, size, x_shift, y_shift, montage):
+        calls.append((size, x_shift, y_shift, montage))
+        values = np.arange(12, dtype=">f4").reshape(3, 4)
+        return values, (100.0, 1.0, 0.0, 200.0, 0.0, -1.0), -9999.0, (1, 2, 4, 3)
+
+    return reader
+
+
+SETTINGS = {"PREVIEW": "4", "X_SHIFT": "0.5", "Y_SHIFT": "0.5"}
+
+
+def test_preview_dem_is_memory_mapped_and_reused(tmp_path):
+    dem_path = make_dem(tmp_path)
+    calls = []
+    folder = str(tmp_path / "cache")
+    first = dem_cache.preview_dem(dem_path, SETTINGS, make_reader(calls), folder)
+    second = dem_cache.preview_dem(dem_path, SETTINGS, make_reader(calls), folder)
+
+    assert calls == [("4", "0.5", "0.5", "")]
+    assert isinstance(second.values, np.memmap)
+    assert second.values.dtype == np.dtype("<f4")
+    np.testing.assert_array_equal(second.values, np.arange(12).reshape(3, 4))
+    assert first.key == second.key
+    assert second.geotransform == (100.0, 1.0, 0.0, 200.0, 0.0, -1.0)
+    assert second.nodata == -9999.0
+    assert second.window == (1, 2, 4, 3)
+
+
+def test_trigger_and_settings_invalidate(tmp_path):
+    dem_path = make_dem(tmp_path)
+    calls = []
+    folder = str(tmp_path / "cache")
+    first = dem_cache.preview_dem(dem_path, SETTINGS, make_reader(calls), folder)
+
+    moved = dict(SETTINGS, X_SHIFT="0.2")
+    assert dem_cache.cache_key(dem_path, moved) != first.key
+
+    trigger = dem_cache.trigger_path(dem_path)
+    assert trigger.endswith("region_A_DEM_trigger.cfg")
+    with open(trigger, "w") as file:
+        file.write("x")
+    second = dem_cache.preview_dem(dem_path, SETTINGS, make_reader(calls), folder)
+
+    assert second.key != first.key
+    assert len(calls) == 2
+    # The entry for the older trigger is removed
+    assert [key for key, _ in dem_cache.entries(folder)] == [second.key]
+
+
+def test_incomplete_entry_is_rebuilt(tmp_path):
+    dem_path = make_dem(tmp_path)
+    calls = []
+    folder = str(tmp_path / "cache")
+    first = dem_cache.preview_dem(dem_path, SETTINGS, make_reader(calls), folder)
+    with open(os.path.join(folder, first.key + ".raw"), "r+b") as file:
+        file.truncate(8)
+
+    assert dem_cache.load(folder, first.key) is None
+    dem_cache.preview_dem(dem_path, SETTINGS, make_reader(calls), folder)
+    assert len(calls) == 2
+
+
+def test_build_cache_off_reads_into_memory(tmp_path):
+    dem_path = make_dem(tmp_path)
+    calls = []
+    settings = dict(SETTINGS, BUILD_CACHE="off")
+    result = dem_cache.preview_dem(dem_path, settings, make_reader(calls))
+
+    assert not isinstance(result.values, np.memmap)
+    assert not os.path.exists(tmp_path / ".relief_cache")
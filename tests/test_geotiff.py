@@ -0,0 +1,38 @@
+#  Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated
+#  documentation files (the “Software”), to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+#  persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+#  Software.
+#
+#  THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+#  WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+#  COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import struct
+
+from ColorReliefEditor.geotiff import cog_images, is_cog
+
+
+def test_is_cog(tmp_path):
+    """Test a Cloud-Optimized GeoTIFF is recognized from its header."""
+    header = b"II" + struct.pack("<HI", 42, 8)
+    (tmp_path / "cog.tif").write_bytes(
+        header + b"GDAL_STRUCTURAL_METADATA_SIZE=000140 bytes\nLAYOUT=IFDS_BEFORE_DATA\n"
+    )
+    (tmp_path / "plain.tif").write_bytes(header + bytes(64))
+    (tmp_path / "text.tif").write_bytes(b"LAYOUT=IFDS_BEFORE_DATA")
+    assert is_cog(str(tmp_path / "cog.tif"))
+    assert not is_cog(str(tmp_path / "plain.tif"))
+    assert not is_cog(str(tmp_path / "text.tif"))
+    assert not is_cog(str(tmp_path / "missing.tif"))
+
+
+def test_cog_images():
+    """Test the images the COG setting applies to."""
+    assert cog_images({"COG": "off"}) == set()
+    assert cog_images({}) == set()
+    assert cog_images({"COG": "relief"}) == {"relief"}
+    assert cog_images({"COG": "all"}) == {"relief", "color", "hillshade"}
@@ -0,0 +1,114 @@
+#  Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated
+#  documentation files (the “Software”), to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+#  persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+#  Software.
+#
+#  THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+#  WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+#  COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import struct
+
+import pytest
+
+try:
+    from PySide6.QtCore import QCoreApplication
+except ImportError:
+    from PyQt6.QtCore import QCoreApplication
+
+from ColorReliefEditor.geotiff import REDUCED_RESOLUTION, choose_level, image_levels
+from ColorReliefEditor.image_loader import ImageLoader, _read_qt, fit_size
+
+
+@pytest.fixture
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def write_tiff(path, images):
+    """Write an uncompressed RGB TIFF with a directory for each (width, height, rgb, subfile
+    type)."""
+    data = bytearray(b"II" + struct.pack("<HI", 42, 0))
+    previous = 4
+    for width, height, rgb, subfile_type in images:
+        pixels = bytes(rgb) * (width * height)
+        pixel_offset = len(data)
+        data += pixels
+        bits_offset = len(data)
+        data += struct.pack("<HHH", 8, 8, 8)
+        entries = [(254, 4, 1, subfile_type), (256, 4, 1, width), (257, 4, 1, height),
+                   (258, 3, 3, bits_offset), (259, 3, 1, 1), (262, 3, 1, 2),
+                   (273, 4, 1, pixel_offset), (277, 3, 1, 3), (278, 4, 1, height),
+                   (279, 4, 1, len(pixels)), (284, 3, 1, 1)]
+        if len(data) % 2:
+            data += b"\0"
+        struct.pack_into("<I", data, previous, len(data))
+        data += struct.pack("<H", len(entries))
+        for tag, field_type, count, value in entries:
+            value_bytes = (struct.pack("<HH", value, 0) if field_type == 3 and count == 1 else
+                           struct.pack("<I", value))
+            data += struct.pack("<HHI", tag, field_type, count) + value_bytes
+        previous = len(data)
+        data += struct.pack("<I", 0)
+    path.write_bytes(bytes(data))
+
+
+def test_levels(tmp_path):
+    """Test overview levels are read from the TIFF directories and chosen by display size."""
+    path = tmp_path / "relief.tif"
+    write_tiff(path, [(80, 40, (255, 0, 0), 0), (40, 20, (0, 255, 0), REDUCED_RESOLUTION),
+                      (20, 10, (0, 0, 255), REDUCED_RESOLUTION)])
+    levels = image_levels(str(path))
+    assert [(level.index, level.width, level.height) for level in levels] == [
+        (0, 80, 40), (1, 40, 20), (2, 20, 10)]
+    assert choose_level(levels, 1000, 1000).index == 0
+    assert choose_level(levels, 40, 1000).index == 1
+    assert choose_level(levels, 30, 30).index == 1
+    assert choose_level(levels, 5, 5).index == 2
+    assert choose_level([], 5, 5) is None
+    assert image_levels(str(tmp_path / "missing.tif")) == []
+
+
+def test_read_overview(app, tmp_path):
+    """Test Qt decodes the overview nearest the display size."""
+    path = tmp_path / "relief.tif"
+    write_tiff(path, [(80, 40, (255, 0, 0), 0), (40, 20, (0, 255, 0), REDUCED_RESOLUTION)])
+    image, source = _read_qt(str(path), 40, 40)
+    assert source == (80, 40)
+    assert (image.width(), image.height()) == (40, 20)
+    assert image.pixelColor(5, 5).green() == 255
+
+    image, _ = _read_qt(str(path), 200, 200)
+    assert (image.width(), image.height()) == (80, 40)
+    assert image.pixelColor(5, 5).red() == 255
+
+
+def test_read_scaled(app, tmp_path):
+    """Test an image without overviews is scaled to the display size."""
+    path = tmp_path / "relief.tif"
+    write_tiff(path, [(80, 40, (255, 0, 0), 0)])
+    image, source = _read_qt(str(path), 20, 20)
+    assert source == (80, 40)
+    assert (image.width(), image.height()) == (20, 10)
+    assert fit_size(80, 40, 20, 20) == (20, 10)
+    assert fit_size(80, 40, 200, 200) == (80, 40)
+
+
+def test_loader_delivers_newest(app, tmp_path):
+    """Test only the newest load is delivered."""
+    first, second = tmp_path / "first.tif", tmp_path / "second.tif"
+    write_tiff(first, [(8, 8, (255, 0, 0), 0)])
+    write_tiff(second, [(8, 8, (0, 0, 255), 0)])
+    loaded = []
+    loader = ImageLoader(lambda path, image, source: loaded.append((path, image, source)))
+    loader.load(str(first), 8, 8)
+    loader.load(str(second), 8, 8)
+    loader.pool.waitForDone()
+    app.processEvents()
+    assert [(path, source) for path, _, source in loaded] == [(str(second), (8, 8))]
+    assert loaded[0][1].pixelColor(0, 0).blue() == 255
+    assert not loader.loading
@@ -0,0 +1,65 @@
+#  Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated
+#  documentation files (the “Software”), to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+#  persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+#  Software.
+#
+#  THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+#  WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+#  COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+
+import pytest
+
+try:
+    from PySide6.QtGui import QImage
+    from PySide6.QtWidgets import QApplication
+except ImportError:
+    from PyQt6.QtGui import QImage
+    from PyQt6.QtWidgets import QApplication
+
+from ColorReliefEditor.image_scaler import ImageScaler, build_mips, choose_mip
+
+
+def make_image(width, height):
+    image = QImage(width, height, QImage.Format.Format_RGB888)
+    image.fill(0x336699)
+    return image
+
+
+def test_build_mips():
+    """Test each level is half the size of the one before, down to the minimum size."""
+    mips = build_mips(make_image(3000, 2000))
+    assert [(mip.width(), mip.height()) for mip in mips] == [
+        (3000, 2000), (1500, 1000), (750, 500), (375, 250)]
+    assert choose_mip(mips, 400, 300) == 2
+    assert choose_mip(mips, 100, 100) == 3
+    assert choose_mip(mips, 5000, 100) == 0
+
+
+def test_scaler():
+    """Test drafts are shown at once and only the last requested size is smooth scaled."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication.instance() or QApplication([])
+    if not isinstance(app, QApplication):
+        pytest.skip("needs a QApplication")
+    scaled = []
+    scaler = ImageScaler(scaled.append, delay=0)
+    scaler.set_image(make_image(3000, 2000))
+    scaler.pool.waitForDone()
+    app.processEvents()
+    assert len(scaler.mips) == 4
+
+    draft = scaler.draft(600, 400)
+    assert (draft.width(), draft.height()) == (600, 400)
+    for width in (500, 550, 600):
+        scaler.request(width, width * 2 // 3)
+    for _ in range(3):
+        app.processEvents()
+        scaler.pool.waitForDone()
+    app.processEvents()
+    assert [(pixmap.width(), pixmap.height()) for pixmap in scaled] == [(600, 400)]
@@ -0,0 +1,162 @@
+#  Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated
+#  documentation files (the “Software”), to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+#  persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+#  Software.
+#
+#  THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+#  WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+#  COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import threading
+import time
+
+import numpy as np
+
+# Handle imports for PyQt6 versus PySide depending on which has been installed
+try:
+    from PySide6.QtCore import QCoreApplication
+except ImportError:
+    from PyQt6.QtCore import QCoreApplication
+
+from ColorReliefEditor.live_preview import LivePreview
+
+
+class FakeClient:
+    """Render client that records requests and returns a small image."""
+
+    def __init__(self):
+        self.renders = []
+        self.cancels = []
+
+    def render(self, channel, **request):
+        self.renders.append(request)
+        return "ok", np.full((2, 3, 4), request["value"], dtype=np.uint8)
+
+    def cancel_channel(self, channel):
+        self.cancels.append(channel)
+
+
+def test_edits_are_coalesced():
+    """Test a burst of edits produces one background render of the newest settings."""
+    app = QCoreApplication.instance() or QCoreApplication([])
+    client = FakeClient()
+    frames = []
+    settings = {"value": 0}
+    live = LivePreview(client, "Color", lambda: dict(settings), frames.append, delay=20)
+    for value in range(1, 4):
+        settings["value"] = value
+        live.schedule()
+
+    deadline = time.monotonic() + 5
+    while not frames and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    live.pool.waitForDone()
+
+    assert [request["value"] for request in client.renders] == [3]
+    assert len(frames) == 1 and frames[0].width() == 3 and frames[0].pixelColor(0, 0).red() == 3
+
+
+class ScaledClient(FakeClient):
+    """Render client that returns images decimated by the requested scale."""
+
+    def render(self, channel, **request):
+        self.renders.append(request)
+        size = 16 // request["scale"]
+        return "ok", np.full((size, size, 4), request["value"], dtype=np.uint8)
+
+
+def test_progressive_frames_are_refined():
+    """Test a progressive render shows each frame coarsest first."""
+    app = QCoreApplication.instance() or QCoreApplication([])
+    client = ScaledClient()
+    frames = []
+    live = LivePreview(client, "Color", lambda: {"value": 1}, frames.append, delay=0,
+                       scales=(8, 2, 1))
+    live.schedule()
+
+    deadline = time.monotonic() + 5
+    while len(frames) < 3 and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    live.pool.waitForDone()
+
+    assert [request["scale"] for request in client.renders] == [8, 2, 1]
+    assert [frame.width() for frame in frames] == [2, 8, 16]
+
+    # A coarse frame that arrives after a finer frame of the same render is not shown
+    live._on_finished(live.generation, 8, "ok", frames[0])
+    assert len(frames) == 3
+
+
+def test_render_now_reports_done():
+    """Test a render started by a button runs in the background and reports the final frame."""
+    app = QCoreApplication.instance() or QCoreApplication([])
+    client = ScaledClient()
+    frames, done = [], []
+    live = LivePreview(client, "Color", lambda: {"value": 2}, frames.append, scales=(8, 1))
+    assert live.render(lambda status, result: done.append((status, result)))
+
+    deadline = time.monotonic() + 5
+    while not done and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    live.pool.waitForDone()
+
+    assert [status for status, _ in done] == ["ok"]
+    assert done[0][1].width() == 16 and len(frames) == 2
+
+    unavailable = LivePreview(client, "Color", lambda: None, frames.append)
+    assert not unavailable.render(lambda status, result: None)
+
+
+class BlockingClient(FakeClient):
+    """Render client that waits for release before returning."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def render(self, channel, **request):
+        self.release.wait(5)
+        return super().render(channel, **request)
+
+
+def test_edit_during_render_reports_done():
+    """Test an edit while a button render runs still reports the end of the render."""
+    app = QCoreApplication.instance() or QCoreApplication([])
+    client = BlockingClient()
+    frames, done = [], []
+    settings = {"value": 1}
+    live = LivePreview(client, "Color", lambda: dict(settings), frames.append, delay=0)
+    assert live.render(lambda status, result: done.append((status, result)))
+
+    settings["value"] = 2
+    live.schedule()
+    deadline = time.monotonic() + 5
+    while live.generation < 2 and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    client.release.set()
+    while not done and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    live.pool.waitForDone()
+    app.processEvents()
+
+    # The button gets the frame of the edit's render, once
+    assert [status for status, _ in done] == ["ok"]
+    assert done[0][1].pixelColor(0, 0).red() == 2
+
+    # A second button render cancels the first
+    done.clear()
+    client.release.clear()
+    live.render(lambda status, result: done.append(("first", status)))
+    live.render(lambda status, result: done.append(("second", status)))
+    assert done == [("first", "cancelled")]
+    client.release.set()
+    live.pool.waitForDone()
@@ -0,0 +1,123 @@
+#  Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated
+#  documentation files (the “Software”), to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+#  persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+#  Software.
+#
+#  THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+#  WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+#  COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import sys
+import time
+
+import pytest
+
+# Handle imports for PyQt6 versus PySide depending on which has been installed
+try:
+    from PySide6.QtCore import QCoreApplication
+    from PySide6.QtWidgets import QApplication, QPlainTextEdit
+except ImportError:
+    from PyQt6.QtCore import QCoreApplication
+    from PyQt6.QtWidgets import QApplication, QPlainTextEdit
+
+from ColorReliefEditor.make_process import BUILD_PRIORITY, MakeJob, MakeProcess, PREVIEW_PRIORITY
+
+
+@pytest.fixture
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def run_jobs(app, tmp_path, process, jobs):
+    makefile = tmp_path / "Makefile"
+    makefile.write_text("")
+    finished = []
+    process.make_finished.connect(lambda name, code, job_id: finished.append((name, code, job_id)))
+    ids = [process.run_make(str(makefile), str(tmp_path), command, name, None, priority, targets)
+           for command, name, priority, targets in jobs]
+    deadline = time.monotonic() + 20
+    while len(finished) < len(jobs) and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    return ids, finished
+
+
+def test_preview_runs_before_queued_build(app, tmp_path):
+    """Test a preview queued behind a build starts first, while the running build continues."""
+    log = tmp_path / "jobs.log"
+    process = MakeProcess(max_jobs=2, max_builds=1)
+    ids, finished = run_jobs(app, tmp_path, process, [
+        (f'sh -c "sleep 0.5; echo build1 >> {log}"', "Relief", BUILD_PRIORITY, {"a.tif"}),
+        (f'sh -c "echo build2 >> {log}"', "Contour", BUILD_PRIORITY, {"b.tif"}),
+        (f'sh -c "echo preview >> {log}"', "Color", PREVIEW_PRIORITY, {"a_prev.tif"}),
+    ])
+    assert [code for _, code, _ in finished] == [0, 0, 0]
+    assert {job_id for _, _, job_id in finished} == set(ids)
+    assert log.read_text().split() == ["preview", "build1", "build2"]
+
+
+def test_conflicting_jobs_wait(app, tmp_path):
+    """Test jobs writing the same file, or with unknown targets, don't overlap."""
+    log = tmp_path / "jobs.log"
+    command = f'sh -c "echo start >> {log}; sleep 0.2; echo end >> {log}"'
+    process = MakeProcess(max_jobs=4, max_builds=4)
+    _, finished = run_jobs(app, tmp_path, process, [
+        (command, "Relief", BUILD_PRIORITY, {"a.tif"}),
+        (command, "Color", PREVIEW_PRIORITY, {"a.tif"}),
+        (command, "Hillshade", BUILD_PRIORITY, None),
+    ])
+    assert [name for name, _, _ in finished] == ["Relief", "Color", "Hillshade"]
+    assert log.read_text().split() == ["start", "end"] * 3
+
+
+def test_output_is_batched(tmp_path, monkeypatch):
+    """Test output is written on flush, keeping colors across reads and the line limit."""
+    monkeypatch.setenv("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication.instance() or QApplication([])
+    if not isinstance(app, QApplication):
+        pytest.skip("needs a QApplication")
+    window = QPlainTextEdit()
+    window.setMaximumBlockCount(50)
+    process = MakeProcess(dark_mode=False)
+    process._output_window = window
+    for line in range(100):
+        process.output(f"line {line}\n")
+    process.output("\x1b[3")
+    process.output("1mred")
+    assert window.toPlainText() == ""
+
+    process.flush()
+    assert window.document().blockCount() == 50
+    assert window.toPlainText().endswith("line 99\nred")
+    cursor = window.textCursor()
+    cursor.movePosition(cursor.MoveOperation.End)
+    assert cursor.charFormat().foreground().color().name() == "#ff0000"
+
+
+def test_progress_events(app, tmp_path):
+    """Test progress events are emitted and removed from the output, even split across reads."""
+    script = tmp_path / "stage.py"
+    script.write_text(
+        "import sys, time\n"
+        "sys.stdout.write('text\\n@progress {\"percent\": 10}\\n@prog'); sys.stdout.flush()\n"
+        "time.sleep(0.2)\n"
+        "sys.stdout.write('ress {\"percent\": 50}\\nmore')\n"
+    )
+    process = MakeProcess()
+    events = []
+    process.progress.connect(lambda name, event: events.append((name, event["percent"])))
+    _, finished = run_jobs(
+        app, tmp_path, process, [(f"{sys.executable} {script}", "Relief", BUILD_PRIORITY, None)]
+    )
+    assert finished[0][1] == 0
+    assert events == [("Relief", 10), ("Relief", 50)]
+
+    job = MakeJob(1, "Relief", "", str(tmp_path), None, BUILD_PRIORITY, None)
+    assert process._take_progress(job, 'a\n@progress {"percent": 70}\n@pro') == "a\n"
+    assert process._take_progress(job, 'gress {"percent": 80}\nb') == "b"
+    assert events[2:] == [("Relief", 70), ("Relief", 80)]
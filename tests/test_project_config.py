@@ -0,0 +1,57 @@
+#  Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated
+#  documentation files (the “Software”), to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+#  persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+#  Software.
+#
+#  THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+#  WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+#  COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+
+from ColorReliefEditor import config_env
+from ColorReliefEditor.project_config import ProjectSettings, upgrade_hillshade_tone
+
+# Settings of a project created before BRIGHTNESS was applied at the merge
+BASELINE_CONFIG = """COMPRESS: -co COMPRESS=JPEG
+BRIGHTNESS: '1.3'
+EDGE: -compute_edges
+GAMMA: '1.2'
+HILLSHADE1: -igor
+HILLSHADE2: -z  3
+MERGE_CALC: --calc=numpy.where( (A < 2)  | (A > 254), B, (A / 255.) * B)
+"""
+
+
+def test_baseline_hillshade_rebuilt_once(tmp_path):
+    """Test a baseline project's hillshades are made stale once and the tone is unchanged."""
+    config = tmp_path / "T_relief.cfg"
+    config.write_text(BASELINE_CONFIG)
+    trigger = tmp_path / "T_hillshade_trigger.cfg"
+    hillshade = tmp_path / "T_A_hillshade.tif"
+    trigger.write_text("")
+    hillshade.write_bytes(b"II")
+    os.utime(trigger, (1000, 1000))
+    os.utime(hillshade, (2000, 2000))
+
+    settings = ProjectSettings(verbose=0)
+    settings.load(str(config))
+    assert upgrade_hillshade_tone(settings, str(trigger))
+    # Make now rebuilds the hillshade (and so the merge) without the old brightness
+    assert trigger.stat().st_mtime > hillshade.stat().st_mtime
+
+    values = config_env.load_values(str(config))
+    assert values["HILLSHADE_GAMMA"] == "1.0"
+    assert values["BRIGHTNESS"] == "1.3" and values["GAMMA"] == "1.2"
+
+    # Loading the upgraded project again doesn't rebuild the hillshade
+    os.utime(trigger, (1000, 1000))
+    settings = ProjectSettings(verbose=0)
+    settings.load(str(config))
+    assert not upgrade_hillshade_tone(settings, str(trigger))
+    assert trigger.stat().st_mtime == 1000
@@ -0,0 +1,234 @@
+#  Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated
+#  documentation files (the “Software”), to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+#  persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+#  Software.
+#
+#  THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+#  WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+#  COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import numpy as np
+import pytest
+
+from ColorReliefEditor.relief_engine import ColorRamp, EXACT, NEAREST, parse_color_flags, \
+    parse_nv_line, HillshadeOptions, hillshade, adjust_brightness, MergeCalc, relief_block, \
+    preview_window, window_geotransform, tone_lut, tone_expression, parse_montage, \
+    montage_windows, tile_montage, MONTAGE_GUTTER, check_output_type
+
+
+@pytest.fixture
+def rows():
+    """Ramp rows as stored in ColorConfig._data (descending elevation, alpha may be None)."""
+    return [(1000, 255, 255, 255, None), (100, 100, 50, 0, None), (0, 0, 0, 200, 128)]
+
+
+def test_interpolate(rows):
+    """Test interpolation uses the gdaldem 0.45 rounding offset and truncation."""
+    ramp = ColorRamp(rows)
+    rgba = ramp.apply(np.array([50.0, 550.0]))
+    # 50 is halfway between 0 and 100:  0.45 + 0 + 0.5 * 100 = 50.45 -> 50
+    assert rgba[0].tolist() == [50, 25, 100, 191]
+    # 550 is halfway between 100 and 1000: 0.45 + 100 + 0.5 * 155 = 177.95 -> 177
+    assert rgba[1].tolist() == [177, 152, 127, 255]
+
+
+def test_outside_ramp(rows):
+    """Test values below and above the ramp use the first and last colors."""
+    ramp = ColorRamp(rows)
+    rgba = ramp.apply(np.array([-500, 5000]))
+    assert rgba[0].tolist() == [0, 0, 200, 128]
+    assert rgba[1].tolist() == [255, 255, 255, 255]
+
+
+def test_exact(rows):
+    """Test exact mode only colors exact matches."""
+    ramp = ColorRamp(rows, mode=EXACT)
+    rgba = ramp.apply(np.array([100, 101, -1, 1000]))
+    assert rgba.tolist() == [[100, 50, 0, 255], [0, 0, 0, 0], [0, 0, 0, 0], [255, 255, 255, 255]]
+
+
+def test_nearest(rows):
+    """Test nearest mode picks the closest entry and the upper entry on ties."""
+    ramp = ColorRamp(rows, mode=NEAREST)
+    rgba = ramp.apply(np.array([40, 50, 60]))
+    assert rgba.tolist() == [[0, 0, 200, 128], [100, 50, 0, 255], [100, 50, 0, 255]]
+
+
+def test_nodata(rows):
+    """Test no data values are transparent, or use the nv color if one is given."""
+    assert ColorRamp(rows, nodata=-9999).apply(np.array([-9999]))[0].tolist() == [0, 0, 0, 0]
+
+    ramp = ColorRamp(rows, nodata=-9999, nv_color=(10, 20, 30, 40))
+    assert ramp.apply(np.array([-9999]))[0].tolist() == [10, 20, 30, 40]
+
+
+def test_nan_nodata(rows):
+    """Test NaN no data values."""
+    ramp = ColorRamp(rows, nodata=float("nan"))
+    assert ramp.apply(np.array([np.nan]))[0].tolist() == [0, 0, 0, 0]
+
+
+def test_lookup_table_matches(rows):
+    """Test the integer lookup table path matches the direct calculation."""
+    ramp = ColorRamp(rows, nodata=-32768)
+    dem = np.random.default_rng(1).integers(-200, 1200, size=(400, 400), dtype=np.int16)
+    dem[0, 0] = -32768
+    assert np.array_equal(ramp.apply(dem), ramp.apply(dem.astype(np.float64)))
+
+
+def test_parse_flags():
+    """Test parsing of gdaldem color switches."""
+    assert parse_color_flags(" -alpha -nearest_color_entry") == (NEAREST, True)
+    assert parse_color_flags("-exact_color_entry") == (EXACT, False)
+    assert parse_color_flags(None) == ("interpolate", False)
+
+
+def test_parse_nv_line():
+    """Test parsing the no data line of a color file."""
+    assert parse_nv_line(["# comment", "nv 1 2 3"]) == (1, 2, 3, 255)
+    assert parse_nv_line(["# comment"]) is None
+
+
+GEOTRANSFORM = (0.0, 10.0, 0.0, 0.0, 0.0, -10.0)
+
+
+@pytest.fixture
+def dem():
+    """Sloping DEM with a bump."""
+    y, x = np.mgrid[0:40, 0:50]
+    return (x * 3.0 + y * 2.0 + 40 * np.exp(-((x - 20) ** 2 + (y - 15) ** 2) / 60.0))
+
+
+def test_hillshade_flat():
+    """Test a flat DEM is lit by sin(altitude) and edges are no data without -compute_edges."""
+    shade = hillshade(np.full((5, 5), 100.0), GEOTRANSFORM, HillshadeOptions())
+    # 1 + 254 * sin(45) = 180.6 -> 181
+    assert shade[1:-1, 1:-1].tolist() == [[181] * 3] * 3
+    assert shade[0].tolist() == [0] * 5 and shade[:, 0].tolist() == [0] * 5
+
+    options = HillshadeOptions.from_flags("-compute_edges")
+    assert hillshade(np.full((5, 5), 100.0), GEOTRANSFORM, options).min() == 181
+
+
+def test_parse_hillshade_flags():
+    """Test gdaldem hillshade switches are parsed."""
+    options = HillshadeOptions.from_flags("-compute_edges -igor -z  3 -alg ZevenbergenThorne")
+    assert (options.shading, options.z, options.alg, options.compute_edges) == \
+           ("igor", 3.0, "ZevenbergenThorne", True)
+    with pytest.raises(ValueError):
+        HillshadeOptions.from_flags("-az north")
+
+
+@pytest.mark.parametrize("flags", ["", "-compute_edges", "-compute_edges -multidirectional",
+                                   "-igor -compute_edges", "-combined -z 2"])
+def test_hillshade_blocks_match(dem, flags):
+    """Test hillshade computed in blocks with a halo matches the whole DEM."""
+    options = HillshadeOptions.from_flags(flags)
+    dem[3, 30] = -9999
+    whole = hillshade(dem, GEOTRANSFORM, options, nodata=-9999)
+    blocks = np.zeros_like(whole)
+    rows, cols = dem.shape
+    for y in range(0, rows, 16):
+        for x in range(0, cols, 16):
+            y1, x1 = min(y + 16, rows), min(x + 16, cols)
+            block = dem[max(0, y - 1):min(rows, y1 + 1), max(0, x - 1):min(cols, x1 + 1)]
+            edges = (y == 0, y1 == rows, x == 0, x1 == cols)
+            blocks[y:y1, x:x1] = hillshade(block, GEOTRANSFORM, options, -9999, edges)
+    assert np.array_equal(whole, blocks)
+    assert whole[3, 30] == 0
+
+
+def test_merge_and_brightness():
+    """Test the default MERGE_CALC and brightness match the gdal_calc.py formulas."""
+    shade = np.array([[0, 1, 128, 255]], dtype=np.uint8)
+    color = np.full((1, 4, 3), 200, dtype=np.uint8)
+    relief = MergeCalc('--calc="numpy.where( (A < 2)  | (A > 254), B, (A / 255.) * B)"').apply(
+        shade, color)
+    # No data hillshade gives 255, 128 / 255 * 200 = 100.39 -> 100
+    assert relief[0, :, 0].tolist() == [255, 200, 100, 200]
+    assert adjust_brightness(shade, 1.5).tolist() == [[0, 1, 192, 254]]
+    with pytest.raises(ValueError):
+        MergeCalc("A *")
+
+
+def test_relief_block(rows, dem):
+    """Test the fused block pipeline combines the color ramp and hillshade."""
+    ramp = ColorRamp(rows)
+    color, shade, relief = relief_block(
+        dem, GEOTRANSFORM, ramp, HillshadeOptions(), 1.0, MergeCalc(), 3
+    )
+    assert color.shape == relief.shape == dem.shape + (3,)
+    assert np.array_equal(color, ramp.apply(dem)[..., :3])
+    assert np.array_equal(shade, hillshade(dem, GEOTRANSFORM, HillshadeOptions()))
+
+
+def test_preview_window():
+    """Test the preview section matches create_preview_dem in color_relief.sh."""
+    assert preview_window(3000, 2000, "", "", "") == (0, 0, 1000, 1000)
+    assert preview_window(3000, 2000, "500", "0.5", "1") == (1250, 1500, 500, 500)
+    with pytest.raises(ValueError):
+        preview_window(1000, 2000, "0", "0", "0")
+    with pytest.raises(ValueError):
+        preview_window(3000, 2000, "500", "1.5", "0")
+    assert window_geotransform(GEOTRANSFORM, 2, 3) == (
+        GEOTRANSFORM[0] + 2 * GEOTRANSFORM[1], GEOTRANSFORM[1], 0.0,
+        GEOTRANSFORM[3] + 3 * GEOTRANSFORM[5], 0.0, GEOTRANSFORM[5])
+
+
+def test_montage_windows():
+    """Test montage windows from shifts and from elevation quantiles fit in one preview."""
+    assert parse_montage("") is None and parse_montage("off") is None
+    assert parse_montage("4") == 4
+    assert parse_montage("0,0 1,0.5") == [(0.0, 0.0), (1.0, 0.5)]
+    for value in ("0,2", "a", "0", "17"):
+        with pytest.raises(ValueError):
+            parse_montage(value)
+
+    tile = (1000 - MONTAGE_GUTTER) // 2
+    assert montage_windows(4000, 3000, "", [(0, 0), (1, 0.5)]) == [
+        (0, 0, tile, tile), (4000 - tile, round((3000 - tile) * 0.5), tile, tile)]
+
+    # Elevation rises left to right, so quantile windows are in different columns
+    dem = np.tile(np.arange(4000, dtype=np.float64), (3000, 1))
+    dem[:, :500] = -9999
+
+    def read_sample(window, width, height):
+        x, y, w, h = window
+        return dem[y:y + h:h // height, x:x + w:w // width][:height, :width]
+
+    windows = montage_windows(4000, 3000, "1000", 4, read_sample, -9999)
+    assert len(windows) == 4
+    assert [w[0] for w in windows] == sorted(w[0] for w in windows)
+    assert all(w[0] >= 498 and w[2:] == (498, 498) for w in windows)
+
+    blocks = [np.full((3, 3), i, dtype=np.int16) for i in range(3)]
+    values, nodata = tile_montage(blocks)
+    assert values.shape == (6 + MONTAGE_GUTTER, 6 + MONTAGE_GUTTER)
+    assert nodata == np.iinfo(np.int16).min
+    assert values[0, 3] == nodata and values[-1, -1] == nodata and values[-1, 0] == 2
+
+
+def test_output_type():
+    """Test OUTPUT_TYPE is accepted for GeoTIFF and rejected for other formats."""
+    check_output_type("")
+    check_output_type("-of GTiff -compute_edges -alpha")
+    with pytest.raises(ValueError):
+        check_output_type("-of PNG -alpha")
+
+
+def test_tone():
+    """Test brightness and gamma give the same result as a LUT and as a gdal_calc expression."""
+    shade = np.arange(256, dtype=np.uint8).reshape(16, 16)
+    color = np.full((16, 16, 3), 200, dtype=np.uint8)
+    assert tone_lut(1.0, 1.0) is None
+    assert tone_lut(1.0, 2.0)[64] == 127 and tone_lut(1.0, 2.0)[0] == 0
+    for brightness, gamma in [(1.4, 1.0), (0.8, 1.2), (1.0, 0.7)]:
+        toned = adjust_brightness(shade, brightness, gamma)
+        expected = MergeCalc().apply(toned, color, shade == 0)
+        expression = tone_expression(None, brightness, gamma)
+        assert np.array_equal(MergeCalc(expression).apply(shade, color), expected)
@@ -0,0 +1,231 @@
+#  Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated
+#  documentation files (the “Software”), to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+#  persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+#  Software.
+#
+#  THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+#  WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+#  COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from multiprocessing import Pipe
+import os
+import threading
+import time
+
+import numpy as np
+
+from ColorReliefEditor import relief_engine, render_worker
+from ColorReliefEditor.render_worker import PreviewRenderer, RenderClient, RenderWorker, \
+    shade_settings
+
+
+class EchoRenderer:
+    """Renderer that returns the request id."""
+
+    def render(self, request, cancelled):
+        return request["id"]
+
+    def warmup(self, config_path, dem_path):
+        pass
+
+
+def run_requests(requests):
+    """Queue all requests before the worker starts, then collect the replies."""
+    client, server = Pipe()
+    for request in requests:
+        client.send(request)
+    thread = threading.Thread(target=RenderWorker(EchoRenderer()).handle, args=(server,))
+    thread.start()
+    replies = {}
+    for _ in requests:
+        reply = client.recv()
+        replies[reply["id"]] = reply["status"]
+    client.send({"id": 0, "op": "shutdown"})
+    thread.join(5)
+    return replies
+
+
+def test_superseded_render_is_cancelled():
+    """Test a newer render on the same channel cancels the older one, other channels run."""
+    replies = run_requests([
+        {"id": 1, "op": "render", "channel": "Color"},
+        {"id": 2, "op": "render", "channel": "Hillshade"},
+        {"id": 3, "op": "render", "channel": "Color"},
+    ])
+    assert replies == {1: "cancelled", 2: "ok", 3: "ok"}
+
+
+def test_cancel_request():
+    """Test a cancel request cancels the named request."""
+    replies = run_requests([
+        {"id": 1, "op": "render", "channel": "Color"},
+        {"id": 2, "op": "cancel", "target": 1},
+        {"id": 3, "op": "ping"},
+    ])
+    assert replies == {1: "cancelled", 2: "ok", 3: "ok"}
+
+
+def test_cancel_during_strip_render(monkeypatch):
+    """Test cancels sent while a multi-strip render runs are read in order and cancel it."""
+    started = threading.Event()
+    colorize = render_worker.colorize
+
+    def slow_colorize(*args):
+        started.set()
+        time.sleep(0.01)
+        return colorize(*args)
+
+    monkeypatch.setattr(render_worker, "colorize", slow_colorize)
+    monkeypatch.setattr(render_worker, "STRIP_ROWS", 2)
+    values = np.arange(40000, dtype=np.float32).reshape(200, 200) % 1000
+    renderer = PreviewRenderer()
+    renderer.config = lambda path: {}
+    renderer.dem = lambda path, settings: (("dem", 0), values, None, None)
+    rows = [(elevation, elevation // 4, 50, 0, None) for elevation in range(1000, -1, -200)]
+
+    # Only the thread handling the connection may read it
+    readers = set()
+    check = RenderWorker._check
+
+    def recording_check(self, conn, request):
+        readers.add(threading.current_thread())
+        return check(self, conn, request)
+
+    monkeypatch.setattr(RenderWorker, "_check", recording_check)
+    client, server = Pipe()
+    thread = threading.Thread(target=RenderWorker(renderer).handle, args=(server,))
+    thread.start()
+    client.send({"id": 1, "op": "render", "channel": "Color", "base": "color", "config": "",
+                 "dem": "", "rows": rows})
+    assert started.wait(5)
+    for request_id in range(2, 40):
+        client.send({"id": request_id, "op": "cancel", "target": 100})
+    client.send({"id": 40, "op": "cancel", "target": 1})
+    replies = {}
+    for _ in range(40):
+        assert client.poll(10)
+        reply = client.recv()
+        replies[reply["id"]] = reply["status"]
+    client.send({"id": 0, "op": "shutdown"})
+    thread.join(5)
+    assert readers == {thread}
+    assert replies.pop(1) == "cancelled"
+    assert set(replies) == set(range(2, 41)) and set(replies.values()) == {"ok"}
+
+
+def test_client_round_trip(tmp_path, monkeypatch):
+    """Test the client starts the worker process and receives responses."""
+    # The worker process imports the package from the checkout, installed or not
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join(
+        filter(None, [root, os.environ.get("PYTHONPATH")])))
+    config = tmp_path / "TEST_relief.cfg"
+    config.write_text("COLOR1: ''\n")
+    client = RenderClient(address=str(tmp_path / "worker.sock"), timeout=20)
+    try:
+        status, result = client.render(
+            "Color", "color", str(config), str(tmp_path / "missing.tif"), "ramp.txt"
+        )
+        assert status == "error" and result
+        assert client.running
+    finally:
+        client.close()
+    assert not client.running
+
+
+def test_recolor_patch():
+    """Test a one row color edit returns a patch that matches a full render."""
+    values = np.arange(10000, dtype=np.float32).reshape(100, 100) % 1000
+    renderer = PreviewRenderer()
+    renderer.config = lambda path: {}
+    renderer.dem = lambda path, settings: (("dem", 0), values, None, None)
+    rows = [(elevation, elevation // 4, 50, 0, None) for elevation in range(1000, -1, -200)]
+    edited = rows[:2] + [(650, 10, 20, 30, None)] + rows[3:]
+    request = {"id": 1, "op": "render", "channel": "Color", "base": "color", "config": "",
+               "dem": "", "rows": rows}
+    image = renderer.render(request, lambda: False)
+
+    patch = renderer.render(dict(request, id=2, rows=edited, since=1), lambda: False)
+    assert isinstance(patch, dict) and 0 < len(patch["index"]) < values.size
+    image.reshape(-1, 4)[patch["index"]] = patch["rgba"]
+    assert np.array_equal(image, renderer.render(dict(request, id=3, rows=edited), lambda: False))
+
+    # An edit to the top row only changes elevations above the row below it
+    top = [(1000, 1, 2, 3, None)] + edited[1:]
+    patch = renderer.render(dict(request, id=4, rows=top, since=3), lambda: False)
+    assert values.ravel()[patch["index"]].min() >= 800
+
+
+def test_montage_windows_shaded_separately(tmp_path, monkeypatch):
+    """Test each montage window is shaded as a separate DEM, with no data between windows."""
+    rng = np.random.default_rng(1)
+    blocks = [rng.random((40, 40)).astype(np.float32) * 100 for _ in range(3)]
+    values, nodata = relief_engine.tile_montage(blocks, -9999.0)
+    geotransform = (0.0, 10.0, 0.0, 0.0, 0.0, -10.0)
+    windows = [(i * 50, 0, 40, 40) for i in range(3)]
+    monkeypatch.setattr(relief_engine, "read_preview",
+                        lambda *args: (values, geotransform, nodata, windows))
+    dem_path = tmp_path / "region_A_DEM.tif"
+    dem_path.write_bytes(b"dem")
+
+    renderer = PreviewRenderer()
+    renderer.config = lambda path: {"MONTAGE": "3", "BUILD_CACHE": "off"}
+    request = {"id": 1, "op": "render", "base": "hillshade", "config": "", "dem": str(dem_path)}
+    image = renderer.render(request, lambda: False)[..., 0]
+
+    options = relief_engine.HillshadeOptions.from_flags("")
+    _, offsets = relief_engine.montage_shape(3, 40)
+    for block, (y, x) in zip(blocks, offsets):
+        expected = relief_engine.hillshade(block, geotransform, options, nodata)
+        assert np.array_equal(image[y:y + 40, x:x + 40], expected)
+    assert not image[:, 40:40 + relief_engine.MONTAGE_GUTTER].any()
+
+
+def test_scaled_render():
+    """Test a coarse render decimates the DEM and doesn't disturb color edit patches."""
+    values = np.arange(10000, dtype=np.float32).reshape(100, 100) % 1000
+    renderer = PreviewRenderer()
+    renderer.config = lambda path: {}
+    renderer.dem = lambda path, settings: (("dem", 0), values, (0, 10, 0, 0, 0, -10), None)
+    rows = [(elevation, elevation // 4, 50, 0, None) for elevation in range(1000, -1, -200)]
+    request = {"id": 1, "op": "render", "channel": "Relief", "base": "relief", "config": "",
+               "dem": "", "rows": rows}
+    full = renderer.render(request, lambda: False)
+
+    coarse = renderer.render(dict(request, id=2, scale=8), lambda: False)
+    assert coarse.shape == (13, 13, 4)
+    assert np.array_equal(coarse, full[::8, ::8])
+
+    # Only the ramp changed, so the coarse frame is skipped and the full frame is a patch
+    edited = rows[:2] + [(650, 10, 20, 30, None)] + rows[3:]
+    assert renderer.render(dict(request, id=3, rows=edited, since=1, scale=8), lambda: False) \
+        is None
+    patch = renderer.render(dict(request, id=4, rows=edited, since=1), lambda: False)
+    assert isinstance(patch, dict)
+
+
+def test_baseline_config_tone(tmp_path):
+    """Test a baseline config (unused GAMMA 1.2) merges like the old brightness step."""
+    config = tmp_path / "TEST_relief.cfg"
+    config.write_text("BRIGHTNESS: '1.3'\nGAMMA: '1.2'\n"
+                      "MERGE_CALC: --calc=numpy.where( (A < 2)  | (A > 254), B, (A / 255.) * B)\n")
+    settings = PreviewRenderer().config(str(config))
+    _, brightness, gamma = shade_settings(settings)
+    assert (brightness, gamma) == (1.3, 1.0)
+
+    shade = np.arange(256, dtype=np.uint8).reshape(16, 16)
+    color = np.random.default_rng(1).integers(0, 256, (16, 16, 3), dtype=np.uint8)
+    merge_calc = relief_engine.MergeCalc(settings["MERGE_CALC"])
+    # The color_relief.sh adjust_brightness gdal_calc.py step before the tone moved to the merge
+    old_shade = np.clip(((shade / 255.) * 1.3) * 255, 1, 254).astype(np.uint8)
+    toned = relief_engine.adjust_brightness(shade, brightness, gamma)
+    # gdal_calc.py masks the hillshade no data (0), so only the valid pixels are compared
+    valid = shade > 0
+    assert np.array_equal(toned[valid], old_shade[valid])
+    assert np.array_equal(merge_calc.apply(toned, color)[valid],
+                          merge_calc.apply(old_shade, color)[valid])
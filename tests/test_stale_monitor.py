@@ -0,0 +1,62 @@
+#  Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated
+#  documentation files (the “Software”), to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+#  persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+#  Software.
+#
+#  THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+#  WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+#  COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import time
+
+# Handle imports for PyQt6 versus PySide depending on which has been installed
+try:
+    from PySide6.QtCore import QCoreApplication
+except ImportError:
+    from PyQt6.QtCore import QCoreApplication
+
+from ColorReliefEditor.stale_monitor import StaleMonitor
+
+CONFIG = """DEM_FOLDER: elevation
+LAYER: A
+NAMES:
+  A: base
+FILES:
+  A: n45*.tif
+"""
+
+FILES = ["T_color_ramp.txt", "T_base_DEM_trigger.cfg", "T_hillshade_trigger.cfg",
+         "elevation/n45w001.tif", "T_base_DEM.tif", "T_base_color.tif", "T_base_hillshade.tif",
+         "T_relief.cfg", "T_base_relief.tif"]
+
+
+def test_monitor(tmp_path):
+    """Test the monitor reports a changed elevation file after the debounce delay."""
+    app = QCoreApplication.instance() or QCoreApplication([])
+    (tmp_path / "elevation").mkdir()
+    for i, name in enumerate(FILES):
+        (tmp_path / name).write_text(CONFIG if name == "T_relief.cfg" else "")
+        os.utime(tmp_path / name, (1000 + i, 1000 + i))
+
+    monitor = StaleMonitor(delay=20)
+    changes = []
+    monitor.status_changed.connect(lambda: changes.append(dict(monitor.status)))
+    monitor.set_project(str(tmp_path / "T_relief.cfg"))
+    assert monitor.status == {"base": []}
+
+    # A new elevation tile makes the DEM and everything built from it out of date
+    (tmp_path / "elevation" / "n45w002.tif").write_text("")
+    deadline = time.monotonic() + 5
+    while len(changes) < 2 and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    assert [item.stage for item in monitor.status["base"]] == ["DEM", "color", "hillshade",
+                                                               "relief"]
+    assert monitor.stale("base")[0].reason == "elevation file is newer"
+    monitor.stop()
@@ -0,0 +1,78 @@
+#  Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated
+#  documentation files (the “Software”), to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+#  persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+#  Software.
+#
+#  THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+#  WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+#  COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import numpy as np
+import pytest
+
+from ColorReliefEditor import relief_engine
+from ColorReliefEditor.relief_engine import HillshadeJob, HillshadeOptions, read_block
+from ColorReliefEditor.tile_scheduler import resolve_workers, run_blocks
+
+GEOTRANSFORM = (0.0, 10.0, 0.0, 0.0, 0.0, -10.0)
+
+
+class ArrayBand:
+    """In-memory raster band with the ReadAsArray interface."""
+
+    def __init__(self, values):
+        self.values = values
+
+    def ReadAsArray(self, x_off, y_off, width, height):
+        return self.values[y_off:y_off + height, x_off:x_off + width]
+
+
+class ArrayHillshadeJob(HillshadeJob):
+    """HillshadeJob that reads from an array instead of a DEM file."""
+
+    def __init__(self, values, options):
+        super().__init__(None, GEOTRANSFORM, options, 1.3, -9999)
+        self.values = values
+
+    def read(self, window):
+        rows, cols = self.values.shape
+        return read_block(ArrayBand(self.values), window, cols, rows, self.halo)
+
+
+@pytest.fixture
+def dem():
+    y, x = np.mgrid[0:70, 0:90]
+    values = x * 3.0 + y * 2.0 + 40 * np.sin(x / 7.0) * np.cos(y / 5.0)
+    values[10, 40] = -9999
+    return values
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_tiled_matches_whole(dem, workers):
+    """Test blocks rendered in worker processes match the hillshade of the whole DEM."""
+    options = HillshadeOptions.from_flags("-compute_edges -multidirectional")
+    expected = relief_engine.adjust_brightness(
+        relief_engine.hillshade(dem, GEOTRANSFORM, options, -9999), 1.3
+    )
+    result = np.zeros_like(expected)
+
+    def on_result(window, outputs):
+        x_off, y_off, width, height = window
+        result[y_off:y_off + height, x_off:x_off + width] = outputs[0]
+
+    windows = list(relief_engine.iter_windows(dem.shape[1], dem.shape[0], 32))
+    run_blocks(ArrayHillshadeJob(dem, options), windows, workers, on_result)
+    assert np.array_equal(result, expected)
+
+
+def test_resolve_workers():
+    """Test WORKERS parsing."""
+    assert resolve_workers("4") == 4
+    assert resolve_workers("ALL_CPUS") == resolve_workers("") >= 1
+    with pytest.raises(ValueError):
+        resolve_workers("many")
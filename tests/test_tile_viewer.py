@@ -0,0 +1,71 @@
+#  Copyright (c) 2024. Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated
+#  documentation files (the “Software”), to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+#  persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+#  Software.
+#
+#  THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+#  WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+#  COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import pytest
+
+try:
+    from PySide6.QtCore import QCoreApplication
+except ImportError:
+    from PyQt6.QtCore import QCoreApplication
+
+from ColorReliefEditor.geotiff import REDUCED_RESOLUTION
+from ColorReliefEditor.tile_viewer import QtTileSource, TILE_SIZE, TileCache
+from test_image_loader import write_tiff
+
+
+@pytest.fixture
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+class Tile:
+    def __init__(self, width, height):
+        self._width, self._height = width, height
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+
+def test_tile_cache():
+    """Test the least recently used tiles are evicted over the memory budget."""
+    cache = TileCache(budget_mb=3)
+    tile = Tile(512, 512)
+    for key in ("a", "b", "c"):
+        cache.put(key, tile)
+    assert len(cache) == 3
+    cache.get("a")
+    cache.put("d", tile)
+    assert "b" not in cache and "a" in cache and "d" in cache
+    assert cache.size == 3 * 512 * 512 * 4
+    cache.clear()
+    assert len(cache) == 0 and cache.size == 0
+
+
+def test_qt_tile_source(app, tmp_path):
+    """Test tiles are cut from the TIFF levels."""
+    path = tmp_path / "relief.tif"
+    write_tiff(path, [(1200, 600, (255, 0, 0), 0), (300, 150, (0, 255, 0), REDUCED_RESOLUTION)])
+    source = QtTileSource(str(path))
+    assert (source.width, source.height) == (1200, 600)
+    assert source.levels == [1.0, 4.0]
+
+    tile = source.read_tile(0, 2, 1)
+    assert (tile.width(), tile.height()) == (1200 - 2 * TILE_SIZE, 600 - TILE_SIZE)
+    assert tile.pixelColor(0, 0).red() == 255
+    tile = source.read_tile(1, 0, 0)
+    assert (tile.width(), tile.height()) == (300, 150)
+    assert tile.pixelColor(0, 0).green() == 255
+    assert source.read_tile(1, 1, 0) is None